@@ -183,6 +183,14 @@ class AnkiConnectClient:
         """Find note IDs matching an Anki search query."""
         return self._request("findNotes", {"query": query})
 
+    def notes_info(self, note_ids: list[int]) -> list[dict[str, Any]]:
+        """Fetch fields, model and modification time for each note ID."""
+        return self._request("notesInfo", {"notes": note_ids})
+
+    def notes_mod_time(self, note_ids: list[int]) -> list[dict[str, Any]]:
+        """Fetch only ``noteId`` and ``mod`` for each note ID (cheaper than notesInfo)."""
+        return self._request("notesModTime", {"notes": note_ids})
+
     def update_note_fields(self, note_id: int, fields: dict[str, str]) -> None:
         """Update fields of an existing note."""
         self._request("updateNoteFields", {"note": {"id": note_id, "fields": fields}})
@@ -1,4 +1,5 @@
 from .card_pipeline import (
+    is_normalized,
     normalize_card_draft,
     normalize_cards,
     normalize_raw_card,
@@ -6,6 +7,7 @@ from .card_pipeline import (
 )
 
 __all__ = [
+    "is_normalized",
     "normalize_card_draft",
     "normalize_cards",
     "normalize_raw_card",
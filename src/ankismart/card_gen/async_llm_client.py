@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Mapping
+from typing import Any
+
+import httpx
+from openai import AsyncOpenAI, RateLimitError
+
+from ankismart.card_gen.llm_client import (
+    _MAX_RETRIES,
+    _RETRYABLE_ERRORS,
+    StreamCollector,
+    _ChatClientBase,
+    _note_request_cached,
+    record_usage,
+    usage_total_tokens,
+)
+from ankismart.card_gen.response_cache import LLMResponseCache
+from ankismart.core.errors import CardGenError
+from ankismart.core.logging import get_logger
+from ankismart.core.tracing import metrics
+
+logger = get_logger("async_llm_client")
+
+
+class AsyncLLMClient(_ChatClientBase):
+    """asyncio counterpart of :class:`~ankismart.card_gen.llm_client.LLMClient`.
+
+    Shares retry policy, error mapping and metrics with the sync client; retry and
+    throttle waits suspend the coroutine so one event loop can keep many requests in flight.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o",
+        *,
+        base_url: str | None = None,
+        rpm_limit: int = 0,
+        tpm_limit: int = 0,
+        temperature: float = 0.3,
+        max_tokens: int = 0,
+        proxy_url: str = "",
+        response_cache: LLMResponseCache | None = None,
+        context_window: int = 0,
+        max_output_tokens: int = 0,
+        structured_output: bool = False,
+    ) -> None:
+        super().__init__(
+            api_key,
+            model,
+            base_url=base_url,
+            rpm_limit=rpm_limit,
+            tpm_limit=tpm_limit,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            proxy_url=proxy_url,
+            response_cache=response_cache,
+            context_window=context_window,
+            max_output_tokens=max_output_tokens,
+            structured_output=structured_output,
+        )
+        kwargs: dict[str, object] = {"api_key": api_key}
+        self._http_client: httpx.AsyncClient | None = None
+        if base_url:
+            kwargs["base_url"] = base_url
+        if proxy_url:
+            self._http_client = httpx.AsyncClient(proxy=proxy_url)
+            kwargs["http_client"] = self._http_client
+        self._client = AsyncOpenAI(**kwargs)
+        self._closed = False
+        # Called with "rate_limited" or "timeout" on every retryable failure so a
+        # scheduler can adapt its concurrency before the retries run out.
+        self.congestion_listener: Callable[[str], None] | None = None
+
+    async def aclose(self) -> None:
+        """Release underlying OpenAI and HTTP resources."""
+        if self._closed:
+            return
+        self._closed = True
+
+        close_openai = getattr(self._client, "close", None)
+        if callable(close_openai):
+            try:
+                await close_openai()
+            except Exception as exc:  # pragma: no cover - defensive cleanup
+                logger.debug(f"Failed to close async OpenAI client cleanly: {exc}")
+
+        if self._http_client is not None:
+            try:
+                await self._http_client.aclose()
+            except Exception as exc:  # pragma: no cover - defensive cleanup
+                logger.debug(f"Failed to close async HTTP client cleanly: {exc}")
+            finally:
+                self._http_client = None
+
+    async def __aenter__(self) -> AsyncLLMClient:
+        return self
+
+    async def __aexit__(self, _exc_type, _exc, _tb) -> None:
+        await self.aclose()
+
+    async def chat(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        """Send a chat completion request with retry logic, consulting the response cache."""
+        return await self._chat_cached(
+            system_prompt,
+            user_prompt,
+            timeout,
+            response_format=response_format,
+            use_cache=use_cache,
+        )
+
+    async def chat_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        """Streaming counterpart of :meth:`chat`; see ``LLMClient.chat_stream``."""
+        return await self._chat_cached(
+            system_prompt,
+            user_prompt,
+            timeout,
+            stream=True,
+            on_text=on_text,
+            response_format=response_format,
+            use_cache=use_cache,
+        )
+
+    async def _chat_cached(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None,
+        *,
+        stream: bool = False,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        cache = self._response_cache
+        if cache is None or not cache.accepts(self._temperature):
+            return await self._chat_uncached(
+                system_prompt,
+                user_prompt,
+                timeout,
+                stream=stream,
+                on_text=on_text,
+                response_format=response_format,
+            )
+
+        key = self._cache_key(system_prompt, user_prompt, response_format)
+        if not use_cache:
+            # Regeneration and retries want a new answer; it replaces the cached one.
+            metrics.increment("llm_cache_bypassed_total")
+            response = await self._chat_uncached(
+                system_prompt,
+                user_prompt,
+                timeout,
+                stream=stream,
+                on_text=on_text,
+                response_format=response_format,
+            )
+            await asyncio.to_thread(cache.put, key, response, model=self._model)
+            return response
+
+        fetched = False
+
+        async def fetch() -> str:
+            nonlocal fetched
+            fetched = True
+            return await self._chat_uncached(
+                system_prompt,
+                user_prompt,
+                timeout,
+                stream=stream,
+                on_text=on_text,
+                response_format=response_format,
+            )
+
+        # Coalesces with sync and async callers of the same request alike.
+        response = await cache.get_or_fetch_async(key, fetch, model=self._model)
+        if not fetched:
+            _note_request_cached()
+            if on_text is not None:
+                on_text(response)
+        return response
+
+    async def _chat_uncached(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        stream: bool = False,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+    ) -> str:
+        trace_id, reserved = self._start_request(system_prompt, user_prompt, response_format)
+        kwargs = self._completion_kwargs(
+            system_prompt, user_prompt, timeout, response_format, stream=stream
+        )
+
+        for attempt in range(_MAX_RETRIES):
+            self._note_attempt(await self._throttle.wait_async(reserved))
+            collector: StreamCollector | None = None
+            try:
+                if stream:
+                    collector = StreamCollector(
+                        trace_id=trace_id, model=self._model, on_text=on_text
+                    )
+                    async for chunk in await self._open_stream(kwargs):
+                        collector.add(chunk)
+                    content, used_tokens = collector.content, collector.used_tokens
+                else:
+                    response = await self._client.chat.completions.create(**kwargs)
+                    record_usage(response, trace_id=trace_id, model=self._model)
+                    used_tokens = usage_total_tokens(response)
+                    content = response.choices[0].message.content
+                return self._finish_response(
+                    content, reserved=reserved, used_tokens=used_tokens, trace_id=trace_id
+                )
+
+            except CardGenError:
+                raise
+
+            except asyncio.CancelledError:
+                self._throttle.reconcile(reserved, 0)
+                raise
+
+            except _RETRYABLE_ERRORS as exc:
+                if self.congestion_listener is not None:
+                    self.congestion_listener(
+                        "rate_limited" if isinstance(exc, RateLimitError) else "timeout"
+                    )
+                delay = self._retry_delay(
+                    exc,
+                    attempt=attempt,
+                    delivered=collector is not None and collector.delivered,
+                    reserved=reserved,
+                    trace_id=trace_id,
+                )
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            except Exception as exc:
+                raise self._request_error(
+                    exc, reserved=reserved, trace_id=trace_id, response_format=response_format
+                ) from exc
+
+        raise self._retries_exhausted(trace_id)
+
+    async def _open_stream(self, kwargs: dict[str, Any]) -> Any:
+        try:
+            return await self._client.chat.completions.create(**kwargs)
+        except Exception as exc:
+            if not self._stream_usage_fallback(exc, kwargs):
+                raise
+        return await self._client.chat.completions.create(**kwargs)
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from ankismart.card_gen.tokens import estimate_tokens
+
+_PAGE_HEADING_RE = re.compile(r"^#{1,6}\s*page\s+\d+\s*$", re.IGNORECASE)
+_SEPARATOR_RE = re.compile(r"^\s*(?:-{3,}|\*{3,}|_{3,})\s*$")
+_FENCE_RE = re.compile(r"^\s*(?:```|~~~)")
+_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}(?:\s|$)")
+_TABLE_RULE_RE = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(?:\|\s*:?-{2,}:?\s*)*\|?\s*$")
+_DIGITS_RE = re.compile(r"\d+")
+_BOILERPLATE_HINT_RE = re.compile(
+    r"(?:©|\(c\)|copyright|all rights reserved|confidential|watermark|"
+    r"downloaded from|版权所有|保留所有权利|内部资料|仅供|机密|水印)",
+    re.IGNORECASE,
+)
+# Lines whose numbers change from page to page only count as boilerplate when they look like
+# a page counter; otherwise "Step 1"/"Step 2" style content would be mistaken for a footer.
+_PAGE_COUNTER_HINT_RE = re.compile(r"(?:page|\bp\.|\bof\b|/|\||第|页|頁)", re.IGNORECASE)
+
+# Lines this close to the start/end of a page are where running headers and footers live.
+_EDGE_LINES = 3
+_MAX_BOILERPLATE_LINE_CHARS = 160
+_MIN_SECTIONS = 3
+
+
+@dataclass(frozen=True)
+class BoilerplateReport:
+    """What :func:`strip_repeated_boilerplate` removed from one document."""
+
+    removed_lines: int = 0
+    chars_saved: int = 0
+    tokens_saved: int = 0
+    patterns: tuple[str, ...] = ()
+
+
+def _exact_key(line: str) -> str:
+    return " ".join(line.strip().split()).lower()
+
+
+def _line_key(line: str) -> str:
+    # Page numbers and running counters differ per page; compare the template.
+    return _DIGITS_RE.sub("#", _exact_key(line))
+
+
+def _is_structural(line: str) -> bool:
+    # Headings are document structure even when every slide repeats them.
+    stripped = line.strip()
+    return (
+        not stripped
+        or bool(_HEADING_RE.match(line))
+        or bool(_SEPARATOR_RE.match(stripped))
+        or bool(_TABLE_RULE_RE.match(stripped))
+    )
+
+
+def _split_sections(lines: list[str]) -> list[list[int]]:
+    """Group line indices into page-like sections (``## Page N`` headings or ``---`` rules)."""
+    sections: list[list[int]] = [[]]
+    in_fence = False
+    for index, line in enumerate(lines):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        if not in_fence and (_PAGE_HEADING_RE.match(line.strip()) or _SEPARATOR_RE.match(line)):
+            if sections[-1]:
+                sections.append([])
+            continue
+        sections[-1].append(index)
+    return [section for section in sections if section]
+
+
+def _fenced_indices(lines: list[str]) -> set[int]:
+    """Indices of code-fence lines and everything between them, across the whole document."""
+    fenced: set[int] = set()
+    in_fence = False
+    for index, line in enumerate(lines):
+        if _FENCE_RE.match(line):
+            fenced.add(index)
+            in_fence = not in_fence
+        elif in_fence:
+            fenced.add(index)
+    return fenced
+
+
+def _candidate_indices(
+    lines: list[str], section: list[int], fenced: set[int]
+) -> tuple[set[int], set[int]]:
+    """Return (all candidate line indices, those at the top/bottom edge of the section)."""
+    candidates = [
+        index
+        for index in section
+        if index not in fenced
+        and not _is_structural(lines[index])
+        and len(lines[index].strip()) <= _MAX_BOILERPLATE_LINE_CHARS
+    ]
+    edges = set(candidates[:_EDGE_LINES]) | set(candidates[-_EDGE_LINES:])
+    return set(candidates), edges
+
+
+def _drop_lines(lines: list[str], removed: set[int]) -> str:
+    """Join ``lines`` without ``removed``, merging only the blank runs a removal left behind.
+
+    Blank lines elsewhere, such as those inside code blocks, are kept as they are.
+    """
+    kept: list[str] = []
+    drop_blank = False
+    for index, line in enumerate(lines):
+        if index in removed:
+            drop_blank = not kept or not kept[-1].strip()
+            continue
+        if drop_blank and not line.strip():
+            continue
+        drop_blank = False
+        kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def strip_repeated_boilerplate(
+    markdown: str,
+    *,
+    min_section_ratio: float = 0.5,
+    min_repeats: int = 3,
+) -> tuple[str, BoilerplateReport]:
+    """Remove running headers, footers and watermark lines repeated across pages.
+
+    A line template is boilerplate when it appears in at least ``min_section_ratio`` of
+    the sections (and at least ``min_repeats`` times) and either sits at a page edge in
+    most of those sections or looks like a copyright/watermark notice. Templates whose
+    numbers vary must also look like a page counter. Documents with fewer than three
+    sections are returned unchanged.
+    """
+    text = str(markdown or "")
+    lines = text.split("\n")
+    sections = _split_sections(lines)
+    if len(sections) < _MIN_SECTIONS:
+        return text, BoilerplateReport()
+
+    section_hits: Counter[str] = Counter()
+    edge_hits: Counter[str] = Counter()
+    variants: dict[str, set[str]] = {}
+    per_section: list[set[int]] = []
+    fenced = _fenced_indices(lines)
+    for section in sections:
+        candidates, edges = _candidate_indices(lines, section, fenced)
+        per_section.append(candidates)
+        for index in candidates:
+            variants.setdefault(_line_key(lines[index]), set()).add(_exact_key(lines[index]))
+        keys = {_line_key(lines[index]) for index in candidates}
+        edge_keys = {_line_key(lines[index]) for index in edges}
+        section_hits.update(keys)
+        edge_hits.update(edge_keys)
+
+    required = max(int(min_repeats), math.ceil(len(sections) * float(min_section_ratio)))
+    boilerplate_keys: set[str] = set()
+    for key, hits in section_hits.items():
+        if hits < required:
+            continue
+        if len(variants[key]) > 1 and not _PAGE_COUNTER_HINT_RE.search(key):
+            continue
+        if edge_hits[key] * 2 >= hits or _BOILERPLATE_HINT_RE.search(key):
+            boilerplate_keys.add(key)
+
+    if not boilerplate_keys:
+        return text, BoilerplateReport()
+
+    removed = {
+        index
+        for candidates in per_section
+        for index in candidates
+        if _line_key(lines[index]) in boilerplate_keys
+    }
+    cleaned = _drop_lines(lines, removed)
+    report = BoilerplateReport(
+        removed_lines=len(removed),
+        chars_saved=max(0, len(text) - len(cleaned)),
+        tokens_saved=max(0, estimate_tokens(text) - estimate_tokens(cleaned)),
+        patterns=tuple(sorted(boilerplate_keys)),
+    )
+    return cleaned, report
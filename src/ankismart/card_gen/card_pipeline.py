@@ -1,13 +1,107 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 from collections.abc import Mapping, Sequence
 
 from ankismart.core.models import CardDraft
+from ankismart.core.tracing import metrics
 
 from .card_kind import detect_card_kind
 from .card_normalizer import NormalizationResult, normalize_fields
 from .card_structure_validator import ValidationResult, validate_normalized_card
 
+_NORMALIZATION_CACHE_MAX_ENTRIES = 4096
+
+
+class _NormalizationCache:
+    """Thread-safe LRU of normalization results keyed by card content fingerprint."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max(1, int(max_entries))
+        self._entries: OrderedDict[str, NormalizationResult] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> NormalizationResult | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: NormalizationResult) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_normalization_cache = _NormalizationCache(_NORMALIZATION_CACHE_MAX_ENTRIES)
+
+
+def clear_normalization_cache() -> None:
+    _normalization_cache.clear()
+
+
+def _content_fingerprint(
+    note_type: str,
+    strategy_id: str,
+    fields: Mapping[str, object],
+    tags: Sequence[str] | None,
+) -> str:
+    # Field values are coerced the way the normalizer coerces them; order is kept
+    # because the generic normalization preserves it.
+    raw = json.dumps(
+        [
+            str(note_type or ""),
+            str(strategy_id or ""),
+            [[str(key), str(value or "").strip()] for key, value in fields.items()],
+            [str(tag) for tag in tags or ()],
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _copy_result(result: NormalizationResult) -> NormalizationResult:
+    return NormalizationResult(
+        fields=dict(result.fields),
+        quality_flags=list(result.quality_flags),
+        warnings=list(result.warnings),
+        blocking_errors=list(result.blocking_errors),
+        card_kind=result.card_kind,
+    )
+
+
+def _normalize_cached(
+    fingerprint: str,
+    *,
+    note_type: str,
+    strategy_id: str,
+    fields: Mapping[str, object],
+    tags: Sequence[str] | None,
+) -> NormalizationResult:
+    cached = _normalization_cache.get(fingerprint)
+    if cached is not None:
+        metrics.increment("card_normalization_cache_hits_total")
+        return cached
+    metrics.increment("card_normalization_cache_misses_total")
+    result = normalize_fields(
+        note_type=note_type,
+        strategy_id=strategy_id,
+        fields=fields,
+        tags=tags,
+    )
+    _normalization_cache.put(fingerprint, result)
+    return result
+
 
 def normalize_raw_card(
     *,
@@ -16,16 +110,43 @@ def normalize_raw_card(
     fields: Mapping[str, object],
     tags: Sequence[str] | None = None,
 ) -> NormalizationResult:
-    return normalize_fields(
+    result = _normalize_cached(
+        _content_fingerprint(note_type, strategy_id, fields, tags),
         note_type=note_type,
         strategy_id=strategy_id,
         fields=fields,
         tags=tags,
     )
+    # Cached results are shared; callers get their own copy to mutate.
+    return _copy_result(result)
+
+
+def _draft_fingerprint(draft: CardDraft) -> str:
+    return _content_fingerprint(
+        draft.note_type, draft.metadata.strategy_id, draft.fields, draft.tags
+    )
+
+
+def is_normalized(draft: CardDraft) -> bool:
+    """Whether ``draft`` came out of :func:`normalize_card_draft` and is unchanged since."""
+    state = draft._normalized_state
+    return state is not None and state == (
+        _draft_fingerprint(draft),
+        tuple(draft.metadata.quality_flags),
+    )
 
 
 def normalize_card_draft(draft: CardDraft) -> CardDraft:
-    normalized = normalize_raw_card(
+    """Return a normalized copy of ``draft``.
+
+    A draft already produced by this function and not edited since is returned as is,
+    so push and export stages can normalize defensively without re-copying cards.
+    """
+    if is_normalized(draft):
+        metrics.increment("card_normalization_skipped_total")
+        return draft
+    normalized = _normalize_cached(
+        _draft_fingerprint(draft),
         note_type=draft.note_type,
         strategy_id=draft.metadata.strategy_id,
         fields=draft.fields,
@@ -34,6 +155,10 @@ def normalize_card_draft(draft: CardDraft) -> CardDraft:
     updated = draft.model_copy(deep=True)
     updated.fields = dict(normalized.fields)
     updated.metadata.quality_flags = list(normalized.quality_flags)
+    updated._normalized_state = (
+        _draft_fingerprint(updated),
+        tuple(updated.metadata.quality_flags),
+    )
     return updated
 
 
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import html
+import re
+import threading
+from collections.abc import Iterator, Sequence
+from typing import TYPE_CHECKING, Any
+
+from ankismart.card_gen.near_duplicates import NearDuplicateIndex
+from ankismart.core.errors import AnkiGatewayError
+from ankismart.core.logging import get_logger
+from ankismart.core.tracing import metrics
+
+if TYPE_CHECKING:
+    from ankismart.anki_gateway.client import AnkiConnectClient
+
+logger = get_logger("card_gen.existing_notes")
+
+# notesInfo payloads carry every field of every note; keep each request modest.
+_NOTES_INFO_BATCH = 500
+_NOTES_MOD_TIME_BATCH = 5000
+_QUESTION_FIELDS = ("Front", "Question", "Text")
+_TAG_RE = re.compile(r"<[^>]+>")
+_CLOZE_RE = re.compile(r"\{\{c\d+::(.*?)(?:::.*?)?\}\}", re.DOTALL)
+
+
+def plain_question_text(text: str) -> str:
+    """Question text without markup, entities or cloze syntax."""
+    plain = _CLOZE_RE.sub(r"\1", str(text or ""))
+    plain = html.unescape(_TAG_RE.sub(" ", plain))
+    return " ".join(plain.split())
+
+
+def note_question_text(note: dict[str, Any]) -> str:
+    """The question-side text of an AnkiConnect ``notesInfo`` entry."""
+    fields = note.get("fields") or {}
+    if not isinstance(fields, dict) or not fields:
+        return ""
+
+    def value_of(field: Any) -> str:
+        return str(field.get("value", "") if isinstance(field, dict) else field or "")
+
+    for name in _QUESTION_FIELDS:
+        if name in fields and value_of(fields[name]).strip():
+            return plain_question_text(value_of(fields[name]))
+    first = min(
+        fields.values(),
+        key=lambda field: field.get("order", 0) if isinstance(field, dict) else 0,
+    )
+    return plain_question_text(value_of(first))
+
+
+def deck_search_query(deck_name: str, scope: str = "deck") -> str:
+    """Anki search covering the notes a push would be checked against."""
+    if scope == "collection" or not deck_name.strip():
+        return "deck:*"
+    escaped = deck_name.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"deck:{escaped}"'
+
+
+def _batches(values: Sequence[int], size: int) -> Iterator[list[int]]:
+    for start in range(0, len(values), size):
+        yield list(values[start : start + size])
+
+
+class ExistingNotesIndex:
+    """Near-duplicate index over the question fields of notes already in Anki.
+
+    :meth:`refresh` lists the notes matching the search query, compares their
+    modification times with the cached ones and only downloads new or edited notes,
+    so repeated generations against an unchanged deck cost two cheap requests.
+    """
+
+    def __init__(self, query: str, threshold: float = 0.9) -> None:
+        self.query = query
+        self._index = NearDuplicateIndex(threshold)
+        self._mod_times: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def threshold(self) -> float:
+        return self._index.threshold
+
+    def __len__(self) -> int:
+        return len(self._mod_times)
+
+    def refresh(self, client: AnkiConnectClient) -> int:
+        """Sync with Anki; return how many notes were (re)downloaded."""
+        with self._lock:
+            note_ids = [int(note_id) for note_id in client.find_notes(self.query) or []]
+            current = set(note_ids)
+            for note_id in [note_id for note_id in self._mod_times if note_id not in current]:
+                del self._mod_times[note_id]
+                self._index.remove(note_id)
+
+            try:
+                mod_times = self._fetch_mod_times(client, note_ids)
+            except AnkiGatewayError as exc:
+                # Older AnkiConnect builds lack notesModTime; notesInfo carries ``mod`` too.
+                logger.debug(f"notesModTime unavailable, fetching full notes: {exc}")
+                mod_times = None
+            stale = (
+                note_ids
+                if mod_times is None
+                else [
+                    note_id
+                    for note_id in note_ids
+                    if self._mod_times.get(note_id) != mod_times.get(note_id)
+                ]
+            )
+
+            downloaded = 0
+            for batch in _batches(stale, _NOTES_INFO_BATCH):
+                notes = client.notes_info(batch) or []
+                items: list[tuple[int, str]] = []
+                for note in notes:
+                    if not isinstance(note, dict) or note.get("noteId") is None:
+                        continue
+                    note_id = int(note["noteId"])
+                    mod = int(note.get("mod") or 0)
+                    if mod_times is None and self._mod_times.get(note_id) == mod:
+                        continue
+                    self._mod_times[note_id] = mod
+                    items.append((note_id, note_question_text(note)))
+                self._index.add_many(items)
+                downloaded += len(items)
+
+        metrics.increment("existing_notes_downloaded_total", value=downloaded)
+        logger.info(
+            "existing notes index refreshed",
+            extra={
+                "event": "card_gen.existing_notes.refreshed",
+                "notes_total": len(note_ids),
+                "notes_downloaded": downloaded,
+            },
+        )
+        return downloaded
+
+    @staticmethod
+    def _fetch_mod_times(client: AnkiConnectClient, note_ids: list[int]) -> dict[int, int]:
+        mod_times: dict[int, int] = {}
+        for batch in _batches(note_ids, _NOTES_MOD_TIME_BATCH):
+            for entry in client.notes_mod_time(batch) or []:
+                if isinstance(entry, dict) and entry.get("noteId") is not None:
+                    mod_times[int(entry["noteId"])] = int(entry.get("mod") or 0)
+        return mod_times
+
+    def contains_similar(self, question: str) -> bool:
+        """Whether an existing note's question is a near-duplicate of ``question``."""
+        text = plain_question_text(question)
+        if not text:
+            return False
+        with self._lock:
+            return self._index.contains_similar(text)
+
+
+_INDEXES: dict[tuple[str, str, float], ExistingNotesIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def shared_existing_notes_index(
+    *, anki_url: str, query: str, threshold: float = 0.9
+) -> ExistingNotesIndex:
+    """Return the process-wide index for one AnkiConnect endpoint and search query."""
+    key = (str(anki_url or "").rstrip("/"), query, float(threshold))
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = ExistingNotesIndex(query, threshold)
+        return index
@@ -1,24 +1,42 @@
 from __future__ import annotations
 
+import concurrent.futures
 import inspect
 import re
+from collections.abc import Callable, Mapping, Sequence
 from pathlib import Path
 
+from ankismart.card_gen.boilerplate import strip_repeated_boilerplate
 from ankismart.card_gen.llm_client import LLMClient
-from ankismart.card_gen.postprocess import build_card_drafts, parse_llm_output
+from ankismart.card_gen.ocr_correction import correct_low_confidence_lines, correct_ocr_chunks
+from ankismart.card_gen.output_schema import SINGLE_RESPONSE_KEY, cards_response_format
+from ankismart.card_gen.postprocess import (
+    IncrementalCardParser,
+    RecoveredCards,
+    build_card_drafts,
+    recover_llm_output,
+    recover_typed_llm_output,
+)
 from ankismart.card_gen.prompts import (
     BASIC_SYSTEM_PROMPT,
     CLOZE_SYSTEM_PROMPT,
     CONCEPT_SYSTEM_PROMPT,
+    GENERATION_SYSTEM_PROMPT,
     IMAGE_QA_SYSTEM_PROMPT,
     KEY_TERMS_SYSTEM_PROMPT,
+    MULTI_STRATEGY_SYSTEM_PROMPT,
     MULTIPLE_CHOICE_SYSTEM_PROMPT,
-    OCR_CORRECTION_PROMPT,
     SINGLE_CHOICE_SYSTEM_PROMPT,
+    build_generation_user_prompt,
+    structured_output_instructions,
 )
+from ankismart.card_gen.tokens import ContextLimits, estimate_tokens
+from ankismart.card_gen.usage_estimate import RequestEstimate
+from ankismart.core.cancellation import CancellationToken, raise_if_cancelled
+from ankismart.core.errors import CardGenError
 from ankismart.core.logging import get_logger
 from ankismart.core.models import CardDraft, GenerateRequest, MediaItem
-from ankismart.core.tracing import timed, trace_context
+from ankismart.core.tracing import metrics, timed, trace_context
 
 logger = get_logger("card_gen")
 
@@ -47,11 +65,68 @@ _RAW_CARD_BUILD_MAX_CAP = 500
 _AUTO_CARD_SAFETY_MIN = 24
 _AUTO_CARD_SAFETY_MAX = 240
 _AUTO_CARD_CHARS_PER_CARD = 450
+_CHUNK_CONCURRENCY = 4
+# Token budgeting: room left for the system prompt and task text, the share of the
+# remaining window filled with document text, and rough completion throughput.
+_PROMPT_OVERHEAD_TOKENS = 2_000
+_CHUNK_BUDGET_FILL = 0.9
+_MIN_CHUNK_TOKENS = 1_000
+_OUTPUT_TOKENS_PER_CARD = 200
+_TIMEOUT_BASE_SECONDS = 60.0
+_PROMPT_TOKENS_PER_SECOND = 2_000.0
+_OUTPUT_TOKENS_PER_SECOND = 25.0
+_TIMEOUT_MIN_SECONDS = 120.0
+_TIMEOUT_MAX_SECONDS = 600.0
+_HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+# Retry rounds list already accepted questions; keep that list compact.
+_AVOID_QUESTIONS_MAX = 40
+_AVOID_QUESTION_CHARS = 120
+
+
+def _raw_card_question(card: Mapping[str, object]) -> str:
+    for key in ("Front", "Question", "Text"):
+        value = card.get(key)
+        if isinstance(value, str) and value.strip():
+            return value
+    return ""
+
+
+def largest_remainder_split(total: int, weights: Sequence[int]) -> list[int]:
+    """Split ``total`` in proportion to ``weights`` so the parts sum exactly to it."""
+    if sum(weights) <= 0:
+        weights = [1] * len(weights)
+    total_weight = sum(weights)
+    shares = [total * weight / total_weight for weight in weights]
+    parts = [int(share) for share in shares]
+    leftover = total - sum(parts)
+    by_remainder = sorted(
+        range(len(parts)), key=lambda index: (parts[index] - shares[index], index)
+    )
+    for index in by_remainder[:leftover]:
+        parts[index] += 1
+    return parts
+
+
+def expected_auto_card_count(content_length: int) -> int:
+    """Cards auto mode expects per strategy from ``content_length`` characters of text."""
+    return max(1, int(content_length) // _AUTO_CARD_CHARS_PER_CARD)
 
 
 class CardGenerator:
-    def __init__(self, llm_client: LLMClient) -> None:
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        *,
+        chunk_concurrency: int = _CHUNK_CONCURRENCY,
+        stream: bool = False,
+        on_cards: Callable[[list[CardDraft]], None] | None = None,
+    ) -> None:
         self._llm = llm_client
+        self._chunk_concurrency = max(1, int(chunk_concurrency))
+        # Streaming needs a client with ``chat_stream``; ``on_cards`` receives drafts as
+        # soon as each card object is complete, before the final parse and trimming.
+        self._stream = bool(stream)
+        self._on_cards = on_cards
 
     @staticmethod
     def _build_target_instruction(target_count: int, *, auto_target_count: bool) -> str:
@@ -73,20 +148,35 @@ class CardGenerator:
             return ""
         return f"\n- Generate exactly {target_count} cards\n"
 
-    @staticmethod
+    def _context_limits(self) -> ContextLimits | None:
+        limits = getattr(self._llm, "context_limits", None)
+        return limits if isinstance(limits, ContextLimits) else None
+
     def _estimate_request_timeout(
+        self,
+        content: str,
         *,
-        content_length: int,
         target_count: int,
-        chunk_count: int = 1,
         auto_target_count: bool = False,
     ) -> float:
-        base_timeout = 120.0
-        length_bonus = min(240.0, max(0.0, content_length / 1500.0))
-        target_bonus = min(180.0, max(0, target_count) * 10.0)
-        chunk_bonus = min(180.0, max(0, chunk_count - 1) * 25.0)
-        auto_bonus = 30.0 if auto_target_count else 0.0
-        return base_timeout + length_bonus + target_bonus + chunk_bonus + auto_bonus
+        """Derive a request timeout from the prompt size and the completion we expect.
+
+        The completion is ``target_count`` cards, or the content-derived auto card limit
+        when the target is missing or only a hint, capped by the model's output limit.
+        """
+        cards = target_count
+        if auto_target_count or target_count <= 0:
+            cards = max(target_count, self._auto_card_safety_limit(len(content)))
+        expected_output = cards * _OUTPUT_TOKENS_PER_CARD
+        limits = self._context_limits()
+        if limits is not None:
+            expected_output = min(expected_output, limits.max_output_tokens)
+        seconds = (
+            _TIMEOUT_BASE_SECONDS
+            + estimate_tokens(content) / _PROMPT_TOKENS_PER_SECOND
+            + expected_output / _OUTPUT_TOKENS_PER_SECOND
+        )
+        return min(_TIMEOUT_MAX_SECONDS, max(_TIMEOUT_MIN_SECONDS, seconds))
 
     @staticmethod
     def _raw_card_build_limit(target_count: int) -> int:
@@ -175,8 +265,21 @@ class CardGenerator:
         return cls._auto_card_safety_limit(content_length, target_hint=0)
 
     def _chat_with_timeout(
-        self, system_prompt: str, user_prompt: str, *, timeout: float | None
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        *,
+        timeout: float | None,
+        response_format: Mapping[str, object] | None = None,
+        use_cache: bool = True,
     ) -> str:
+        if response_format is not None or not use_cache:
+            # Only clients reporting ``supports_structured_output`` or fronting a response
+            # cache get here; they all take the full keyword signature.
+            extra: dict[str, object] = {} if use_cache else {"use_cache": False}
+            if response_format is not None:
+                extra["response_format"] = response_format
+            return self._llm.chat(system_prompt, user_prompt, timeout=timeout, **extra)
         chat_fn = self._llm.chat
         side_effect = getattr(chat_fn, "side_effect", None)
         signature_target = side_effect if callable(side_effect) else chat_fn
@@ -209,6 +312,148 @@ class CardGenerator:
             return self._llm.chat(system_prompt, user_prompt, timeout=timeout)
         return self._llm.chat(system_prompt, user_prompt)
 
+    def _structured_output_format(
+        self, strategies: Mapping[str, tuple[str, str]]
+    ) -> dict[str, object] | None:
+        """JSON schema ``response_format`` for these response keys, if the client takes one."""
+        if getattr(self._llm, "supports_structured_output", False) is not True:
+            return None
+        return cards_response_format(
+            {
+                key or SINGLE_RESPONSE_KEY: note_type
+                for key, (_strategy, note_type) in strategies.items()
+            }
+        )
+
+    def _chat_for_cards(
+        self,
+        document: str,
+        instructions: str,
+        *,
+        timeout: float | None,
+        request: GenerateRequest,
+        strategies: Mapping[str, tuple[str, str]],
+        trace_id: str,
+    ) -> tuple[str | None, list[tuple[str, dict]], bool]:
+        """Send a generation request, streaming finished cards to ``on_cards`` if enabled.
+
+        ``strategies`` maps the lower-cased response key (``""`` for a plain array) to
+        ``(strategy_id, note_type)``. Returns ``(raw_output, streamed, structured)``;
+        ``raw_output`` is None when the stream broke after cards had arrived, and
+        ``streamed`` then holds the ``(key, card)`` pairs received so far.
+
+        When the client supports structured output the response is constrained by a JSON
+        schema built from the note types, the instructions drop their format section and
+        ``structured`` is True; a plain array then arrives under ``"cards"``. If the
+        provider turns the schema down, the request is repeated with the full prompt.
+        """
+        response_format = self._structured_output_format(strategies)
+        if response_format is not None:
+            try:
+                raw_output, streamed = self._send_for_cards(
+                    *self._compose_prompts(document, structured_output_instructions(instructions)),
+                    timeout=timeout,
+                    request=request,
+                    strategies={
+                        key or SINGLE_RESPONSE_KEY: value for key, value in strategies.items()
+                    },
+                    trace_id=trace_id,
+                    response_format=response_format,
+                )
+            except CardGenError:
+                if getattr(self._llm, "supports_structured_output", False) is True:
+                    raise
+                metrics.increment("card_gen_structured_output_fallbacks_total")
+                logger.info(
+                    "JSON schema output unavailable, retrying with the format in the prompt",
+                    extra={"event": "card_gen.structured_output.fallback", "trace_id": trace_id},
+                )
+            else:
+                metrics.increment("card_gen_structured_output_requests_total")
+                return raw_output, streamed, True
+        raw_output, streamed = self._send_for_cards(
+            *self._compose_prompts(document, instructions),
+            timeout=timeout,
+            request=request,
+            strategies=strategies,
+            trace_id=trace_id,
+        )
+        return raw_output, streamed, False
+
+    def _send_for_cards(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        *,
+        timeout: float | None,
+        request: GenerateRequest,
+        strategies: Mapping[str, tuple[str, str]],
+        trace_id: str,
+        response_format: Mapping[str, object] | None = None,
+    ) -> tuple[str | None, list[tuple[str, dict]]]:
+        use_cache = bool(getattr(request, "use_response_cache", True))
+        chat_stream = getattr(self._llm, "chat_stream", None) if self._stream else None
+        if not callable(chat_stream):
+            raw_output = self._chat_with_timeout(
+                system_prompt,
+                user_prompt,
+                timeout=timeout,
+                response_format=response_format,
+                use_cache=use_cache,
+            )
+            return raw_output, []
+
+        parser = IncrementalCardParser()
+
+        def on_text(delta: str) -> None:
+            cards = parser.feed(delta)
+            if not cards:
+                return
+            metrics.increment("card_gen_streamed_cards_total", value=len(cards))
+            if self._on_cards is None:
+                return
+            drafts: list[CardDraft] = []
+            for key, card in cards:
+                strategy, note_type = strategies.get(key.strip().lower(), ("", ""))
+                if not strategy:
+                    continue
+                drafts.extend(
+                    build_card_drafts(
+                        raw_cards=[card],
+                        deck_name=request.deck_name,
+                        note_type=note_type,
+                        tags=request.tags or ["ankismart"],
+                        trace_id=trace_id,
+                        source_path=request.source_path,
+                        strategy_id=strategy,
+                    )
+                )
+            if drafts:
+                self._on_cards(drafts)
+
+        extra: dict[str, object] = {} if use_cache else {"use_cache": False}
+        if response_format is not None:
+            extra["response_format"] = response_format
+        try:
+            raw_output = chat_stream(
+                system_prompt, user_prompt, timeout=timeout, on_text=on_text, **extra
+            )
+        except CardGenError as exc:
+            if not parser.cards:
+                raise
+            logger.warning(
+                "LLM stream interrupted, keeping cards received so far",
+                extra={
+                    "event": "card_gen.stream.partial",
+                    "card_count": len(parser.cards),
+                    "error_detail": str(exc),
+                    "trace_id": trace_id,
+                },
+            )
+            metrics.increment("card_gen_stream_partial_total")
+            return None, list(parser.cards)
+        return raw_output, list(parser.cards)
+
     @staticmethod
     def _hard_split_text(text: str, threshold: int) -> list[str]:
         value = str(text or "")
@@ -260,6 +505,95 @@ class CardGenerator:
                 return all(not trailing.strip() for trailing in lines[index + 1 :])
         return False
 
+    def _chunk_token_budget(self, limits: ContextLimits) -> int:
+        """Document tokens per request that leave room for the prompt and the completion."""
+        usable = limits.context_window - limits.max_output_tokens - _PROMPT_OVERHEAD_TOKENS
+        return max(_MIN_CHUNK_TOKENS, int(usable * _CHUNK_BUDGET_FILL))
+
+    def _chunk_markdown(self, markdown: str, request: GenerateRequest) -> list[str]:
+        """Split a document for generation according to the request's auto-split settings.
+
+        Chunks are packed to the model's token budget and never exceed the request's
+        character ``split_threshold``, whichever is smaller.
+        """
+        if not getattr(request, "enable_auto_split", False):
+            return [markdown]
+        split_threshold = max(1, int(getattr(request, "split_threshold", 70000) or 70000))
+        limits = self._context_limits()
+        if limits is not None:
+            return self._split_markdown_by_tokens(
+                markdown, self._chunk_token_budget(limits), char_limit=split_threshold
+            )
+        if len(markdown) <= split_threshold:
+            return [markdown]
+        return self._split_markdown(markdown, split_threshold)
+
+    @staticmethod
+    def _split_markdown_sections(markdown: str) -> list[str]:
+        """Split markdown before each heading that is not inside a fenced code block."""
+        sections: list[str] = []
+        current: list[str] = []
+        in_code_block = False
+        for line in markdown.splitlines():
+            if line.strip().startswith("```"):
+                in_code_block = not in_code_block
+            elif not in_code_block and current and _HEADING_PATTERN.match(line):
+                sections.append("\n".join(current))
+                current = []
+            current.append(line)
+        if current:
+            sections.append("\n".join(current))
+        return [section.strip("\n") for section in sections if section.strip()]
+
+    def _split_markdown_by_tokens(
+        self, markdown: str, token_budget: int, *, char_limit: int | None = None
+    ) -> list[str]:
+        """Pack heading sections into chunks of at most ``token_budget`` estimated tokens.
+
+        Sections larger than the budget are split at paragraph boundaries with a character
+        threshold scaled to that section's own characters-per-token ratio. ``char_limit``
+        additionally caps every chunk's length in characters.
+        """
+        char_limit = char_limit if char_limit is not None and char_limit > 0 else None
+        if estimate_tokens(markdown) <= token_budget and (
+            char_limit is None or len(markdown) <= char_limit
+        ):
+            return [markdown]
+
+        chunks: list[str] = []
+        current: list[str] = []
+        current_tokens = 0
+        current_chars = 0
+
+        def flush_current() -> None:
+            nonlocal current, current_tokens, current_chars
+            if current:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+                current_chars = 0
+
+        for section in self._split_markdown_sections(markdown):
+            tokens = estimate_tokens(section) + 1
+            chars = len(section) + 2
+            if tokens > token_budget or (char_limit is not None and len(section) > char_limit):
+                flush_current()
+                char_threshold = max(1, int(len(section) * min(1.0, token_budget / tokens)))
+                if char_limit is not None:
+                    char_threshold = min(char_threshold, char_limit)
+                chunks.extend(self._split_markdown(section, char_threshold))
+                continue
+            if current and (
+                current_tokens + tokens > token_budget
+                or (char_limit is not None and current_chars + chars - 2 > char_limit)
+            ):
+                flush_current()
+            current.append(section)
+            current_tokens += tokens
+            current_chars += chars
+        flush_current()
+        return chunks
+
     def _split_markdown(self, markdown: str, threshold: int) -> list[str]:
         """Split markdown content into chunks at paragraph boundaries.
 
@@ -421,14 +755,14 @@ class CardGenerator:
     def generate(self, request: GenerateRequest) -> list[CardDraft]:
         with trace_context(request.trace_id or None) as trace_id:
             with timed("card_generate_total"):
-                normalized_strategy = _STRATEGY_ALIASES.get(request.strategy, request.strategy)
-                strategy_info = _STRATEGY_MAP.get(normalized_strategy)
-                if strategy_info is None:
-                    strategy_info = _STRATEGY_MAP["basic"]
-                    normalized_strategy = "basic"
-
-                base_system_prompt, note_type = strategy_info
+                normalized_strategy, base_system_prompt, note_type = self._resolve_strategy(
+                    request.strategy
+                )
                 markdown = request.markdown
+                if getattr(request, "strip_boilerplate", True):
+                    markdown = self._strip_boilerplate(
+                        markdown, trace_id=trace_id, source_path=request.source_path
+                    )
                 auto_target_count = bool(getattr(request, "auto_target_count", False))
 
                 system_prompt = base_system_prompt
@@ -436,6 +770,7 @@ class CardGenerator:
                     request.target_count,
                     auto_target_count=auto_target_count,
                 )
+                system_prompt += self._build_avoid_instruction(self._avoid_questions(request))
 
                 logger.info(
                     "Generating cards",
@@ -449,123 +784,72 @@ class CardGenerator:
                     },
                 )
 
-                # Check if auto-split is needed
-                enable_split = getattr(request, "enable_auto_split", False)
-                split_threshold = getattr(request, "split_threshold", 70000)
-
-                all_drafts = []
-
-                if enable_split and len(markdown) > split_threshold:
-                    # Split document into chunks
-                    chunks = self._split_markdown(markdown, split_threshold)
-                    remaining_target = max(0, request.target_count)
+                chunks = self._chunk_markdown(markdown, request)
+                spans = self._locate_chunk_spans(request.markdown, chunks)
+                if len(chunks) > 1:
+                    # Targets are fixed up front so chunks can be generated concurrently
+                    # and merged back in document order.
+                    covered = self._covered_chunk_counts(request, len(chunks))
+                    if any(covered) and not auto_target_count:
+                        chunk_targets = self._allocate_retry_targets(
+                            chunks, request.target_count, covered
+                        )
+                    else:
+                        chunk_targets = self._allocate_chunk_targets(
+                            chunks,
+                            request.target_count,
+                            auto_target_count=auto_target_count,
+                        )
+                    jobs = [
+                        (index, chunk, chunk_target)
+                        for index, (chunk, chunk_target) in enumerate(zip(chunks, chunk_targets), 1)
+                        if chunk_target > 0 or request.target_count <= 0 or auto_target_count
+                    ]
 
                     logger.info(
                         "Processing document in chunks",
                         extra={
                             "chunk_count": len(chunks),
+                            "dispatched_chunks": len(jobs),
                             "trace_id": trace_id,
                         },
                     )
 
-                    # Process each chunk
-                    for i, chunk in enumerate(chunks, 1):
-                        if (
-                            remaining_target <= 0
-                            and request.target_count > 0
-                            and not auto_target_count
-                        ):
-                            break
-
-                        logger.info(
-                            f"Processing chunk {i}/{len(chunks)}",
-                            extra={
-                                "chunk_index": i,
-                                "chunk_length": len(chunk),
-                                "trace_id": trace_id,
-                            },
-                        )
-
-                        chunk_system_prompt = base_system_prompt
-                        chunk_target = 0
-                        if remaining_target > 0:
-                            chunks_left = len(chunks) - i + 1
-                            base_target = remaining_target // max(1, chunks_left)
-                            extra_target = 1 if remaining_target % max(1, chunks_left) else 0
-                            chunk_target = max(1, base_target + extra_target)
-                        chunk_system_prompt += self._build_target_instruction(
-                            chunk_target or request.target_count,
-                            auto_target_count=auto_target_count,
-                        )
-
-                        request_timeout = self._estimate_request_timeout(
-                            content_length=len(chunk),
-                            target_count=chunk_target or request.target_count,
+                    def run_chunk(job: tuple[int, str, int]) -> list[CardDraft]:
+                        index, chunk, chunk_target = job
+                        chunk_drafts = self._generate_chunk(
+                            chunk,
+                            index=index,
                             chunk_count=len(chunks),
-                            auto_target_count=auto_target_count,
-                        )
-
-                        # Call LLM for this chunk
-                        with timed(f"llm_generate_chunk_{i}"):
-                            raw_output = self._chat_with_timeout(
-                                chunk_system_prompt,
-                                chunk,
-                                timeout=request_timeout,
-                            )
-
-                        # Parse and build card drafts for this chunk
-                        raw_limit_target = self._raw_limit_target_for_request(
-                            target_count=chunk_target or request.target_count,
-                            auto_target_count=auto_target_count,
-                            content_length=len(chunk),
-                        )
-                        raw_cards = self._limit_raw_cards_for_build(
-                            parse_llm_output(raw_output),
-                            target_count=raw_limit_target,
-                            strategy=normalized_strategy,
-                            trace_id=trace_id,
-                        )
-                        chunk_drafts = build_card_drafts(
-                            raw_cards=raw_cards,
-                            deck_name=request.deck_name,
+                            chunk_target=chunk_target,
+                            request=request,
+                            base_system_prompt=base_system_prompt,
                             note_type=note_type,
-                            tags=request.tags or ["ankismart"],
+                            strategy=normalized_strategy,
+                            auto_target_count=auto_target_count,
                             trace_id=trace_id,
-                            source_path=request.source_path,
-                            source_document=(
-                                Path(request.source_path).name if request.source_path else ""
-                            ),
-                            strategy_id=normalized_strategy,
                         )
+                        self._attach_provenance(chunk_drafts, index, spans[index - 1])
+                        return chunk_drafts
 
-                        if (
-                            chunk_target > 0
-                            and not auto_target_count
-                            and len(chunk_drafts) > chunk_target
-                        ):
-                            chunk_drafts = chunk_drafts[:chunk_target]
-
-                        all_drafts.extend(chunk_drafts)
-                        if remaining_target > 0:
-                            remaining_target = max(0, remaining_target - len(chunk_drafts))
-                            if auto_target_count and request.target_count > 0:
-                                remaining_target = max(1, remaining_target)
-                            if remaining_target <= 0 and not auto_target_count:
-                                break
-
-                    drafts = all_drafts
+                    drafts = []
+                    for chunk_drafts in self._map_chunks(run_chunk, jobs):
+                        drafts.extend(chunk_drafts)
                 else:
                     request_timeout = self._estimate_request_timeout(
-                        content_length=len(markdown),
+                        markdown,
                         target_count=request.target_count,
                         auto_target_count=auto_target_count,
                     )
                     # Normal processing without split
                     with timed("llm_generate"):
-                        raw_output = self._chat_with_timeout(
-                            system_prompt,
+                        raw_output, streamed, structured = self._chat_for_cards(
                             markdown,
+                            system_prompt,
                             timeout=request_timeout,
+                            request=request,
+                            strategies={"": (normalized_strategy, note_type)},
+                            trace_id=trace_id,
                         )
 
                     # Parse and build card drafts
@@ -575,7 +859,21 @@ class CardGenerator:
                         content_length=len(markdown),
                     )
                     raw_cards = self._limit_raw_cards_for_build(
-                        parse_llm_output(raw_output),
+                        self._cards_with_continuation(
+                            raw_output,
+                            streamed,
+                            structured=structured,
+                            document=markdown,
+                            base_instructions=base_system_prompt,
+                            target_count=request.target_count,
+                            auto_target_count=auto_target_count,
+                            avoid_questions=self._avoid_questions(request),
+                            timeout=request_timeout,
+                            request=request,
+                            strategy=normalized_strategy,
+                            note_type=note_type,
+                            trace_id=trace_id,
+                        ),
                         target_count=raw_limit_target,
                         strategy=normalized_strategy,
                         trace_id=trace_id,
@@ -592,6 +890,7 @@ class CardGenerator:
                         ),
                         strategy_id=normalized_strategy,
                     )
+                    self._attach_provenance(drafts, 1, spans[0])
 
                 # Attach source image for image-based strategy
                 if normalized_strategy in {"image_qa", "image_occlusion"} and request.source_path:
@@ -617,6 +916,666 @@ class CardGenerator:
                 )
                 return drafts
 
+    @staticmethod
+    def _locate_chunk_spans(document: str, chunks: Sequence[str]) -> list[tuple[int, int]]:
+        """Find the character span of each chunk in the original ``document``.
+
+        Chunks can lose boilerplate lines and gain code fences while being split, so a span
+        runs from the chunk's first line found in ``document`` to the end of its last one.
+        Chunks none of whose lines can be found get ``(-1, -1)``.
+        """
+        if len(chunks) == 1:
+            return [(0, len(document))]
+        spans: list[tuple[int, int]] = []
+        cursor = 0
+        for chunk in chunks:
+            start = end = -1
+            search_from = cursor
+            for line in chunk.splitlines():
+                line = line.strip()
+                if not line or line.startswith("```"):
+                    continue
+                position = document.find(line, search_from)
+                if position == -1:
+                    continue
+                if start == -1:
+                    start = position
+                end = position + len(line)
+                search_from = end
+            spans.append((start, end))
+            if end != -1:
+                cursor = end
+        return spans
+
+    @staticmethod
+    def _attach_provenance(drafts: Sequence[CardDraft], index: int, span: tuple[int, int]) -> None:
+        for draft in drafts:
+            draft.metadata.source_chunk_id = f"chunk-{index}"
+            draft.metadata.source_start, draft.metadata.source_end = span
+
+    @staticmethod
+    def _expected_card_count(content_length: int, target_count: int, *, auto: bool) -> int:
+        """Cards a request is expected to return; auto mode without a hint uses density."""
+        if target_count > 0:
+            return target_count
+        if not auto:
+            return 0
+        return expected_auto_card_count(content_length)
+
+    def estimate_usage(
+        self,
+        request: GenerateRequest,
+        strategy_counts: Mapping[str, int] | None = None,
+        *,
+        document: str = "",
+    ) -> list[RequestEstimate]:
+        """Project the requests for ``request`` without calling the LLM.
+
+        Follows the split plan of :meth:`generate`, or of :meth:`generate_multi` when
+        ``strategy_counts`` is given: one estimate per dispatched chunk. Prompt tokens cover
+        the system prompt and the composed user message; completion tokens assume
+        ``_OUTPUT_TOKENS_PER_CARD`` per expected card, capped by the model's output limit.
+        Continuations and retry rounds are not planned; calibrate against actual usage.
+        """
+        markdown = request.markdown
+        if getattr(request, "strip_boilerplate", True):
+            markdown, _report = strip_repeated_boilerplate(markdown)
+        auto = bool(getattr(request, "auto_target_count", False))
+        if strategy_counts is None:
+            counts = {request.strategy: max(0, int(request.target_count))}
+        else:
+            counts = {str(key): max(0, int(value)) for key, value in strategy_counts.items()}
+
+        chunks = self._chunk_markdown(markdown, request)
+        targets = {
+            strategy: self._allocate_chunk_targets(chunks, count, auto_target_count=auto)
+            for strategy, count in counts.items()
+        }
+        limits = self._context_limits()
+        estimates: list[RequestEstimate] = []
+        for index, chunk in enumerate(chunks, 1):
+            chunk_counts = {
+                strategy: chunk_targets[index - 1]
+                for strategy, chunk_targets in targets.items()
+                if chunk_targets[index - 1] > 0 or counts[strategy] <= 0 or auto
+            }
+            if not chunk_counts:
+                continue
+            if strategy_counts is None:
+                _normalized, base_prompt, _note_type = self._resolve_strategy(request.strategy)
+                instructions = base_prompt + self._build_target_instruction(
+                    chunk_counts[request.strategy], auto_target_count=auto
+                )
+            else:
+                instructions = self._build_multi_system_prompt(chunk_counts, auto_target_count=auto)
+            instructions += self._build_avoid_instruction(self._avoid_questions(request, index))
+            system_prompt, user_prompt = self._compose_prompts(chunk, instructions)
+            completion_tokens = _OUTPUT_TOKENS_PER_CARD * sum(
+                self._expected_card_count(len(chunk), target, auto=auto)
+                for target in chunk_counts.values()
+            )
+            if limits is not None:
+                completion_tokens = min(completion_tokens, limits.max_output_tokens)
+            estimates.append(
+                RequestEstimate(
+                    document=document or request.source_path,
+                    chunk_index=index,
+                    strategies=tuple(chunk_counts),
+                    prompt_tokens=estimate_tokens(system_prompt) + estimate_tokens(user_prompt),
+                    completion_tokens=completion_tokens,
+                )
+            )
+        return estimates
+
+    @staticmethod
+    def _compose_prompts(document: str, instructions: str) -> tuple[str, str]:
+        """Return ``(system, user)`` with the cacheable part first.
+
+        Every generation request shares one system prompt and opens its user message with
+        the document, so consecutive strategies and retries on the same chunk share a
+        prompt prefix; only the trailing instructions differ.
+        """
+        return GENERATION_SYSTEM_PROMPT, build_generation_user_prompt(document, instructions)
+
+    @staticmethod
+    def _resolve_strategy(strategy: str) -> tuple[str, str, str]:
+        """Return ``(normalized_strategy, system_prompt, note_type)``, defaulting to basic."""
+        normalized = _STRATEGY_ALIASES.get(strategy, strategy)
+        info = _STRATEGY_MAP.get(normalized)
+        if info is None:
+            normalized = "basic"
+            info = _STRATEGY_MAP["basic"]
+        return normalized, info[0], info[1]
+
+    def _build_multi_system_prompt(
+        self, strategy_counts: Mapping[str, int], *, auto_target_count: bool
+    ) -> str:
+        sections = [MULTI_STRATEGY_SYSTEM_PROMPT]
+        for strategy, count in strategy_counts.items():
+            _normalized, base_prompt, _note_type = self._resolve_strategy(strategy)
+            sections.append(
+                f'\n## Card type "{strategy}"\n'
+                + self._build_target_instruction(count, auto_target_count=auto_target_count)
+                + "\n"
+                + base_prompt
+            )
+        return "".join(sections)
+
+    def generate_multi(
+        self,
+        request: GenerateRequest,
+        strategy_counts: Mapping[str, int],
+    ) -> dict[str, list[CardDraft]]:
+        """Generate several strategies from one request per chunk.
+
+        ``request.strategy`` and ``request.target_count`` are ignored; ``strategy_counts``
+        gives the per-type targets (0 lets the model decide in auto mode). Returns drafts
+        keyed by the requested strategy names, in document order.
+        """
+        with trace_context(request.trace_id or None) as trace_id:
+            with timed("card_generate_multi_total"):
+                counts = {str(key): max(0, int(value)) for key, value in strategy_counts.items()}
+                markdown = request.markdown
+                if getattr(request, "strip_boilerplate", True):
+                    markdown = self._strip_boilerplate(
+                        markdown, trace_id=trace_id, source_path=request.source_path
+                    )
+                auto_target_count = bool(getattr(request, "auto_target_count", False))
+
+                chunks = self._chunk_markdown(markdown, request)
+                spans = self._locate_chunk_spans(request.markdown, chunks)
+                per_strategy_targets = {
+                    strategy: self._allocate_chunk_targets(
+                        chunks, count, auto_target_count=auto_target_count
+                    )
+                    for strategy, count in counts.items()
+                }
+                jobs: list[tuple[int, str, dict[str, int]]] = []
+                for index, chunk in enumerate(chunks):
+                    chunk_counts = {
+                        strategy: targets[index]
+                        for strategy, targets in per_strategy_targets.items()
+                        if targets[index] > 0 or counts[strategy] <= 0 or auto_target_count
+                    }
+                    if chunk_counts:
+                        jobs.append((index + 1, chunk, chunk_counts))
+
+                logger.info(
+                    "Generating cards for multiple strategies in one pass",
+                    extra={
+                        "event": "card_gen.multi.started",
+                        "strategies": list(counts),
+                        "chunk_count": len(chunks),
+                        "dispatched_chunks": len(jobs),
+                        "content_length": len(markdown),
+                        "trace_id": trace_id,
+                    },
+                )
+
+                def run_chunk(job: tuple[int, str, dict[str, int]]) -> dict[str, list[CardDraft]]:
+                    index, chunk, chunk_counts = job
+                    chunk_result = self._generate_multi_chunk(
+                        chunk,
+                        index=index,
+                        chunk_counts=chunk_counts,
+                        request=request,
+                        auto_target_count=auto_target_count,
+                        trace_id=trace_id,
+                    )
+                    for drafts in chunk_result.values():
+                        self._attach_provenance(drafts, index, spans[index - 1])
+                    return chunk_result
+
+                results: dict[str, list[CardDraft]] = {strategy: [] for strategy in counts}
+                for chunk_result in self._map_chunks(run_chunk, jobs):
+                    for strategy, drafts in chunk_result.items():
+                        results[strategy].extend(drafts)
+
+                for strategy, drafts in results.items():
+                    normalized, _prompt, _note_type = self._resolve_strategy(strategy)
+                    if normalized in {"image_qa", "image_occlusion"} and request.source_path:
+                        self._attach_image(drafts, request.source_path)
+                    if auto_target_count:
+                        results[strategy] = self._limit_auto_drafts_for_safety(
+                            drafts,
+                            content_length=len(markdown),
+                            target_hint=counts[strategy],
+                            strategy=normalized,
+                            trace_id=trace_id,
+                        )
+                    elif counts[strategy] > 0:
+                        results[strategy] = drafts[: counts[strategy]]
+
+                metrics.increment("card_gen_multi_requests_total", value=len(jobs))
+                logger.info(
+                    "Multi-strategy card generation completed",
+                    extra={
+                        "event": "card_gen.multi.completed",
+                        "card_counts": {key: len(value) for key, value in results.items()},
+                        "trace_id": trace_id,
+                    },
+                )
+                return results
+
+    def _generate_multi_chunk(
+        self,
+        chunk: str,
+        *,
+        index: int,
+        chunk_counts: Mapping[str, int],
+        request: GenerateRequest,
+        auto_target_count: bool,
+        trace_id: str,
+        avoid_questions: Sequence[str] = (),
+        continuation: bool = False,
+    ) -> dict[str, list[CardDraft]]:
+        with trace_context(trace_id):
+            system_prompt = self._build_multi_system_prompt(
+                chunk_counts, auto_target_count=auto_target_count
+            ) + self._build_avoid_instruction(avoid_questions)
+            total_target = sum(chunk_counts.values())
+            request_timeout = self._estimate_request_timeout(
+                chunk,
+                target_count=total_target,
+                auto_target_count=auto_target_count,
+            )
+            stream_strategies = {}
+            for strategy in chunk_counts:
+                normalized, _prompt, note_type = self._resolve_strategy(strategy)
+                stream_strategies[strategy.strip().lower()] = (normalized, note_type)
+            with timed(f"llm_generate_multi_chunk_{index}"):
+                raw_output, streamed, structured = self._chat_for_cards(
+                    chunk,
+                    system_prompt,
+                    timeout=request_timeout,
+                    request=request,
+                    strategies=stream_strategies,
+                    trace_id=trace_id,
+                )
+
+            if raw_output is not None:
+                typed_cards, recovered = recover_typed_llm_output(
+                    raw_output, list(chunk_counts), structured=structured
+                )
+            else:
+                typed_cards = {strategy: [] for strategy in chunk_counts}
+                for key, card in streamed:
+                    for strategy in chunk_counts:
+                        if strategy.strip().lower() == key.strip().lower():
+                            typed_cards[strategy].append(card)
+                recovered = RecoveredCards(
+                    [card for cards in typed_cards.values() for card in cards], truncated=True
+                )
+            results: dict[str, list[CardDraft]] = {}
+            for strategy, chunk_target in chunk_counts.items():
+                normalized, _prompt, note_type = self._resolve_strategy(strategy)
+                raw_cards = self._limit_raw_cards_for_build(
+                    typed_cards.get(strategy, []),
+                    target_count=self._raw_limit_target_for_request(
+                        target_count=chunk_target,
+                        auto_target_count=auto_target_count,
+                        content_length=len(chunk),
+                    ),
+                    strategy=normalized,
+                    trace_id=trace_id,
+                )
+                drafts = build_card_drafts(
+                    raw_cards=raw_cards,
+                    deck_name=request.deck_name,
+                    note_type=note_type,
+                    tags=request.tags or ["ankismart"],
+                    trace_id=trace_id,
+                    source_path=request.source_path,
+                    source_document=(Path(request.source_path).name if request.source_path else ""),
+                    strategy_id=normalized,
+                )
+                if chunk_target > 0 and not auto_target_count:
+                    drafts = drafts[:chunk_target]
+                results[strategy] = drafts
+
+            if recovered.damaged and not continuation:
+                missing_counts: dict[str, int] = {}
+                for strategy, chunk_target in chunk_counts.items():
+                    missing = self._continuation_target(
+                        RecoveredCards(typed_cards.get(strategy, []), truncated=True),
+                        chunk_target,
+                        auto_target_count=auto_target_count,
+                    )
+                    if missing is not None and (missing > 0 or recovered.truncated):
+                        missing_counts[strategy] = missing
+                self._log_recovery(
+                    recovered, sum(missing_counts.values()) if missing_counts else None, trace_id
+                )
+                if missing_counts:
+                    metrics.increment("card_gen_continuation_requests_total")
+                    more = self._multi_continuation(
+                        chunk,
+                        index=index,
+                        chunk_counts=missing_counts,
+                        request=request,
+                        auto_target_count=auto_target_count,
+                        trace_id=trace_id,
+                        avoid_questions=[_raw_card_question(card) for card in recovered.cards],
+                        continuation=True,
+                    )
+                    for strategy, drafts in more.items():
+                        results[strategy].extend(drafts)
+            return results
+
+    @staticmethod
+    def _allocate_chunk_targets(
+        chunks: Sequence[str],
+        target_count: int,
+        *,
+        auto_target_count: bool,
+    ) -> list[int]:
+        """Split ``target_count`` across chunks in proportion to their length.
+
+        Uses largest remainders so the total is exact; ties go to the earlier chunk. In
+        auto mode a positive hint is only a guide, so every chunk gets at least one card.
+        """
+        if target_count <= 0 or not chunks:
+            return [0] * len(chunks)
+        targets = largest_remainder_split(target_count, [max(1, len(chunk)) for chunk in chunks])
+        if auto_target_count:
+            targets = [max(1, target) for target in targets]
+        return targets
+
+    @classmethod
+    def _allocate_retry_targets(
+        cls, chunks: Sequence[str], shortfall: int, covered: Sequence[int]
+    ) -> list[int]:
+        """Split a retry round's ``shortfall`` across the chunks that are behind.
+
+        Each chunk's fair share of the accepted cards plus the shortfall follows its
+        length; the shortfall goes to chunks in proportion to how far they are below
+        that share, so chunks already covered are not sent again.
+        """
+        if shortfall <= 0 or not chunks:
+            return [0] * len(chunks)
+        fair = cls._allocate_chunk_targets(
+            chunks, shortfall + sum(covered), auto_target_count=False
+        )
+        deficits = [max(0, share - count) for share, count in zip(fair, covered, strict=True)]
+        return largest_remainder_split(shortfall, deficits)
+
+    @staticmethod
+    def _covered_chunk_counts(request: GenerateRequest, chunk_count: int) -> list[int]:
+        accepted = getattr(request, "accepted_questions", None) or {}
+        return [len(accepted.get(f"chunk-{index}", [])) for index in range(1, chunk_count + 1)]
+
+    @staticmethod
+    def _avoid_questions(request: GenerateRequest, index: int | None = None) -> list[str]:
+        """Accepted questions to list for chunk ``index`` (every chunk when None)."""
+        accepted = getattr(request, "accepted_questions", None) or {}
+        if index is None:
+            return [question for questions in accepted.values() for question in questions]
+        return [*accepted.get(f"chunk-{index}", []), *accepted.get("", [])]
+
+    @staticmethod
+    def _recovered(
+        raw_output: str | None, streamed: list[tuple[str, dict]], *, structured: bool = False
+    ) -> RecoveredCards:
+        if raw_output is None:
+            # The stream broke off; what arrived is kept like a truncated response.
+            return RecoveredCards([card for _key, card in streamed], truncated=True)
+        if structured:
+            return recover_typed_llm_output(raw_output, [SINGLE_RESPONSE_KEY], structured=True)[1]
+        return recover_llm_output(raw_output)
+
+    @staticmethod
+    def _continuation_target(
+        recovered: RecoveredCards, target_count: int, *, auto_target_count: bool
+    ) -> int | None:
+        """Cards still owed after a damaged response, or None when nothing is missing."""
+        if not recovered.damaged:
+            return None
+        if target_count > 0 and not auto_target_count:
+            missing = target_count - len(recovered.cards)
+            return missing if missing > 0 else None
+        # Without a fixed count only a cut-off response is known to be incomplete.
+        return 0 if recovered.truncated else None
+
+    def _log_recovery(self, recovered: RecoveredCards, missing: int | None, trace_id: str) -> None:
+        metrics.increment("card_gen_recovered_responses_total")
+        if recovered.dropped:
+            metrics.increment("card_gen_dropped_card_objects_total", value=recovered.dropped)
+        logger.warning(
+            "LLM response incomplete, requesting only the remainder"
+            if missing is not None
+            else "LLM response incomplete, keeping salvaged cards",
+            extra={
+                "event": "card_gen.output.continuation",
+                "salvaged": len(recovered.cards),
+                "dropped": recovered.dropped,
+                "truncated": recovered.truncated,
+                "missing": missing,
+                "trace_id": trace_id,
+            },
+        )
+
+    def _cards_with_continuation(
+        self,
+        raw_output: str | None,
+        streamed: list[tuple[str, dict]],
+        *,
+        structured: bool = False,
+        document: str,
+        base_instructions: str,
+        target_count: int,
+        auto_target_count: bool,
+        avoid_questions: Sequence[str],
+        timeout: float | None,
+        request: GenerateRequest,
+        strategy: str,
+        note_type: str,
+        trace_id: str,
+    ) -> list[dict]:
+        """Raw cards of a response; a damaged one is topped up by one follow-up request.
+
+        Complete cards are kept from truncated or partly malformed output, and the
+        follow-up asks only for the missing cards while listing the salvaged questions,
+        instead of discarding the response and repeating the whole request.
+        """
+        recovered = self._recovered(raw_output, streamed, structured=structured)
+        cards = list(recovered.cards)
+        if not recovered.damaged:
+            return cards
+        missing = self._continuation_target(
+            recovered, target_count, auto_target_count=auto_target_count
+        )
+        self._log_recovery(recovered, missing, trace_id)
+        if missing is None:
+            return cards
+
+        salvaged = [_raw_card_question(card) for card in cards]
+        instructions = (
+            base_instructions
+            + self._build_target_instruction(missing, auto_target_count=auto_target_count)
+            + self._build_avoid_instruction([*avoid_questions, *salvaged])
+        )
+        metrics.increment("card_gen_continuation_requests_total")
+        try:
+            with timed("llm_generate_continuation"):
+                raw_more, streamed_more, structured_more = self._chat_for_cards(
+                    document,
+                    instructions,
+                    timeout=timeout,
+                    request=request,
+                    strategies={"": (strategy, note_type)},
+                    trace_id=trace_id,
+                )
+            more = self._recovered(raw_more, streamed_more, structured=structured_more).cards
+        except CardGenError as exc:
+            # Salvaged cards are still worth keeping when the follow-up is unusable.
+            logger.warning(
+                "continuation response unusable",
+                extra={"event": "card_gen.output.continuation_failed", "error_detail": str(exc)},
+            )
+            return cards
+        seen = {question for question in salvaged if question}
+        cards.extend(card for card in more if _raw_card_question(card) not in seen)
+        return cards
+
+    def _multi_continuation(self, chunk: str, **kwargs) -> dict[str, list[CardDraft]]:
+        try:
+            return self._generate_multi_chunk(chunk, **kwargs)
+        except CardGenError as exc:
+            # Salvaged cards are still worth keeping when the follow-up is unusable.
+            logger.warning(
+                "continuation response unusable",
+                extra={"event": "card_gen.output.continuation_failed", "error_detail": str(exc)},
+            )
+            return {}
+
+    @staticmethod
+    def _build_avoid_instruction(questions: Sequence[str]) -> str:
+        compact: list[str] = []
+        for question in questions:
+            text = " ".join(str(question or "").split())
+            if len(text) > _AVOID_QUESTION_CHARS:
+                text = text[: _AVOID_QUESTION_CHARS - 1] + "…"
+            if text and text not in compact:
+                compact.append(text)
+        if not compact:
+            return ""
+        listed = "\n".join(f"  - {text}" for text in compact[-_AVOID_QUESTIONS_MAX:])
+        return (
+            "\n- Cards already exist for the questions below; cover other knowledge points "
+            f"and do not repeat them:\n{listed}\n"
+        )
+
+    def _map_chunks(
+        self,
+        fn: Callable[[tuple[int, str, int]], list[CardDraft]],
+        jobs: list[tuple[int, str, int]],
+    ) -> list[list[CardDraft]]:
+        """Run chunk jobs concurrently and return their results in chunk order.
+
+        Concurrency is further bounded by the LLM client itself (RPM throttle or the
+        shared request scheduler), so this only decides how many calls may wait at once.
+        """
+        workers = max(1, min(self._chunk_concurrency, len(jobs)))
+        if workers <= 1:
+            return [fn(job) for job in jobs]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(fn, job) for job in jobs]
+            try:
+                return [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _generate_chunk(
+        self,
+        chunk: str,
+        *,
+        index: int,
+        chunk_count: int,
+        chunk_target: int,
+        request: GenerateRequest,
+        base_system_prompt: str,
+        note_type: str,
+        strategy: str,
+        auto_target_count: bool,
+        trace_id: str,
+    ) -> list[CardDraft]:
+        # Runs on a pool thread; restore the request's trace id for logs and LLM metrics.
+        with trace_context(trace_id):
+            logger.info(
+                f"Processing chunk {index}/{chunk_count}",
+                extra={
+                    "chunk_index": index,
+                    "chunk_length": len(chunk),
+                    "chunk_target": chunk_target,
+                    "trace_id": trace_id,
+                },
+            )
+            effective_target = chunk_target or request.target_count
+            chunk_system_prompt = (
+                base_system_prompt
+                + self._build_target_instruction(
+                    effective_target,
+                    auto_target_count=auto_target_count,
+                )
+                + self._build_avoid_instruction(self._avoid_questions(request, index))
+            )
+            request_timeout = self._estimate_request_timeout(
+                chunk,
+                target_count=effective_target,
+                auto_target_count=auto_target_count,
+            )
+            with timed(f"llm_generate_chunk_{index}"):
+                raw_output, streamed, structured = self._chat_for_cards(
+                    chunk,
+                    chunk_system_prompt,
+                    timeout=request_timeout,
+                    request=request,
+                    strategies={"": (strategy, note_type)},
+                    trace_id=trace_id,
+                )
+
+            raw_limit_target = self._raw_limit_target_for_request(
+                target_count=effective_target,
+                auto_target_count=auto_target_count,
+                content_length=len(chunk),
+            )
+            raw_cards = self._limit_raw_cards_for_build(
+                self._cards_with_continuation(
+                    raw_output,
+                    streamed,
+                    structured=structured,
+                    document=chunk,
+                    base_instructions=base_system_prompt,
+                    target_count=effective_target,
+                    auto_target_count=auto_target_count,
+                    avoid_questions=self._avoid_questions(request, index),
+                    timeout=request_timeout,
+                    request=request,
+                    strategy=strategy,
+                    note_type=note_type,
+                    trace_id=trace_id,
+                ),
+                target_count=raw_limit_target,
+                strategy=strategy,
+                trace_id=trace_id,
+            )
+            chunk_drafts = build_card_drafts(
+                raw_cards=raw_cards,
+                deck_name=request.deck_name,
+                note_type=note_type,
+                tags=request.tags or ["ankismart"],
+                trace_id=trace_id,
+                source_path=request.source_path,
+                source_document=(Path(request.source_path).name if request.source_path else ""),
+                strategy_id=strategy,
+            )
+            if chunk_target > 0 and not auto_target_count and len(chunk_drafts) > chunk_target:
+                chunk_drafts = chunk_drafts[:chunk_target]
+            return chunk_drafts
+
+    @staticmethod
+    def _strip_boilerplate(markdown: str, *, trace_id: str, source_path: str) -> str:
+        cleaned, report = strip_repeated_boilerplate(markdown)
+        if not report.removed_lines:
+            return markdown
+        metrics.increment("card_gen_boilerplate_chars_saved_total", value=report.chars_saved)
+        metrics.increment("card_gen_boilerplate_tokens_saved_total", value=report.tokens_saved)
+        logger.info(
+            "Stripped repeated boilerplate before generation",
+            extra={
+                "event": "card_gen.boilerplate.stripped",
+                "source_path": source_path,
+                "removed_lines": report.removed_lines,
+                "chars_saved": report.chars_saved,
+                "tokens_saved": report.tokens_saved,
+                "pattern_count": len(report.patterns),
+                "trace_id": trace_id,
+            },
+        )
+        return cleaned
+
     def _attach_image(self, drafts: list[CardDraft], source_path: str) -> None:
         """Attach source image to card fields and media."""
         p = Path(source_path)
@@ -637,7 +1596,23 @@ class CardGenerator:
                 )
             )
 
-    def correct_ocr_text(self, text: str) -> str:
-        """Use LLM to correct OCR errors in text."""
+    def correct_ocr_text(
+        self,
+        text: str,
+        *,
+        cancel_token: CancellationToken | None = None,
+        line_scores: Sequence[float | None] | None = None,
+    ) -> str:
+        """Use LLM to correct OCR errors in text.
+
+        With ``line_scores`` (OCR confidence per line) only low-confidence lines are sent;
+        otherwise the text is corrected page by page in bounded chunks. Requests go through
+        the client (concurrently when it is a scheduler) and its response cache.
+        """
+        raise_if_cancelled(cancel_token, stage="OCR correction")
         with timed("ocr_correction"):
-            return self._llm.chat(OCR_CORRECTION_PROMPT, text)
+            if line_scores is None:
+                return correct_ocr_chunks(text, self._llm, cancel_token=cancel_token)
+            return correct_low_confidence_lines(
+                text, line_scores, self._llm, cancel_token=cancel_token
+            )
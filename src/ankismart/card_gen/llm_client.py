@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import contextvars
 import threading
 import time
-from collections import deque
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from typing import TYPE_CHECKING, Any
 
 import httpx
 from openai import (
@@ -10,60 +13,377 @@ from openai import (
     APIStatusError,
     APITimeoutError,
     AuthenticationError,
+    BadRequestError,
     OpenAI,
     PermissionDeniedError,
     RateLimitError,
+    UnprocessableEntityError,
 )
 
+from ankismart.card_gen.rate_limiter import error_retry_delay, shared_rate_limiter
+from ankismart.card_gen.response_cache import LLMResponseCache, build_cache_key
+from ankismart.card_gen.tokens import ContextLimits, estimate_tokens, resolve_context_limits
 from ankismart.core.errors import CardGenError, ErrorCode
 from ankismart.core.logging import get_logger
 from ankismart.core.tracing import get_trace_id, metrics, timed
 
+if TYPE_CHECKING:
+    from ankismart.card_gen.async_llm_client import AsyncLLMClient
+
 logger = get_logger("llm_client")
 
 _RETRYABLE_ERRORS = (APITimeoutError, RateLimitError)
 _MAX_RETRIES = 3
 _BASE_DELAY = 1.0  # seconds
+# Completion tokens reserved against a TPM limit when the request sets no max_tokens.
+_COMPLETION_RESERVATION_TOKENS = 1024
+# Endpoints that rejected a JSON schema ``response_format``; shared by every client so one
+# rejection switches the whole process back to prompt-described output.
+_STRUCTURED_OUTPUT_REJECTED: set[tuple[str, str]] = set()
+_STRUCTURED_OUTPUT_LOCK = threading.Lock()
+_STRUCTURED_OUTPUT_ERROR_HINTS = ("response_format", "json_schema", "schema")
+# Endpoints that rejected ``stream_options``; their streams are sent without a usage request.
+_STREAM_USAGE_REJECTED: set[tuple[str, str]] = set()
+_STREAM_USAGE_ERROR_HINTS = ("stream_options", "include_usage")
+# Billed ``(prompt, completion)`` tokens per trace id, so a document's actual usage can be
+# compared with its pre-flight estimate. Bounded; the oldest traces are dropped first.
+_TRACE_USAGE: OrderedDict[str, tuple[int, int]] = OrderedDict()
+_TRACE_USAGE_LOCK = threading.Lock()
+_TRACE_USAGE_MAX_ENTRIES = 2048
+
+
+class RequestTiming:
+    """What a request spent outside the provider: limiter waits, retry sleeps, cache hits.
+
+    A caller that times requests (the batch scheduler's concurrency window) starts one
+    with :func:`begin_request_timing`; the clients fill it in from the same context.
+    """
+
+    __slots__ = ("cached", "paused")
+
+    def __init__(self) -> None:
+        self.cached = False
+        self.paused = 0.0
+
+
+_REQUEST_TIMING: contextvars.ContextVar[RequestTiming | None] = contextvars.ContextVar(
+    "llm_request_timing", default=None
+)
+
+
+def begin_request_timing() -> RequestTiming:
+    """Start timing the request about to run in the current context."""
+    timing = RequestTiming()
+    _REQUEST_TIMING.set(timing)
+    return timing
+
 
+def _note_request_pause(seconds: float) -> None:
+    timing = _REQUEST_TIMING.get()
+    if timing is not None and seconds > 0:
+        timing.paused += seconds
 
-class _RpmThrottle:
-    """Thread-safe sliding-window RPM throttle."""
 
-    def __init__(self, rpm: int) -> None:
-        self._rpm = max(0, int(rpm))
-        self._lock = threading.Lock()
-        self._timestamps: deque[float] = deque()
+def _note_request_cached() -> None:
+    timing = _REQUEST_TIMING.get()
+    if timing is not None:
+        timing.cached = True
 
-    def wait(self) -> float:
-        if self._rpm <= 0:
-            return 0.0
 
-        total_waited = 0.0
+class _ChatClientBase:
+    """Provider settings and per-request policy shared by the sync and async clients.
 
-        while True:
-            now = time.monotonic()
-            wait_for = 0.0
+    Subclasses own the transport; request shaping, cache keys, stream accounting, retry
+    decisions and error mapping live here so both clients behave identically.
+    """
 
-            with self._lock:
-                window_start = now - 60.0
-                while self._timestamps and self._timestamps[0] <= window_start:
-                    self._timestamps.popleft()
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o",
+        *,
+        base_url: str | None = None,
+        rpm_limit: int = 0,
+        tpm_limit: int = 0,
+        temperature: float = 0.3,
+        max_tokens: int = 0,
+        proxy_url: str = "",
+        response_cache: LLMResponseCache | None = None,
+        context_window: int = 0,
+        max_output_tokens: int = 0,
+        structured_output: bool = False,
+    ) -> None:
+        self._api_key = api_key
+        self._base_url = base_url
+        self._rpm_limit = rpm_limit
+        self._tpm_limit = tpm_limit
+        self._proxy_url = proxy_url
+        self._model = model
+        self._throttle = shared_rate_limiter(
+            base_url=base_url, api_key=api_key, model=model, rpm=rpm_limit, tpm=tpm_limit
+        )
+        self._temperature = temperature
+        self._max_tokens = max_tokens
+        self._response_cache = response_cache
+        self._context_window = max(0, int(context_window or 0))
+        self._max_output_tokens = max(0, int(max_output_tokens or 0))
+        self._structured_output = bool(structured_output)
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    @property
+    def context_limits(self) -> ContextLimits:
+        """Context window and completion budget of the configured model."""
+        limits = resolve_context_limits(
+            self._model,
+            context_window=self._context_window,
+            max_output_tokens=self._max_output_tokens,
+        )
+        if 0 < self._max_tokens < limits.max_output_tokens:
+            return ContextLimits(limits.context_window, self._max_tokens)
+        return limits
+
+    @property
+    def supports_structured_output(self) -> bool:
+        """Whether requests may carry a JSON schema ``response_format``."""
+        return self._structured_output and not structured_output_rejected(
+            self._base_url, self._model
+        )
 
-                if len(self._timestamps) < self._rpm:
-                    self._timestamps.append(now)
-                    return total_waited
+    def _settings(self) -> dict[str, Any]:
+        """Constructor arguments reproducing this client's provider settings."""
+        return {
+            "api_key": self._api_key,
+            "model": self._model,
+            "base_url": self._base_url,
+            "rpm_limit": self._rpm_limit,
+            "tpm_limit": self._tpm_limit,
+            "temperature": self._temperature,
+            "max_tokens": self._max_tokens,
+            "proxy_url": self._proxy_url,
+            "response_cache": self._response_cache,
+            "context_window": self._context_window,
+            "max_output_tokens": self._max_output_tokens,
+            "structured_output": self._structured_output,
+        }
+
+    def _cache_key(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        response_format: Mapping[str, Any] | None = None,
+    ) -> str:
+        return build_cache_key(
+            model=self._model,
+            base_url=self._base_url,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=self._temperature,
+            max_tokens=self._max_tokens,
+            response_format=response_format,
+        )
 
-                wait_for = 60.0 - (now - self._timestamps[0])
+    def _completion_budget(self) -> int:
+        return self._max_tokens if self._max_tokens > 0 else _COMPLETION_RESERVATION_TOKENS
 
-            if wait_for > 0:
-                time.sleep(wait_for)
-                total_waited += wait_for
-            else:
-                # Yield to avoid busy spin on edge timing.
-                time.sleep(0)
+    def _reserve_tokens(self, system_prompt: str, user_prompt: str) -> int:
+        """Tokens a request is expected to consume: the prompt plus its completion budget."""
+        prompt = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        return prompt + self._completion_budget()
 
+    def _start_request(
+        self, system_prompt: str, user_prompt: str, response_format: Mapping[str, Any] | None
+    ) -> tuple[str, int]:
+        """Check the request can be sent and count it; return its trace id and reservation."""
+        trace_id = get_trace_id()
+        if response_format is not None and not self.supports_structured_output:
+            raise structured_output_unavailable(trace_id)
+        metrics.increment("llm_requests_total")
+        return trace_id, self._reserve_tokens(system_prompt, user_prompt)
 
-class LLMClient:
+    @staticmethod
+    def _note_attempt(waited: object) -> None:
+        try:
+            seconds = float(waited)
+        except (TypeError, ValueError):
+            seconds = 0.0
+        metrics.increment("llm_attempts_total")
+        _note_request_pause(seconds)
+        if seconds > 0:
+            metrics.increment("llm_throttle_wait_seconds_total", value=seconds)
+            metrics.set_gauge("llm_throttle_last_wait_seconds", seconds)
+
+    def _completion_kwargs(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None,
+        response_format: Mapping[str, Any] | None,
+        *,
+        stream: bool = False,
+    ) -> dict[str, Any]:
+        kwargs: dict[str, Any] = {
+            "model": self._model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": self._temperature,
+            "timeout": timeout if timeout is not None else 120,
+        }
+        if self._max_tokens > 0:
+            kwargs["max_tokens"] = self._max_tokens
+        if response_format is not None:
+            kwargs["response_format"] = dict(response_format)
+        if stream:
+            kwargs["stream"] = True
+            # OpenAI-style endpoints only report usage in a stream when asked to.
+            if not stream_usage_rejected(self._base_url, self._model):
+                kwargs["stream_options"] = {"include_usage": True}
+        return kwargs
+
+    def _stream_usage_fallback(self, exc: Exception, kwargs: dict[str, Any]) -> bool:
+        """Drop ``stream_options`` after an endpoint refused it; return whether to resend."""
+        if "stream_options" not in kwargs:
+            return False
+        if not note_stream_usage_rejection(exc, base_url=self._base_url, model=self._model):
+            return False
+        del kwargs["stream_options"]
+        return True
+
+    def _finish_response(
+        self, content: str | None, *, reserved: int, used_tokens: int | None, trace_id: str
+    ) -> str:
+        """Settle the rate-limit reservation and return ``content``, or fail if it is empty.
+
+        Without reported usage the reservation is settled on the prompt estimate plus the
+        estimated length of the answer.
+        """
+        if used_tokens is None:
+            used_tokens = reserved - self._completion_budget() + estimate_tokens(content or "")
+        self._throttle.reconcile(reserved, used_tokens)
+        if content is None:
+            metrics.increment(
+                "llm_requests_failed_total",
+                labels={"code": ErrorCode.E_LLM_ERROR.value},
+            )
+            raise CardGenError(
+                "LLM returned empty response",
+                code=ErrorCode.E_LLM_ERROR,
+                trace_id=trace_id,
+            )
+        metrics.increment("llm_requests_succeeded_total")
+        return content
+
+    def _retry_delay(
+        self, exc: Exception, *, attempt: int, delivered: bool, reserved: int, trace_id: str
+    ) -> float:
+        """Seconds to sleep before retrying a retryable failure, or raise when out of retries.
+
+        A server-sent delay is enforced by the shared limiter on the next attempt, so the
+        caller sleeps zero. A stream that already delivered text cannot be replayed. The
+        failed attempt reported no usage, so its reservation is returned either way and
+        the next attempt's limiter wait charges it afresh.
+        """
+        self._throttle.reconcile(reserved, 0)
+        server_delay = note_rate_limit(self._throttle, exc)
+        converted = convert_llm_error(exc, trace_id=trace_id, context="chat completion")
+        if attempt < _MAX_RETRIES - 1 and not delivered:
+            delay = server_delay if server_delay is not None else _BASE_DELAY * (2**attempt)
+            logger.warning(
+                "LLM call failed, retrying",
+                extra={
+                    "trace_id": trace_id,
+                    "attempt": attempt + 1,
+                    "delay": delay,
+                    "error": str(exc),
+                    "error_code": str(converted.code),
+                },
+            )
+            metrics.increment("llm_retries_total")
+            if server_delay is not None:
+                return 0.0
+            _note_request_pause(delay)
+            return delay
+        metrics.increment(
+            "llm_requests_failed_total",
+            labels={"code": converted.code.value},
+        )
+        raise CardGenError(
+            f"LLM call failed after {attempt + 1} attempts: {converted.message}",
+            code=converted.code,
+            trace_id=trace_id,
+        ) from exc
+
+    def _request_error(
+        self,
+        exc: Exception,
+        *,
+        reserved: int,
+        trace_id: str,
+        response_format: Mapping[str, Any] | None,
+    ) -> CardGenError:
+        """Map a non-retryable failure, remembering endpoints that refuse JSON schemas."""
+        self._throttle.reconcile(reserved, 0)
+        if response_format is not None:
+            note_structured_output_rejection(exc, base_url=self._base_url, model=self._model)
+        converted = convert_llm_error(exc, trace_id=trace_id, context="chat completion")
+        metrics.increment(
+            "llm_requests_failed_total",
+            labels={"code": converted.code.value},
+        )
+        return converted
+
+    @staticmethod
+    def _retries_exhausted(trace_id: str) -> CardGenError:
+        metrics.increment(
+            "llm_requests_failed_total",
+            labels={"code": ErrorCode.E_LLM_ERROR.value},
+        )
+        return CardGenError(
+            "LLM call failed: exhausted retries",
+            code=ErrorCode.E_LLM_ERROR,
+            trace_id=trace_id,
+        )
+
+
+class StreamCollector:
+    """Accumulate one streamed completion: text deltas, reported usage, first-token time."""
+
+    def __init__(self, *, trace_id: str, model: str, on_text: Callable[[str], None] | None) -> None:
+        self._trace_id = trace_id
+        self._model = model
+        self._on_text = on_text
+        self._started = time.monotonic()
+        self._parts: list[str] = []
+        self.used_tokens: int | None = None
+
+    @property
+    def delivered(self) -> bool:
+        """Whether any text has been passed on, after which a retry would repeat it."""
+        return bool(self._parts)
+
+    @property
+    def content(self) -> str | None:
+        return "".join(self._parts) or None
+
+    def add(self, chunk: object) -> None:
+        if getattr(chunk, "usage", None):
+            record_usage(chunk, trace_id=self._trace_id, model=self._model)
+            self.used_tokens = usage_total_tokens(chunk)
+        delta = stream_delta_text(chunk)
+        if not delta:
+            return
+        if not self._parts:
+            metrics.set_gauge("llm_stream_first_token_seconds", time.monotonic() - self._started)
+        self._parts.append(delta)
+        if self._on_text is not None:
+            self._on_text(delta)
+
+
+class LLMClient(_ChatClientBase):
     def __init__(
         self,
         api_key: str,
@@ -71,10 +391,29 @@ class LLMClient:
         *,
         base_url: str | None = None,
         rpm_limit: int = 0,
+        tpm_limit: int = 0,
         temperature: float = 0.3,
         max_tokens: int = 0,
         proxy_url: str = "",
+        response_cache: LLMResponseCache | None = None,
+        context_window: int = 0,
+        max_output_tokens: int = 0,
+        structured_output: bool = False,
     ) -> None:
+        super().__init__(
+            api_key,
+            model,
+            base_url=base_url,
+            rpm_limit=rpm_limit,
+            tpm_limit=tpm_limit,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            proxy_url=proxy_url,
+            response_cache=response_cache,
+            context_window=context_window,
+            max_output_tokens=max_output_tokens,
+            structured_output=structured_output,
+        )
         kwargs: dict[str, object] = {"api_key": api_key}
         self._http_client: httpx.Client | None = None
         if base_url:
@@ -83,13 +422,15 @@ class LLMClient:
             self._http_client = httpx.Client(proxy=proxy_url)
             kwargs["http_client"] = self._http_client
         self._client = OpenAI(**kwargs)
-        self._model = model
-        self._throttle = _RpmThrottle(rpm_limit)
-        self._temperature = temperature
-        self._max_tokens = max_tokens
         self._close_lock = threading.Lock()
         self._closed = False
 
+    def as_async(self) -> AsyncLLMClient:
+        """Build an asyncio client with the same provider settings."""
+        from ankismart.card_gen.async_llm_client import AsyncLLMClient
+
+        return AsyncLLMClient(**self._settings())
+
     def close(self) -> None:
         """Release underlying OpenAI and HTTP resources."""
         with self._close_lock:
@@ -164,134 +505,179 @@ class LLMClient:
             metrics.increment("llm_validate_failed_total", labels={"code": converted.code.value})
             raise converted from exc
 
-    def chat(self, system_prompt: str, user_prompt: str, timeout: float | None = None) -> str:
-        """Send a chat completion request with retry logic."""
-        trace_id = get_trace_id()
-        metrics.increment("llm_requests_total")
+    def chat(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        """Send a chat completion request with retry logic.
+
+        With a response cache configured, identical requests are answered from disk and
+        concurrent duplicates share one provider call; ``use_cache=False`` skips the lookup
+        and stores the fresh answer in its place. ``response_format`` is only sent
+        while :attr:`supports_structured_output` holds; a provider rejecting it is
+        remembered and the request fails, so the caller can retry with a plain prompt.
+        """
+        return self._chat_cached(
+            system_prompt,
+            user_prompt,
+            timeout,
+            response_format=response_format,
+            use_cache=use_cache,
+        )
+
+    def chat_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        """Stream a chat completion, passing each content delta to ``on_text``.
+
+        Returns the full response. Once content has arrived a dropped stream is not
+        retried, because ``on_text`` has already consumed part of it; the error is raised
+        and the caller decides what to keep. A cache hit arrives as a single delta.
+        """
+        return self._chat_cached(
+            system_prompt,
+            user_prompt,
+            timeout,
+            stream=True,
+            on_text=on_text,
+            response_format=response_format,
+            use_cache=use_cache,
+        )
+
+    def _chat_cached(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None,
+        *,
+        stream: bool = False,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        cache = self._response_cache
+        if cache is None or not cache.accepts(self._temperature):
+            return self._chat_uncached(
+                system_prompt,
+                user_prompt,
+                timeout,
+                stream=stream,
+                on_text=on_text,
+                response_format=response_format,
+            )
+
+        fetched = False
+
+        def fetch() -> str:
+            nonlocal fetched
+            fetched = True
+            return self._chat_uncached(
+                system_prompt,
+                user_prompt,
+                timeout,
+                stream=stream,
+                on_text=on_text,
+                response_format=response_format,
+            )
+
+        key = self._cache_key(system_prompt, user_prompt, response_format)
+        if not use_cache:
+            # Regeneration and retries want a new answer; it replaces the cached one.
+            metrics.increment("llm_cache_bypassed_total")
+            response = fetch()
+            cache.put(key, response, model=self._model)
+            return response
+        response = cache.get_or_fetch(key, fetch, model=self._model)
+        if not fetched:
+            _note_request_cached()
+            if on_text is not None:
+                on_text(response)
+        return response
+
+    def _chat_uncached(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        stream: bool = False,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+    ) -> str:
+        trace_id, reserved = self._start_request(system_prompt, user_prompt, response_format)
+        kwargs = self._completion_kwargs(
+            system_prompt, user_prompt, timeout, response_format, stream=stream
+        )
 
         for attempt in range(_MAX_RETRIES):
-            waited_raw = self._throttle.wait()
-            try:
-                waited = float(waited_raw)
-            except (TypeError, ValueError):
-                waited = 0.0
-            metrics.increment("llm_attempts_total")
-            if waited > 0:
-                metrics.increment("llm_throttle_wait_seconds_total", value=waited)
-                metrics.set_gauge("llm_throttle_last_wait_seconds", waited)
+            self._note_attempt(self._throttle.wait(reserved))
+            collector: StreamCollector | None = None
             try:
                 with timed(f"llm_call_attempt_{attempt + 1}"):
-                    kwargs = {
-                        "model": self._model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt},
-                        ],
-                        "temperature": self._temperature,
-                        "timeout": timeout if timeout is not None else 120,
-                    }
-                    if self._max_tokens > 0:
-                        kwargs["max_tokens"] = self._max_tokens
-                    response = self._client.chat.completions.create(**kwargs)
-
-                usage = response.usage
-                if usage:
-                    metrics.increment("llm_prompt_tokens_total", value=usage.prompt_tokens)
-                    metrics.increment("llm_completion_tokens_total", value=usage.completion_tokens)
-                    metrics.increment("llm_total_tokens_total", value=usage.total_tokens)
-                    logger.info(
-                        "LLM call completed",
-                        extra={
-                            "trace_id": trace_id,
-                            "model": self._model,
-                            "prompt_tokens": usage.prompt_tokens,
-                            "completion_tokens": usage.completion_tokens,
-                            "total_tokens": usage.total_tokens,
-                        },
-                    )
-
-                content = response.choices[0].message.content
-                if content is None:
-                    metrics.increment(
-                        "llm_requests_failed_total",
-                        labels={"code": ErrorCode.E_LLM_ERROR.value},
-                    )
-                    raise CardGenError(
-                        "LLM returned empty response",
-                        code=ErrorCode.E_LLM_ERROR,
-                        trace_id=trace_id,
-                    )
-                metrics.increment("llm_requests_succeeded_total")
-                return content
+                    if stream:
+                        collector = StreamCollector(
+                            trace_id=trace_id, model=self._model, on_text=on_text
+                        )
+                        for chunk in self._open_stream(kwargs):
+                            collector.add(chunk)
+                        content, used_tokens = collector.content, collector.used_tokens
+                    else:
+                        response = self._client.chat.completions.create(**kwargs)
+                        record_usage(response, trace_id=trace_id, model=self._model)
+                        used_tokens = usage_total_tokens(response)
+                        content = response.choices[0].message.content
+                return self._finish_response(
+                    content, reserved=reserved, used_tokens=used_tokens, trace_id=trace_id
+                )
 
             except CardGenError:
                 raise
 
             except _RETRYABLE_ERRORS as exc:
-                if attempt < _MAX_RETRIES - 1:
-                    delay = _BASE_DELAY * (2**attempt)
-                    converted = self._convert_to_card_error(
-                        exc,
-                        trace_id=trace_id,
-                        context="chat completion",
-                    )
-                    logger.warning(
-                        "LLM call failed, retrying",
-                        extra={
-                            "trace_id": trace_id,
-                            "attempt": attempt + 1,
-                            "delay": delay,
-                            "error": str(exc),
-                            "error_code": str(converted.code),
-                        },
-                    )
-                    metrics.increment("llm_retries_total")
+                delay = self._retry_delay(
+                    exc,
+                    attempt=attempt,
+                    delivered=collector is not None and collector.delivered,
+                    reserved=reserved,
+                    trace_id=trace_id,
+                )
+                if delay > 0:
                     time.sleep(delay)
-                else:
-                    converted = self._convert_to_card_error(
-                        exc,
-                        trace_id=trace_id,
-                        context="chat completion",
-                    )
-                    metrics.increment(
-                        "llm_requests_failed_total",
-                        labels={"code": converted.code.value},
-                    )
-                    raise CardGenError(
-                        f"LLM call failed after {_MAX_RETRIES} attempts: {converted.message}",
-                        code=converted.code,
-                        trace_id=trace_id,
-                    ) from exc
 
             except Exception as exc:
-                converted = self._convert_to_card_error(
-                    exc, trace_id=trace_id, context="chat completion"
-                )
-                metrics.increment(
-                    "llm_requests_failed_total",
-                    labels={"code": converted.code.value},
-                )
-                raise converted from exc
+                raise self._request_error(
+                    exc, reserved=reserved, trace_id=trace_id, response_format=response_format
+                ) from exc
 
         # Should not reach here, but just in case
-        metrics.increment(
-            "llm_requests_failed_total",
-            labels={"code": ErrorCode.E_LLM_ERROR.value},
-        )
-        raise CardGenError(
-            "LLM call failed: exhausted retries",
-            code=ErrorCode.E_LLM_ERROR,
-            trace_id=trace_id,
-        )
+        raise self._retries_exhausted(trace_id)
+
+    def _open_stream(self, kwargs: dict[str, Any]) -> Any:
+        try:
+            return self._client.chat.completions.create(**kwargs)
+        except Exception as exc:
+            if not self._stream_usage_fallback(exc, kwargs):
+                raise
+        return self._client.chat.completions.create(**kwargs)
+
+    def _note_rate_limit(self, exc: Exception) -> float | None:
+        return note_rate_limit(self._throttle, exc)
 
     @staticmethod
     def _extract_status_code(exc: Exception) -> int | None:
-        if isinstance(exc, APIStatusError):
-            return getattr(exc, "status_code", None)
-        response = getattr(exc, "response", None)
-        if response is not None:
-            return getattr(response, "status_code", None)
-        return None
+        return extract_status_code(exc)
 
     def _convert_to_card_error(
         self,
@@ -300,41 +686,224 @@ class LLMClient:
         trace_id: str,
         context: str,
     ) -> CardGenError:
-        if isinstance(exc, CardGenError):
-            return exc
+        return convert_llm_error(exc, trace_id=trace_id, context=context)
+
+
+def _endpoint_key(base_url: str | None, model: str) -> tuple[str, str]:
+    return ((base_url or "").rstrip("/"), model)
+
+
+def _rejects_parameter(exc: Exception, hints: tuple[str, ...]) -> bool:
+    """Whether ``exc`` is an HTTP 400/422 whose message names one of ``hints``."""
+    rejected_request = isinstance(exc, BadRequestError | UnprocessableEntityError)
+    if not rejected_request and extract_status_code(exc) not in {400, 422}:
+        return False
+    message = str(exc).lower()
+    return any(hint in message for hint in hints)
+
+
+def stream_usage_rejected(base_url: str | None, model: str) -> bool:
+    """Whether this endpoint has rejected ``stream_options`` before."""
+    with _STRUCTURED_OUTPUT_LOCK:
+        return _endpoint_key(base_url, model) in _STREAM_USAGE_REJECTED
+
+
+def note_stream_usage_rejection(exc: Exception, *, base_url: str | None, model: str) -> bool:
+    """Remember an endpoint that refused ``stream_options``; return whether ``exc`` did."""
+    if not _rejects_parameter(exc, _STREAM_USAGE_ERROR_HINTS):
+        return False
+    with _STRUCTURED_OUTPUT_LOCK:
+        _STREAM_USAGE_REJECTED.add(_endpoint_key(base_url, model))
+    metrics.increment("llm_stream_usage_rejected_total")
+    logger.warning(
+        "LLM provider rejected stream usage reporting, streaming without it",
+        extra={
+            "event": "llm.stream_usage.rejected",
+            "model": model,
+            "error_detail": str(exc),
+        },
+    )
+    return True
+
+
+def structured_output_rejected(base_url: str | None, model: str) -> bool:
+    """Whether this endpoint has rejected a JSON schema ``response_format`` before."""
+    with _STRUCTURED_OUTPUT_LOCK:
+        return _endpoint_key(base_url, model) in _STRUCTURED_OUTPUT_REJECTED
+
+
+def note_structured_output_rejection(exc: Exception, *, base_url: str | None, model: str) -> bool:
+    """Remember an endpoint that refused ``response_format``; return whether ``exc`` did.
+
+    Providers without structured output answer with HTTP 400/422 naming the parameter;
+    other request errors are left alone.
+    """
+    if not _rejects_parameter(exc, _STRUCTURED_OUTPUT_ERROR_HINTS):
+        return False
+    with _STRUCTURED_OUTPUT_LOCK:
+        _STRUCTURED_OUTPUT_REJECTED.add(_endpoint_key(base_url, model))
+    metrics.increment("llm_structured_output_rejected_total")
+    logger.warning(
+        "LLM provider rejected JSON schema output, using prompt-described format",
+        extra={
+            "event": "llm.structured_output.rejected",
+            "model": model,
+            "error_detail": str(exc),
+        },
+    )
+    return True
+
+
+def structured_output_unavailable(trace_id: str) -> CardGenError:
+    return CardGenError(
+        "JSON schema output is not supported by this LLM provider",
+        code=ErrorCode.E_LLM_ERROR,
+        trace_id=trace_id,
+    )
+
+
+def cached_prompt_tokens(usage: object) -> int:
+    """Prompt tokens the provider served from its prefix cache.
+
+    OpenAI-compatible APIs report ``prompt_tokens_details.cached_tokens``; DeepSeek
+    reports ``prompt_cache_hit_tokens``.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    for value in (
+        getattr(details, "cached_tokens", None) if details is not None else None,
+        getattr(usage, "prompt_cache_hit_tokens", None),
+    ):
+        if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            return value
+    return 0
+
+
+def record_usage(response: object, *, trace_id: str, model: str) -> None:
+    usage = getattr(response, "usage", None)
+    if not usage:
+        return
+    cached_tokens = cached_prompt_tokens(usage)
+    metrics.increment("llm_prompt_tokens_total", value=usage.prompt_tokens)
+    metrics.increment("llm_completion_tokens_total", value=usage.completion_tokens)
+    metrics.increment("llm_total_tokens_total", value=usage.total_tokens)
+    metrics.increment("llm_cached_prompt_tokens_total", value=cached_tokens)
+    prompt_tokens_total = metrics.get_counter("llm_prompt_tokens_total")
+    if prompt_tokens_total > 0:
+        metrics.set_gauge(
+            "llm_prompt_cache_hit_ratio",
+            metrics.get_counter("llm_cached_prompt_tokens_total") / prompt_tokens_total,
+        )
+    if usage.prompt_tokens:
+        metrics.set_gauge("llm_prompt_cache_last_hit_ratio", cached_tokens / usage.prompt_tokens)
+    _add_trace_usage(trace_id, usage.prompt_tokens, usage.completion_tokens)
+    logger.info(
+        "LLM call completed",
+        extra={
+            "trace_id": trace_id,
+            "model": model,
+            "prompt_tokens": usage.prompt_tokens,
+            "cached_prompt_tokens": cached_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+        },
+    )
+
+
+def _add_trace_usage(trace_id: str, prompt_tokens: object, completion_tokens: object) -> None:
+    if not trace_id:
+        return
+    prompt = prompt_tokens if isinstance(prompt_tokens, int) else 0
+    completion = completion_tokens if isinstance(completion_tokens, int) else 0
+    with _TRACE_USAGE_LOCK:
+        previous_prompt, previous_completion = _TRACE_USAGE.pop(trace_id, (0, 0))
+        _TRACE_USAGE[trace_id] = (previous_prompt + prompt, previous_completion + completion)
+        while len(_TRACE_USAGE) > _TRACE_USAGE_MAX_ENTRIES:
+            _TRACE_USAGE.popitem(last=False)
+
+
+def trace_usage(trace_id: str) -> tuple[int, int]:
+    """``(prompt, completion)`` tokens billed so far under ``trace_id``."""
+    with _TRACE_USAGE_LOCK:
+        return _TRACE_USAGE.get(trace_id, (0, 0))
+
+
+def usage_total_tokens(response: object) -> int | None:
+    """Total tokens billed for a response, when the provider reported usage."""
+    total = getattr(getattr(response, "usage", None), "total_tokens", None)
+    return total if isinstance(total, int) and not isinstance(total, bool) else None
+
+
+def note_rate_limit(limiter: object, exc: Exception) -> float | None:
+    """Apply a 429 to the shared limiter; return the server's retry delay, if it sent one.
+
+    When the response carries ``Retry-After``/``x-ratelimit-reset-*`` hints every client
+    of the provider is held until then; the caller's next limiter wait does the sleeping.
+    """
+    if not isinstance(exc, RateLimitError):
+        return None
+    delay = error_retry_delay(exc)
+    metrics.increment("llm_rate_limited_total")
+    if delay is not None:
+        limiter.defer(delay)
+        metrics.set_gauge("llm_rate_limit_last_retry_after_seconds", delay)
+    return delay
 
-        status_code = self._extract_status_code(exc)
 
-        if isinstance(exc, AuthenticationError) or status_code == 401:
-            return CardGenError(
-                f"LLM authentication failed (HTTP 401) during {context}: {exc}",
-                code=ErrorCode.E_LLM_AUTH_ERROR,
-                trace_id=trace_id,
-            )
+def stream_delta_text(chunk: object) -> str:
+    """Content text carried by one streamed chat completion chunk."""
+    choices = getattr(chunk, "choices", None) or []
+    if not choices:
+        return ""
+    content = getattr(getattr(choices[0], "delta", None), "content", None)
+    return content if isinstance(content, str) else ""
 
-        if isinstance(exc, PermissionDeniedError) or status_code == 403:
-            return CardGenError(
-                f"LLM permission denied (HTTP 403) during {context}: {exc}",
-                code=ErrorCode.E_LLM_PERMISSION_ERROR,
-                trace_id=trace_id,
-            )
 
-        if isinstance(exc, APIStatusError):
-            return CardGenError(
-                f"LLM API status error (HTTP {status_code}) during {context}: {exc}",
-                code=ErrorCode.E_LLM_ERROR,
-                trace_id=trace_id,
-            )
+def extract_status_code(exc: Exception) -> int | None:
+    if isinstance(exc, APIStatusError):
+        return getattr(exc, "status_code", None)
+    response = getattr(exc, "response", None)
+    if response is not None:
+        return getattr(response, "status_code", None)
+    return None
 
-        if isinstance(exc, APIError):
-            return CardGenError(
-                f"LLM API error during {context}: {exc}",
-                code=ErrorCode.E_LLM_ERROR,
-                trace_id=trace_id,
-            )
 
+def convert_llm_error(exc: Exception, *, trace_id: str, context: str) -> CardGenError:
+    """Map OpenAI SDK errors onto :class:`CardGenError` codes."""
+    if isinstance(exc, CardGenError):
+        return exc
+
+    status_code = extract_status_code(exc)
+
+    if isinstance(exc, AuthenticationError) or status_code == 401:
+        return CardGenError(
+            f"LLM authentication failed (HTTP 401) during {context}: {exc}",
+            code=ErrorCode.E_LLM_AUTH_ERROR,
+            trace_id=trace_id,
+        )
+
+    if isinstance(exc, PermissionDeniedError) or status_code == 403:
+        return CardGenError(
+            f"LLM permission denied (HTTP 403) during {context}: {exc}",
+            code=ErrorCode.E_LLM_PERMISSION_ERROR,
+            trace_id=trace_id,
+        )
+
+    if isinstance(exc, APIStatusError):
         return CardGenError(
-            f"Unexpected LLM error during {context}: {exc}",
+            f"LLM API status error (HTTP {status_code}) during {context}: {exc}",
             code=ErrorCode.E_LLM_ERROR,
             trace_id=trace_id,
         )
+
+    if isinstance(exc, APIError):
+        return CardGenError(
+            f"LLM API error during {context}: {exc}",
+            code=ErrorCode.E_LLM_ERROR,
+            trace_id=trace_id,
+        )
+
+    return CardGenError(
+        f"Unexpected LLM error during {context}: {exc}",
+        code=ErrorCode.E_LLM_ERROR,
+        trace_id=trace_id,
+    )
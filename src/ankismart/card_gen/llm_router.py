@@ -0,0 +1,547 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from typing import TYPE_CHECKING, Any
+
+from ankismart.card_gen.tokens import ContextLimits
+from ankismart.core.errors import CardGenError, ErrorCode
+from ankismart.core.logging import get_logger
+from ankismart.core.tracing import metrics
+
+if TYPE_CHECKING:
+    from ankismart.card_gen.async_llm_client import AsyncLLMClient
+    from ankismart.card_gen.llm_client import LLMClient
+    from ankismart.card_gen.response_cache import LLMResponseCache
+
+logger = get_logger("llm_router")
+
+# Provider-level failures worth trying on another provider; parse and cancellation
+# errors are not about the provider.
+_FAILOVER_CODES = frozenset(
+    {ErrorCode.E_LLM_ERROR, ErrorCode.E_LLM_AUTH_ERROR, ErrorCode.E_LLM_PERMISSION_ERROR}
+)
+_LATENCY_SAMPLES = 64
+_MIN_HEDGE_SAMPLES = 10
+_HEDGE_PERCENTILE = 0.95
+_COOLDOWN_BASE_SECONDS = 5.0
+_COOLDOWN_MAX_SECONDS = 120.0
+
+
+def _is_failover_error(exc: BaseException) -> bool:
+    return isinstance(exc, CardGenError) and exc.code in _FAILOVER_CODES
+
+
+class ProviderHealth:
+    """Routing weights, latency samples and failure cool-downs for a provider pool.
+
+    :meth:`order` returns provider indexes to try: a weighted random pick among healthy
+    providers first, the remaining healthy ones by weight, then providers still cooling
+    down after consecutive failures. Shared by :class:`LLMRouter` and
+    :class:`AsyncLLMRouter` so sync and async traffic see the same health.
+    """
+
+    def __init__(self, names: Sequence[str], weights: Sequence[int] | None = None) -> None:
+        self._names = [str(name) for name in names]
+        raw_weights = list(weights or [1] * len(self._names))
+        self._weights = [max(1, int(weight or 1)) for weight in raw_weights]
+        self._latencies = [deque(maxlen=_LATENCY_SAMPLES) for _ in self._names]
+        self._failures = [0] * len(self._names)
+        self._cooldown_until = [0.0] * len(self._names)
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._names)
+
+    def order(self) -> list[int]:
+        now = time.monotonic()
+        with self._lock:
+            healthy = [i for i in range(len(self._names)) if self._cooldown_until[i] <= now]
+            cooling = sorted(
+                (i for i in range(len(self._names)) if self._cooldown_until[i] > now),
+                key=lambda i: self._cooldown_until[i],
+            )
+            ordered: list[int] = []
+            if healthy:
+                first = self._random.choices(
+                    healthy, weights=[self._weights[i] for i in healthy], k=1
+                )[0]
+                ordered.append(first)
+                ordered.extend(
+                    sorted(
+                        (i for i in healthy if i != first),
+                        key=lambda i: (-self._weights[i], i),
+                    )
+                )
+            return ordered + cooling
+
+    def record_success(self, index: int, latency: float) -> None:
+        with self._lock:
+            self._latencies[index].append(max(0.0, float(latency)))
+            self._failures[index] = 0
+            self._cooldown_until[index] = 0.0
+
+    def record_censored(self, index: int, elapsed: float) -> None:
+        """Record a request cancelled after ``elapsed`` seconds; its latency is at least that.
+
+        Hedge losers are cancelled exactly when they are slow, so dropping them would let
+        :meth:`hedge_delay` drift down. Only a bound at or past the current p95 says the
+        request was in the tail; shorter cancellations carry no such information.
+        """
+        elapsed = max(0.0, float(elapsed))
+        delay = self.hedge_delay(index)
+        if delay is not None and elapsed < delay:
+            return
+        with self._lock:
+            self._latencies[index].append(elapsed)
+
+    def record_failure(self, index: int) -> None:
+        with self._lock:
+            self._failures[index] += 1
+            cooldown = min(
+                _COOLDOWN_MAX_SECONDS,
+                _COOLDOWN_BASE_SECONDS * 2 ** (self._failures[index] - 1),
+            )
+            self._cooldown_until[index] = time.monotonic() + cooldown
+        metrics.increment("llm_provider_failures_total", labels={"provider": self._names[index]})
+
+    def hedge_delay(self, index: int) -> float | None:
+        """p95 latency of a provider, or None until enough requests have completed."""
+        with self._lock:
+            samples = sorted(self._latencies[index])
+        if len(samples) < _MIN_HEDGE_SAMPLES:
+            return None
+        rank = max(0, math.ceil(_HEDGE_PERCENTILE * len(samples)) - 1)
+        return samples[rank]
+
+
+def _all_support_structured_output(clients: Sequence[object]) -> bool:
+    # A routed request may land on any provider, so the schema is only sent when every
+    # provider in the pool accepts it.
+    return all(getattr(client, "supports_structured_output", False) is True for client in clients)
+
+
+def _request_kwargs(response_format: Mapping[str, Any] | None, use_cache: bool) -> dict[str, Any]:
+    # Plain requests keep the original call shape so clients without the keywords work.
+    kwargs: dict[str, Any] = {}
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+    if not use_cache:
+        kwargs["use_cache"] = False
+    return kwargs
+
+
+def _combined_limits(clients: Sequence[object]) -> ContextLimits:
+    """Tightest limits across the pool so a chunk fits whichever provider serves it."""
+    limits = [client.context_limits for client in clients]
+    return ContextLimits(
+        min(limit.context_window for limit in limits),
+        min(limit.max_output_tokens for limit in limits),
+    )
+
+
+class LLMRouter:
+    """Spread chat requests over several :class:`LLMClient` providers.
+
+    Each request goes to a weighted pick among healthy providers and fails over to the
+    others when a provider error survives the client's own retries. Providers that keep
+    failing are cooled down with exponential backoff. Streamed requests only fail over
+    while no text has been delivered. Hedging is done by :class:`AsyncLLMRouter`, which
+    :meth:`as_async` returns for the batch scheduler.
+    """
+
+    def __init__(
+        self,
+        clients: Sequence[LLMClient],
+        *,
+        weights: Sequence[int] | None = None,
+        names: Sequence[str] | None = None,
+        hedge: bool = False,
+    ) -> None:
+        if not clients:
+            raise ValueError("LLMRouter needs at least one client")
+        self._clients = list(clients)
+        self._health = ProviderHealth(
+            names or [client.model for client in self._clients], weights=weights
+        )
+        self._hedge = bool(hedge)
+
+    @property
+    def model(self) -> str:
+        return self._clients[0].model
+
+    @property
+    def context_limits(self) -> ContextLimits:
+        return _combined_limits(self._clients)
+
+    @property
+    def supports_structured_output(self) -> bool:
+        return _all_support_structured_output(self._clients)
+
+    @property
+    def clients(self) -> list[LLMClient]:
+        return list(self._clients)
+
+    @property
+    def health(self) -> ProviderHealth:
+        return self._health
+
+    def as_async(self) -> AsyncLLMRouter:
+        """Build the asyncio router over the same providers, sharing their health."""
+        return AsyncLLMRouter(
+            [client.as_async() for client in self._clients],
+            health=self._health,
+            hedge=self._hedge,
+        )
+
+    def chat(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        return self._route(
+            lambda client: client.chat(
+                system_prompt,
+                user_prompt,
+                timeout=timeout,
+                **_request_kwargs(response_format, use_cache),
+            )
+        )
+
+    def chat_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        delivered = [False]
+
+        def sink(text: str) -> None:
+            delivered[0] = True
+            if on_text is not None:
+                on_text(text)
+
+        return self._route(
+            lambda client: client.chat_stream(
+                system_prompt,
+                user_prompt,
+                timeout=timeout,
+                on_text=sink,
+                **_request_kwargs(response_format, use_cache),
+            ),
+            delivered=delivered,
+        )
+
+    def _route(
+        self, call: Callable[[LLMClient], str], *, delivered: list[bool] | None = None
+    ) -> str:
+        last_error: BaseException | None = None
+        for index in self._health.order():
+            started = time.monotonic()
+            try:
+                result = call(self._clients[index])
+            except Exception as exc:
+                if not _is_failover_error(exc):
+                    raise
+                self._health.record_failure(index)
+                if delivered is not None and delivered[0]:
+                    raise
+                last_error = exc
+                _log_failover(self._health.names[index], exc)
+                continue
+            self._health.record_success(index, time.monotonic() - started)
+            return result
+        assert last_error is not None
+        raise last_error
+
+    def close(self) -> None:
+        for client in self._clients:
+            try:
+                client.close()
+            except Exception as exc:  # pragma: no cover - defensive cleanup
+                logger.debug(f"Failed to close routed LLM client cleanly: {exc}")
+
+
+class AsyncLLMRouter:
+    """asyncio counterpart of :class:`LLMRouter` with optional hedged requests.
+
+    With ``hedge=True`` a request still running after its provider's p95 latency is
+    re-issued to the next provider in routing order; the first success wins and the other
+    request is cancelled. For streamed requests the first provider to deliver text wins,
+    so ``on_text`` only ever sees one response.
+    """
+
+    def __init__(
+        self,
+        clients: Sequence[AsyncLLMClient],
+        *,
+        health: ProviderHealth | None = None,
+        hedge: bool = False,
+    ) -> None:
+        if not clients:
+            raise ValueError("AsyncLLMRouter needs at least one client")
+        self._clients = list(clients)
+        self._health = health or ProviderHealth([client.model for client in self._clients])
+        self._hedge = bool(hedge)
+        self._congestion_listener: Callable[[str], None] | None = None
+
+    @property
+    def model(self) -> str:
+        return self._clients[0].model
+
+    @property
+    def context_limits(self) -> ContextLimits:
+        return _combined_limits(self._clients)
+
+    @property
+    def supports_structured_output(self) -> bool:
+        return _all_support_structured_output(self._clients)
+
+    @property
+    def congestion_listener(self) -> Callable[[str], None] | None:
+        return self._congestion_listener
+
+    @congestion_listener.setter
+    def congestion_listener(self, listener: Callable[[str], None] | None) -> None:
+        self._congestion_listener = listener
+        for client in self._clients:
+            if hasattr(client, "congestion_listener"):
+                client.congestion_listener = listener
+
+    async def chat(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        return await self._route(
+            lambda client, _sink: client.chat(
+                system_prompt,
+                user_prompt,
+                timeout=timeout,
+                **_request_kwargs(response_format, use_cache),
+            )
+        )
+
+    async def chat_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        return await self._route(
+            lambda client, sink: client.chat_stream(
+                system_prompt,
+                user_prompt,
+                timeout=timeout,
+                on_text=sink,
+                **_request_kwargs(response_format, use_cache),
+            ),
+            on_text=on_text,
+            stream=True,
+        )
+
+    async def _route(
+        self,
+        call: Callable[[AsyncLLMClient, Callable[[str], None]], Awaitable[str]],
+        *,
+        on_text: Callable[[str], None] | None = None,
+        stream: bool = False,
+    ) -> str:
+        order = self._health.order()
+        last_error: BaseException | None = None
+        while order:
+            primary = order.pop(0)
+            backup = order[0] if self._hedge and order else None
+            race = _Race(self, call, on_text=on_text, stream=stream)
+            try:
+                return await race.run(primary, backup)
+            except Exception as exc:
+                if not _is_failover_error(exc) or race.delivered:
+                    raise
+                last_error = exc
+                if race.hedged and backup is not None:
+                    order.remove(backup)
+        assert last_error is not None
+        raise last_error
+
+    async def aclose(self) -> None:
+        for client in self._clients:
+            try:
+                await client.aclose()
+            except Exception as exc:  # pragma: no cover - defensive cleanup
+                logger.debug(f"Failed to close routed async LLM client cleanly: {exc}")
+
+
+class _Race:
+    """One routed attempt: the primary provider, plus a hedge once it runs past p95."""
+
+    def __init__(
+        self,
+        router: AsyncLLMRouter,
+        call: Callable[[AsyncLLMClient, Callable[[str], None]], Awaitable[str]],
+        *,
+        on_text: Callable[[str], None] | None,
+        stream: bool,
+    ) -> None:
+        self._router = router
+        self._call = call
+        self._on_text = on_text
+        self._stream = stream
+        self._tasks: dict[asyncio.Task[str], int] = {}
+        self._owner: int | None = None
+        self._primary: int | None = None
+        self.hedged = False
+
+    @property
+    def delivered(self) -> bool:
+        return self._owner is not None
+
+    def _sink(self, index: int) -> Callable[[str], None]:
+        def sink(text: str) -> None:
+            if self._owner is None:
+                self._owner = index
+                # The first provider to stream text wins; the other would only duplicate it.
+                for task, task_index in self._tasks.items():
+                    if task_index != index:
+                        task.cancel()
+            if self._owner == index and self._on_text is not None:
+                self._on_text(text)
+
+        return sink
+
+    def _start(self, index: int) -> None:
+        client = self._router._clients[index]
+        started = time.monotonic()
+        task = asyncio.ensure_future(self._call(client, self._sink(index)))
+        self._tasks[task] = index
+        task.add_done_callback(lambda done: self._record(index, done, started))
+
+    def _record(self, index: int, task: asyncio.Task[str], started: float) -> None:
+        if task.cancelled():
+            self._router._health.record_censored(index, time.monotonic() - started)
+            return
+        exc = task.exception()
+        if exc is None:
+            self._router._health.record_success(index, time.monotonic() - started)
+        elif _is_failover_error(exc):
+            self._router._health.record_failure(index)
+            _log_failover(self._router._health.names[index], exc)
+
+    async def run(self, primary: int, backup: int | None) -> str:
+        self._primary = primary
+        self._start(primary)
+        try:
+            if backup is not None:
+                delay = self._router._health.hedge_delay(primary)
+                if delay is not None:
+                    done, _pending = await asyncio.wait(set(self._tasks), timeout=delay)
+                    if not done and self._owner is None:
+                        self.hedged = True
+                        metrics.increment("llm_hedged_requests_total")
+                        self._start(backup)
+            return await self._first_success()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    async def _first_success(self) -> str:
+        pending = set(self._tasks)
+        first_error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                exc = task.exception()
+                if exc is None:
+                    if self.hedged and self._tasks[task] != self._primary:
+                        metrics.increment("llm_hedged_wins_total")
+                    return task.result()
+                if first_error is None:
+                    first_error = exc
+        if first_error is None:
+            raise asyncio.CancelledError()
+        raise first_error
+
+
+def _log_failover(name: str, exc: BaseException) -> None:
+    logger.warning(
+        "LLM provider failed, trying next provider",
+        extra={"event": "llm_router.failover", "provider": name, "error": str(exc)},
+    )
+    metrics.increment("llm_provider_failovers_total")
+
+
+def build_llm_client(
+    config: object,
+    provider: object,
+    *,
+    response_cache: LLMResponseCache | None = None,
+) -> LLMClient | LLMRouter:
+    """Client for ``provider``, or a router over every enabled provider.
+
+    Routing is used when ``config.llm_multi_provider`` is on and at least one other
+    configured provider has a model, credentials or endpoint, and a positive
+    ``routing_weight``. ``provider`` (normally the active one) is always in the pool.
+    """
+    from ankismart.card_gen.llm_client import LLMClient
+
+    def make(item: object) -> LLMClient:
+        return LLMClient(
+            api_key=getattr(item, "api_key", ""),
+            base_url=getattr(item, "base_url", ""),
+            model=getattr(item, "model", ""),
+            rpm_limit=getattr(item, "rpm_limit", 0),
+            tpm_limit=getattr(item, "tpm_limit", 0),
+            context_window=getattr(item, "context_window", 0),
+            max_output_tokens=getattr(item, "max_output_tokens", 0),
+            temperature=float(getattr(config, "llm_temperature", 0.3)),
+            max_tokens=int(getattr(config, "llm_max_tokens", 0)),
+            proxy_url=getattr(config, "proxy_url", ""),
+            response_cache=response_cache,
+            structured_output=bool(getattr(config, "llm_structured_output", False)),
+        )
+
+    pool = [provider]
+    if getattr(config, "llm_multi_provider", False):
+        for item in getattr(config, "llm_providers", []) or []:
+            if item is provider or getattr(item, "id", None) == getattr(provider, "id", None):
+                continue
+            if int(getattr(item, "routing_weight", 1) or 0) <= 0:
+                continue
+            if not getattr(item, "model", "") or not (
+                getattr(item, "api_key", "") or getattr(item, "base_url", "")
+            ):
+                continue
+            pool.append(item)
+    if len(pool) == 1:
+        return make(provider)
+    return LLMRouter(
+        [make(item) for item in pool],
+        weights=[max(1, int(getattr(item, "routing_weight", 1) or 1)) for item in pool],
+        names=[getattr(item, "name", "") or getattr(item, "model", "") for item in pool],
+        hedge=bool(getattr(config, "llm_hedged_requests", False)),
+    )
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+from collections.abc import Callable, Mapping, Sequence
+from typing import Any
+
+from ankismart.card_gen.async_llm_client import AsyncLLMClient
+from ankismart.card_gen.llm_client import begin_request_timing
+from ankismart.card_gen.llm_router import AsyncLLMRouter
+from ankismart.card_gen.tokens import ContextLimits, estimate_tokens
+from ankismart.core.cancellation import CancellationToken, raise_if_cancelled
+from ankismart.core.errors import OperationCancelledError
+from ankismart.core.logging import get_logger
+from ankismart.core.tracing import metrics, peek_trace_id, trace_context
+
+logger = get_logger("llm_scheduler")
+
+_DEFAULT_MAX_IN_FLIGHT = 16
+_RESULT_POLL_SECONDS = 0.1
+# Latency samples are seconds per this many response tokens, and short responses count
+# as at least ``_MIN_SAMPLE_TOKENS`` so fixed per-request overhead does not dominate.
+_SAMPLE_TOKENS = 1000
+_MIN_SAMPLE_TOKENS = 64
+
+# Monotonic start time of the request running in the current task, so congestion
+# reported by the client mid-request can be attributed to the window it was sent under.
+_REQUEST_STARTED: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "llm_request_started", default=None
+)
+
+
+class AIMDConcurrencyLimit:
+    """Additive-increase/multiplicative-decrease window for in-flight LLM requests.
+
+    Every successful request grows the window by ``1 / window`` (about one slot per
+    window of successes). A 429, a timeout or a latency spike (slower than
+    ``latency_tolerance`` times the smoothed baseline) shrinks it by ``backoff``. Only
+    requests sent after the previous cut can cut again, so one burst of failures from the
+    same window halves it once rather than collapsing it to the minimum.
+
+    Latencies passed to :meth:`on_success` must be comparable across requests; the
+    scheduler reports provider time per 1000 response tokens.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: int,
+        maximum: int,
+        minimum: int = 1,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        warmup_samples: int = 5,
+    ) -> None:
+        self._maximum = max(1, int(maximum))
+        self._minimum = max(1, min(int(minimum), self._maximum))
+        self._window = float(min(self._maximum, max(self._minimum, int(initial))))
+        self._backoff = min(0.95, max(0.1, float(backoff)))
+        self._latency_tolerance = max(1.0, float(latency_tolerance))
+        self._warmup_samples = max(1, int(warmup_samples))
+        self._baseline: float | None = None
+        self._samples = 0
+        self._last_decrease = float("-inf")
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return max(self._minimum, int(self._window))
+
+    @property
+    def maximum(self) -> int:
+        return self._maximum
+
+    def on_success(self, latency: float, *, started: float | None = None) -> None:
+        """Record a completed request and grow the window unless it was abnormally slow."""
+        latency = max(0.0, float(latency))
+        self._samples += 1
+        if (
+            self._baseline is not None
+            and self._samples > self._warmup_samples
+            and latency > self._baseline * self._latency_tolerance
+        ):
+            self.on_congestion("latency", started=started)
+            return
+        self._baseline = latency if self._baseline is None else 0.9 * self._baseline + 0.1 * latency
+        self._window = min(float(self._maximum), self._window + 1.0 / self._window)
+        self._publish()
+
+    def on_congestion(self, reason: str, *, started: float | None = None) -> None:
+        """Shrink the window after a 429, timeout or latency spike."""
+        if started is not None and started < self._last_decrease:
+            return
+        previous = self.limit
+        self._window = max(float(self._minimum), self._window * self._backoff)
+        self._last_decrease = time.monotonic()
+        metrics.increment("llm_concurrency_decreases_total", labels={"reason": reason})
+        self._publish()
+        if self.limit != previous:
+            logger.info(
+                "LLM concurrency window reduced",
+                extra={
+                    "event": "llm_scheduler.concurrency_reduced",
+                    "reason": reason,
+                    "from": previous,
+                    "to": self.limit,
+                },
+            )
+
+    def _publish(self) -> None:
+        metrics.set_gauge("llm_concurrency_window", self.limit)
+
+
+class LLMRequestScheduler:
+    """Run chat requests for a whole batch on one background event loop.
+
+    Requests from any thread are multiplexed onto a single loop and bounded by
+    ``max_in_flight``; retry and throttle waits no longer hold a thread each. :meth:`chat`
+    is a blocking facade with the ``LLMClient.chat`` signature so existing callers such as
+    :class:`~ankismart.card_gen.generator.CardGenerator` can use the scheduler unchanged.
+
+    With ``adaptive=True`` the number of requests actually in flight follows an
+    :class:`AIMDConcurrencyLimit` that starts at ``initial_in_flight`` and never exceeds
+    ``max_in_flight``; it reacts to latency, 429s and timeouts as requests complete.
+    Latency samples leave out rate-limiter waits and retry sleeps, are scaled by the
+    response length, and are not taken at all for responses served from the cache.
+    """
+
+    def __init__(
+        self,
+        client: AsyncLLMClient | AsyncLLMRouter,
+        *,
+        max_in_flight: int = _DEFAULT_MAX_IN_FLIGHT,
+        cancel_token: CancellationToken | None = None,
+        adaptive: bool = False,
+        initial_in_flight: int | None = None,
+    ) -> None:
+        self._client = client
+        self._max_in_flight = max(1, int(max_in_flight))
+        self._cancel_token = cancel_token
+        self._limit: AIMDConcurrencyLimit | None = None
+        if adaptive:
+            self._limit = AIMDConcurrencyLimit(
+                initial=initial_in_flight or self._max_in_flight, maximum=self._max_in_flight
+            )
+            if hasattr(client, "congestion_listener"):
+                client.congestion_listener = self._on_congestion
+        self._loop = asyncio.new_event_loop()
+        self._slot_released = asyncio.Condition()
+        self._in_flight = 0
+        self._pending: set[concurrent.futures.Future[str]] = set()
+        self._pending_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run_loop, name="llm-request-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def model(self) -> str:
+        return self._client.model
+
+    @property
+    def context_limits(self) -> ContextLimits:
+        return self._client.context_limits
+
+    @property
+    def supports_structured_output(self) -> bool:
+        return getattr(self._client, "supports_structured_output", False) is True
+
+    @property
+    def max_in_flight(self) -> int:
+        return self._max_in_flight
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Requests currently allowed in flight (the adaptive window, if enabled)."""
+        return self._limit.limit if self._limit is not None else self._max_in_flight
+
+    def _on_congestion(self, reason: str) -> None:
+        if self._limit is not None:
+            self._limit.on_congestion(reason, started=_REQUEST_STARTED.get())
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _run_request(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None,
+        trace_id: str | None,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        with trace_context(trace_id):
+            raise_if_cancelled(self._cancel_token, trace_id=trace_id, stage="LLM request")
+            async with self._slot_released:
+                await self._slot_released.wait_for(lambda: self._in_flight < self.concurrency_limit)
+                # Only touched from the loop thread, so no lock is needed.
+                self._in_flight += 1
+            metrics.set_gauge("llm_scheduler_in_flight", self._in_flight)
+            started = time.monotonic()
+            _REQUEST_STARTED.set(started)
+            timing = begin_request_timing()
+            try:
+                raise_if_cancelled(self._cancel_token, trace_id=trace_id, stage="LLM request")
+                # Plain requests keep the original call shape for clients without the keywords.
+                extra: dict[str, Any] = {}
+                if response_format is not None:
+                    extra["response_format"] = response_format
+                if not use_cache:
+                    extra["use_cache"] = False
+                if on_text is not None:
+                    result = await self._client.chat_stream(
+                        system_prompt, user_prompt, timeout=timeout, on_text=on_text, **extra
+                    )
+                else:
+                    result = await self._client.chat(
+                        system_prompt, user_prompt, timeout=timeout, **extra
+                    )
+                if self._limit is not None and not timing.cached:
+                    service = max(0.0, time.monotonic() - started - timing.paused)
+                    tokens = max(_MIN_SAMPLE_TOKENS, estimate_tokens(result))
+                    self._limit.on_success(service * _SAMPLE_TOKENS / tokens, started=started)
+                return result
+            finally:
+                async with self._slot_released:
+                    self._in_flight -= 1
+                    self._slot_released.notify_all()
+                metrics.set_gauge("llm_scheduler_in_flight", self._in_flight)
+
+    def submit(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        *,
+        timeout: float | None = None,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> concurrent.futures.Future[str]:
+        """Schedule a request from any thread and return a future for its response.
+
+        With ``on_text`` the response is streamed and each delta is passed to it on the
+        scheduler's loop thread. ``use_cache=False`` asks the provider again instead of
+        replaying a cached response.
+        """
+        if self._closed:
+            raise RuntimeError("LLM request scheduler is closed")
+        metrics.increment("llm_scheduler_requests_total")
+        future = asyncio.run_coroutine_threadsafe(
+            self._run_request(
+                system_prompt,
+                user_prompt,
+                timeout,
+                peek_trace_id(),
+                on_text,
+                response_format,
+                use_cache,
+            ),
+            self._loop,
+        )
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future: concurrent.futures.Future[str]) -> None:
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    def _wait(
+        self,
+        future: concurrent.futures.Future[str],
+        cancel_token: CancellationToken | None = None,
+    ) -> str:
+        while True:
+            for token in (self._cancel_token, cancel_token):
+                if token is not None and token.cancelled:
+                    future.cancel()
+                    raise_if_cancelled(token, stage="LLM request")
+            try:
+                return future.result(timeout=_RESULT_POLL_SECONDS)
+            except concurrent.futures.TimeoutError:
+                continue
+            except concurrent.futures.CancelledError as exc:
+                raise OperationCancelledError(
+                    "Operation cancelled during LLM request", stage="LLM request"
+                ) from exc
+
+    def chat(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        """Blocking facade matching ``LLMClient.chat``."""
+        return self._wait(
+            self.submit(
+                system_prompt,
+                user_prompt,
+                timeout=timeout,
+                response_format=response_format,
+                use_cache=use_cache,
+            )
+        )
+
+    def chat_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        *,
+        on_text: Callable[[str], None] | None = None,
+        response_format: Mapping[str, Any] | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        """Blocking facade matching ``LLMClient.chat_stream``."""
+        return self._wait(
+            self.submit(
+                system_prompt,
+                user_prompt,
+                timeout=timeout,
+                on_text=on_text,
+                response_format=response_format,
+                use_cache=use_cache,
+            )
+        )
+
+    def chat_each(
+        self,
+        prompts: Sequence[tuple[str, str]],
+        *,
+        timeout: float | None = None,
+        cancel_token: CancellationToken | None = None,
+    ) -> list[str | Exception]:
+        """Send ``(system, user)`` pairs concurrently; a failed request yields its exception.
+
+        One failure leaves the other requests running, so callers can keep partial
+        results. Cancellation, of the scheduler or of ``cancel_token``, cancels every
+        request and raises.
+        """
+        futures = [self.submit(system, user, timeout=timeout) for system, user in prompts]
+        results: list[str | Exception] = []
+        try:
+            for future in futures:
+                try:
+                    results.append(self._wait(future, cancel_token))
+                except OperationCancelledError:
+                    raise
+                except Exception as exc:
+                    results.append(exc)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return results
+
+    def cancel_pending(self) -> int:
+        """Cancel every queued or in-flight request; return how many were cancelled."""
+        with self._pending_lock:
+            pending = list(self._pending)
+        cancelled = sum(1 for future in pending if future.cancel())
+        if cancelled:
+            metrics.increment("llm_scheduler_cancelled_total", value=cancelled)
+        return cancelled
+
+    def close(self) -> None:
+        """Cancel outstanding requests, close the async client and stop the loop."""
+        if self._closed:
+            return
+        self._closed = True
+        self.cancel_pending()
+        try:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result(timeout=5)
+        except Exception as exc:  # pragma: no cover - defensive cleanup
+            logger.debug(f"Failed to close async LLM client cleanly: {exc}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+    def __enter__(self) -> LLMRequestScheduler:
+        return self
+
+    def __exit__(self, _exc_type, _exc, _tb) -> None:
+        self.close()
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import json
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from ankismart.card_gen.llm_client import LLMClient
+from ankismart.card_gen.llm_scheduler import LLMRequestScheduler
+from ankismart.card_gen.prompts import OCR_CORRECTION_PROMPT, OCR_LINE_CORRECTION_PROMPT
+from ankismart.core.cancellation import CancellationToken, raise_if_cancelled
+from ankismart.core.errors import OperationCancelledError
+from ankismart.core.logging import get_logger
+from ankismart.core.tracing import metrics
+
+logger = get_logger("card_gen.ocr_correction")
+
+# Paddle rec_scores are ~0.95+ for clean print; anything below this is worth a second look.
+LOW_CONFIDENCE_THRESHOLD = 0.85
+
+_CONTEXT_LINES = 1
+_MAX_TARGET_LINES_PER_BATCH = 24
+_MAX_BATCH_CHARS = 4000
+# Whole-text correction sends one request per page, split further above this size.
+_MAX_CHUNK_CHARS = 6000
+
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+# Separator between pages in the markdown built by the OCR converter.
+_PAGE_SEPARATOR_RE = re.compile(r"(\n\s*---\s*\n)")
+_PAGE_SEPARATOR_LINE = "---"
+# Oversized pages are split at paragraph breaks first, then at line breaks.
+_CHUNK_SEPARATORS = ("\n\n", "\n")
+
+
+@dataclass(frozen=True)
+class LineBatch:
+    """One correction request: low-confidence line indices plus the lines shown for context."""
+
+    targets: tuple[int, ...]
+    window: tuple[int, ...]
+
+
+def find_low_confidence_lines(
+    lines: Sequence[str],
+    line_scores: Sequence[float | None],
+    *,
+    threshold: float = LOW_CONFIDENCE_THRESHOLD,
+) -> list[int]:
+    """Return indices of non-blank lines whose OCR confidence is below ``threshold``.
+
+    ``None`` scores mark structural lines (page headers, separators) and are never sent.
+    """
+    suspicious: list[int] = []
+    for index, line in enumerate(lines[: len(line_scores)]):
+        score = line_scores[index]
+        if score is None or not line.strip():
+            continue
+        if score < threshold:
+            suspicious.append(index)
+    return suspicious
+
+
+def plan_line_batches(
+    lines: Sequence[str],
+    targets: Sequence[int],
+    *,
+    context_lines: int = _CONTEXT_LINES,
+    max_targets: int = _MAX_TARGET_LINES_PER_BATCH,
+    max_chars: int = _MAX_BATCH_CHARS,
+) -> list[LineBatch]:
+    """Group target lines (with surrounding context) into bounded requests."""
+    batches: list[LineBatch] = []
+    batch_targets: list[int] = []
+    batch_window: set[int] = set()
+    batch_chars = 0
+
+    def flush() -> None:
+        nonlocal batch_targets, batch_window, batch_chars
+        if batch_targets:
+            batches.append(LineBatch(tuple(batch_targets), tuple(sorted(batch_window))))
+        batch_targets = []
+        batch_window = set()
+        batch_chars = 0
+
+    for target in targets:
+        start = max(0, target - context_lines)
+        stop = min(len(lines), target + context_lines + 1)
+        window = range(start, stop)
+        added = [index for index in window if index not in batch_window]
+        added_chars = sum(len(lines[index]) + 8 for index in added)
+        if batch_targets and (
+            len(batch_targets) >= max_targets or batch_chars + added_chars > max_chars
+        ):
+            flush()
+            added = list(window)
+            added_chars = sum(len(lines[index]) + 8 for index in added)
+        batch_targets.append(target)
+        batch_window.update(added)
+        batch_chars += added_chars
+    flush()
+    return batches
+
+
+def render_line_batch(lines: Sequence[str], batch: LineBatch) -> str:
+    targets = set(batch.targets)
+    rows: list[str] = []
+    previous: int | None = None
+    for index in batch.window:
+        if previous is not None and index != previous + 1:
+            rows.append("...")
+        marker = ">>" if index in targets else "  "
+        rows.append(f"{marker} {index + 1}: {lines[index]}")
+        previous = index
+    return "\n".join(rows)
+
+
+def parse_line_fixes(response: str, batch: LineBatch, lines: Sequence[str]) -> dict[int, str]:
+    """Extract ``{line_number: text}`` fixes, keeping only plausible single-line edits."""
+    match = _JSON_OBJECT_RE.search(str(response or ""))
+    if match is None:
+        return {}
+    try:
+        payload = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(payload, dict):
+        return {}
+
+    targets = set(batch.targets)
+    fixes: dict[int, str] = {}
+    for key, value in payload.items():
+        try:
+            index = int(str(key).strip()) - 1
+        except ValueError:
+            continue
+        if index not in targets or not isinstance(value, str):
+            continue
+        fixed = value.strip("\r\n")
+        if not fixed.strip() or "\n" in fixed:
+            continue
+        # Reject rewrites that are clearly not character-level OCR fixes.
+        if len(fixed) > 2 * len(lines[index]) + 20:
+            continue
+        fixes[index] = fixed
+    return fixes
+
+
+def _page_spans(lines: Sequence[str], line_scores: Sequence[float | None]) -> list[tuple[int, int]]:
+    """``[start, stop)`` line ranges of the pages, split at structural ``---`` lines.
+
+    Blank lines around a separator are left out, so a page is numbered the same way
+    whether it is corrected on its own or inside a document.
+    """
+    bounds: list[tuple[int, int]] = []
+    start = 0
+    for index, line in enumerate(lines):
+        is_structural = index >= len(line_scores) or line_scores[index] is None
+        if is_structural and line.strip() == _PAGE_SEPARATOR_LINE:
+            bounds.append((start, index))
+            start = index + 1
+    bounds.append((start, len(lines)))
+
+    spans: list[tuple[int, int]] = []
+    for start, stop in bounds:
+        while start < stop and not lines[start].strip():
+            start += 1
+        while stop > start and not lines[stop - 1].strip():
+            stop -= 1
+        if start < stop:
+            spans.append((start, stop))
+    return spans
+
+
+def _send_requests(
+    llm: LLMClient | LLMRequestScheduler,
+    prompts: Sequence[tuple[str, str]],
+    cancel_token: CancellationToken | None,
+) -> list[str | Exception]:
+    """Responses to ``(system, user)`` prompts in order; a failed request yields its exception.
+
+    A scheduler sends the requests concurrently on its event loop, any other client one at
+    a time. Either way they go through the client's persistent response cache.
+    """
+    raise_if_cancelled(cancel_token, stage="OCR correction")
+    if isinstance(llm, LLMRequestScheduler):
+        return llm.chat_each(prompts, cancel_token=cancel_token)
+    responses: list[str | Exception] = []
+    for system_prompt, user_prompt in prompts:
+        raise_if_cancelled(cancel_token, stage="OCR correction")
+        try:
+            responses.append(llm.chat(system_prompt, user_prompt))
+        except OperationCancelledError:
+            raise
+        except Exception as exc:
+            responses.append(exc)
+    return responses
+
+
+def correct_low_confidence_lines(
+    text: str,
+    line_scores: Sequence[float | None],
+    llm: LLMClient | LLMRequestScheduler,
+    *,
+    threshold: float = LOW_CONFIDENCE_THRESHOLD,
+    max_lines_per_batch: int = _MAX_TARGET_LINES_PER_BATCH,
+    cancel_token: CancellationToken | None = None,
+) -> str:
+    """Send only low-confidence OCR lines to the LLM and splice the fixes back in.
+
+    ``line_scores`` is aligned with ``text.split("\\n")``. Batches run concurrently when
+    ``llm`` is a scheduler; a batch that fails keeps its raw lines instead of failing
+    the whole document.
+    """
+    lines = text.split("\n")
+    targets = find_low_confidence_lines(lines, line_scores, threshold=threshold)
+    metrics.increment("ocr_correction_lines_total", value=len(lines))
+    metrics.increment("ocr_correction_suspicious_lines_total", value=len(targets))
+    if not targets:
+        logger.info(
+            "OCR correction skipped, no low-confidence lines",
+            extra={"event": "ocr.correction.skipped", "line_count": len(lines)},
+        )
+        return text
+
+    # Batches are planned per page with page-local line numbers, so a page's requests
+    # (and their cached responses) do not depend on the pages around it.
+    batches: list[tuple[int, list[str], LineBatch]] = []
+    for start, stop in _page_spans(lines, line_scores):
+        page_lines = lines[start:stop]
+        page_targets = [target - start for target in targets if start <= target < stop]
+        batches.extend(
+            (start, page_lines, batch)
+            for batch in plan_line_batches(
+                page_lines, page_targets, max_targets=max(1, int(max_lines_per_batch))
+            )
+        )
+
+    responses = _send_requests(
+        llm,
+        [
+            (OCR_LINE_CORRECTION_PROMPT, render_line_batch(page_lines, batch))
+            for _offset, page_lines, batch in batches
+        ],
+        cancel_token,
+    )
+    corrected = list(lines)
+    failed_batches = 0
+    for (offset, page_lines, batch), response in zip(batches, responses, strict=True):
+        if isinstance(response, Exception):
+            failed_batches += 1
+            logger.warning(
+                f"OCR line correction batch failed, keeping raw lines: {response}",
+                extra={"event": "ocr.correction.batch_failed"},
+            )
+            continue
+        for index, fixed in parse_line_fixes(response, batch, page_lines).items():
+            corrected[offset + index] = fixed
+
+    logger.info(
+        "OCR line correction finished",
+        extra={
+            "event": "ocr.correction.finished",
+            "line_count": len(lines),
+            "suspicious_lines": len(targets),
+            "batches": len(batches),
+            "failed_batches": failed_batches,
+        },
+    )
+    return "\n".join(corrected)
+
+
+def split_ocr_chunks(text: str, *, max_chars: int = _MAX_CHUNK_CHARS) -> list[tuple[str, bool]]:
+    """Split OCR markdown into ``(piece, correctable)`` pieces that join back to ``text``.
+
+    Pages become separate pieces, page separators are kept as non-correctable pieces, and
+    a page longer than ``max_chars`` is split further at paragraph, then line, breaks.
+    """
+    limit = max(1, int(max_chars))
+    pieces: list[tuple[str, bool]] = []
+    for index, part in enumerate(_PAGE_SEPARATOR_RE.split(text)):
+        if index % 2:
+            pieces.append((part, False))
+        elif part:
+            pieces.extend((chunk, bool(chunk.strip())) for chunk in _bounded_chunks(part, limit))
+    return pieces
+
+
+def _bounded_chunks(
+    text: str, limit: int, separators: tuple[str, ...] = _CHUNK_SEPARATORS
+) -> list[str]:
+    """Split ``text`` at the first separator, then split oversized parts at the next."""
+    if len(text) <= limit or not separators:
+        return [text]
+    separator, finer = separators[0], separators[1:]
+    parts = text.split(separator)
+    chunks: list[str] = []
+    current = ""
+    for position, part in enumerate(parts):
+        piece = part if position == len(parts) - 1 else part + separator
+        if current and len(current) + len(piece) > limit:
+            chunks.append(current)
+            current = ""
+        current += piece
+    chunks.append(current)
+    return [smaller for chunk in chunks for smaller in _bounded_chunks(chunk, limit, finer)]
+
+
+def correct_ocr_chunks(
+    text: str,
+    llm: LLMClient | LLMRequestScheduler,
+    *,
+    max_chunk_chars: int = _MAX_CHUNK_CHARS,
+    cancel_token: CancellationToken | None = None,
+) -> str:
+    """Correct OCR text page by page (bounded chunks) when line confidences are unknown.
+
+    Chunks run concurrently when ``llm`` is a scheduler, and a chunk whose request fails
+    keeps its raw text instead of failing the whole document.
+    """
+    pieces = split_ocr_chunks(text, max_chars=max_chunk_chars)
+    jobs = [position for position, (_piece, correctable) in enumerate(pieces) if correctable]
+    metrics.increment("ocr_correction_chunks_total", value=len(jobs))
+    if not jobs:
+        return text
+
+    responses = _send_requests(
+        llm,
+        [(OCR_CORRECTION_PROMPT, pieces[position][0].strip()) for position in jobs],
+        cancel_token,
+    )
+    corrected = [piece for piece, _correctable in pieces]
+    failed_chunks = 0
+    for position, response in zip(jobs, responses, strict=True):
+        fixed = "" if isinstance(response, Exception) else str(response or "").strip()
+        if not fixed:
+            failed_chunks += 1
+            reason = response if isinstance(response, Exception) else "empty correction"
+            logger.warning(
+                f"OCR correction chunk failed, keeping raw text: {reason}",
+                extra={"event": "ocr.correction.chunk_failed"},
+            )
+            continue
+        # Keep the whitespace around the chunk so pages and paragraphs join as before.
+        chunk = pieces[position][0]
+        leading = chunk[: len(chunk) - len(chunk.lstrip())]
+        trailing = chunk[len(chunk.rstrip()) :]
+        corrected[position] = f"{leading}{fixed}{trailing}"
+
+    metrics.increment("ocr_correction_failed_chunks_total", value=failed_chunks)
+    logger.info(
+        "OCR chunk correction finished",
+        extra={
+            "event": "ocr.correction.finished",
+            "chunks": len(jobs),
+            "failed_chunks": failed_chunks,
+        },
+    )
+    return "".join(corrected)
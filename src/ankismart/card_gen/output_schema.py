@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any
+
+# Fields the model fills for each note type; they match the Ankismart note models.
+NOTE_TYPE_FIELDS: dict[str, tuple[str, ...]] = {
+    "Basic": ("Front", "Back"),
+    "Cloze": ("Text", "Extra"),
+}
+
+# A JSON schema response must be an object, so single-strategy cards sit under this key.
+SINGLE_RESPONSE_KEY = "cards"
+_SCHEMA_NAME = "flashcards"
+
+
+def card_schema(note_type: str) -> dict[str, Any]:
+    """JSON schema of one card object for ``note_type`` (unknown types use Basic)."""
+    fields = NOTE_TYPE_FIELDS.get(note_type, NOTE_TYPE_FIELDS["Basic"])
+    return {
+        "type": "object",
+        "properties": {name: {"type": "string"} for name in fields},
+        "required": list(fields),
+        "additionalProperties": False,
+    }
+
+
+def cards_response_format(sections: Mapping[str, str]) -> dict[str, Any]:
+    """``response_format`` for a response holding one card array per key.
+
+    ``sections`` maps each response key to the note type of its cards. The schema is
+    strict, so every key is required and cards cannot carry extra properties.
+    """
+    schema = {
+        "type": "object",
+        "properties": {
+            key: {"type": "array", "items": card_schema(note_type)}
+            for key, note_type in sections.items()
+        },
+        "required": list(sections),
+        "additionalProperties": False,
+    }
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": _SCHEMA_NAME, "strict": True, "schema": schema},
+    }
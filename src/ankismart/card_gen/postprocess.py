@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import json
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass, field
 from pathlib import Path
 
 from ankismart.card_gen.card_format_parsers import has_valid_cloze
@@ -13,6 +16,9 @@ from ankismart.core.tracing import get_trace_id
 
 logger = get_logger("card_gen.postprocess")
 
+# The most common slip in otherwise valid card objects: a comma before a closing bracket.
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
 
 def parse_llm_output(raw: str) -> list[dict]:
     """Extract JSON array from LLM output, handling markdown code blocks."""
@@ -53,6 +59,271 @@ def parse_llm_output(raw: str) -> list[dict]:
         ) from exc
 
 
+def _extract_json_container(text: str) -> str:
+    """Strip a code fence and any text around the outermost JSON object or array."""
+    if text.startswith("```"):
+        lines = text.split("\n")
+        end = len(lines) - 1 if lines[-1].strip() == "```" else len(lines)
+        text = "\n".join(lines[1:end]).strip()
+
+    brace_start = text.find("{")
+    bracket_start = text.find("[")
+    if brace_start != -1 and (bracket_start == -1 or brace_start < bracket_start):
+        end = text.rfind("}")
+        if end > brace_start:
+            text = text[brace_start : end + 1]
+    elif bracket_start != -1:
+        end = text.rfind("]")
+        if end > bracket_start:
+            text = text[bracket_start : end + 1]
+    return text
+
+
+def parse_typed_llm_output(
+    raw: str, card_types: Sequence[str], *, structured: bool = False
+) -> dict[str, list[dict]]:
+    """Extract per-type card arrays from a multi-strategy response.
+
+    Accepts ``{"basic": [...], "cloze": [...]}`` or a flat array whose items carry a
+    ``"type"`` key. Types missing from the response map to an empty list. A
+    ``structured`` response was produced under a JSON schema and is parsed as is,
+    without looking for code fences or surrounding text.
+    """
+    trace_id = get_trace_id()
+    if not isinstance(raw, str):
+        raise CardGenError(
+            f"Failed to parse LLM output as JSON: expected text, got {type(raw).__name__}",
+            code=ErrorCode.E_LLM_PARSE_ERROR,
+            trace_id=trace_id,
+        )
+
+    text = raw.strip()
+    if not structured:
+        text = _extract_json_container(text)
+
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise CardGenError(
+            f"Failed to parse LLM output as JSON: {exc}",
+            code=ErrorCode.E_LLM_PARSE_ERROR,
+            trace_id=trace_id,
+        ) from exc
+
+    lookup = {str(card_type).strip().lower(): card_type for card_type in card_types}
+    typed: dict[str, list[dict]] = {card_type: [] for card_type in card_types}
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            card_type = lookup.get(str(key).strip().lower())
+            if card_type is not None and isinstance(value, list):
+                typed[card_type].extend(value)
+        return typed
+    if isinstance(payload, list):
+        for item in payload:
+            if not isinstance(item, dict):
+                continue
+            card = dict(item)
+            card_type = lookup.get(str(card.pop("type", "")).strip().lower())
+            if card_type is not None:
+                typed[card_type].append(card)
+        return typed
+    raise CardGenError(
+        "Failed to parse LLM output as JSON: expected object or array",
+        code=ErrorCode.E_LLM_PARSE_ERROR,
+        trace_id=trace_id,
+    )
+
+
+@dataclass(frozen=True)
+class RecoveredCards:
+    """Cards salvaged from a response that may be cut off or partly malformed.
+
+    ``dropped`` counts card objects that were complete but could not be parsed;
+    ``truncated`` is set when the response ended before its closing bracket (for
+    example because ``max_tokens`` was reached).
+    """
+
+    cards: list[dict] = field(default_factory=list)
+    dropped: int = 0
+    truncated: bool = False
+
+    @property
+    def damaged(self) -> bool:
+        return self.dropped > 0 or self.truncated
+
+
+def _salvage(raw: str, error: CardGenError) -> IncrementalCardParser:
+    parser = IncrementalCardParser()
+    parser.feed(raw)
+    if not parser.cards and not parser.dropped:
+        raise error
+    logger.warning(
+        "LLM output was damaged, keeping complete cards",
+        extra={
+            "event": "card_gen.output.recovered",
+            "card_count": len(parser.cards),
+            "dropped": parser.dropped,
+            "truncated": not parser.closed,
+            "trace_id": get_trace_id(),
+        },
+    )
+    return parser
+
+
+def recover_llm_output(raw: str) -> RecoveredCards:
+    """Parse a card array like :func:`parse_llm_output`, tolerating damaged output.
+
+    When strict parsing fails, every complete card object is kept. The error is only
+    raised when not a single card object can be found.
+    """
+    try:
+        return RecoveredCards(parse_llm_output(raw))
+    except CardGenError as exc:
+        if not isinstance(raw, str):
+            raise
+        parser = _salvage(raw, exc)
+    return RecoveredCards(
+        [card for _key, card in parser.cards],
+        dropped=parser.dropped,
+        truncated=not parser.closed,
+    )
+
+
+def recover_typed_llm_output(
+    raw: str, card_types: Sequence[str], *, structured: bool = False
+) -> tuple[dict[str, list[dict]], RecoveredCards]:
+    """Tolerant form of :func:`parse_typed_llm_output`.
+
+    Returns the per-type cards plus a :class:`RecoveredCards` describing the damage
+    (its ``cards`` lists every salvaged card regardless of type).
+    """
+    try:
+        typed = parse_typed_llm_output(raw, card_types, structured=structured)
+        return typed, RecoveredCards([card for cards in typed.values() for card in cards])
+    except CardGenError as exc:
+        if not isinstance(raw, str):
+            raise
+        parser = _salvage(raw, exc)
+
+    lookup = {str(card_type).strip().lower(): card_type for card_type in card_types}
+    typed = {card_type: [] for card_type in card_types}
+    for key, item in parser.cards:
+        card = dict(item)
+        type_name = key or str(card.pop("type", ""))
+        card_type = lookup.get(type_name.strip().lower())
+        if card_type is not None:
+            typed[card_type].append(card)
+    recovered = RecoveredCards(
+        [card for cards in typed.values() for card in cards],
+        dropped=parser.dropped,
+        truncated=not parser.closed,
+    )
+    return typed, recovered
+
+
+class IncrementalCardParser:
+    """Pull complete card objects out of a JSON response while it is still streaming.
+
+    Cards are objects inside the top-level array, or inside an array value of a top-level
+    object (multi-strategy output keyed by card type). :meth:`feed` returns the cards
+    completed by the new text as ``(key, card)`` pairs; ``key`` is the enclosing object
+    key, or ``""`` for a top-level array. Text before the first bracket (code fences,
+    preamble) is skipped. The whole response should still go through
+    :func:`parse_llm_output` once it is complete.
+
+    Card objects with a trailing comma are repaired; other malformed objects are
+    skipped and counted in ``dropped``. :attr:`closed` tells whether the outer
+    container has been closed, i.e. the response was not cut off.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_key = ""
+        self._array_keys: list[str] = []
+        self._card_start = -1
+        self._opened = False
+        self.cards: list[tuple[str, dict]] = []
+        self.dropped = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._opened and not self._stack
+
+    @staticmethod
+    def _load_card(text: str) -> object:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+        try:
+            return json.loads(_TRAILING_COMMA_RE.sub(r"\1", text))
+        except json.JSONDecodeError:
+            return None
+
+    def _is_card_array(self) -> bool:
+        if not self._stack or self._stack[-1] != "[":
+            return False
+        return len(self._stack) == 1 or (len(self._stack) == 2 and self._stack[0] == "{")
+
+    def feed(self, text: str) -> list[tuple[str, dict]]:
+        if not text:
+            return []
+        start = len(self._text)
+        self._text += text
+        completed: list[tuple[str, dict]] = []
+
+        for index in range(start, len(self._text)):
+            char = self._text[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._stack[0] == "{":
+                        try:
+                            self._last_key = str(
+                                json.loads(self._text[self._string_start : index + 1])
+                            )
+                        except json.JSONDecodeError:
+                            self._last_key = ""
+                continue
+            if not self._stack and char not in "[{":
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char in "[{":
+                if char == "{" and self._is_card_array():
+                    self._card_start = index
+                if char == "[":
+                    self._array_keys.append(self._last_key if len(self._stack) == 1 else "")
+                self._stack.append(char)
+                self._opened = True
+            elif char in "]}":
+                if not self._stack:
+                    continue
+                opened = self._stack.pop()
+                if opened == "[" and self._array_keys:
+                    self._array_keys.pop()
+                if char == "}" and self._card_start != -1 and self._is_card_array():
+                    card = self._load_card(self._text[self._card_start : index + 1])
+                    self._card_start = -1
+                    if isinstance(card, dict):
+                        key = self._array_keys[-1] if self._array_keys else ""
+                        completed.append((key, card))
+                    else:
+                        self.dropped += 1
+
+        self.cards.extend(completed)
+        return completed
+
+
 def validate_cloze(text: str) -> bool:
     """Check that text contains at least one valid cloze deletion."""
     return has_valid_cloze(text)
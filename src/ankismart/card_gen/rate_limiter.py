@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+
+from ankismart.core.tracing import metrics
+
+# Server hints beyond this are treated as bogus and clamped.
+_MAX_SERVER_DELAY_SECONDS = 120.0
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class _Bucket:
+    """Token bucket refilled continuously at ``per_minute / 60`` tokens per second."""
+
+    __slots__ = ("capacity", "level", "updated")
+
+    def __init__(self, per_minute: int, now: float) -> None:
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated)
+        self.level = min(self.capacity, self.level + elapsed * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until ``amount`` tokens are available (0 when they already are)."""
+        missing = min(amount, self.capacity) - self.level
+        return 0.0 if missing <= 0 else missing * 60.0 / self.capacity
+
+
+class ProviderRateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one provider.
+
+    Each request reserves one request slot and its estimated tokens before it is sent;
+    :meth:`reconcile` corrects the token bucket once the provider reports actual usage.
+    :meth:`defer` pauses every caller until a server-supplied reset time. The state is
+    guarded by a thread lock, so sync clients on worker threads and async clients on an
+    event loop can share one limiter.
+    """
+
+    def __init__(self, *, rpm: int = 0, tpm: int = 0) -> None:
+        self._lock = threading.Lock()
+        self._requests: _Bucket | None = None
+        self._tokens: _Bucket | None = None
+        self._blocked_until = 0.0
+        self.configure(rpm=rpm, tpm=tpm)
+
+    def configure(self, *, rpm: int, tpm: int) -> None:
+        """Apply new limits, keeping the current fill level where the limit is unchanged."""
+        now = time.monotonic()
+        with self._lock:
+            self._requests = self._resized(self._requests, rpm, now)
+            self._tokens = self._resized(self._tokens, tpm, now)
+
+    @staticmethod
+    def _resized(bucket: _Bucket | None, per_minute: int, now: float) -> _Bucket | None:
+        per_minute = max(0, int(per_minute or 0))
+        if per_minute <= 0:
+            return None
+        if bucket is not None and bucket.capacity == per_minute:
+            return bucket
+        return _Bucket(per_minute, now)
+
+    @property
+    def rpm(self) -> int:
+        return int(self._requests.capacity) if self._requests is not None else 0
+
+    @property
+    def tpm(self) -> int:
+        return int(self._tokens.capacity) if self._tokens is not None else 0
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """Take a request slot and ``tokens`` tokens, or return how long to wait first."""
+        now = time.monotonic()
+        with self._lock:
+            wait = max(0.0, self._blocked_until - now)
+            for bucket, amount in ((self._requests, 1.0), (self._tokens, float(tokens))):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_for(amount))
+            if wait > 0:
+                return wait
+            if self._requests is not None:
+                self._requests.level -= 1.0
+            if self._tokens is not None:
+                self._tokens.level -= min(float(tokens), self._tokens.capacity)
+            return 0.0
+
+    def wait(self, tokens: int = 0) -> float:
+        """Block until the request may be sent; return the seconds spent waiting."""
+        total = 0.0
+        while (delay := self.try_acquire(tokens)) > 0:
+            time.sleep(delay)
+            total += delay
+        return total
+
+    async def wait_async(self, tokens: int = 0) -> float:
+        """Coroutine form of :meth:`wait` that suspends instead of blocking the thread."""
+        total = 0.0
+        while (delay := self.try_acquire(tokens)) > 0:
+            await asyncio.sleep(delay)
+            total += delay
+        return total
+
+    def reconcile(self, reserved: int, actual: int) -> None:
+        """Return unused reserved tokens, or charge the overshoot, once usage is known."""
+        with self._lock:
+            if self._tokens is None:
+                return
+            delta = float(reserved) - float(actual)
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + delta)
+
+    def defer(self, seconds: float) -> None:
+        """Hold every request until ``seconds`` from now (a server reset hint)."""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        metrics.increment("llm_rate_limit_deferrals_total")
+
+
+_LIMITERS: dict[tuple[str, str, str], ProviderRateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def shared_rate_limiter(
+    *, base_url: str | None, api_key: str, model: str, rpm: int = 0, tpm: int = 0
+) -> ProviderRateLimiter:
+    """Return the process-wide limiter for one provider account and model.
+
+    Every client built for the same endpoint, key and model draws from the same buckets;
+    the most recently supplied limits win.
+    """
+    key = (
+        (base_url or "").rstrip("/"),
+        hashlib.sha256(str(api_key or "").encode("utf-8")).hexdigest()[:16],
+        str(model or ""),
+    )
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(key)
+        if limiter is None:
+            limiter = _LIMITERS[key] = ProviderRateLimiter(rpm=rpm, tpm=tpm)
+            return limiter
+    if limiter.rpm != max(0, int(rpm or 0)) or limiter.tpm != max(0, int(tpm or 0)):
+        limiter.configure(rpm=rpm, tpm=tpm)
+    return limiter
+
+
+def _parse_duration(value: str) -> float | None:
+    text = value.strip().lower()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(text)
+    if not parts or "".join(number + unit for number, unit in parts) != text:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def retry_delay_from_headers(headers: Mapping[str, str] | None) -> float | None:
+    """Seconds the server asks us to wait, from rate-limit response headers.
+
+    Understands ``retry-after-ms``, ``retry-after`` (seconds or HTTP date) and the
+    ``x-ratelimit-reset-requests``/``x-ratelimit-reset-tokens`` durations (``"6m0s"``,
+    ``"20ms"``). Returns None when no usable hint is present.
+    """
+    if not headers:
+        return None
+    try:
+        lowered = {str(key).lower(): value for key, value in headers.items()}
+    except (AttributeError, TypeError):
+        return None
+
+    def header(name: str) -> str | None:
+        value = lowered.get(name)
+        return value if isinstance(value, str) and value.strip() else None
+
+    delay: float | None = None
+    if (value := header("retry-after-ms")) is not None:
+        try:
+            delay = float(value) / 1000.0
+        except ValueError:
+            delay = None
+    if delay is None and (value := header("retry-after")) is not None:
+        delay = _parse_duration(value)
+        if delay is None:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                delay = None
+    if delay is None:
+        resets = [
+            parsed
+            for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+            if (value := header(name)) is not None
+            and (parsed := _parse_duration(value)) is not None
+        ]
+        delay = max(resets) if resets else None
+    if delay is None:
+        return None
+    return min(_MAX_SERVER_DELAY_SECONDS, max(0.0, delay))
+
+
+def error_retry_delay(exc: BaseException) -> float | None:
+    """Server-suggested retry delay carried by an SDK error's HTTP response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) if response is not None else None
+    return retry_delay_from_headers(headers if isinstance(headers, Mapping) else None)
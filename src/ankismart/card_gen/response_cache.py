@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from pathlib import Path
+from typing import Any
+
+from ankismart.core import config as config_module
+from ankismart.core.logging import get_logger
+from ankismart.core.tracing import metrics
+
+logger = get_logger("card_gen.response_cache")
+
+_KEY_VERSION = 1
+_DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+_DEFAULT_MAX_ENTRIES = 5000
+_CONNECT_TIMEOUT_SECONDS = 5.0
+
+
+def resolve_llm_cache_db_path() -> Path:
+    """Resolve the LLM response cache under the application cache directory."""
+    env_path = os.getenv("ANKISMART_LLM_CACHE_DB_PATH", "").strip()
+    if env_path:
+        return Path(env_path).expanduser().resolve()
+    return (config_module._resolve_install_cache_dir() / "llm_responses.sqlite3").resolve()
+
+
+def build_cache_key(
+    *,
+    model: str,
+    base_url: str | None,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float,
+    max_tokens: int,
+    response_format: Mapping[str, Any] | None = None,
+) -> str:
+    """Hash every request input that can change the provider's answer."""
+    fields: dict[str, object] = {
+        "v": _KEY_VERSION,
+        "model": model,
+        "base_url": (base_url or "").rstrip("/"),
+        "system": system_prompt,
+        "user": user_prompt,
+        "temperature": round(float(temperature), 4),
+        "max_tokens": int(max_tokens),
+    }
+    if response_format is not None:
+        fields["response_format"] = response_format
+    payload = json.dumps(
+        fields,
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("abandoned", "done", "error", "result", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        # Set when an async leader was cancelled; followers then run the call themselves.
+        self.abandoned = False
+        self.waiters: list[asyncio.Future[None]] = []
+
+
+def _wake(waiter: asyncio.Future[None]) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    Threads (:meth:`do`) and coroutines (:meth:`do_async`) share the same flights, so a
+    sync and an async caller asking for the same key make one call between them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+
+    def _join(self, key: str) -> tuple[_Flight, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _land(self, key: str, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.done.set()
+            waiters, flight.waiters = flight.waiters, []
+        for waiter in waiters:
+            try:
+                waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # The follower's event loop has already closed; nobody is waiting.
+                continue
+
+    async def _wait(self, flight: _Flight) -> None:
+        with self._lock:
+            if flight.done.is_set():
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            flight.waiters.append(waiter)
+        await waiter
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Run ``fn`` once per key at a time; return ``(result, shared)``.
+
+        Callers arriving while a call for ``key`` is running wait for it and receive
+        its result (or exception) with ``shared`` set to True.
+        """
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                break
+            flight.done.wait()
+            if flight.abandoned:
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            self._land(key, flight)
+        return flight.result, False
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Coroutine form of :meth:`do`; waiting suspends instead of blocking the loop.
+
+        A cancelled leader does not cancel its followers: the flight is abandoned and
+        each follower retries, so one of them leads the next attempt.
+        """
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                break
+            await self._wait(flight)
+            if flight.abandoned:
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = await fn()
+        except asyncio.CancelledError:
+            flight.abandoned = True
+            raise
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            self._land(key, flight)
+        return flight.result, False
+
+
+# Shared by every cache instance so clients built per run still coalesce with each other.
+_FLIGHTS = SingleFlight()
+
+
+class LLMResponseCache:
+    """SQLite-backed store of chat completion responses.
+
+    Entries expire ``ttl_seconds`` after they were written; beyond ``max_entries`` the
+    least recently read rows are evicted. With ``cache_sampled=False`` requests sent with
+    a non-zero temperature bypass the cache. Storage failures only cost a cache miss.
+    """
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        *,
+        ttl_seconds: float = _DEFAULT_TTL_SECONDS,
+        max_entries: int = _DEFAULT_MAX_ENTRIES,
+        cache_sampled: bool = True,
+    ) -> None:
+        self.path = Path(path) if path is not None else resolve_llm_cache_db_path()
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.max_entries = max(1, int(max_entries))
+        self.cache_sampled = bool(cache_sampled)
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return sqlite3.connect(self.path, timeout=_CONNECT_TIMEOUT_SECONDS)
+
+    def initialize(self) -> None:
+        with self._init_lock:
+            if self._initialized:
+                return
+            with self._connect() as conn:
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS llm_responses (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    );
+
+                    CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access
+                    ON llm_responses(last_access);
+                    """
+                )
+            self._initialized = True
+
+    def accepts(self, temperature: float) -> bool:
+        return self.cache_sampled or float(temperature) <= 0
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        try:
+            self.initialize()
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT response, created_at FROM llm_responses WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is None:
+                    return None
+                response, created_at = row
+                if self.ttl_seconds and created_at < now - self.ttl_seconds:
+                    conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    return None
+                conn.execute(
+                    "UPDATE llm_responses SET last_access = ? WHERE key = ?",
+                    (now, key),
+                )
+                return str(response)
+        except (sqlite3.Error, OSError) as exc:
+            logger.debug(f"LLM response cache read failed: {exc}")
+            return None
+
+    def put(self, key: str, response: str, *, model: str = "") -> None:
+        now = time.time()
+        try:
+            self.initialize()
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses "
+                    "(key, model, response, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, response, now, now),
+                )
+                self._evict(conn, now)
+        except (sqlite3.Error, OSError) as exc:
+            logger.debug(f"LLM response cache write failed: {exc}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> int:
+        removed = 0
+        if self.ttl_seconds:
+            removed += conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?",
+                (now - self.ttl_seconds,),
+            ).rowcount
+        removed += conn.execute(
+            "DELETE FROM llm_responses WHERE key IN ("
+            "SELECT key FROM llm_responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        if removed:
+            metrics.increment("llm_cache_evictions_total", value=removed)
+        return removed
+
+    def prune(self) -> int:
+        """Drop expired and over-capacity entries; return how many were removed."""
+        try:
+            self.initialize()
+            with self._connect() as conn:
+                return self._evict(conn, time.time())
+        except (sqlite3.Error, OSError) as exc:
+            logger.debug(f"LLM response cache prune failed: {exc}")
+            return 0
+
+    def clear(self) -> None:
+        try:
+            self.initialize()
+            with self._connect() as conn:
+                conn.execute("DELETE FROM llm_responses")
+        except (sqlite3.Error, OSError) as exc:
+            logger.debug(f"LLM response cache clear failed: {exc}")
+
+    def count(self) -> int:
+        try:
+            self.initialize()
+            with self._connect() as conn:
+                return int(conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0])
+        except (sqlite3.Error, OSError):
+            return 0
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], str], *, model: str = "") -> str:
+        """Return the cached response for ``key`` or fetch it exactly once.
+
+        Identical concurrent requests share a single ``fetch`` call.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            metrics.increment("llm_cache_hits_total")
+            return cached
+
+        def load() -> str:
+            # Another caller may have filled the entry between our read and taking the flight.
+            again = self.get(key)
+            if again is not None:
+                metrics.increment("llm_cache_hits_total")
+                return again
+            metrics.increment("llm_cache_misses_total")
+            response = fetch()
+            self.put(key, response, model=model)
+            return response
+
+        response, shared = _FLIGHTS.do(key, load)
+        if shared:
+            metrics.increment("llm_cache_coalesced_total")
+        return response
+
+    async def get_or_fetch_async(
+        self, key: str, fetch: Callable[[], Awaitable[str]], *, model: str = ""
+    ) -> str:
+        """Coroutine form of :meth:`get_or_fetch`, coalescing with sync callers too.
+
+        SQLite calls are short but blocking, so they run off the event loop.
+        """
+        cached = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            metrics.increment("llm_cache_hits_total")
+            return cached
+
+        async def load() -> str:
+            again = await asyncio.to_thread(self.get, key)
+            if again is not None:
+                metrics.increment("llm_cache_hits_total")
+                return again
+            metrics.increment("llm_cache_misses_total")
+            response = await fetch()
+            await asyncio.to_thread(self.put, key, response, model=model)
+            return response
+
+        response, shared = await _FLIGHTS.do_async(key, load)
+        if shared:
+            metrics.increment("llm_cache_coalesced_total")
+        return response
+
+
+def build_response_cache(config: object) -> LLMResponseCache | None:
+    """Create the response cache described by ``config``, or None when disabled."""
+    if not getattr(config, "llm_response_cache", False):
+        return None
+    return LLMResponseCache(
+        ttl_seconds=float(getattr(config, "llm_response_cache_ttl_hours", 168)) * 3600,
+        max_entries=int(getattr(config, "llm_response_cache_max_entries", _DEFAULT_MAX_ENTRIES)),
+        cache_sampled=bool(getattr(config, "llm_cache_sampled_responses", True)),
+    )
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from ankismart.card_gen.tokens import estimate_tokens
+
+_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+\S")
+_PAGE_HEADING_RE = re.compile(r"^#{1,6}\s*page\s+\d+\s*$", re.IGNORECASE)
+_SEPARATOR_RE = re.compile(r"^\s*(?:-{3,}|\*{3,}|_{3,})\s*$")
+_FENCE_RE = re.compile(r"^\s*(?:```|~~~)")
+
+# Content-defined boundaries: a block closes a chunk when its hash hits this mask, so the
+# same section produces the same chunk sequence no matter what precedes it in a file.
+_BOUNDARY_MODULUS = 4
+_MIN_CHUNK_CHARS = 400
+_MAX_CHUNK_CHARS = 4000
+# Shorter repeats (titles, one-line definitions) are cheaper to resend than to split out.
+_MIN_SHARED_CHUNK_CHARS = 200
+
+
+@dataclass(frozen=True)
+class DedupWorkItem:
+    """One generation unit after cross-document deduplication.
+
+    ``document_index`` is the owning document; ``source_documents`` lists every document
+    the content (and therefore its cards) is attributed to.
+    """
+
+    document_index: int
+    markdown: str
+    source_documents: tuple[str, ...]
+
+    @property
+    def shared(self) -> bool:
+        return len(self.source_documents) > 1
+
+
+@dataclass(frozen=True)
+class DedupPlan:
+    items: tuple[DedupWorkItem, ...]
+    shared_sections: int = 0
+    duplicate_chars_skipped: int = 0
+    duplicate_tokens_skipped: int = 0
+
+
+def _is_layout_line(line: str) -> bool:
+    stripped = line.strip()
+    return bool(_PAGE_HEADING_RE.match(stripped) or _SEPARATOR_RE.match(stripped))
+
+
+def _normalize(text: str) -> str:
+    lines = [line for line in text.splitlines() if not _is_layout_line(line)]
+    return " ".join(" ".join(lines).split()).lower()
+
+
+def _fingerprint(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _split_blocks(markdown: str) -> list[str]:
+    """Split on blank lines, keeping fenced code blocks whole."""
+    blocks: list[str] = []
+    current: list[str] = []
+    in_fence = False
+    for line in markdown.split("\n"):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        if not in_fence and not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def split_content_defined_chunks(
+    markdown: str,
+    *,
+    min_chars: int = _MIN_CHUNK_CHARS,
+    max_chars: int = _MAX_CHUNK_CHARS,
+) -> list[str]:
+    """Group markdown blocks into chunks whose boundaries depend only on content.
+
+    Headings always open a new chunk; otherwise a chunk closes after a block whose
+    normalized hash hits the boundary mask once ``min_chars`` is reached, or at ``max_chars``.
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+
+    def flush() -> None:
+        nonlocal current, size
+        if current:
+            chunks.append("\n\n".join(current))
+        current = []
+        size = 0
+
+    for block in _split_blocks(str(markdown or "")):
+        first_line = block.lstrip("\n").split("\n", 1)[0]
+        if _HEADING_RE.match(first_line) and not _PAGE_HEADING_RE.match(first_line.strip()):
+            flush()
+        current.append(block)
+        size += len(block)
+        normalized = _normalize(block)
+        at_boundary = (
+            bool(normalized) and int(_fingerprint(normalized)[:8], 16) % _BOUNDARY_MODULUS == 0
+        )
+        if size >= max_chars or (size >= min_chars and at_boundary):
+            flush()
+    flush()
+    return chunks
+
+
+def plan_cross_document_dedup(
+    documents: Sequence[tuple[str, str]],
+    *,
+    min_shared_chars: int = _MIN_SHARED_CHUNK_CHARS,
+) -> DedupPlan:
+    """Pull sections repeated across documents out so each is generated only once.
+
+    ``documents`` is ``(name, markdown)`` in batch order. Every document keeps its own
+    unique chunks; chunks found in several documents move into one shared work item per
+    group of documents, owned by the first document of the group.
+    """
+    names = [name for name, _markdown in documents]
+    doc_chunks: list[list[tuple[str, str]]] = []
+    owners: dict[str, list[int]] = {}
+    for doc_index, (_name, markdown) in enumerate(documents):
+        chunks: list[tuple[str, str]] = []
+        for chunk in split_content_defined_chunks(markdown):
+            normalized = _normalize(chunk)
+            fingerprint = _fingerprint(normalized) if len(normalized) >= min_shared_chars else ""
+            chunks.append((fingerprint, chunk))
+            if fingerprint:
+                holders = owners.setdefault(fingerprint, [])
+                if doc_index not in holders:
+                    holders.append(doc_index)
+        doc_chunks.append(chunks)
+
+    def is_shared(fingerprint: str) -> bool:
+        return bool(fingerprint) and len(owners.get(fingerprint, ())) > 1
+
+    shared_groups: dict[tuple[int, ...], list[str]] = {}
+    seen_shared: set[str] = set()
+    shared_sections = 0
+    skipped_chars = 0
+    skipped_tokens = 0
+    unique_markdown: list[str] = []
+    for doc_index, chunks in enumerate(doc_chunks):
+        kept: list[str] = []
+        for fingerprint, chunk in chunks:
+            if not is_shared(fingerprint):
+                kept.append(chunk)
+                continue
+            if fingerprint in seen_shared:
+                skipped_chars += len(chunk)
+                skipped_tokens += estimate_tokens(chunk)
+                continue
+            seen_shared.add(fingerprint)
+            shared_sections += 1
+            shared_groups.setdefault(tuple(owners[fingerprint]), []).append(chunk)
+        unique_markdown.append("\n\n".join(kept))
+
+    items: list[DedupWorkItem] = []
+    for doc_index, markdown in enumerate(unique_markdown):
+        if markdown.strip():
+            items.append(DedupWorkItem(doc_index, markdown, (names[doc_index],)))
+        for group, chunks in shared_groups.items():
+            if group[0] != doc_index:
+                continue
+            items.append(
+                DedupWorkItem(
+                    doc_index,
+                    "\n\n".join(chunks),
+                    tuple(names[index] for index in group),
+                )
+            )
+
+    return DedupPlan(
+        items=tuple(items),
+        shared_sections=shared_sections,
+        duplicate_chars_skipped=skipped_chars,
+        duplicate_tokens_skipped=skipped_tokens,
+    )
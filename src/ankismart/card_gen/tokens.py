@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+# Rough BPE averages: CJK ideographs are ~1 token each, other text ~4 characters per token.
+_CHARS_PER_TOKEN = 4.0
+
+
+def _is_cjk(ch: str) -> bool:
+    code = ord(ch)
+    return (
+        0x4E00 <= code <= 0x9FFF
+        or 0x3400 <= code <= 0x4DBF
+        or 0x3040 <= code <= 0x30FF
+        or 0xAC00 <= code <= 0xD7AF
+        or 0xF900 <= code <= 0xFAFF
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap provider-agnostic token estimate used for budgeting and reporting."""
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if _is_cjk(ch))
+    other = len(text) - cjk
+    return cjk + math.ceil(other / _CHARS_PER_TOKEN)
+
+
+@dataclass(frozen=True)
+class ContextLimits:
+    """Token limits of one model: total context window and the longest completion."""
+
+    context_window: int
+    max_output_tokens: int
+
+
+# Longest prefix wins. Values are the published limits of the model families that
+# providers in the default configuration serve; unknown models get the fallback below.
+_KNOWN_CONTEXT_LIMITS: dict[str, tuple[int, int]] = {
+    "gpt-4o": (128_000, 16_384),
+    "gpt-4.1": (1_047_576, 32_768),
+    "gpt-4-turbo": (128_000, 4_096),
+    "gpt-4": (8_192, 4_096),
+    "gpt-3.5-turbo": (16_385, 4_096),
+    "o1": (200_000, 100_000),
+    "o3": (200_000, 100_000),
+    "o4-mini": (200_000, 100_000),
+    "deepseek-chat": (64_000, 8_192),
+    "deepseek-reasoner": (64_000, 8_192),
+    "qwen-turbo": (131_072, 8_192),
+    "qwen-plus": (131_072, 8_192),
+    "qwen-max": (32_768, 8_192),
+    "qwen-long": (1_000_000, 8_192),
+    "qwen": (32_768, 8_192),
+    "moonshot-v1-8k": (8_192, 4_096),
+    "moonshot-v1-32k": (32_768, 8_192),
+    "moonshot-v1-128k": (131_072, 8_192),
+    "kimi": (131_072, 8_192),
+    "glm-4-long": (1_000_000, 4_096),
+    "glm-4": (128_000, 4_096),
+    "doubao": (32_768, 4_096),
+    "claude": (200_000, 8_192),
+    "gemini": (1_048_576, 8_192),
+}
+_DEFAULT_CONTEXT_LIMITS = ContextLimits(context_window=32_768, max_output_tokens=4_096)
+
+
+def resolve_context_limits(
+    model: str,
+    *,
+    context_window: int = 0,
+    max_output_tokens: int = 0,
+) -> ContextLimits:
+    """Return the limits for ``model``; positive overrides take precedence over the table."""
+    name = str(model or "").strip().lower().rsplit("/", 1)[-1]
+    known = _DEFAULT_CONTEXT_LIMITS
+    for prefix in sorted(_KNOWN_CONTEXT_LIMITS, key=len, reverse=True):
+        if name.startswith(prefix):
+            known = ContextLimits(*_KNOWN_CONTEXT_LIMITS[prefix])
+            break
+    window = int(context_window) if int(context_window or 0) > 0 else known.context_window
+    output = int(max_output_tokens) if int(max_output_tokens or 0) > 0 else known.max_output_tokens
+    return ContextLimits(context_window=window, max_output_tokens=min(output, window))
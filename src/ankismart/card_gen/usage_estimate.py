@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+
+# Calibration keeps the most recent per-document samples; a ratio outside these bounds
+# says more about a broken sample (a cached run, a cancelled batch) than about the model.
+_CALIBRATION_SAMPLES = 50
+_CALIBRATION_MIN = 0.25
+_CALIBRATION_MAX = 4.0
+
+
+@dataclass(frozen=True)
+class RequestEstimate:
+    """Projected usage of one planned LLM request (one chunk, one or more strategies)."""
+
+    document: str
+    chunk_index: int
+    strategies: tuple[str, ...]
+    prompt_tokens: int
+    completion_tokens: int
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass(frozen=True)
+class TokenPricing:
+    """Provider prices per 1000 tokens; zero prices make every estimate free."""
+
+    prompt_per_1k: float = 0.0
+    completion_per_1k: float = 0.0
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (
+            prompt_tokens * self.prompt_per_1k + completion_tokens * self.completion_per_1k
+        ) / 1000.0
+
+
+@dataclass(frozen=True)
+class UsageEstimate:
+    """Pre-flight projection for a generation batch, after calibration."""
+
+    requests: tuple[RequestEstimate, ...]
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def by_document(self) -> dict[str, tuple[int, int]]:
+        """Uncalibrated ``(prompt, completion)`` tokens per document, in plan order."""
+        totals: dict[str, tuple[int, int]] = {}
+        for request in self.requests:
+            prompt, completion = totals.get(request.document, (0, 0))
+            totals[request.document] = (
+                prompt + request.prompt_tokens,
+                completion + request.completion_tokens,
+            )
+        return totals
+
+
+def summarize_usage(
+    requests: Sequence[RequestEstimate],
+    *,
+    pricing: TokenPricing,
+    calibration: tuple[float, float] = (1.0, 1.0),
+) -> UsageEstimate:
+    """Total the planned requests, scaled by the ``(prompt, completion)`` calibration."""
+    prompt_factor, completion_factor = calibration
+    prompt_tokens = round(sum(request.prompt_tokens for request in requests) * prompt_factor)
+    completion_tokens = round(
+        sum(request.completion_tokens for request in requests) * completion_factor
+    )
+    return UsageEstimate(
+        requests=tuple(requests),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cost=pricing.cost(prompt_tokens, completion_tokens),
+    )
+
+
+def budget_overrun(estimate: UsageEstimate, *, token_budget: int, cost_budget: float) -> str:
+    """Which budget ``estimate`` exceeds: ``"tokens"``, ``"cost"`` or ``""`` when it fits.
+
+    A budget of zero or less is unlimited.
+    """
+    if token_budget > 0 and estimate.total_tokens > token_budget:
+        return "tokens"
+    if cost_budget > 0 and estimate.cost > cost_budget:
+        return "cost"
+    return ""
+
+
+def _sample_tokens(sample: Mapping[str, object], key: str) -> int:
+    value = sample.get(key, 0)
+    if isinstance(value, bool) or not isinstance(value, int | float):
+        return 0
+    return max(0, int(value))
+
+
+def _ratio(actual: int, estimated: int) -> float:
+    if actual <= 0 or estimated <= 0:
+        return 1.0
+    return min(_CALIBRATION_MAX, max(_CALIBRATION_MIN, actual / estimated))
+
+
+def calibration_factors(samples: Iterable[Mapping[str, object]]) -> tuple[float, float]:
+    """``(prompt, completion)`` actual-to-estimate ratios over the recorded samples.
+
+    Ratios are taken over the summed tokens rather than averaged per document, so large
+    documents weigh in proportion to what they cost.
+    """
+    totals = {
+        "estimated_prompt_tokens": 0,
+        "estimated_completion_tokens": 0,
+        "actual_prompt_tokens": 0,
+        "actual_completion_tokens": 0,
+    }
+    for sample in samples:
+        if not isinstance(sample, Mapping):
+            continue
+        for key in totals:
+            totals[key] += _sample_tokens(sample, key)
+    return (
+        _ratio(totals["actual_prompt_tokens"], totals["estimated_prompt_tokens"]),
+        _ratio(totals["actual_completion_tokens"], totals["estimated_completion_tokens"]),
+    )
+
+
+def append_calibration_sample(
+    samples: Sequence[Mapping[str, object]],
+    *,
+    document: str,
+    estimated: tuple[int, int],
+    actual: tuple[int, int],
+) -> list[dict[str, object]]:
+    """``samples`` plus one document's estimate and actual usage, keeping the newest."""
+    sample: dict[str, object] = {
+        "document": document,
+        "estimated_prompt_tokens": int(estimated[0]),
+        "estimated_completion_tokens": int(estimated[1]),
+        "actual_prompt_tokens": int(actual[0]),
+        "actual_completion_tokens": int(actual[1]),
+    }
+    kept = [dict(item) for item in samples if isinstance(item, Mapping)]
+    kept.append(sample)
+    return kept[-_CALIBRATION_SAMPLES:]
@@ -3,7 +3,9 @@ from __future__ import annotations
 import hashlib
 import json
 import os
+import shutil
 import sys
+import time
 from pathlib import Path
 
 from ankismart.core.logging import get_logger
@@ -45,6 +47,11 @@ def _resolve_app_dir() -> Path:
 
 CACHE_DIR: Path = _resolve_app_dir() / "cache"
 
+# Per-page OCR results only matter until a cancelled conversion is resumed; pages of
+# abandoned conversions are dropped after a week, and only the newest documents are kept.
+_OCR_PAGE_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
+_OCR_PAGE_CACHE_MAX_DOCUMENTS = 20
+
 
 # ---------------------------------------------------------------------------
 # File-hash based cache (content fingerprint + metadata)
@@ -152,6 +159,112 @@ def save_cache_by_hash(file_hash: str, result: MarkdownResult) -> None:
         logger.warning("Failed to save hash cache", extra={"file_hash": file_hash})
 
 
+# ---------------------------------------------------------------------------
+# Per-page OCR cache (keeps finished pages when a conversion is cancelled)
+# ---------------------------------------------------------------------------
+
+
+def build_ocr_page_cache_key(path: Path, *, ocr_fingerprint: str = "") -> str:
+    """Build a document-level key for raw per-page OCR results."""
+    raw = json.dumps(
+        {"file_hash": get_file_hash(path), "ocr": str(ocr_fingerprint or "").strip()},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _ocr_page_cache_root() -> Path:
+    return CACHE_DIR / "ocr_pages"
+
+
+def _ocr_page_cache_path(doc_key: str, page_index: int) -> Path:
+    return _ocr_page_cache_root() / doc_key / f"{int(page_index):05d}.json"
+
+
+def get_cached_ocr_page(
+    doc_key: str, page_index: int
+) -> tuple[str, list[float | None] | None] | None:
+    """Return cached ``(text, line_scores)`` for one page, or ``None`` when not cached."""
+    page_path = _ocr_page_cache_path(doc_key, page_index)
+    if not page_path.exists():
+        return None
+    try:
+        payload = json.loads(page_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(
+            f"Failed to read OCR page cache: {e}",
+            extra={"doc_key": doc_key, "page": page_index},
+        )
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get("text"), str):
+        return None
+    scores = payload.get("scores")
+    if not isinstance(scores, list):
+        scores = None
+    return payload["text"], scores
+
+
+def save_cached_ocr_page(
+    doc_key: str,
+    page_index: int,
+    text: str,
+    line_scores: list[float | None] | None = None,
+) -> None:
+    """Persist raw OCR text (and per-line confidence when known) for one page."""
+    page_path = _ocr_page_cache_path(doc_key, page_index)
+    payload: dict[str, object] = {"text": text}
+    if line_scores is not None:
+        payload["scores"] = line_scores
+    try:
+        page_path.parent.mkdir(parents=True, exist_ok=True)
+        page_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    except OSError:
+        logger.warning(
+            "Failed to save OCR page cache",
+            extra={"doc_key": doc_key, "page": page_index},
+        )
+
+
+def discard_ocr_page_cache(doc_key: str) -> None:
+    """Drop a document's cached pages once its conversion has finished."""
+    if doc_key:
+        shutil.rmtree(_ocr_page_cache_root() / doc_key, ignore_errors=True)
+
+
+def prune_ocr_page_cache(
+    *,
+    keep: str = "",
+    max_age_seconds: float = _OCR_PAGE_CACHE_MAX_AGE_SECONDS,
+    max_documents: int = _OCR_PAGE_CACHE_MAX_DOCUMENTS,
+) -> int:
+    """Remove page caches older than ``max_age_seconds`` or beyond the newest documents.
+
+    ``keep`` names the document being converted, which is never removed. Returns how
+    many document caches were dropped.
+    """
+    root = _ocr_page_cache_root()
+    try:
+        entries = [(entry.stat().st_mtime, entry) for entry in root.iterdir() if entry.is_dir()]
+    except OSError:
+        return 0
+    entries.sort(key=lambda item: item[0], reverse=True)
+    cutoff = time.time() - max_age_seconds
+    room = max(0, max_documents - (1 if keep else 0))
+    removed = 0
+    for mtime, entry in entries:
+        if entry.name == keep:
+            continue
+        if mtime >= cutoff and room > 0:
+            room -= 1
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        removed += 1
+    if removed:
+        logger.info("Pruned OCR page cache", extra={"removed_documents": removed})
+    return removed
+
+
 # ---------------------------------------------------------------------------
 # Trace-id based cache (original)
 # ---------------------------------------------------------------------------
@@ -17,7 +17,8 @@ from ankismart.converter.cache import (
 )
 from ankismart.converter.detector import detect_file_type
 from ankismart.converter.markitdown_converter import convert as markitdown_convert
-from ankismart.core.errors import ConvertError, ErrorCode
+from ankismart.core.cancellation import CancellationToken, raise_if_cancelled
+from ankismart.core.errors import ConvertError, ErrorCode, OperationCancelledError
 from ankismart.core.logging import get_logger
 from ankismart.core.models import MarkdownResult
 from ankismart.core.tracing import metrics, timed, trace_context
@@ -50,7 +51,8 @@ class DocumentConverter:
         self,
         *,
         doc_convert_backend: str = "native",
-        ocr_correction_fn: Callable[[str], str] | None = None,
+        # Called as ``fn(text, *, cancel_token=..., line_scores=...)``.
+        ocr_correction_fn: Callable[..., str] | None = None,
         ocr_mode: str = "local",
         ocr_cloud_provider: str = "",
         ocr_cloud_endpoint: str = "",
@@ -123,7 +125,11 @@ class DocumentConverter:
         )
 
     def convert(
-        self, file_path: Path, *, progress_callback: Callable[..., None] | None = None
+        self,
+        file_path: Path,
+        *,
+        progress_callback: Callable[..., None] | None = None,
+        cancel_token: CancellationToken | None = None,
     ) -> MarkdownResult:
         with trace_context() as trace_id:
             with timed("convert_total"):
@@ -164,6 +170,7 @@ class DocumentConverter:
                 converter_fn = self._resolve_converter(file_type, trace_id)
 
                 try:
+                    raise_if_cancelled(cancel_token, trace_id=trace_id, stage="conversion")
                     if file_type in ("pdf", "image"):
                         safe_progress_callback = None
                         if progress_callback is not None:
@@ -197,31 +204,27 @@ class DocumentConverter:
                                         extra={"error": str(cb_exc), "trace_id": trace_id},
                                     )
 
+                        ocr_kwargs: dict[str, object] = {
+                            "progress_callback": safe_progress_callback,
+                            "ocr_mode": self._ocr_mode,
+                            "cloud_provider": self._ocr_cloud_provider,
+                            "cloud_endpoint": self._ocr_cloud_endpoint,
+                            "cloud_api_key": self._ocr_cloud_api_key,
+                            "proxy_url": self._proxy_url,
+                        }
                         if self._ocr_correction_fn is not None:
-                            result = converter_fn(
-                                file_path,
-                                trace_id,
-                                ocr_correction_fn=self._ocr_correction_fn,
-                                progress_callback=safe_progress_callback,
-                                ocr_mode=self._ocr_mode,
-                                cloud_provider=self._ocr_cloud_provider,
-                                cloud_endpoint=self._ocr_cloud_endpoint,
-                                cloud_api_key=self._ocr_cloud_api_key,
-                                proxy_url=self._proxy_url,
-                            )
-                        else:
-                            result = converter_fn(
-                                file_path,
-                                trace_id,
-                                progress_callback=safe_progress_callback,
-                                ocr_mode=self._ocr_mode,
-                                cloud_provider=self._ocr_cloud_provider,
-                                cloud_endpoint=self._ocr_cloud_endpoint,
-                                cloud_api_key=self._ocr_cloud_api_key,
-                                proxy_url=self._proxy_url,
-                            )
+                            ocr_kwargs["ocr_correction_fn"] = self._ocr_correction_fn
+                        if cancel_token is not None:
+                            ocr_kwargs["cancel_token"] = cancel_token
+                        if file_type == "pdf":
+                            # Finished pages survive a cancel and are reused on resume.
+                            ocr_kwargs["use_page_cache"] = True
+                        result = converter_fn(file_path, trace_id, **ocr_kwargs)
                     else:
                         result = converter_fn(file_path, trace_id)
+                except OperationCancelledError:
+                    metrics.increment("convert_cancelled_total")
+                    raise
                 except ConvertError as exc:
                     metrics.increment(
                         "convert_failures_total",
@@ -4,6 +4,7 @@ import gc
 import io
 import ipaddress
 import json
+import math
 import os
 import re
 import socket
@@ -24,10 +25,18 @@ from PIL import Image
 from ankismart.converter import ocr_device as _device
 from ankismart.converter import ocr_models as _models
 from ankismart.converter import ocr_pdf as _pdf
-from ankismart.core.errors import ConvertError, ErrorCode
+from ankismart.converter.cache import (
+    build_ocr_page_cache_key,
+    discard_ocr_page_cache,
+    get_cached_ocr_page,
+    prune_ocr_page_cache,
+    save_cached_ocr_page,
+)
+from ankismart.core.cancellation import CancellationToken, raise_if_cancelled
+from ankismart.core.errors import ConvertError, ErrorCode, OperationCancelledError
 from ankismart.core.logging import get_logger
 from ankismart.core.models import MarkdownResult
-from ankismart.core.tracing import get_trace_id, timed
+from ankismart.core.tracing import get_trace_id, metrics, timed
 
 if TYPE_CHECKING:
     from paddleocr import PaddleOCR
@@ -189,6 +198,14 @@ def _sleep_cloud_retry(attempt: int) -> None:
     time.sleep(min(backoff, 5.0))
 
 
+def _sleep_cloud_poll(interval: float, cancel_token: CancellationToken | None) -> None:
+    if cancel_token is None:
+        time.sleep(interval)
+        return
+    # Wake up immediately on cancel instead of finishing the poll interval.
+    cancel_token.wait(interval)
+
+
 def _raise_cloud_http_error(
     *,
     response: httpx.Response,
@@ -756,6 +773,7 @@ def _convert_via_cloud(
     cloud_endpoint: str = "",
     cloud_api_key: str = "",
     proxy_url: str = "",
+    cancel_token: CancellationToken | None = None,
 ) -> MarkdownResult:
     provider = _normalize_cloud_provider(cloud_provider)
     if provider != "mineru":
@@ -792,6 +810,7 @@ def _convert_via_cloud(
         float(_get_env_int("ANKISMART_OCR_CLOUD_TIMEOUT_SECONDS", int(_OCR_CLOUD_TIMEOUT_SECONDS))),
     )
 
+    raise_if_cancelled(cancel_token, trace_id=trace_id, stage="cloud OCR upload")
     _emit_cloud_progress(progress_callback, 0, 3, "云端 OCR: 创建上传任务...")
     transport = httpx.Client(proxy=proxy) if proxy else httpx.Client()
     data_id = uuid.uuid4().hex[:12]
@@ -823,6 +842,7 @@ def _convert_via_cloud(
                     trace_id=trace_id,
                 )
 
+            raise_if_cancelled(cancel_token, trace_id=trace_id, stage="cloud OCR upload")
             _emit_cloud_progress(progress_callback, 1, 3, "云端 OCR: 上传文件中...")
             _upload_cloud_file(
                 client,
@@ -844,6 +864,14 @@ def _convert_via_cloud(
             result_entry: dict[str, object] = {}
             last_cloud_page_progress: tuple[int, int] | None = None
             while True:
+                if cancel_token is not None and cancel_token.cancelled:
+                    polled_pages, known_pages = last_cloud_page_progress or (0, 0)
+                    cancel_token.raise_if_cancelled(
+                        trace_id=trace_id,
+                        stage="cloud OCR polling",
+                        completed=polled_pages,
+                        total=known_pages,
+                    )
                 if (time.monotonic() - start) >= timeout_seconds:
                     raise ConvertError(
                         "Cloud OCR result polling timeout",
@@ -891,7 +919,7 @@ def _convert_via_cloud(
                         code=ErrorCode.E_OCR_FAILED,
                         trace_id=trace_id,
                     )
-                time.sleep(poll_interval)
+                _sleep_cloud_poll(poll_interval, cancel_token)
 
             md_url = _find_first_string_value(
                 result_entry,
@@ -931,7 +959,7 @@ def _convert_via_cloud(
                     code=ErrorCode.E_OCR_FAILED,
                     trace_id=trace_id,
                 )
-    except ConvertError:
+    except (ConvertError, OperationCancelledError):
         raise
     except Exception as exc:
         raise ConvertError(
@@ -1474,6 +1502,35 @@ def _is_meaningful_text(content: str) -> bool:
     return _pdf._is_meaningful_text(content)
 
 
+class OcrPageText(str):
+    """Recognized page text that also keeps Paddle's per-line ``rec_scores``.
+
+    ``line_scores[i]`` belongs to ``text.split("\\n")[i]``; ``None`` means unknown.
+    """
+
+    line_scores: tuple[float | None, ...]
+
+    def __new__(cls, lines: list[tuple[str, float | None]]) -> OcrPageText:
+        instance = super().__new__(cls, "\n".join(text for text, _score in lines))
+        instance.line_scores = tuple(score for _text, score in lines)
+        return instance
+
+
+def _page_line_scores(page_text: str) -> list[float | None] | None:
+    scores = getattr(page_text, "line_scores", None)
+    if scores is None or len(scores) != len(page_text.split("\n")):
+        return None
+    return list(scores)
+
+
+def _coerce_score(raw: object) -> float | None:
+    try:
+        score = float(raw)
+    except (TypeError, ValueError):
+        return None
+    return score if math.isfinite(score) else None
+
+
 def _ocr_image(ocr: "PaddleOCR", image: Image.Image) -> str:
     img_array = np.array(image)
     try:
@@ -1506,12 +1563,16 @@ def _ocr_image(ocr: "PaddleOCR", image: Image.Image) -> str:
         return ""
 
     rec_texts = None
+    rec_scores = None
     if hasattr(page_result, "get"):
         rec_texts = page_result.get("rec_texts")
+        rec_scores = page_result.get("rec_scores")
 
     if not rec_texts and hasattr(page_result, "json"):
         try:
-            rec_texts = page_result.json.get("res", {}).get("rec_texts")
+            json_result = page_result.json.get("res", {})
+            rec_texts = json_result.get("rec_texts")
+            rec_scores = json_result.get("rec_scores")
         except (AttributeError, TypeError, KeyError) as exc:
             logger.warning(f"Failed to extract rec_texts from page_result.json: {exc}")
             rec_texts = None
@@ -1519,15 +1580,80 @@ def _ocr_image(ocr: "PaddleOCR", image: Image.Image) -> str:
     if not rec_texts:
         return ""
 
-    lines: list[str] = []
-    for text in rec_texts:
+    scores = list(rec_scores) if rec_scores is not None else []
+    lines: list[tuple[str, float | None]] = []
+    for index, text in enumerate(rec_texts):
         line = str(text).strip()
         if not line:
             continue
         if _is_page_marker_line(line):
             continue
-        lines.append(line)
-    return "\n".join(lines)
+        score = _coerce_score(scores[index]) if index < len(scores) else None
+        lines.append((line, score))
+    return OcrPageText(lines)
+
+
+def _ocr_page_cache_fingerprint() -> str:
+    """Identify the local OCR setup so cached pages are reused only for the same models."""
+    det_model = os.getenv("ANKISMART_OCR_DET_MODEL", OCR_MODEL_PRESETS["lite"]["det"])
+    rec_model = os.getenv("ANKISMART_OCR_REC_MODEL", OCR_MODEL_PRESETS["lite"]["rec"])
+    limit_type = os.getenv("ANKISMART_OCR_DET_LIMIT_TYPE", "max")
+    limit_side_len = _get_env_int("ANKISMART_OCR_DET_LIMIT_SIDE_LEN", 640, min_value=1)
+    return f"{det_model}|{rec_model}|{limit_type}|{limit_side_len}"
+
+
+def _document_line_scores(
+    pages: list[tuple[str, list[float | None] | None]],
+) -> list[float | None] | None:
+    """Align page confidences with the joined ``## Page`` markdown built by :func:`convert`."""
+    if all(scores is None for _text, scores in pages):
+        return None
+    document_scores: list[float | None] = []
+    for index, (page_text, scores) in enumerate(pages):
+        if index:
+            document_scores.extend([None, None, None])  # "", "---", ""
+        document_scores.extend([None, None])  # "## Page N", ""
+        if scores is None:
+            # Unknown confidence (e.g. an older cached page): let correction look at it.
+            scores = [0.0] * len(page_text.split("\n"))
+        document_scores.extend(scores)
+    return document_scores
+
+
+def _apply_ocr_correction(
+    text: str,
+    ocr_correction_fn,
+    *,
+    trace_id: str,
+    cancel_token: CancellationToken | None,
+    line_scores: list[float | None] | None = None,
+) -> str:
+    raise_if_cancelled(cancel_token, trace_id=trace_id, stage="OCR correction")
+    try:
+        with timed("ocr_correction"):
+            return ocr_correction_fn(text, cancel_token=cancel_token, line_scores=line_scores)
+    except (ValueError, RuntimeError, OSError) as exc:
+        logger.warning(
+            f"OCR correction failed, using raw text: {exc}",
+            extra={"trace_id": trace_id},
+        )
+        return text
+
+
+def _record_ocr_cancelled(exc: OperationCancelledError, *, trace_id: str) -> None:
+    metrics.increment("ocr_cancelled_total")
+    if exc.skipped:
+        metrics.increment("ocr_pages_skipped_total", value=exc.skipped)
+    logger.info(
+        "OCR cancelled",
+        extra={
+            "trace_id": trace_id,
+            "event": "ocr.cancelled",
+            "stage": exc.stage,
+            "completed_pages": exc.completed,
+            "skipped_pages": exc.skipped,
+        },
+    )
 
 
 def convert(
@@ -1541,6 +1667,8 @@ def convert(
     cloud_endpoint: str = "",
     cloud_api_key: str = "",
     proxy_url: str = "",
+    cancel_token: CancellationToken | None = None,
+    use_page_cache: bool = False,
 ) -> MarkdownResult:
     trace_id = trace_id or get_trace_id()
 
@@ -1561,6 +1689,7 @@ def convert(
             cloud_endpoint=cloud_endpoint,
             cloud_api_key=cloud_api_key,
             proxy_url=proxy_url,
+            cancel_token=cancel_token,
         )
 
     if progress_callback is not None:
@@ -1595,29 +1724,64 @@ def convert(
             logger.warning(f"Failed to get PDF page count: {exc}", extra={"trace_id": trace_id})
             total_pages = 0
 
+        page_cache_key = ""
+        if use_page_cache:
+            try:
+                page_cache_key = build_ocr_page_cache_key(
+                    file_path, ocr_fingerprint=_ocr_page_cache_fingerprint()
+                )
+                prune_ocr_page_cache(keep=page_cache_key)
+            except OSError as exc:
+                logger.warning(f"OCR page cache unavailable: {exc}", extra={"trace_id": trace_id})
+
         sections: list[str] = []
+        section_scores: list[tuple[str, list[float | None] | None]] = []
         page_count = 0
-        for i, image in enumerate(_pdf_to_images(file_path), 1):
-            try:
-                page_count += 1
-                if progress_callback is not None:
-                    progress_callback(i, total_pages, f"正在识别第 {i}/{total_pages} 页")
-
-                with timed(f"ocr_page_{i}"):
-                    with _borrow_ocr() as ocr:
-                        page_text = _ocr_image(ocr, image)
-
-                if page_text.strip():
-                    sections.append(f"## Page {i}\n\n{page_text}")
-                else:
-                    logger.warning(
-                        "Empty OCR result for page",
-                        extra={"page": i, "trace_id": trace_id},
+        try:
+            for i, image in enumerate(_pdf_to_images(file_path), 1):
+                try:
+                    raise_if_cancelled(
+                        cancel_token,
+                        trace_id=trace_id,
+                        stage="OCR",
+                        completed=page_count,
+                        total=total_pages,
                     )
-            finally:
-                close_fn = getattr(image, "close", None)
-                if callable(close_fn):
-                    close_fn()
+                    page_count += 1
+                    if progress_callback is not None:
+                        progress_callback(i, total_pages, f"正在识别第 {i}/{total_pages} 页")
+
+                    cached_page = get_cached_ocr_page(page_cache_key, i) if page_cache_key else None
+                    if cached_page is not None:
+                        metrics.increment("ocr_page_cache_hits_total")
+                        page_text, page_scores = cached_page
+                        if page_scores is not None and len(page_scores) != len(
+                            page_text.split("\n")
+                        ):
+                            page_scores = None
+                    else:
+                        with timed(f"ocr_page_{i}"):
+                            with _borrow_ocr() as ocr:
+                                page_text = _ocr_image(ocr, image)
+                        page_scores = _page_line_scores(page_text)
+                        if page_cache_key:
+                            save_cached_ocr_page(page_cache_key, i, page_text, page_scores)
+
+                    if page_text.strip():
+                        sections.append(f"## Page {i}\n\n{page_text}")
+                        section_scores.append((page_text, page_scores))
+                    else:
+                        logger.warning(
+                            "Empty OCR result for page",
+                            extra={"page": i, "trace_id": trace_id},
+                        )
+                finally:
+                    close_fn = getattr(image, "close", None)
+                    if callable(close_fn):
+                        close_fn()
+        except OperationCancelledError as exc:
+            _record_ocr_cancelled(exc, trace_id=trace_id)
+            raise
 
         if page_count == 0:
             raise ConvertError(
@@ -1631,15 +1795,16 @@ def convert(
 
         content = "\n\n---\n\n".join(sections) if sections else ""
         if content.strip() and ocr_correction_fn is not None:
-            try:
-                with timed("ocr_correction"):
-                    content = ocr_correction_fn(content)
-            except (ValueError, RuntimeError, OSError) as exc:
-                logger.warning(
-                    f"OCR correction failed, using raw text: {exc}",
-                    extra={"trace_id": trace_id},
-                )
+            content = _apply_ocr_correction(
+                content,
+                ocr_correction_fn,
+                trace_id=trace_id,
+                cancel_token=cancel_token,
+                line_scores=_document_line_scores(section_scores),
+            )
         content = _remove_page_marker_lines(content)
+        # The finished result lands in the conversion cache; the pages are not needed.
+        discard_ocr_page_cache(page_cache_key)
 
         if not content.strip():
             logger.warning(
@@ -1666,6 +1831,7 @@ def convert_image(
     cloud_endpoint: str = "",
     cloud_api_key: str = "",
     proxy_url: str = "",
+    cancel_token: CancellationToken | None = None,
 ) -> MarkdownResult:
     trace_id = trace_id or get_trace_id()
 
@@ -1686,8 +1852,10 @@ def convert_image(
             cloud_endpoint=cloud_endpoint,
             cloud_api_key=cloud_api_key,
             proxy_url=proxy_url,
+            cancel_token=cancel_token,
         )
 
+    raise_if_cancelled(cancel_token, trace_id=trace_id, stage="OCR")
     with timed("ocr_image_convert"):
         with Image.open(file_path) as image:
             with _borrow_ocr() as ocr:
@@ -1698,14 +1866,13 @@ def convert_image(
                     progress_callback("OCR 图片识别完成")
 
         if text.strip() and ocr_correction_fn is not None:
-            try:
-                with timed("ocr_correction"):
-                    text = ocr_correction_fn(text)
-            except (ValueError, RuntimeError, OSError) as exc:
-                logger.warning(
-                    f"OCR correction failed, using raw text: {exc}",
-                    extra={"trace_id": trace_id},
-                )
+            text = _apply_ocr_correction(
+                text,
+                ocr_correction_fn,
+                trace_id=trace_id,
+                cancel_token=cancel_token,
+                line_scores=_page_line_scores(text),
+            )
         text = _remove_page_marker_lines(text)
 
     return MarkdownResult(
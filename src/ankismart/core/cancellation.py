@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import threading
+
+from ankismart.core.errors import OperationCancelledError
+
+
+class CancellationToken:
+    """Thread-safe cooperative cancellation flag shared across pipeline stages.
+
+    Workers own the token and call :meth:`cancel`; converters, OCR page loops,
+    cloud pollers and LLM steps poll it between units of work.
+    """
+
+    def __init__(self, event: threading.Event | None = None) -> None:
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to ``timeout`` seconds; return ``True`` as soon as cancelled."""
+        return self._event.wait(max(0.0, float(timeout)))
+
+    def raise_if_cancelled(
+        self,
+        *,
+        trace_id: str | None = None,
+        stage: str = "",
+        completed: int = 0,
+        total: int = 0,
+    ) -> None:
+        if not self._event.is_set():
+            return
+        message = f"Operation cancelled during {stage}" if stage else "Operation cancelled"
+        if total > 0:
+            message = f"{message} ({completed}/{total} completed)"
+        raise OperationCancelledError(
+            message,
+            trace_id=trace_id,
+            stage=stage,
+            completed=completed,
+            total=total,
+        )
+
+
+def raise_if_cancelled(
+    token: CancellationToken | None,
+    *,
+    trace_id: str | None = None,
+    stage: str = "",
+    completed: int = 0,
+    total: int = 0,
+) -> None:
+    """``None``-tolerant shortcut for optional ``cancel_token`` parameters."""
+    if token is None:
+        return
+    token.raise_if_cancelled(trace_id=trace_id, stage=stage, completed=completed, total=total)
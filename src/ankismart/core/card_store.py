@@ -0,0 +1,398 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Mapping, MutableSequence, Sequence
+from typing import Any, overload
+
+from pydantic.alias_generators import to_camel
+
+from ankismart.core.models import CardDraft, CardMetadata, CardOptions, MediaAttachments
+
+# CardMetadata fields kept in a record's ``meta`` tuple, in this order. ``strategy_id`` and
+# ``quality_flags`` have their own slots because filters read them.
+_META_FIELDS = (
+    "source_format",
+    "source_path",
+    "generated_at",
+    "source_document",
+    "source_documents",
+    "source_chunk_id",
+    "source_start",
+    "source_end",
+)
+_DEFAULT_META: tuple[Any, ...] = ("", "", "", "", (), "", -1, -1)
+_DEFAULT_OPTIONS = CardOptions()
+_DEFAULT_OPTIONS_DUMP = _DEFAULT_OPTIONS.model_dump()
+
+
+def _interned(value: object) -> str:
+    return sys.intern(str(value or ""))
+
+
+def _meta_value(name: str, value: Any) -> Any:
+    if name == "source_documents":
+        return tuple(_interned(item) for item in value or ())
+    if name in ("source_start", "source_end"):
+        return int(value if value is not None else -1)
+    return _interned(value)
+
+
+def _lookup(mapping: Mapping[str, Any], name: str, default: Any = None) -> Any:
+    """Value stored under a snake_case field name or its camelCase alias."""
+    if name in mapping:
+        return mapping[name]
+    return mapping.get(to_camel(name), default)
+
+
+class _CardRecord:
+    """One card as interned strings, a field dict and tuples.
+
+    Media and options are ``None`` when they hold the defaults, which is nearly always.
+    ``draft`` is the materialized :class:`CardDraft` once something asked for it; from
+    then on the draft is authoritative, so in-place edits are never lost.
+    """
+
+    __slots__ = (
+        "schema_version",
+        "trace_id",
+        "deck_name",
+        "note_type",
+        "fields",
+        "tags",
+        "media",
+        "options",
+        "strategy_id",
+        "quality_flags",
+        "meta",
+        "draft",
+    )
+
+    def __init__(
+        self,
+        *,
+        schema_version: str,
+        trace_id: str,
+        deck_name: str,
+        note_type: str,
+        fields: dict[str, str],
+        tags: tuple[str, ...],
+        media: MediaAttachments | None,
+        options: CardOptions | None,
+        strategy_id: str,
+        quality_flags: tuple[str, ...],
+        meta: tuple[Any, ...],
+    ) -> None:
+        self.schema_version = schema_version
+        self.trace_id = trace_id
+        self.deck_name = deck_name
+        self.note_type = note_type
+        self.fields = fields
+        self.tags = tags
+        self.media = media
+        self.options = options
+        self.strategy_id = strategy_id
+        self.quality_flags = quality_flags
+        self.meta = meta
+        self.draft: CardDraft | None = None
+
+    @classmethod
+    def from_draft(cls, draft: CardDraft) -> _CardRecord:
+        metadata = draft.metadata
+        media = draft.media
+        has_media = bool(media.audio or media.video or media.picture)
+        meta = tuple(_meta_value(name, getattr(metadata, name)) for name in _META_FIELDS)
+        return cls(
+            schema_version=_interned(draft.schema_version),
+            trace_id=_interned(draft.trace_id),
+            deck_name=_interned(draft.deck_name),
+            note_type=_interned(draft.note_type),
+            fields={_interned(key): str(value) for key, value in draft.fields.items()},
+            tags=tuple(_interned(tag) for tag in draft.tags),
+            media=media.model_copy(deep=True) if has_media else None,
+            options=(
+                None if draft.options == _DEFAULT_OPTIONS else draft.options.model_copy(deep=True)
+            ),
+            strategy_id=_interned(metadata.strategy_id),
+            quality_flags=tuple(_interned(flag) for flag in metadata.quality_flags),
+            meta=_DEFAULT_META if meta == _DEFAULT_META else meta,
+        )
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> _CardRecord:
+        """Record from a serialized card (``model_dump``/JSON, either key style)."""
+        metadata = _lookup(data, "metadata") or {}
+        media = _lookup(data, "media") or {}
+        options = _lookup(data, "options")
+        meta = tuple(_meta_value(name, _lookup(metadata, name)) for name in _META_FIELDS)
+        return cls(
+            schema_version=_interned(_lookup(data, "schema_version", "1.0")),
+            trace_id=_interned(_lookup(data, "trace_id", "")),
+            deck_name=_interned(_lookup(data, "deck_name", "Default")),
+            note_type=_interned(_lookup(data, "note_type", "Basic")),
+            fields={
+                _interned(key): str(value) for key, value in (_lookup(data, "fields") or {}).items()
+            },
+            tags=tuple(_interned(tag) for tag in _lookup(data, "tags") or ()),
+            media=(
+                MediaAttachments.model_validate(media)
+                if any(media.get(kind) for kind in ("audio", "video", "picture"))
+                else None
+            ),
+            options=(
+                None
+                if not options or options == _DEFAULT_OPTIONS_DUMP
+                else CardOptions.model_validate(options)
+            ),
+            strategy_id=_interned(_lookup(metadata, "strategy_id", "")),
+            quality_flags=tuple(
+                _interned(flag) for flag in _lookup(metadata, "quality_flags") or ()
+            ),
+            meta=_DEFAULT_META if meta == _DEFAULT_META else meta,
+        )
+
+    def materialize(self) -> CardDraft:
+        meta = dict(zip(_META_FIELDS, self.meta, strict=True))
+        meta["source_documents"] = list(meta["source_documents"])
+        return CardDraft(
+            schema_version=self.schema_version,
+            trace_id=self.trace_id,
+            deck_name=self.deck_name,
+            note_type=self.note_type,
+            fields=dict(self.fields),
+            tags=list(self.tags),
+            media=self.media.model_copy(deep=True) if self.media else MediaAttachments(),
+            options=self.options.model_copy(deep=True) if self.options else CardOptions(),
+            metadata=CardMetadata(
+                strategy_id=self.strategy_id,
+                quality_flags=list(self.quality_flags),
+                **meta,
+            ),
+        )
+
+
+class CardRow:
+    """Read-only view of one stored card that never materializes a :class:`CardDraft`."""
+
+    __slots__ = ("_record",)
+
+    def __init__(self, record: _CardRecord) -> None:
+        self._record = record
+
+    @property
+    def key(self) -> int:
+        """Identity of the stored card; stable until the card is replaced or released."""
+        return id(self._record)
+
+    @property
+    def deck_name(self) -> str:
+        draft = self._record.draft
+        return draft.deck_name if draft is not None else self._record.deck_name
+
+    @property
+    def note_type(self) -> str:
+        draft = self._record.draft
+        return draft.note_type if draft is not None else self._record.note_type
+
+    @property
+    def fields(self) -> Mapping[str, str]:
+        draft = self._record.draft
+        return draft.fields if draft is not None else self._record.fields
+
+    @property
+    def tags(self) -> Sequence[str]:
+        draft = self._record.draft
+        return draft.tags if draft is not None else self._record.tags
+
+    @property
+    def strategy_id(self) -> str:
+        draft = self._record.draft
+        return draft.metadata.strategy_id if draft is not None else self._record.strategy_id
+
+    @property
+    def quality_flags(self) -> Sequence[str]:
+        draft = self._record.draft
+        return draft.metadata.quality_flags if draft is not None else self._record.quality_flags
+
+    @property
+    def source_document(self) -> str:
+        draft = self._record.draft
+        if draft is not None:
+            return draft.metadata.source_document
+        return self._record.meta[_META_FIELDS.index("source_document")]
+
+
+class CardStore(MutableSequence[CardDraft]):
+    """Compact list of cards for large sessions.
+
+    Cards are kept as slotted records of interned strings, so deck names, note types,
+    tags and field names are shared instead of repeated in every nested pydantic model.
+    Indexing materializes a :class:`CardDraft` on first access and hands out the same
+    object afterwards, so code that edits cards in place or keys caches by ``id(card)``
+    keeps working. :meth:`row`, :meth:`filter` and :meth:`view` read the records
+    directly, without materializing anything.
+
+    Inserted cards are encoded and not kept; a card assigned with ``store[i] = card``
+    stays live, like an edited card.
+    """
+
+    def __init__(self, cards: Iterable[CardDraft] = ()) -> None:
+        self._records: list[_CardRecord] = [_CardRecord.from_draft(card) for card in cards]
+        # ``id(draft)`` -> record for every draft this store handed out or was assigned.
+        self._by_draft: dict[int, _CardRecord] = {}
+
+    def _track(self, record: _CardRecord) -> None:
+        if record.draft is not None:
+            self._by_draft[id(record.draft)] = record
+
+    def _untrack(self, record: _CardRecord) -> None:
+        if record.draft is not None and self._by_draft.get(id(record.draft)) is record:
+            del self._by_draft[id(record.draft)]
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping[str, Any]]) -> CardStore:
+        """Store built from serialized cards without validating each one as a model."""
+        store = cls()
+        store._records = [_CardRecord.from_mapping(record) for record in records]
+        return store
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @overload
+    def __getitem__(self, index: int) -> CardDraft: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> CardView: ...
+
+    def __getitem__(self, index: int | slice) -> CardDraft | CardView:
+        if isinstance(index, slice):
+            return CardView(self, range(len(self._records))[index])
+        record = self._records[index]
+        if record.draft is None:
+            record.draft = record.materialize()
+        # Records shared by ``extend`` may have been materialized through the other store.
+        self._track(record)
+        return record.draft
+
+    def __setitem__(self, index: int, card: CardDraft) -> None:  # type: ignore[override]
+        record = _CardRecord.from_draft(card)
+        record.draft = card
+        self._untrack(self._records[index])
+        self._records[index] = record
+        self._track(record)
+
+    def __delitem__(self, index: int | slice) -> None:  # type: ignore[override]
+        removed = self._records[index] if isinstance(index, slice) else [self._records[index]]
+        for record in removed:
+            self._untrack(record)
+        del self._records[index]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str | bytes):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            card == other_card
+            for card, other_card in zip(self.transient_drafts(), other, strict=True)
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def insert(self, index: int, card: CardDraft) -> None:
+        self._records.insert(index, _CardRecord.from_draft(card))
+
+    def extend(self, cards: Iterable[CardDraft]) -> None:
+        if isinstance(cards, CardStore):
+            self._records.extend(cards._records)
+            for record in cards._records:
+                self._track(record)
+            return
+        self._records.extend(_CardRecord.from_draft(card) for card in cards)
+
+    def row(self, index: int) -> CardRow:
+        return CardRow(self._records[index])
+
+    def rows(self) -> Iterator[CardRow]:
+        return (CardRow(record) for record in self._records)
+
+    def row_of(self, card: CardDraft) -> CardRow | None:
+        """Row of a draft handed out by this store, or ``None`` for any other card."""
+        record = self._by_draft.get(id(card))
+        if record is None or record.draft is not card:
+            return None
+        return CardRow(record)
+
+    def view(self) -> CardView:
+        return CardView(self, range(len(self._records)))
+
+    def filter(self, predicate: Callable[[CardRow], bool]) -> CardView:
+        return self.view().filter(predicate)
+
+    def transient_drafts(self) -> Iterator[CardDraft]:
+        """Every card as a draft, without keeping the ones that were not materialized.
+
+        Meant for one-pass readers such as exporters and history saves.
+        """
+        for record in self._records:
+            yield record.draft if record.draft is not None else record.materialize()
+
+    def materialized_count(self) -> int:
+        return sum(1 for record in self._records if record.draft is not None)
+
+    def release_drafts(self) -> None:
+        """Fold materialized drafts back into records and drop them.
+
+        Drafts handed out earlier stay valid but are no longer tracked by the store.
+        """
+        for position, record in enumerate(self._records):
+            if record.draft is not None:
+                self._records[position] = _CardRecord.from_draft(record.draft)
+        self._by_draft.clear()
+
+
+class CardView(Sequence[CardDraft]):
+    """Ordered subset of a :class:`CardStore`, held as positions rather than card copies."""
+
+    __slots__ = ("_positions", "_store")
+
+    def __init__(self, store: CardStore, positions: Sequence[int]) -> None:
+        self._store = store
+        self._positions = positions
+
+    @property
+    def store(self) -> CardStore:
+        return self._store
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @overload
+    def __getitem__(self, index: int) -> CardDraft: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> CardView: ...
+
+    def __getitem__(self, index: int | slice) -> CardDraft | CardView:
+        if isinstance(index, slice):
+            return CardView(self._store, self._positions[index])
+        return self._store[self._positions[index]]
+
+    def store_index(self, index: int) -> int:
+        """Position in the store of the ``index``-th card of this view."""
+        return self._positions[index]
+
+    def rows(self) -> Iterator[CardRow]:
+        return (self._store.row(position) for position in self._positions)
+
+    def filter(self, predicate: Callable[[CardRow], bool]) -> CardView:
+        kept = array("q", (pos for pos in self._positions if predicate(self._store.row(pos))))
+        return CardView(self._store, kept)
+
+    def page(self, number: int, size: int) -> CardView:
+        """Zero-based page ``number`` of at most ``size`` cards."""
+        size = max(1, int(size))
+        start = max(0, int(number)) * size
+        return self[start : start + size]
+
+    def drafts(self) -> list[CardDraft]:
+        return list(self)
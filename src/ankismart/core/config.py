@@ -213,6 +213,12 @@ class LLMProviderConfig(BaseModel):
     base_url: str = ""
     model: str = ""
     rpm_limit: int = 0
+    tpm_limit: int = 0
+    # Token limits of the model; 0 looks them up from the model name.
+    context_window: int = 0
+    max_output_tokens: int = 0
+    # Share of requests under multi-provider routing; 0 keeps the provider out of the pool.
+    routing_weight: int = 1
 
 
 def _default_llm_providers() -> list[LLMProviderConfig]:
@@ -256,6 +262,11 @@ class AppConfig(BaseModel):
     llm_concurrency: int = 2  # Max concurrent LLM requests (0 = auto by document count)
     llm_adaptive_concurrency: bool = True
     llm_concurrency_max: int = 6
+    llm_max_in_flight: int = 16  # Requests multiplexed on the async scheduler (0 = disabled)
+    llm_streaming: bool = True  # Stream responses and surface cards as they arrive
+    llm_multi_provider: bool = False  # Route requests over all weighted providers
+    llm_hedged_requests: bool = False  # Re-issue requests past p95 latency to another provider
+    llm_structured_output: bool = True  # Send JSON schemas to providers that accept them
 
     # Persistence: last-used values
     last_deck: str = ""
@@ -294,6 +305,22 @@ class AppConfig(BaseModel):
     ocr_quality_min_chars: int = 80
     card_quality_min_chars: int = 2
     card_quality_retry_rounds: int = 2
+    cross_document_dedup: bool = True  # Generate sections shared by several files once
+    combined_strategy_generation: bool = True  # One request for all strategies per chunk
+    deck_aware_generation: bool = False  # Drop cards whose question is already in Anki
+
+    # LLM response cache
+    llm_response_cache: bool = True
+    llm_response_cache_ttl_hours: int = 168
+    llm_response_cache_max_entries: int = 5000
+    llm_cache_sampled_responses: bool = True  # False: bypass cache when temperature > 0
+
+    # LLM usage estimation & per-batch budgets (0 = unlimited)
+    llm_cost_per_1k_prompt_tokens: float = 0.0
+    llm_cost_per_1k_completion_tokens: float = 0.0
+    llm_batch_token_budget: int = 0  # Projected tokens above which a batch is not dispatched
+    llm_batch_cost_budget: float = 0.0  # Projected cost above which a batch is not dispatched
+    llm_usage_calibration: list[dict[str, object]] = Field(default_factory=list)
 
     # Cloud OCR usage & cost estimation
     ocr_cloud_priority_daily_quota: int = 2000
@@ -526,6 +553,11 @@ def load_config() -> AppConfig:
             config.llm_concurrency = 0
         if config.llm_concurrency > config.llm_concurrency_max:
             config.llm_concurrency = config.llm_concurrency_max
+        config.llm_max_in_flight = min(64, max(0, int(config.llm_max_in_flight)))
+        if config.llm_response_cache_ttl_hours < 1:
+            config.llm_response_cache_ttl_hours = 168
+        if config.llm_response_cache_max_entries < 1:
+            config.llm_response_cache_max_entries = 5000
         if config.card_quality_min_chars < 1:
             config.card_quality_min_chars = 1
         if config.ocr_quality_min_chars < 10:
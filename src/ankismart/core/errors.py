@@ -19,6 +19,7 @@ class ErrorCode(StrEnum):
     E_CONFIG_INVALID = "E_CONFIG_INVALID"
     E_FILE_NOT_FOUND = "E_FILE_NOT_FOUND"
     E_FILE_TYPE_UNSUPPORTED = "E_FILE_TYPE_UNSUPPORTED"
+    E_CANCELLED = "E_CANCELLED"
     E_UNKNOWN = "E_UNKNOWN"
 
 
@@ -75,6 +76,32 @@ class AnkiGatewayError(AnkiSmartError):
         super().__init__(code=code, message=message, trace_id=trace_id)
 
 
+class OperationCancelledError(AnkiSmartError):
+    """Raised when a cancellation token interrupts a long-running operation.
+
+    ``completed``/``total`` describe the work units (pages, chunks, ...) reached
+    before the stop, so callers can report how much work was skipped.
+    """
+
+    def __init__(
+        self,
+        message: str = "Operation cancelled",
+        *,
+        trace_id: str | None = None,
+        stage: str = "",
+        completed: int = 0,
+        total: int = 0,
+    ) -> None:
+        super().__init__(code=ErrorCode.E_CANCELLED, message=message, trace_id=trace_id)
+        self.stage = stage
+        self.completed = max(0, int(completed))
+        self.total = max(self.completed, int(total))
+
+    @property
+    def skipped(self) -> int:
+        return max(0, self.total - self.completed)
+
+
 class ConfigError(AnkiSmartError):
     def __init__(
         self,
@@ -197,6 +224,11 @@ ERROR_MESSAGES = {
                 "• 支持的格式：PDF、DOCX、PPTX、PNG、JPG、JPEG\n• 转换为支持的格式\n• 使用其他文件"
             ),
         },
+        ErrorCode.E_CANCELLED: {
+            "title": "操作已取消",
+            "message": "任务已按请求停止，已完成的部分已保留",
+            "solution": "• 重新开始任务会复用已缓存的结果\n• 如非主动取消，请查看日志",
+        },
         ErrorCode.E_UNKNOWN: {
             "title": "未知错误",
             "message": "发生了未知错误",
@@ -346,6 +378,14 @@ ERROR_MESSAGES = {
                 "• Use another file"
             ),
         },
+        ErrorCode.E_CANCELLED: {
+            "title": "Operation Cancelled",
+            "message": "The task was stopped on request; completed work has been kept",
+            "solution": (
+                "• Restarting the task reuses cached results\n"
+                "• If you did not cancel it, check the logs"
+            ),
+        },
         ErrorCode.E_UNKNOWN: {
             "title": "Unknown Error",
             "message": "An unknown error occurred",
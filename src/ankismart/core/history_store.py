@@ -4,12 +4,14 @@ import json
 import os
 import sqlite3
 import uuid
+from collections.abc import Sequence
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 from ankismart.core import config as config_module
+from ankismart.core.card_store import CardStore
 from ankismart.core.models import CardDraft
 
 _SCHEMA_VERSION = 1
@@ -115,7 +117,7 @@ class SQLiteHistoryStore:
 
     def save_generation_batch(
         self,
-        cards: list[CardDraft],
+        cards: Sequence[CardDraft],
         *,
         batch_id: str | None = None,
         title: str = "",
@@ -179,7 +181,9 @@ class SQLiteHistoryStore:
                 """,
                 [
                     self._card_row_values(resolved_batch_id, index, card)
-                    for index, card in enumerate(cards)
+                    for index, card in enumerate(
+                        cards.transient_drafts() if isinstance(cards, CardStore) else cards
+                    )
                 ],
             )
 
@@ -243,6 +247,30 @@ class SQLiteHistoryStore:
         batch = self.get_generation_batch(batch_id)
         return list(batch.cards) if batch is not None else []
 
+    def load_generation_store(self, batch_ids: Sequence[str]) -> CardStore:
+        """Cards of several batches, in order, as a compact :class:`CardStore`.
+
+        Stored JSON is decoded straight into the store, so loading a large history does
+        not build a validated ``CardDraft`` per card.
+        """
+        if not self.path.exists() or not batch_ids:
+            return CardStore()
+        self.initialize()
+        records: list[dict[str, Any]] = []
+        with self._connect() as conn:
+            for batch_id in batch_ids:
+                rows = conn.execute(
+                    """
+                    SELECT card_json
+                    FROM generated_cards
+                    WHERE batch_id = ?
+                    ORDER BY card_index ASC
+                    """,
+                    (batch_id,),
+                ).fetchall()
+                records.extend(json.loads(row["card_json"]) for row in rows)
+        return CardStore.from_records(records)
+
     def delete_generation_batch(self, batch_id: str) -> bool:
         if not self.path.exists():
             return False
@@ -392,21 +420,25 @@ class SQLiteHistoryStore:
         )
 
     @staticmethod
-    def _enrich_metadata(cards: list[CardDraft], metadata: dict[str, Any] | None) -> dict[str, Any]:
+    def _enrich_metadata(
+        cards: Sequence[CardDraft], metadata: dict[str, Any] | None
+    ) -> dict[str, Any]:
         enriched = dict(metadata or {})
-        source_documents = sorted(
-            {
-                str(getattr(card.metadata, "source_document", "") or "").strip()
+        if isinstance(cards, CardStore):
+            origins = [(row.source_document, row.strategy_id) for row in cards.rows()]
+        else:
+            origins = [
+                (
+                    getattr(card.metadata, "source_document", ""),
+                    getattr(card.metadata, "strategy_id", ""),
+                )
                 for card in cards
-                if str(getattr(card.metadata, "source_document", "") or "").strip()
-            }
+            ]
+        source_documents = sorted(
+            {str(document or "").strip() for document, _ in origins if str(document or "").strip()}
         )
         strategy_ids = sorted(
-            {
-                str(getattr(card.metadata, "strategy_id", "") or "").strip()
-                for card in cards
-                if str(getattr(card.metadata, "strategy_id", "") or "").strip()
-            }
+            {str(strategy or "").strip() for _, strategy in origins if str(strategy or "").strip()}
         )
         if source_documents and not enriched.get("source_documents"):
             enriched["source_documents"] = source_documents
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 from pydantic.alias_generators import to_camel
 
 # ---------------------------------------------------------------------------
@@ -52,7 +52,14 @@ class CardMetadata(BaseModel):
     generated_at: str = ""
     strategy_id: str = ""
     source_document: str = ""
+    # Every document the card's content appears in, when shared across a batch.
+    source_documents: list[str] = Field(default_factory=list)
     quality_flags: list[str] = Field(default_factory=list)
+    # Generation chunk the card came from and its character span in the source document
+    # content; -1 when unknown.
+    source_chunk_id: str = ""
+    source_start: int = -1
+    source_end: int = -1
 
 
 class CardDraft(BaseModel):
@@ -67,6 +74,9 @@ class CardDraft(BaseModel):
     media: MediaAttachments = Field(default_factory=MediaAttachments)
     options: CardOptions = Field(default_factory=CardOptions)
     metadata: CardMetadata = Field(default_factory=CardMetadata)
+    # Content fingerprint and quality flags recorded when the draft was last normalized;
+    # it goes stale as soon as fields, tags or flags change. Not serialized.
+    _normalized_state: tuple[str, tuple[str, ...]] | None = PrivateAttr(default=None)
 
 
 # ---------------------------------------------------------------------------
@@ -119,6 +129,19 @@ class GenerateRequest(BaseModel):
     auto_target_count: bool = False  # Let AI adapt count while keeping target_count as soft hint
     enable_auto_split: bool = True  # Enable auto-split for long documents
     split_threshold: int = 70000  # Character count threshold for splitting
+    strip_boilerplate: bool = True  # Drop running headers/footers repeated across pages
+    use_response_cache: bool = True  # False asks the LLM again (regeneration, retries)
+    # Questions accepted in earlier rounds, keyed by ``source_chunk_id`` ("" = any chunk).
+    # Retry rounds send only the shortfall to under-covered chunks and list these to avoid.
+    accepted_questions: dict[str, list[str]] = Field(default_factory=dict)
+
+
+class SourceSection(BaseModel):
+    """Character span of a document that produced one or more cards."""
+
+    source_document: str
+    start: int
+    end: int
 
 
 class RegenerateRequest(BaseModel):
@@ -126,6 +149,8 @@ class RegenerateRequest(BaseModel):
     card_indices: list[int] = Field(default_factory=list)
     source_documents: list[str] = Field(default_factory=list)
     strategy_ids: list[str] = Field(default_factory=list)
+    # When set, only these spans are sent back to the LLM instead of whole documents.
+    sections: list[SourceSection] = Field(default_factory=list)
 
 
 # ---------------------------------------------------------------------------
@@ -5,7 +5,7 @@ from __future__ import annotations
 import csv
 import re
 import time
-from difflib import SequenceMatcher
+from collections.abc import Callable, Iterable, Sequence
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -36,9 +36,12 @@ from qfluentwidgets import (
     isDarkTheme,
 )
 
+from ankismart.card_gen.card_kind import detect_card_kind_from_parts
+from ankismart.card_gen.near_duplicates import NearDuplicateIndex
+from ankismart.core.card_store import CardRow, CardStore, CardView
 from ankismart.core.config import append_task_history, record_operation_metric, save_config
 from ankismart.core.logging import get_logger
-from ankismart.core.models import CardDraft, RegenerateRequest
+from ankismart.core.models import CardDraft, RegenerateRequest, SourceSection
 from ankismart.ui.card_preview_renderer import CARD_KIND_LABELS, CardRenderer, format_quality_flags
 from ankismart.ui.error_handler import build_error_display
 from ankismart.ui.styles import (
@@ -77,13 +80,18 @@ class CardPreviewPage(QWidget):
         super().__init__()
         self.setObjectName("cardPreviewPage")  # Required by QFluentWidgets
         self._main = main_window
-        self._all_cards: list[CardDraft] = []
-        self._filtered_cards: list[CardDraft] = []
+        self._all_cards: Sequence[CardDraft] = []
+        self._filtered_cards: Sequence[CardDraft] = []
         self._current_index = -1
         self._quality_low_only = False
         self._duplicate_risk_only = False
         self._duplicate_risk_card_ids: set[int] = set()
         self._duplicate_risk_pending = False
+        # Live near-duplicate index keyed by ``_card_key``; the cards (or store rows) are kept
+        # so keys stay unique.
+        self._duplicate_index: NearDuplicateIndex | None = None
+        self._duplicate_index_cards: dict[int, CardDraft | CardRow] = {}
+        self._duplicate_index_texts: dict[int, str] = {}
         self._quality_score_cache: dict[int, int] = {}
         self._card_list_text_cache: dict[int, str] = {}
         self._push_worker = None
@@ -309,18 +317,44 @@ class CardPreviewPage(QWidget):
 
         return layout
 
-    def load_cards(self, cards: list[CardDraft]):
-        """Load cards for preview."""
+    def load_cards(self, cards: Sequence[CardDraft]):
+        """Load cards for preview.
+
+        When the duplicate index is live (e.g. after regenerating a few cards), only the
+        added, removed or changed cards and their neighbours are re-checked.
+        """
         self._all_cards = cards
         self._current_index = -1
+        if self._sync_duplicate_index(cards):
+            self._apply_filters()
+            return
         self._quality_score_cache.clear()
         self._card_list_text_cache.clear()
         self._duplicate_risk_card_ids.clear()
+        self._duplicate_index = None
+        self._duplicate_index_cards.clear()
+        self._duplicate_index_texts.clear()
         self._duplicate_risk_pending = len(cards) > self._DUPLICATE_SCAN_EAGER_LIMIT
         if not self._duplicate_risk_pending:
             self._rebuild_duplicate_risk_cache()
         self._apply_filters()
 
+    def update_cards(self, cards: list[CardDraft]) -> None:
+        """Refresh cards edited in place without rescanning the whole deck."""
+        if not cards:
+            return
+        items = [self._card_item(card) for card in cards]
+        for item in items:
+            self._quality_score_cache.pop(self._card_key(item), None)
+            self._card_list_text_cache.pop(self._card_key(item), None)
+        if self._duplicate_index_is_live():
+            # Cards that are not part of the loaded deck are left out of its index.
+            items = [item for item in items if self._card_key(item) in self._duplicate_index_cards]
+            self._update_duplicate_risk(items, [])
+        else:
+            self._duplicate_risk_pending = True
+        self._apply_filters()
+
     def _set_total_count_text(self, count: int) -> None:
         """Update total count text based on current language."""
         is_zh = self._main.config.language == "zh"
@@ -342,7 +376,7 @@ class CardPreviewPage(QWidget):
         kind_text = kind_zh if is_zh else kind_en
         deck_name = card.deck_name or "-"
         tags_text = self._format_tags_summary(card.tags)
-        quality_score = self._compute_card_quality_score(card)
+        quality_score = self._compute_card_quality_score(self._card_item(card))
         quality_flags = list(getattr(card.metadata, "quality_flags", []) or [])
         quality_suffix = ""
         if quality_flags:
@@ -376,35 +410,98 @@ class CardPreviewPage(QWidget):
 
     def _apply_filters(self):
         """Apply current filter settings to card list."""
-        filtered = self._all_cards
-
-        # Filter by note type
         note_type_filter = self._note_type_combo.currentData()
-        if note_type_filter and note_type_filter != "all":
-            filtered = [c for c in filtered if CardRenderer.detect_card_kind(c) == note_type_filter]
-
-        # Filter by search text
+        if note_type_filter == "all":
+            note_type_filter = None
         search_text = self._search_input.text().strip().lower()
-        if search_text:
-            filtered = [
-                c for c in filtered if any(search_text in v.lower() for v in c.fields.values())
-            ]
 
+        if isinstance(self._all_cards, CardStore):
+            # Column filters read the stored records, so unmatched cards are never
+            # materialized and the result is a view rather than a copied list.
+            filtered = self._all_cards.view()
+            if note_type_filter:
+                filtered = filtered.filter(lambda row: self._row_card_kind(row) == note_type_filter)
+            if search_text:
+                filtered = filtered.filter(
+                    lambda row: any(search_text in v.lower() for v in row.fields.values())
+                )
+        else:
+            filtered = self._all_cards
+
+            # Filter by note type
+            if note_type_filter:
+                filtered = [
+                    c for c in filtered if CardRenderer.detect_card_kind(c) == note_type_filter
+                ]
+
+            # Filter by search text
+            if search_text:
+                filtered = [
+                    c for c in filtered if any(search_text in v.lower() for v in c.fields.values())
+                ]
+
+        # Quality and duplicate filters score store rows too, so a CardStore stays a view.
         if self._quality_low_only:
-            filtered = [
-                c
-                for c in filtered
-                if (getattr(c.metadata, "quality_flags", None) or [])
-                or self._compute_card_quality_score(c) < 60
-            ]
+            filtered = self._filter_cards(filtered, self._is_low_quality_card)
 
         if self._duplicate_risk_only:
             self._ensure_duplicate_risk_cache()
-            filtered = [c for c in filtered if self._is_duplicate_risk_card(c)]
+            filtered = self._filter_cards(filtered, self._is_duplicate_risk_card)
 
         self._filtered_cards = filtered
         self._refresh_card_list()
 
+    @staticmethod
+    def _row_card_kind(row: CardRow) -> str:
+        """``CardRenderer.detect_card_kind`` for a stored card row."""
+        if row.note_type == "Basic (and reversed card)":
+            return "basic_reversed"
+        return detect_card_kind_from_parts(
+            note_type=row.note_type,
+            strategy_id=row.strategy_id,
+            tags=row.tags,
+            fields=row.fields,
+        )
+
+    @staticmethod
+    def _card_items(cards: Sequence[CardDraft]) -> Iterable[CardDraft | CardRow]:
+        """``cards`` as stored rows when they come from a CardStore, so scans build no drafts."""
+        if isinstance(cards, CardStore | CardView):
+            return cards.rows()
+        return cards
+
+    def _card_item(self, card: CardDraft) -> CardDraft | CardRow:
+        """The store row behind a draft handed out by the loaded CardStore, else the draft."""
+        if isinstance(self._all_cards, CardStore):
+            row = self._all_cards.row_of(card)
+            if row is not None:
+                return row
+        return card
+
+    @staticmethod
+    def _card_key(card: CardDraft | CardRow) -> int:
+        """Cache and duplicate-index key: the row key for store rows, ``id(card)`` otherwise."""
+        return card.key if isinstance(card, CardRow) else id(card)
+
+    def _card_kind(self, card: CardDraft | CardRow) -> str:
+        if isinstance(card, CardRow):
+            return self._row_card_kind(card)
+        return CardRenderer.detect_card_kind(card)
+
+    @staticmethod
+    def _card_quality_flags(card: CardDraft | CardRow) -> Sequence[str]:
+        if isinstance(card, CardRow):
+            return card.quality_flags
+        return getattr(card.metadata, "quality_flags", None) or []
+
+    @staticmethod
+    def _filter_cards(
+        cards: Sequence[CardDraft], predicate: Callable[[CardDraft | CardRow], bool]
+    ) -> Sequence[CardDraft]:
+        if isinstance(cards, CardView):
+            return cards.filter(predicate)
+        return [card for card in cards if predicate(card)]
+
     def _refresh_card_list(self):
         """Refresh the card list widget."""
         # Performance optimization: batch add items to avoid O(n) redraws
@@ -415,7 +512,7 @@ class CardPreviewPage(QWidget):
         try:
             # Batch create items before adding to widget
             items = []
-            for card in self._filtered_cards:
+            for card in self._card_items(self._filtered_cards):
                 question = self._build_card_list_item_text(card)
                 item = QListWidgetItem(question)
                 items.append(item)
@@ -459,7 +556,7 @@ class CardPreviewPage(QWidget):
         plain = re.sub(r"<[^>]+>", " ", text or "")
         return re.sub(r"\s+", " ", plain).strip()
 
-    def _get_card_answer_text(self, card: CardDraft) -> str:
+    def _get_card_answer_text(self, card: CardDraft | CardRow) -> str:
         for key in ("Back", "Answer", "Extra"):
             value = str(card.fields.get(key, "") or "")
             normalized = self._normalize_quality_text(value)
@@ -469,8 +566,8 @@ class CardPreviewPage(QWidget):
             return self._normalize_quality_text(str(card.fields.get("Text", "") or ""))
         return ""
 
-    def _compute_card_quality_score(self, card: CardDraft) -> int:
-        cache_key = id(card)
+    def _compute_card_quality_score(self, card: CardDraft | CardRow) -> int:
+        cache_key = self._card_key(card)
         cached = self._quality_score_cache.get(cache_key)
         if cached is not None:
             return cached
@@ -493,7 +590,7 @@ class CardPreviewPage(QWidget):
             and question == answer
         ):
             score -= 35
-        if getattr(card.metadata, "quality_flags", None):
+        if self._card_quality_flags(card):
             score = min(score, 55)
         score = max(0, min(100, score))
         self._quality_score_cache[cache_key] = score
@@ -505,7 +602,9 @@ class CardPreviewPage(QWidget):
             self._quality_overview_label.setText("质量: -" if is_zh else "Quality: -")
             return
 
-        scores = [self._compute_card_quality_score(card) for card in self._all_cards]
+        scores = [
+            self._compute_card_quality_score(card) for card in self._card_items(self._all_cards)
+        ]
         avg = sum(scores) / max(1, len(scores))
         low = sum(1 for score in scores if score < 60)
         duplicate_risk = len(self._duplicate_risk_card_ids)
@@ -529,8 +628,11 @@ class CardPreviewPage(QWidget):
         self._duplicate_risk_only = bool(checked)
         self._apply_filters()
 
-    def _get_card_question_text(self, card: CardDraft) -> str:
-        kind = CardRenderer.detect_card_kind(card)
+    def _is_low_quality_card(self, card: CardDraft | CardRow) -> bool:
+        return bool(self._card_quality_flags(card)) or self._compute_card_quality_score(card) < 60
+
+    def _get_card_question_text(self, card: CardDraft | CardRow) -> str:
+        kind = self._card_kind(card)
         if kind in {"single_choice", "multiple_choice"}:
             question, _ = CardRenderer._parse_choice_front(card.fields.get("Front", ""))
             return self._compact_plain_text(question)
@@ -545,18 +647,15 @@ class CardPreviewPage(QWidget):
             return self._compact_plain_text(first_value)
         return "（空问题）" if self._main.config.language == "zh" else "(Empty question)"
 
-    def _build_card_list_item_text(self, card: CardDraft) -> str:
-        cache_key = id(card)
+    def _build_card_list_item_text(self, card: CardDraft | CardRow) -> str:
+        cache_key = self._card_key(card)
         cached = self._card_list_text_cache.get(cache_key)
         if cached is not None:
             return cached
 
         question = self._get_card_question_text(card)
         badges: list[str] = []
-        if (
-            getattr(card.metadata, "quality_flags", None)
-            or self._compute_card_quality_score(card) < 60
-        ):
+        if self._is_low_quality_card(card):
             badges.append("[低分]" if self._main.config.language == "zh" else "[Low]")
         if self._is_duplicate_risk_card(card):
             badges.append("[近重复]" if self._main.config.language == "zh" else "[Near Duplicate]")
@@ -1116,6 +1215,7 @@ class CardPreviewPage(QWidget):
 
         source_documents: list[str] = []
         strategy_ids: list[str] = []
+        sections: list[SourceSection] = []
         for card in cards:
             source_document = str(getattr(card.metadata, "source_document", "") or "").strip()
             strategy_id = str(getattr(card.metadata, "strategy_id", "") or "").strip()
@@ -1123,12 +1223,30 @@ class CardPreviewPage(QWidget):
                 source_documents.append(source_document)
             if strategy_id and strategy_id not in strategy_ids:
                 strategy_ids.append(strategy_id)
-
+            start = self._safe_int(getattr(card.metadata, "source_start", -1), -1)
+            end = self._safe_int(getattr(card.metadata, "source_end", -1), -1)
+            if source_document and 0 <= start < end:
+                sections.append(
+                    SourceSection(source_document=source_document, start=start, end=end)
+                )
+
+        # Indices refer to the full card list so the regenerated cards can replace them.
+        if isinstance(self._filtered_cards, CardView):
+            card_indices = [
+                self._filtered_cards.store_index(index)
+                for index in indices
+                if 0 <= index < len(self._filtered_cards)
+            ]
+        else:
+            positions = {id(card): position for position, card in enumerate(self._all_cards)}
+            card_indices = [positions[id(card)] for card in cards if id(card) in positions]
         return RegenerateRequest(
             scope=scope,
-            card_indices=indices,
+            card_indices=card_indices,
             source_documents=source_documents,
             strategy_ids=strategy_ids,
+            # Whole documents are regenerated unless every card knows its source section.
+            sections=sections if len(sections) == len(cards) else [],
         )
 
     def _dispatch_regenerate_request(self, request: RegenerateRequest) -> None:
@@ -1260,7 +1378,7 @@ class CardPreviewPage(QWidget):
         plain = re.sub(r"\s+", " ", plain).strip().lower()
         return plain
 
-    def _extract_card_question_for_similarity(self, card: CardDraft) -> str:
+    def _extract_card_question_for_similarity(self, card: CardDraft | CardRow) -> str:
         for key in ("Front", "Text", "Question"):
             value = card.fields.get(key, "")
             if value and str(value).strip():
@@ -1269,102 +1387,111 @@ class CardPreviewPage(QWidget):
             return self._normalize_similarity_text(str(next(iter(card.fields.values()))))
         return ""
 
-    def _collect_duplicate_risk_indices(self, cards: list[CardDraft], threshold: float) -> set[int]:
-        """Detect near-duplicate cards with performance safeguards.
+    def _collect_duplicate_risk_indices(
+        self, cards: Sequence[CardDraft], threshold: float
+    ) -> set[int]:
+        """Detect near-duplicate cards through a MinHash/LSH index.
 
-        Performance optimizations:
-        - Early termination after max comparisons to prevent UI freeze
-        - Sample-based checking for very large datasets
-        - Quick hash-based pre-filtering
+        Only cards sharing an LSH bucket are compared, so every card is checked
+        without a comparison budget; candidates are confirmed with the
+        SequenceMatcher ratio. The index is kept for incremental updates.
         """
-        if len(cards) < 2:
-            return set()
-
-        texts = [self._extract_card_question_for_similarity(card) for card in cards]
-        risky_indices: set[int] = set()
-
-        # Scale comparison limit based on dataset size
-        # For large datasets, use sampling to maintain responsiveness
-        card_count = len(texts)
-        if card_count > 500:
-            # Use aggressive limit for large datasets to prevent freeze
-            max_comparisons = 20000
-        else:
-            max_comparisons = 30000
-
-        comparisons = 0
-
-        # Quick pre-filter: group by length for faster rejection
-        length_buckets: dict[int, list[int]] = {}
-        for i, text in enumerate(texts):
-            if not text:
-                continue
-            length_key = len(text) // 10  # Group by length buckets
-            length_buckets.setdefault(length_key, []).append(i)
-
-        # Only compare within similar-length buckets and adjacent buckets
-        for length_key in sorted(length_buckets.keys()):
-            bucket_indices = length_buckets[length_key]
-            adjacent_indices = (
-                length_buckets.get(length_key - 1, []) +
-                bucket_indices +
-                length_buckets.get(length_key + 1, [])
-            )
-
-            for i in bucket_indices:
-                if comparisons >= max_comparisons:
-                    logger.warning(
-                        f"Duplicate check stopped early: {comparisons} comparisons "
-                        f"for {card_count} cards (limit: {max_comparisons})"
-                    )
-                    break
-
-                left = texts[i]
-                if not left:
-                    continue
-
-                for j in adjacent_indices:
-                    if j <= i:  # Avoid duplicate comparisons
-                        continue
-
-                    comparisons += 1
-                    if comparisons > max_comparisons:
-                        break
-
-                    right = texts[j]
-                    if not right:
-                        continue
-
-                    # Quick length check before expensive ratio calculation
-                    len_ratio = len(left) / max(1, len(right))
-                    if len_ratio < 0.7 or len_ratio > 1.3:
-                        continue
-
-                    try:
-                        ratio = SequenceMatcher(None, left, right).ratio()
-                        if ratio >= threshold:
-                            risky_indices.add(i)
-                            risky_indices.add(j)
-                    except Exception as exc:
-                        logger.debug(f"SequenceMatcher error: {exc}")
-                        continue
-
-                if comparisons > max_comparisons:
-                    break
-
-            if comparisons >= max_comparisons:
-                break
+        index = NearDuplicateIndex(threshold)
+        items = list(self._card_items(cards))
+        keys = [self._card_key(item) for item in items]
+        self._duplicate_index_cards = dict(zip(keys, items, strict=True))
+        self._duplicate_index_texts = {
+            key: self._extract_card_question_for_similarity(item)
+            for key, item in zip(keys, items, strict=True)
+        }
+        index.add_many(self._duplicate_index_texts.items())
+        self._duplicate_index = index
+        risky_keys = index.duplicate_keys()
+        risky_indices = {position for position, key in enumerate(keys) if key in risky_keys}
 
         logger.info(
-            f"Duplicate check completed: {comparisons} comparisons, "
-            f"{len(risky_indices)} risky cards found from {card_count} total"
+            f"Duplicate check completed: {len(risky_indices)} risky cards found "
+            f"from {len(cards)} total"
         )
         return risky_indices
 
+    def _duplicate_threshold(self) -> float:
+        return float(getattr(self._main.config, "semantic_duplicate_threshold", 0.9))
+
+    def _duplicate_index_is_live(self) -> bool:
+        index = self._duplicate_index
+        return (
+            index is not None
+            and not self._duplicate_risk_pending
+            and index.threshold == self._duplicate_threshold()
+        )
+
+    def _sync_duplicate_index(self, cards: Sequence[CardDraft]) -> bool:
+        """Bring the live index in line with ``cards``; False when a full rebuild is due."""
+        if not self._duplicate_index_is_live():
+            return False
+        current = {self._card_key(card): card for card in self._card_items(cards)}
+        removed = [key for key in self._duplicate_index_cards if key not in current]
+        # Indexed cards are kept alive, so a known key is the same card as before.
+        changed = [
+            card
+            for key, card in current.items()
+            if key not in self._duplicate_index_cards
+            or self._duplicate_index_texts.get(key)
+            != self._extract_card_question_for_similarity(card)
+        ]
+        # Past half the deck a single bulk pass is cheaper than per-card updates.
+        if 2 * (len(removed) + len(changed)) > max(len(cards), 1):
+            return False
+        for key in removed:
+            self._quality_score_cache.pop(key, None)
+            self._card_list_text_cache.pop(key, None)
+        for card in changed:
+            self._quality_score_cache.pop(self._card_key(card), None)
+            self._card_list_text_cache.pop(self._card_key(card), None)
+        self._update_duplicate_risk(changed, removed)
+        return True
+
+    def _update_duplicate_risk(
+        self, changed: list[CardDraft | CardRow], removed: list[int]
+    ) -> None:
+        """Re-index ``changed`` cards, drop ``removed`` ids and re-check their neighbours."""
+        index = self._duplicate_index
+        if index is None:
+            return
+        affected: set[int] = set()
+        for key in removed:
+            affected.update(index.similar_keys(key))
+            index.remove(key)
+            self._duplicate_index_cards.pop(key, None)
+            self._duplicate_index_texts.pop(key, None)
+            self._duplicate_risk_card_ids.discard(key)
+        for card in changed:
+            key = self._card_key(card)
+            affected.add(key)
+            affected.update(index.similar_keys(key))
+            text = self._extract_card_question_for_similarity(card)
+            index.add(key, text)
+            self._duplicate_index_cards[key] = card
+            self._duplicate_index_texts[key] = text
+            affected.update(index.similar_keys(key))
+        for key in affected:
+            if key not in self._duplicate_index_cards:
+                continue
+            was_risky = key in self._duplicate_risk_card_ids
+            if index.similar_keys(key):
+                self._duplicate_risk_card_ids.add(key)
+            else:
+                self._duplicate_risk_card_ids.discard(key)
+            if was_risky != (key in self._duplicate_risk_card_ids):
+                self._card_list_text_cache.pop(key, None)
+
     def _rebuild_duplicate_risk_cache(self) -> None:
-        threshold = float(getattr(self._main.config, "semantic_duplicate_threshold", 0.9))
-        risky_indices = self._collect_duplicate_risk_indices(self._all_cards, threshold)
-        self._duplicate_risk_card_ids = {id(self._all_cards[index]) for index in risky_indices}
+        risky_indices = self._collect_duplicate_risk_indices(
+            self._all_cards, self._duplicate_threshold()
+        )
+        keys = [self._card_key(card) for card in self._card_items(self._all_cards)]
+        self._duplicate_risk_card_ids = {keys[index] for index in risky_indices}
         self._duplicate_risk_pending = False
         self._card_list_text_cache.clear()
 
@@ -1372,8 +1499,8 @@ class CardPreviewPage(QWidget):
         if self._duplicate_risk_pending:
             self._rebuild_duplicate_risk_cache()
 
-    def _is_duplicate_risk_card(self, card: CardDraft) -> bool:
-        return id(card) in self._duplicate_risk_card_ids
+    def _is_duplicate_risk_card(self, card: CardDraft | CardRow) -> bool:
+        return self._card_key(card) in self._duplicate_risk_card_ids
 
     def _cleanup_push_worker(self) -> None:
         """Safely cleanup push worker to prevent resource leaks."""
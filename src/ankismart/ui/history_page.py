@@ -31,6 +31,7 @@ from qfluentwidgets import (
     MessageBox as FluentMessageBox,
 )
 
+from ankismart.core.card_store import CardStore
 from ankismart.core.history_export import (
     export_cards_to_csv,
     export_cards_to_json,
@@ -41,7 +42,6 @@ from ankismart.core.history_store import (
     SQLiteHistoryStore,
     get_default_history_store,
 )
-from ankismart.core.models import CardDraft
 from ankismart.ui.styles import (
     MARGIN_SMALL,
     MARGIN_STANDARD,
@@ -447,11 +447,8 @@ class HistoryPage(QWidget):
             switch_page(2)
         self._show_info_bar("success", "已载入", f"已载入 {len(cards)} 张卡片到预览页")
 
-    def _load_cards_for_batches(self, batch_ids: list[str]) -> list[CardDraft]:
-        cards: list[CardDraft] = []
-        for batch_id in batch_ids:
-            cards.extend(self._history_store.load_generation_cards(batch_id))
-        return cards
+    def _load_cards_for_batches(self, batch_ids: list[str]) -> CardStore:
+        return self._history_store.load_generation_store(batch_ids)
 
     def _matches_query(self, summary: GenerationBatchSummary, query: str) -> bool:
         if not query:
@@ -702,8 +702,8 @@ TRANSLATIONS: dict[str, dict[str, str]] = {
     },
     "settings.auto_split_threshold": {"zh": "分割阈值", "en": "Split Threshold"},
     "settings.auto_split_threshold_desc": {
-        "zh": "触发自动分割的字符数阈值",
-        "en": "Character count threshold for triggering auto-split",
+        "zh": "自动分割时每个片段的最大字符数",
+        "en": "Maximum characters per chunk when auto-splitting",
     },
     "settings.auto_split_warning": {
         "zh": ("长文档会在超过阈值时自动切分为多个片段，降低单次请求过大导致的不稳定风险。"),
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import re
 import time
+from collections.abc import MutableSequence, Sequence
 from typing import TYPE_CHECKING
 
 from PyQt6 import sip
@@ -19,11 +20,17 @@ from qfluentwidgets import (
     isDarkTheme,
 )
 
+from ankismart.core.card_store import CardStore
 from ankismart.core.config import append_task_history, record_operation_metric, save_config
 from ankismart.core.errors import ErrorCode
 from ankismart.core.history_store import get_default_history_store
 from ankismart.core.logging import get_logger
-from ankismart.core.models import BatchConvertResult, ConvertedDocument, RegenerateRequest
+from ankismart.core.models import (
+    BatchConvertResult,
+    ConvertedDocument,
+    RegenerateRequest,
+    SourceSection,
+)
 from ankismart.core.task_models import build_default_task_run
 from ankismart.ui.error_handler import build_error_display
 from ankismart.ui.shortcuts import ShortcutKeys, create_shortcut, get_shortcut_text
@@ -157,6 +164,8 @@ class PreviewPage(ProgressMixin, QWidget):
         self._generation_start_ts = 0.0
         self._current_task_id = ""
         self._pending_regenerate_request: RegenerateRequest | None = None
+        self._active_regenerate_request: RegenerateRequest | None = None
+        self._regenerate_section_maps: dict[str, list[tuple[int, int, int]]] = {}
         self._confirmations: dict[str, float] = {}
 
         self._setup_ui()
@@ -456,21 +465,108 @@ class PreviewPage(ProgressMixin, QWidget):
         result = []
         regenerate_request = self.__dict__.get("_pending_regenerate_request")
         allowed_documents = set(getattr(regenerate_request, "source_documents", []) or [])
+        sections: dict[str, list[SourceSection]] = {}
+        for section in getattr(regenerate_request, "sections", []) or []:
+            sections.setdefault(section.source_document, []).append(section)
+        self._regenerate_section_maps = {}
         for i, doc in enumerate(self._documents):
             if allowed_documents and doc.file_name not in allowed_documents:
                 continue
             if i in self._edited_content:
                 # Create new document with edited content
-                new_doc = ConvertedDocument(
+                doc = ConvertedDocument(
                     result=doc.result.model_copy(update={"content": self._edited_content[i]}),
                     file_name=doc.file_name,
                 )
-                result.append(new_doc)
-            else:
-                result.append(doc)
+            if doc.file_name in sections:
+                doc = self._scope_document_to_sections(doc, sections[doc.file_name])
+            result.append(doc)
 
         return result
 
+    def _scope_document_to_sections(
+        self, doc: ConvertedDocument, sections: list[SourceSection]
+    ) -> ConvertedDocument:
+        """Reduce ``doc`` to the given source spans, or keep it whole if any span is stale."""
+        content = doc.result.content
+        spans = sorted((section.start, section.end) for section in sections)
+        if any(not 0 <= start < end <= len(content) for start, end in spans):
+            return doc
+
+        merged: list[list[int]] = []
+        for start, end in spans:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        parts: list[str] = []
+        offsets: list[tuple[int, int, int]] = []
+        offset = 0
+        for start, end in merged:
+            offsets.append((offset, start, end))
+            parts.append(content[start:end])
+            offset += end - start + 2
+        self._regenerate_section_maps[doc.file_name] = offsets
+        return ConvertedDocument(
+            result=doc.result.model_copy(update={"content": "\n\n".join(parts)}),
+            file_name=doc.file_name,
+        )
+
+    def _rebase_regenerated_spans(self, cards: list) -> None:
+        """Map spans of cards generated from scoped documents back onto the stored ones."""
+        section_maps = self.__dict__.get("_regenerate_section_maps") or {}
+        for card in cards:
+            offsets = section_maps.get(card.metadata.source_document)
+            if not offsets:
+                continue
+            start, end = card.metadata.source_start, card.metadata.source_end
+            for offset, section_start, section_end in offsets:
+                if offset <= start < offset + (section_end - section_start):
+                    card.metadata.source_start = section_start + (start - offset)
+                    card.metadata.source_end = min(section_end, section_start + (end - offset))
+                    break
+            else:
+                card.metadata.source_start = card.metadata.source_end = -1
+
+    @staticmethod
+    def _merge_regenerated_cards(
+        existing: MutableSequence, indices: list[int], regenerated: Sequence
+    ) -> MutableSequence:
+        """Replace the cards at ``indices`` with ``regenerated``, placed where the first was.
+
+        ``existing`` is edited in place by position, so a loaded CardStore keeps every
+        untouched card encoded instead of being rebuilt as a list of drafts.
+        """
+        replaced = sorted({index for index in indices if 0 <= index < len(existing)})
+        if not replaced:
+            existing.extend(regenerated)
+            return existing
+        insert_at = replaced[0]
+        for index in reversed(replaced[1:]):
+            del existing[index]
+        new_cards = list(regenerated)
+        if not new_cards:
+            del existing[insert_at]
+            return existing
+        existing[insert_at] = new_cards[0]
+        for offset, card in enumerate(new_cards[1:], 1):
+            existing.insert(insert_at + offset, card)
+        return existing
+
+    @staticmethod
+    def _section_generation_config(config: dict, request: RegenerateRequest) -> dict:
+        """Ask for as many cards as are being replaced, of the same strategies."""
+        strategy_mix = [
+            {"strategy": strategy_id, "ratio": 1} for strategy_id in request.strategy_ids
+        ] or config.get("strategy_mix", [])
+        return {
+            **config,
+            "target_total": max(1, len(request.card_indices)),
+            "auto_target_count": False,
+            "strategy_mix": strategy_mix,
+        }
+
     def _show_converting_info_bar(self, pending_count: int):
         """Show info bar indicating files are still being converted with detailed progress."""
         if self._converting_info_bar is not None:
@@ -647,8 +743,13 @@ class PreviewPage(ProgressMixin, QWidget):
             return
 
         # Build documents with edits
+        regenerate_request = self.__dict__.get("_pending_regenerate_request")
         documents = self._build_documents()
         self._pending_regenerate_request = None
+        # Section-scoped regeneration replaces only the requested cards when it finishes.
+        self._active_regenerate_request = (
+            regenerate_request if self.__dict__.get("_regenerate_section_maps") else None
+        )
         if not documents:
             InfoBar.warning(
                 title="警告" if self._main.config.language == "zh" else "Warning",
@@ -665,6 +766,12 @@ class PreviewPage(ProgressMixin, QWidget):
 
         # Get generation config from import page
         generation_config = self._main.import_page.build_generation_config()
+        if self._active_regenerate_request is not None:
+            generation_config = self._section_generation_config(
+                generation_config, self._active_regenerate_request
+            )
+        if regenerate_request is not None:
+            generation_config = {**generation_config, "fresh_responses": True}
         deck_name = self._main.import_page._deck_combo.currentText().strip()
         tags_text = self._main.import_page._tags_input.text().strip()
         tags = split_tags_text(tags_text)
@@ -691,15 +798,14 @@ class PreviewPage(ProgressMixin, QWidget):
 
         llm_client = None
         try:
-            # Create LLM client
-            from ankismart.card_gen.llm_client import LLMClient
-
-            llm_client = LLMClient(
-                api_key=provider.api_key,
-                base_url=provider.base_url,
-                model=provider.model,
-                rpm_limit=provider.rpm_limit,
-                proxy_url=self._main.config.proxy_url,
+            # Create LLM client (a router over several providers when routing is on)
+            from ankismart.card_gen.llm_router import build_llm_client
+            from ankismart.card_gen.response_cache import build_response_cache
+
+            llm_client = build_llm_client(
+                self._main.config,
+                provider,
+                response_cache=build_response_cache(self._main.config),
             )
 
             # Start generation worker
@@ -728,6 +834,7 @@ class PreviewPage(ProgressMixin, QWidget):
             )
             self._generate_worker.progress.connect(self._on_generation_progress)
             self._generate_worker.warning.connect(self._on_generation_warning)
+            self._generate_worker.usage_estimated.connect(self._on_usage_estimated)
             self._generate_worker.card_progress.connect(self._on_card_progress)
             self._generate_worker.document_completed.connect(self._on_document_completed)
             self._generate_worker.finished.connect(self._on_generation_finished)
@@ -762,10 +869,11 @@ class PreviewPage(ProgressMixin, QWidget):
         plain = re.sub(r"<[^>]+>", " ", text or "")
         return re.sub(r"\s+", " ", plain).strip()
 
-    def _count_low_quality_cards(self, cards: list) -> int:
+    def _count_low_quality_cards(self, cards: Sequence) -> int:
         min_chars = max(1, int(getattr(self._main.config, "card_quality_min_chars", 2)))
         bad = 0
-        for card in cards:
+        # Store rows expose the same fields and note type without building drafts.
+        for card in cards.rows() if isinstance(cards, CardStore) else cards:
             question = ""
             for key in ("Front", "Question", "Text"):
                 value = self._normalize_card_field(str(card.fields.get(key, "") or ""))
@@ -870,6 +978,7 @@ class PreviewPage(ProgressMixin, QWidget):
 
         from ankismart.card_gen.generator import CardGenerator
         from ankismart.card_gen.llm_client import LLMClient
+        from ankismart.card_gen.response_cache import build_response_cache
         from ankismart.core.models import GenerateRequest
 
         class SampleGenerateWorker(QThread):
@@ -922,9 +1031,14 @@ class PreviewPage(ProgressMixin, QWidget):
                 base_url=provider.base_url,
                 model=provider.model,
                 rpm_limit=provider.rpm_limit,
+                tpm_limit=getattr(provider, "tpm_limit", 0),
+                context_window=getattr(provider, "context_window", 0),
+                max_output_tokens=getattr(provider, "max_output_tokens", 0),
                 temperature=self._main.config.llm_temperature,
                 max_tokens=self._main.config.llm_max_tokens,
                 proxy_url=self._main.config.proxy_url,
+                response_cache=build_response_cache(self._main.config),
+                structured_output=getattr(self._main.config, "llm_structured_output", False),
             )
 
             # Get deck and tags
@@ -1324,6 +1438,35 @@ class PreviewPage(ProgressMixin, QWidget):
             parent=self,
         )
 
+    def _on_usage_estimated(self, estimate) -> None:
+        """Show the projected token usage and cost before requests are sent."""
+        is_zh = self._main.config.language == "zh"
+        cost = f"{estimate.cost:.4f}" if estimate.cost > 0 else ""
+        if is_zh:
+            message = (
+                f"预计 {len(estimate.requests)} 次请求，约 {estimate.prompt_tokens} 输入 + "
+                f"{estimate.completion_tokens} 输出 tokens" + (f"，费用约 {cost}" if cost else "")
+            )
+        else:
+            message = (
+                f"About {len(estimate.requests)} requests, ~{estimate.prompt_tokens} prompt + "
+                f"{estimate.completion_tokens} completion tokens"
+                + (f", cost ~{cost}" if cost else "")
+            )
+        logger.info(
+            "generation usage estimated",
+            extra={"event": "ui.generation.usage_estimated", "message_detail": message},
+        )
+        self._show_progress_info_bar("正在生成卡片" if is_zh else "Generating Cards", message)
+        self._publish_task_event(
+            TaskEvent(
+                task_id=self._current_task_id,
+                stage="generate",
+                kind="progress",
+                message=message,
+            )
+        )
+
     def _on_generation_warning(self, message: str):
         """Show non-blocking generation warnings without interrupting the workflow."""
         is_zh = self._main.config.language == "zh"
@@ -1348,6 +1491,8 @@ class PreviewPage(ProgressMixin, QWidget):
     def _on_generation_finished(self, cards):
         """Handle generation completion."""
         self._cleanup_generate_worker()
+        regenerate_request = self.__dict__.get("_active_regenerate_request")
+        self._active_regenerate_request = None
         is_zh = self._main.config.language == "zh"
         elapsed = (
             max(0.0, time.monotonic() - self._generation_start_ts)
@@ -1388,6 +1533,8 @@ class PreviewPage(ProgressMixin, QWidget):
             )
         except Exception:
             target_total = 0
+        if regenerate_request is not None:
+            target_total = max(1, len(regenerate_request.card_indices))
         low_quality_count = self._count_low_quality_cards(cards)
         meets_target = target_total <= 0 or len(cards) >= target_total
         status = "success" if (low_quality_count == 0 and meets_target) else "partial"
@@ -1456,6 +1603,14 @@ class PreviewPage(ProgressMixin, QWidget):
                 parent=self,
             )
 
+        if regenerate_request is not None:
+            self._rebase_regenerated_spans(cards)
+            cards = self._merge_regenerated_cards(
+                getattr(self._main, "cards", None) or CardStore(),
+                regenerate_request.card_indices,
+                cards,
+            )
+
         # Store cards and switch to card preview page
         self._main.cards = cards
         self._main.card_preview_page.load_cards(cards)
@@ -1475,23 +1630,24 @@ class PreviewPage(ProgressMixin, QWidget):
         elapsed: float,
     ) -> None:
         try:
-            source_documents = sorted(
-                {
-                    str(getattr(card.metadata, "source_document", "") or "").strip()
+            origins = (
+                [(row.source_document, row.strategy_id) for row in cards.rows()]
+                if isinstance(cards, CardStore)
+                else [
+                    (
+                        getattr(card.metadata, "source_document", ""),
+                        getattr(card.metadata, "strategy_id", ""),
+                    )
                     for card in cards
-                    if str(getattr(card.metadata, "source_document", "") or "").strip()
-                }
+                ]
             )
-            strategy_ids = sorted(
-                {
-                    str(getattr(card.metadata, "strategy_id", "") or "").strip()
-                    for card in cards
-                    if str(getattr(card.metadata, "strategy_id", "") or "").strip()
-                }
+            source_documents = sorted(
+                {str(document or "").strip() for document, _ in origins} - {""}
             )
+            strategy_ids = sorted({str(strategy or "").strip() for _, strategy in origins} - {""})
             history_store = get_default_history_store()
             history_store.save_generation_batch(
-                list(cards),
+                cards if isinstance(cards, CardStore) else list(cards),
                 title=f"生成 {len(cards)} 张卡片",
                 status=status,
                 target_total=target_total,
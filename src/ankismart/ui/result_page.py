@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Sequence
 from pathlib import Path
 from typing import Any
 
@@ -34,6 +35,7 @@ from qfluentwidgets import (
     ToolButton,
 )
 
+from ankismart.core.card_store import CardRow, CardStore, CardView
 from ankismart.core.models import CardDraft, CardPushStatus, PushResult
 from ankismart.ui.card_edit_widget import CardEditDialog
 from ankismart.ui.card_preview_renderer import format_quality_flags
@@ -157,7 +159,7 @@ class ResultPage(QWidget):
         self._export_worker = None
         self._export_button_states: dict[str, bool] | None = None
         self._push_result: PushResult | None = None
-        self._cards: list[CardDraft] = []
+        self._cards: Sequence[CardDraft] = []
         self._selected_indices: set[int] = set()  # Track selected card indices
         self._result_feedback_key: tuple[str, int, int, int] | None = None
         self._current_task_id: str = ""
@@ -519,9 +521,13 @@ class ResultPage(QWidget):
             )
             return
 
-        selected_cards = [
-            self._cards[i] for i in self._selected_indices if 0 <= i < len(self._cards)
-        ]
+        positions = sorted(i for i in self._selected_indices if 0 <= i < len(self._cards))
+        # A view keeps unselected cards of a CardStore encoded until the exporter reads them.
+        selected_cards = (
+            CardView(self._cards, positions)
+            if isinstance(self._cards, CardStore)
+            else [self._cards[i] for i in positions]
+        )
         if not selected_cards:
             return
 
@@ -628,7 +634,7 @@ class ResultPage(QWidget):
         else:
             self._clear_display()
 
-    def load_result(self, result: PushResult, cards: list[CardDraft]) -> None:
+    def load_result(self, result: PushResult, cards: Sequence[CardDraft]) -> None:
         """加载推送结果数据。"""
         self._push_result = result
         self._cards = cards
@@ -638,7 +644,7 @@ class ResultPage(QWidget):
     def _display_result(
         self,
         result: PushResult,
-        cards: list[CardDraft],
+        cards: Sequence[CardDraft],
         *,
         show_feedback: bool = False,
     ) -> None:
@@ -684,7 +690,14 @@ class ResultPage(QWidget):
             )
             self._result_feedback_key = feedback_key
 
-    def _add_table_row(self, status: CardPushStatus, cards: list[CardDraft]) -> None:
+    @staticmethod
+    def _card_item(cards: Sequence[CardDraft], index: int) -> CardDraft | CardRow:
+        """Card at ``index`` for display; a CardStore answers with its row, not a draft."""
+        if isinstance(cards, CardStore):
+            return cards.row(index)
+        return cards[index]
+
+    def _add_table_row(self, status: CardPushStatus, cards: Sequence[CardDraft]) -> None:
         """添加表格行。"""
         row = self._table.rowCount()
         self._table.insertRow(row)
@@ -708,12 +721,14 @@ class ResultPage(QWidget):
         card_title = t("result.unknown_card", lang)
         quality_text = ""
         if 0 <= status.index < len(cards):
-            card = cards[status.index]
+            card = self._card_item(cards, status.index)
             card_title = self._extract_question_title(card, lang=lang)
-            quality_text = format_quality_flags(
-                list(getattr(card.metadata, "quality_flags", []) or []),
-                lang,
+            quality_flags = (
+                card.quality_flags
+                if isinstance(card, CardRow)
+                else getattr(card.metadata, "quality_flags", [])
             )
+            quality_text = format_quality_flags(list(quality_flags or []), lang)
 
         title_item = QTableWidgetItem(card_title)
         self._table.setItem(row, 1, title_item)
@@ -758,7 +773,7 @@ class ResultPage(QWidget):
         self._table.setCellWidget(row, 4, btn_widget)
 
     @staticmethod
-    def _extract_question_title(card: CardDraft, *, lang: str) -> str:
+    def _extract_question_title(card: CardDraft | CardRow, *, lang: str) -> str:
         """Extract display title from question field only."""
 
         def _compact(value: str) -> str:
@@ -820,7 +835,7 @@ class ResultPage(QWidget):
             f"已完成 {current}/{total} 张卡片推送" if is_zh else f"Pushed {current}/{total} cards"
         )
 
-    def _apply_duplicate_settings(self, cards: list[CardDraft]) -> None:
+    def _apply_duplicate_settings(self, cards: Sequence[CardDraft]) -> None:
         """Apply duplicate check settings to cards."""
         config = self._main.config
         for card in cards:
@@ -1048,9 +1063,14 @@ class ResultPage(QWidget):
         # Show edit dialog
         dialog = CardEditDialog(card, lang, self.window())
         if dialog.exec():
-            # Save edited card
+            # Apply the edit to the card itself: the card preview shares this list or
+            # CardStore, so it can refresh just this card instead of the whole deck.
             edited_card = dialog.get_edited_card()
-            self._cards[card_index] = edited_card
+            card.fields = dict(edited_card.fields)
+            card.metadata = edited_card.metadata
+            preview_page = getattr(self._main, "card_preview_page", None)
+            if preview_page is not None:
+                preview_page.update_cards([card])
 
             # Mark as edited
             self._edited_card_indices.add(card_index)
@@ -1263,7 +1283,7 @@ class ResultPage(QWidget):
         for row_idx, status in enumerate(self._current_page_statuses()):
             if status.index == card_index:
                 # Update card title
-                card = self._cards[card_index]
+                card = self._card_item(self._cards, card_index)
                 card_title = self._extract_question_title(
                     card,
                     lang=getattr(self._main.config, "language", "zh"),
@@ -22,6 +22,7 @@ from PyQt6.QtWidgets import (
 from qfluentwidgets import (
     BodyLabel,
     ComboBox,
+    DoubleSpinBox,
     ExpandGroupSettingCard,
     ExpandLayout,
     FluentIcon,
@@ -232,8 +233,43 @@ class LLMProviderDialog(QDialog):
         self._rpm_spin.setValue(self._provider.rpm_limit)
         self._rpm_spin.setPrefix("RPM 限制: " if self._is_zh else "RPM Limit: ")
         rpm_layout.addWidget(self._rpm_spin)
+        self._tpm_spin = SpinBox()
+        self._tpm_spin.setRange(0, 100_000_000)
+        self._tpm_spin.setSingleStep(10_000)
+        self._tpm_spin.setValue(self._provider.tpm_limit)
+        self._tpm_spin.setPrefix("TPM 限制: " if self._is_zh else "TPM Limit: ")
+        rpm_layout.addWidget(self._tpm_spin)
         layout.addLayout(rpm_layout)
 
+        # Token limits (0 = derive from the model name)
+        limits_layout = QHBoxLayout()
+        self._context_window_spin = SpinBox()
+        self._context_window_spin.setRange(0, 10_000_000)
+        self._context_window_spin.setSingleStep(1024)
+        self._context_window_spin.setValue(self._provider.context_window)
+        self._context_window_spin.setPrefix("上下文窗口: " if self._is_zh else "Context window: ")
+        self._context_window_spin.setSpecialValueText(
+            "上下文窗口: 自动" if self._is_zh else "Context window: Auto"
+        )
+        limits_layout.addWidget(self._context_window_spin)
+        self._max_output_spin = SpinBox()
+        self._max_output_spin.setRange(0, 1_000_000)
+        self._max_output_spin.setSingleStep(1024)
+        self._max_output_spin.setValue(self._provider.max_output_tokens)
+        self._max_output_spin.setPrefix("最大输出: " if self._is_zh else "Max output: ")
+        self._max_output_spin.setSpecialValueText(
+            "最大输出: 自动" if self._is_zh else "Max output: Auto"
+        )
+        limits_layout.addWidget(self._max_output_spin)
+        layout.addLayout(limits_layout)
+
+        # Share of requests when multi-provider routing is on (0 = keep out of the pool)
+        self._routing_weight_spin = SpinBox()
+        self._routing_weight_spin.setRange(0, 100)
+        self._routing_weight_spin.setValue(getattr(self._provider, "routing_weight", 1))
+        self._routing_weight_spin.setPrefix("路由权重: " if self._is_zh else "Routing weight: ")
+        layout.addWidget(self._routing_weight_spin)
+
         # Buttons
         btn_layout = QHBoxLayout()
         btn_layout.addStretch()
@@ -254,6 +290,10 @@ class LLMProviderDialog(QDialog):
         self._provider.api_key = self._api_key_edit.text().strip()
         self._provider.model = self._model_edit.text().strip()
         self._provider.rpm_limit = self._rpm_spin.value()
+        self._provider.tpm_limit = self._tpm_spin.value()
+        self._provider.context_window = self._context_window_spin.value()
+        self._provider.max_output_tokens = self._max_output_spin.value()
+        self._provider.routing_weight = self._routing_weight_spin.value()
 
         if not self._provider.name:
             InfoBar.warning(
@@ -358,6 +398,12 @@ class SettingsPage(ScrollArea):
         self._concurrency_spin.valueChanged.connect(self._schedule_auto_save)
         self._adaptive_concurrency_switch.checkedChanged.connect(self._schedule_auto_save)
         self._concurrency_max_spin.valueChanged.connect(self._schedule_auto_save)
+        self._multi_provider_switch.checkedChanged.connect(self._schedule_auto_save)
+        self._hedged_requests_switch.checkedChanged.connect(self._schedule_auto_save)
+        self._prompt_price_spin.valueChanged.connect(self._schedule_auto_save)
+        self._completion_price_spin.valueChanged.connect(self._schedule_auto_save)
+        self._token_budget_spin.valueChanged.connect(self._schedule_auto_save)
+        self._cost_budget_spin.valueChanged.connect(self._schedule_auto_save)
 
         # Anki settings
         self._anki_url_edit.textChanged.connect(self._schedule_auto_save)
@@ -727,6 +773,73 @@ class SettingsPage(ScrollArea):
         self._concurrency_max_card.hBoxLayout.addSpacing(16)
         self._llm_group.addSettingCard(self._concurrency_max_card)
 
+        self._multi_provider_card = SettingCard(
+            FluentIcon.SYNC,
+            "多提供商路由",
+            "按权重在已配置的提供商间分配请求，失败时自动切换",
+            self.scrollWidget,
+        )
+        self._multi_provider_switch = SwitchButton(self._multi_provider_card)
+        self._multi_provider_card.hBoxLayout.addWidget(self._multi_provider_switch)
+        self._multi_provider_card.hBoxLayout.addSpacing(16)
+        self._llm_group.addSettingCard(self._multi_provider_card)
+
+        self._hedged_requests_card = SettingCard(
+            FluentIcon.SEND,
+            "对冲请求",
+            "请求超过 p95 延迟时向另一提供商重发，取先完成的结果",
+            self.scrollWidget,
+        )
+        self._hedged_requests_switch = SwitchButton(self._hedged_requests_card)
+        self._hedged_requests_card.hBoxLayout.addWidget(self._hedged_requests_switch)
+        self._hedged_requests_card.hBoxLayout.addSpacing(16)
+        self._llm_group.addSettingCard(self._hedged_requests_card)
+
+        # Pricing used for the pre-dispatch usage estimate
+        self._llm_pricing_card = SettingCard(
+            FluentIcon.SHOPPING_CART,
+            "令牌价格",
+            "每 1000 个输入/输出令牌的价格，用于估算批次费用（0 = 不显示费用）",
+            self.scrollWidget,
+        )
+        self._prompt_price_spin = DoubleSpinBox(self._llm_pricing_card)
+        self._prompt_price_spin.setRange(0.0, 1000.0)
+        self._prompt_price_spin.setDecimals(4)
+        self._prompt_price_spin.setSingleStep(0.001)
+        self._prompt_price_spin.setPrefix("输入: ")
+        self._llm_pricing_card.hBoxLayout.addWidget(self._prompt_price_spin)
+        self._completion_price_spin = DoubleSpinBox(self._llm_pricing_card)
+        self._completion_price_spin.setRange(0.0, 1000.0)
+        self._completion_price_spin.setDecimals(4)
+        self._completion_price_spin.setSingleStep(0.001)
+        self._completion_price_spin.setPrefix("输出: ")
+        self._llm_pricing_card.hBoxLayout.addWidget(self._completion_price_spin)
+        self._llm_pricing_card.hBoxLayout.addSpacing(16)
+        self._llm_group.addSettingCard(self._llm_pricing_card)
+
+        # Per-batch budgets; a batch projected above either is not dispatched
+        self._batch_budget_card = SettingCard(
+            FluentIcon.CERTIFICATE,
+            "批次预算",
+            "预计令牌数或费用超过上限时不发送请求（0 = 不限制）",
+            self.scrollWidget,
+        )
+        self._token_budget_spin = SpinBox(self._batch_budget_card)
+        self._token_budget_spin.setRange(0, 1_000_000_000)
+        self._token_budget_spin.setSingleStep(100_000)
+        self._token_budget_spin.setSpecialValueText("令牌: 不限")
+        self._token_budget_spin.setPrefix("令牌: ")
+        self._batch_budget_card.hBoxLayout.addWidget(self._token_budget_spin)
+        self._cost_budget_spin = DoubleSpinBox(self._batch_budget_card)
+        self._cost_budget_spin.setRange(0.0, 1_000_000.0)
+        self._cost_budget_spin.setDecimals(2)
+        self._cost_budget_spin.setSingleStep(1.0)
+        self._cost_budget_spin.setSpecialValueText("费用: 不限")
+        self._cost_budget_spin.setPrefix("费用: ")
+        self._batch_budget_card.hBoxLayout.addWidget(self._cost_budget_spin)
+        self._batch_budget_card.hBoxLayout.addSpacing(16)
+        self._llm_group.addSettingCard(self._batch_budget_card)
+
         # ── Anki Configuration Group ──
         self._anki_group = SettingCardGroup("Anki 配置", self.scrollWidget)
 
@@ -1166,7 +1279,9 @@ class SettingsPage(ScrollArea):
         self._split_threshold_card = SettingCard(
             FluentIcon.ALIGNMENT,
             "分割阈值" if is_zh else "Split Threshold",
-            "触发自动分割的字符数阈值" if is_zh else "Character count threshold for auto-splitting",
+            "自动分割时每个片段的最大字符数"
+            if is_zh
+            else "Maximum characters per chunk when auto-splitting",
             parent=self._document_processing_group,
         )
         self._split_threshold_spinbox = SpinBox(self._split_threshold_card)
@@ -1269,6 +1384,12 @@ class SettingsPage(ScrollArea):
             getattr(config, "llm_adaptive_concurrency", True)
         )
         self._concurrency_max_spin.setValue(getattr(config, "llm_concurrency_max", 6))
+        self._multi_provider_switch.setChecked(getattr(config, "llm_multi_provider", False))
+        self._hedged_requests_switch.setChecked(getattr(config, "llm_hedged_requests", False))
+        self._prompt_price_spin.setValue(config.llm_cost_per_1k_prompt_tokens)
+        self._completion_price_spin.setValue(config.llm_cost_per_1k_completion_tokens)
+        self._token_budget_spin.setValue(config.llm_batch_token_budget)
+        self._cost_budget_spin.setValue(config.llm_batch_cost_budget)
 
         # Anki settings
         self._anki_url_edit.setText(config.anki_connect_url)
@@ -2513,6 +2634,12 @@ class SettingsPage(ScrollArea):
                 "llm_max_tokens": self._max_tokens_spin.value(),
                 "llm_concurrency": concurrency_value,
                 "llm_adaptive_concurrency": self._adaptive_concurrency_switch.isChecked(),
+                "llm_multi_provider": self._multi_provider_switch.isChecked(),
+                "llm_hedged_requests": self._hedged_requests_switch.isChecked(),
+                "llm_cost_per_1k_prompt_tokens": self._prompt_price_spin.value(),
+                "llm_cost_per_1k_completion_tokens": self._completion_price_spin.value(),
+                "llm_batch_token_budget": self._token_budget_spin.value(),
+                "llm_batch_cost_budget": self._cost_budget_spin.value(),
                 "llm_concurrency_max": concurrency_cap,
                 "proxy_mode": proxy_mode,
                 "proxy_url": proxy_url,
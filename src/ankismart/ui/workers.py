@@ -2,14 +2,15 @@ from __future__ import annotations
 
 import re
 import threading
-from difflib import SequenceMatcher
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from ankismart.core.cancellation import CancellationToken
+from ankismart.core.card_store import CardStore
 from ankismart.core.config import LLMProviderConfig, record_operation_metric
-from ankismart.core.errors import AnkiSmartError
+from ankismart.core.errors import AnkiSmartError, OperationCancelledError
 from ankismart.core.logging import get_logger
 from ankismart.core.models import (
     BatchConvertResult,
@@ -18,12 +19,15 @@ from ankismart.core.models import (
     GenerateRequest,
     MarkdownResult,
 )
+from ankismart.core.tracing import metrics
 
 if TYPE_CHECKING:
     from ankismart.anki_gateway.apkg_exporter import ApkgExporter
     from ankismart.anki_gateway.client import AnkiConnectClient
     from ankismart.anki_gateway.gateway import AnkiGateway, UpdateMode
     from ankismart.card_gen.llm_client import LLMClient
+    from ankismart.card_gen.llm_scheduler import LLMRequestScheduler
+    from ankismart.card_gen.usage_estimate import UsageEstimate
     from ankismart.converter.converter import DocumentConverter
 
 # Keep monkeypatch target available while avoiding startup import cost.
@@ -128,6 +132,12 @@ class CardGenerator:
     def generate(self, request):
         return self._impl.generate(request)
 
+    def generate_multi(self, request, strategy_counts):
+        return self._impl.generate_multi(request, strategy_counts)
+
+    def estimate_usage(self, request, strategy_counts=None, *, document=""):
+        return self._impl.estimate_usage(request, strategy_counts, document=document)
+
 
 def _normalize_text_for_quality(text: str) -> str:
     plain = re.sub(r"<[^>]+>", " ", text or "")
@@ -174,21 +184,26 @@ def _card_quality_issue(card: CardDraft, *, min_chars: int) -> str | None:
     return None
 
 
-def _is_semantic_duplicate(
-    question: str,
-    existing_questions: list[str],
-    *,
-    threshold: float,
-) -> bool:
-    if not question:
-        return False
-    normalized = question.lower()
-    for candidate in existing_questions:
-        if not candidate:
-            continue
-        if SequenceMatcher(None, normalized, candidate.lower()).ratio() >= threshold:
-            return True
-    return False
+def _accepted_questions_by_chunk(cards: list[CardDraft]) -> dict[str, list[str]]:
+    """Questions of accepted cards grouped by the chunk that produced them."""
+    grouped: dict[str, list[str]] = {}
+    for card in cards:
+        question = _extract_question_text(card)
+        if question:
+            grouped.setdefault(card.metadata.source_chunk_id or "", []).append(question)
+    return grouped
+
+
+def _rebase_source_spans(cards: list[CardDraft], work_text: str, source_text: str) -> None:
+    """Move card source spans from a derived work document onto the stored document."""
+    for card in cards:
+        start, end = card.metadata.source_start, card.metadata.source_end
+        position = source_text.find(work_text[start:end]) if 0 <= start < end else -1
+        if position == -1:
+            card.metadata.source_start = card.metadata.source_end = -1
+        else:
+            card.metadata.source_start = position
+            card.metadata.source_end = position + (end - start)
 
 
 def _ocr_markdown_quality_warning(text: str, *, min_chars: int) -> str | None:
@@ -253,11 +268,15 @@ class ConvertWorker(QThread):
                 if self._is_cancelled():
                     raise _WorkerCancelledError()
 
-            result = self._converter.convert(self._file_path, progress_callback=progress_callback)
+            result = self._converter.convert(
+                self._file_path,
+                progress_callback=progress_callback,
+                cancel_token=CancellationToken(self._cancel_event),
+            )
             if self._is_cancelled():
                 raise _WorkerCancelledError()
             self.finished.emit(result)
-        except _WorkerCancelledError:
+        except (_WorkerCancelledError, OperationCancelledError):
             self.cancelled.emit()
         except Exception as e:
             if not self._is_cancelled():
@@ -562,6 +581,7 @@ class ProviderConnectionWorker(QThread):
                 model=self._provider.model,
                 base_url=self._provider.base_url or None,
                 rpm_limit=self._provider.rpm_limit,
+                tpm_limit=getattr(self._provider, "tpm_limit", 0),
                 temperature=self._temperature,
                 max_tokens=self._max_tokens,
                 proxy_url=self._proxy_url,
@@ -632,6 +652,7 @@ class BatchConvertWorker(QThread):
         self._ocr_correction_fn = None
         self._ocr_correction_fn_ready = False
         self._ocr_correction_client = None
+        self._ocr_correction_scheduler = None
         self._quality_warnings: list[str] = []
         self._ocr_quality_min_chars = int(getattr(config, "ocr_quality_min_chars", 80))
 
@@ -647,6 +668,32 @@ class BatchConvertWorker(QThread):
         cancelled = bool(self.__dict__.get("_cancelled", False))
         return cancelled or bool(cancel_event is not None and cancel_event.is_set())
 
+    def _cancel_token(self) -> CancellationToken:
+        cancel_event = self.__dict__.get("_cancel_event")
+        if cancel_event is None:
+            cancel_event = threading.Event()
+            self._cancel_event = cancel_event
+        if self.__dict__.get("_cancelled", False):
+            cancel_event.set()
+        return CancellationToken(cancel_event)
+
+    def _report_cancelled_conversion(self, file_name: str, exc: OperationCancelledError) -> None:
+        if exc.total:
+            self.ocr_progress.emit(
+                f"{file_name}: 已取消，已完成 {exc.completed}/{exc.total} 页，"
+                f"跳过 {exc.skipped} 页（已识别页面已缓存）"
+            )
+        logger.info(
+            "file conversion cancelled",
+            extra={
+                "event": "worker.batch_convert.cancelled",
+                "file_name": file_name,
+                "stage": exc.stage,
+                "completed_units": exc.completed,
+                "skipped_units": exc.skipped,
+            },
+        )
+
     def run(self) -> None:
         import time
 
@@ -867,22 +914,40 @@ class BatchConvertWorker(QThread):
 
         from ankismart.card_gen.generator import CardGenerator
         from ankismart.card_gen.llm_client import LLMClient
+        from ankismart.card_gen.response_cache import build_response_cache
 
         llm_client = LLMClient(
             api_key=provider.api_key,
             model=provider.model,
             base_url=provider.base_url or None,
             rpm_limit=getattr(provider, "rpm_limit", 0),
+            tpm_limit=getattr(provider, "tpm_limit", 0),
             temperature=float(getattr(self._config, "llm_temperature", 0.3)),
             max_tokens=int(getattr(self._config, "llm_max_tokens", 0)),
             proxy_url=proxy_url,
+            response_cache=build_response_cache(self._config),
         )
-        generator = CardGenerator(llm_client)
         self._ocr_correction_client = llm_client
+        correction_client = llm_client
+        max_in_flight = max(0, int(getattr(self._config, "llm_max_in_flight", 16)))
+        if max_in_flight > 0:
+            from ankismart.card_gen.llm_scheduler import LLMRequestScheduler
+
+            # Page and line corrections of a document are sent concurrently on one loop.
+            correction_client = LLMRequestScheduler(
+                llm_client.as_async(),
+                max_in_flight=max_in_flight,
+                cancel_token=self._cancel_token(),
+            )
+            self._ocr_correction_scheduler = correction_client
+        generator = CardGenerator(correction_client)
         self._ocr_correction_fn = generator.correct_ocr_text
         return self._ocr_correction_fn
 
     def _close_ocr_correction_client(self) -> None:
+        scheduler = self.__dict__.get("_ocr_correction_scheduler")
+        self.__dict__["_ocr_correction_scheduler"] = None
+        _close_client_safely(scheduler, context="ocr correction scheduler cleanup")
         client = self.__dict__.get("_ocr_correction_client")
         self.__dict__["_ocr_correction_client"] = None
         self._ocr_correction_fn = None
@@ -1041,7 +1106,15 @@ class BatchConvertWorker(QThread):
                 def progress_callback(*args):
                     self._forward_progress_callback("图片合集", *args)
 
-                result = converter.convert(temp_pdf_path, progress_callback=progress_callback)
+                try:
+                    result = converter.convert(
+                        temp_pdf_path,
+                        progress_callback=progress_callback,
+                        cancel_token=self._cancel_token(),
+                    )
+                except OperationCancelledError as exc:
+                    self._report_cancelled_conversion("图片合集", exc)
+                    return None
 
                 # Update source path to indicate it's from merged images
                 result.source_path = "图片合集"
@@ -1092,7 +1165,15 @@ class BatchConvertWorker(QThread):
                 def progress_callback(*args):
                     self._forward_progress_callback(file_path.name, *args)
 
-                return converter.convert(file_path, progress_callback=progress_callback)
+                return converter.convert(
+                    file_path,
+                    progress_callback=progress_callback,
+                    cancel_token=self._cancel_token(),
+                )
+            except OperationCancelledError as exc:
+                # Never retry a user cancel; finished OCR pages stay in the page cache.
+                self._report_cancelled_conversion(file_path.name, exc)
+                return None
             except Exception as exc:
                 last_error = exc
                 logger.warning(
@@ -1118,9 +1199,10 @@ class BatchGenerateWorker(QThread):
 
     progress = pyqtSignal(str)
     warning = pyqtSignal(str)
+    usage_estimated = pyqtSignal(object)  # UsageEstimate, before any request is sent
     card_progress = pyqtSignal(int, int)  # current, total
     document_completed = pyqtSignal(str, int)  # document_name, cards_count
-    finished = pyqtSignal(list)  # list[CardDraft]
+    finished = pyqtSignal(object)  # CardStore
     error = pyqtSignal(str)
     cancelled = pyqtSignal()
 
@@ -1152,8 +1234,18 @@ class BatchGenerateWorker(QThread):
         self._semantic_duplicate_threshold = min(1.0, max(0.6, threshold))
         self._card_quality_min_chars = int(getattr(config, "card_quality_min_chars", 2))
         self._card_quality_retry_rounds = int(getattr(config, "card_quality_retry_rounds", 2))
+        self._combined_generation = bool(getattr(config, "combined_strategy_generation", True))
+        self._deck_aware_generation = bool(
+            getattr(config, "deck_aware_generation", False)
+        ) and not bool(getattr(config, "allow_duplicate", False))
+        self._streaming = bool(getattr(config, "llm_streaming", True))
         self._adaptive_enabled = bool(getattr(config, "llm_adaptive_concurrency", True))
         self._concurrency_cap = int(getattr(config, "llm_concurrency_max", 6))
+        try:
+            self._max_in_flight = max(0, int(getattr(config, "llm_max_in_flight", 16)))
+        except (TypeError, ValueError):
+            self._max_in_flight = 16
+        self._llm_scheduler = None
         try:
             self._generation_error_max_attempts = max(
                 1, int(getattr(config, "generation_error_max_attempts", 3) or 3)
@@ -1170,6 +1262,9 @@ class BatchGenerateWorker(QThread):
         if cancel_event is not None:
             cancel_event.set()
         self._cancelled = True
+        scheduler = self.__dict__.get("_llm_scheduler")
+        if scheduler is not None:
+            scheduler.cancel_pending()
 
     def _is_cancelled(self) -> bool:
         cancel_event = self.__dict__.get("_cancel_event")
@@ -1180,12 +1275,16 @@ class BatchGenerateWorker(QThread):
         import concurrent.futures
         import time
 
+        from ankismart.card_gen.near_duplicates import NearDuplicateIndex
+
         try:
             self._start_time = time.time()
 
             # Extract configuration
             raw_target_total = self._generation_config.get("target_total", 20)
             auto_target_count = bool(self._generation_config.get("auto_target_count", False))
+            # Regeneration must not replay the cached responses it is meant to replace.
+            fresh_responses = bool(self._generation_config.get("fresh_responses", False))
             strategy_mix = self._generation_config.get("strategy_mix", [])
             configured_workers = getattr(self._config, "llm_concurrency", 2) if self._config else 2
             try:
@@ -1248,26 +1347,87 @@ class BatchGenerateWorker(QThread):
                 self.error.emit("Failed to allocate strategy counts")
                 return
 
-            # Step 2: Distribute work across documents
-            if auto_target_count:
-                per_doc_allocations = [dict(strategy_counts) for _ in self._documents]
-            else:
-                per_doc_allocations = self._distribute_counts_per_document(
-                    len(self._documents), strategy_counts
-                )
+            # Step 2: Distribute work across documents. Sections repeated across documents
+            # are generated once and attributed to every document that contains them.
+            work_documents, work_sources = self._plan_generation_documents()
+            # Card source spans point into the stored documents, not the deduplicated units.
+            source_contents = {
+                document.file_name: document.result.content for document in self._documents
+            }
+            per_doc_allocations = self._allocate_work_items(
+                work_documents, work_sources, strategy_counts, auto_target_count=auto_target_count
+            )
+
+            # Project the batch's token usage from the split plan and stop before dispatch
+            # when it would exceed the configured budget.
+            usage_estimate = self._estimate_batch_usage(
+                work_documents, per_doc_allocations, auto_target_count=auto_target_count
+            )
+            if usage_estimate is not None:
+                self.usage_estimated.emit(usage_estimate)
+                budget_message = self._budget_overrun_message(usage_estimate)
+                if budget_message:
+                    self.error.emit(budget_message)
+                    return
+            usage_before = self._trace_usage_snapshot(work_documents)
+
+            existing_notes = self._load_existing_notes_index()
 
-            # Step 3: Generate cards concurrently for each document
-            all_cards: list[CardDraft] = []
+            # Step 3: Generate cards concurrently for each document. Requests from every
+            # document share one async scheduler instead of one blocking call per thread.
+            scheduler = self._open_llm_scheduler()
+            generation_client = scheduler or self._llm_client
+            generator_kwargs = (
+                {"chunk_concurrency": scheduler.max_in_flight} if scheduler is not None else {}
+            )
+            streaming = self._streaming and callable(
+                getattr(generation_client, "chat_stream", None)
+            )
+            # Accepted cards are encoded as they arrive, so large batches stay compact.
+            all_cards = CardStore()
             total_cards_to_generate = 0 if auto_target_count else sum(strategy_counts.values())
             cards_generated = 0
+            # Streamed cards not yet settled by the quality filters; they advance the
+            # progress signal while a response is still arriving.
+            streamed_pending = 0
             cards_lock = threading.Lock()
+
+            def emit_card_progress() -> None:
+                # Caller holds cards_lock.
+                current = cards_generated + streamed_pending
+                if total_cards_to_generate > 0:
+                    current = min(current, total_cards_to_generate)
+                self.card_progress.emit(current, total_cards_to_generate)
+
             first_error_message = [None]
             first_error_lock = threading.Lock()
             runtime_warning_requested = threading.Event()
+            # A source document is complete once every unit carrying its content is done.
+            pending_units: dict[str, int] = {}
+            for sources in work_sources:
+                for name in sources:
+                    pending_units[name] = pending_units.get(name, 0) + 1
+            source_card_counts: dict[str, int] = dict.fromkeys(pending_units, 0)
 
             def generate_for_document(doc_idx: int, document: ConvertedDocument) -> list[CardDraft]:
-                """Generate cards for a single document."""
-                nonlocal cards_generated
+                """Generate one unit, then report the source documents it completes."""
+                doc_cards = generate_work_unit(doc_idx, document)
+                if self._is_cancelled():
+                    return doc_cards
+                completed: list[tuple[str, int]] = []
+                with cards_lock:
+                    for name in work_sources[doc_idx]:
+                        source_card_counts[name] += len(doc_cards)
+                        pending_units[name] -= 1
+                        if pending_units[name] == 0 and source_card_counts[name]:
+                            completed.append((name, source_card_counts[name]))
+                for name, count in completed:
+                    self.document_completed.emit(name, count)
+                return doc_cards
+
+            def generate_work_unit(doc_idx: int, document: ConvertedDocument) -> list[CardDraft]:
+                """Generate cards for a single document or shared unit."""
+                nonlocal cards_generated, streamed_pending
 
                 if self._is_cancelled():
                     return []
@@ -1276,13 +1436,69 @@ class BatchGenerateWorker(QThread):
                 if not allocation:
                     return []
 
-                self.progress.emit(
-                    f"正在为 {document.file_name} 生成卡片 ({doc_idx + 1}/{len(self._documents)})"
-                )
+                if len(work_sources[doc_idx]) > 1:
+                    self.progress.emit(
+                        f"正在为 {'、'.join(work_sources[doc_idx])} 的共享章节生成卡片 "
+                        f"({doc_idx + 1}/{len(work_documents)})"
+                    )
+                else:
+                    self.progress.emit(
+                        f"正在为 {document.file_name} 生成卡片 "
+                        f"({doc_idx + 1}/{len(work_documents)})"
+                    )
 
                 doc_cards: list[CardDraft] = []
-                accepted_questions: list[str] = []
-                generator = CardGenerator(self._llm_client)
+                accepted_questions = NearDuplicateIndex(self._semantic_duplicate_threshold)
+                doc_streamed = 0
+
+                def on_streamed_cards(drafts: list[CardDraft]) -> None:
+                    nonlocal doc_streamed, streamed_pending
+                    with cards_lock:
+                        doc_streamed += len(drafts)
+                        streamed_pending += len(drafts)
+                        emit_card_progress()
+
+                stream_kwargs = {"stream": True, "on_cards": on_streamed_cards} if streaming else {}
+                generator = CardGenerator(generation_client, **generator_kwargs, **stream_kwargs)
+
+                def accept_cards(
+                    round_cards: list[CardDraft], accepted: list[CardDraft], limit: int
+                ) -> tuple[int, int]:
+                    """Apply quality and near-duplicate filters, appending survivors."""
+                    rejected_quality = 0
+                    rejected_duplicate = 0
+                    for card in round_cards:
+                        issue = _card_quality_issue(
+                            card, min_chars=max(1, self._card_quality_min_chars)
+                        )
+                        if issue is not None:
+                            rejected_quality += 1
+                            continue
+
+                        question = _extract_question_text(card)
+                        if accepted_questions.contains_similar(question):
+                            rejected_duplicate += 1
+                            continue
+                        if existing_notes is not None and existing_notes.contains_similar(question):
+                            rejected_duplicate += 1
+                            metrics.increment("batch_generate_existing_note_duplicates_total")
+                            continue
+
+                        accepted.append(card)
+                        accepted_questions.add(len(accepted_questions), question)
+                        if limit > 0 and len(accepted) >= limit:
+                            break
+                    return rejected_quality, rejected_duplicate
+
+                # One combined request covers every strategy first; per-strategy calls
+                # below only top up the strategies that came back short.
+                combined_results = self._generate_combined(
+                    generator,
+                    document,
+                    allocation,
+                    auto_target_count=auto_target_count,
+                    use_response_cache=not fresh_responses,
+                )
 
                 # Generate cards for each strategy in this document's allocation
                 for strategy, count in allocation.items():
@@ -1306,12 +1522,22 @@ class BatchGenerateWorker(QThread):
                         1 if auto_target_count else max(1, self._card_quality_retry_rounds + 1)
                     )
                     rounds_used = 0
+                    limit = 0 if auto_target_count else count
+                    combined_cards = combined_results.get(strategy, [])
+                    if combined_cards:
+                        rejected_quality, rejected_duplicate = accept_cards(
+                            combined_cards, accepted_for_strategy, limit
+                        )
 
                     while rounds_used < max_rounds and (
-                        auto_target_count or len(accepted_for_strategy) < count
+                        (auto_target_count and not combined_cards)
+                        or (not auto_target_count and len(accepted_for_strategy) < count)
                     ):
                         rounds_used += 1
-                        remaining = 0 if auto_target_count else count - len(accepted_for_strategy)
+                        # In auto mode ``count`` is only a size hint (zero: decide from density).
+                        remaining = (
+                            count if auto_target_count else count - len(accepted_for_strategy)
+                        )
                         request = GenerateRequest(
                             markdown=document.result.content,
                             strategy=strategy,
@@ -1323,16 +1549,24 @@ class BatchGenerateWorker(QThread):
                             auto_target_count=auto_target_count,
                             enable_auto_split=self._enable_auto_split,
                             split_threshold=self._split_threshold,
+                            # Retry rounds only ask for the shortfall and name what exists.
+                            accepted_questions=_accepted_questions_by_chunk(accepted_for_strategy),
+                            # A repeated prompt would otherwise replay the rejected answer.
+                            use_response_cache=not fresh_responses and rounds_used == 1,
                         )
                         round_cards: list[CardDraft] = []
                         generation_failed = False
                         for attempt in range(1, self._generation_error_max_attempts + 1):
                             if self._is_cancelled():
                                 return doc_cards
+                            if attempt > 1 and request.use_response_cache:
+                                request = request.model_copy(update={"use_response_cache": False})
                             try:
                                 round_cards = generator.generate(request)
                                 generation_failed = False
                                 break
+                            except OperationCancelledError:
+                                return doc_cards
                             except Exception as e:
                                 self._mark_runtime_error(e)
                                 if attempt < self._generation_error_max_attempts:
@@ -1396,27 +1630,11 @@ class BatchGenerateWorker(QThread):
                         if not round_cards:
                             continue
 
-                        for card in round_cards:
-                            issue = _card_quality_issue(
-                                card, min_chars=max(1, self._card_quality_min_chars)
-                            )
-                            if issue is not None:
-                                rejected_quality += 1
-                                continue
-
-                            question = _extract_question_text(card)
-                            if _is_semantic_duplicate(
-                                question,
-                                accepted_questions,
-                                threshold=self._semantic_duplicate_threshold,
-                            ):
-                                rejected_duplicate += 1
-                                continue
-
-                            accepted_for_strategy.append(card)
-                            accepted_questions.append(question)
-                            if not auto_target_count and len(accepted_for_strategy) >= count:
-                                break
+                        round_quality, round_duplicate = accept_cards(
+                            round_cards, accepted_for_strategy, limit
+                        )
+                        rejected_quality += round_quality
+                        rejected_duplicate += round_duplicate
 
                     if rejected_quality or rejected_duplicate:
                         self.progress.emit(
@@ -1429,19 +1647,30 @@ class BatchGenerateWorker(QThread):
                             f"目标 {count} 张，实际 {len(accepted_for_strategy)} 张"
                         )
 
+                    if len(work_sources[doc_idx]) > 1:
+                        for card in accepted_for_strategy:
+                            card.metadata.source_documents = list(work_sources[doc_idx])
+                    source_text = source_contents.get(work_sources[doc_idx][0])
+                    if source_text is not None and source_text != document.result.content:
+                        _rebase_source_spans(
+                            accepted_for_strategy, document.result.content, source_text
+                        )
                     doc_cards.extend(accepted_for_strategy)
                     with cards_lock:
                         cards_generated += len(accepted_for_strategy)
-                        self.card_progress.emit(cards_generated, total_cards_to_generate)
+                        settled = min(doc_streamed, len(accepted_for_strategy))
+                        doc_streamed -= settled
+                        streamed_pending -= settled
+                        emit_card_progress()
 
-                # Emit document completion signal
-                if doc_cards:
-                    self.document_completed.emit(document.file_name, len(doc_cards))
+                with cards_lock:
+                    streamed_pending -= doc_streamed
+                    doc_streamed = 0
 
                 return doc_cards
 
             if max_workers <= 1:
-                for idx, doc in enumerate(self._documents):
+                for idx, doc in enumerate(work_documents):
                     if self._is_cancelled():
                         self.cancelled.emit()
                         return
@@ -1474,7 +1703,7 @@ class BatchGenerateWorker(QThread):
                     # Submit all document generation tasks
                     future_to_doc = {
                         executor.submit(generate_for_document, idx, doc): (idx, doc)
-                        for idx, doc in enumerate(self._documents)
+                        for idx, doc in enumerate(work_documents)
                     }
 
                     # Collect results as they complete
@@ -1527,6 +1756,9 @@ class BatchGenerateWorker(QThread):
                 had_error=first_error_message[0] is not None,
             )
 
+            if usage_estimate is not None:
+                self._record_usage_actuals(work_documents, usage_estimate, usage_before)
+
             # Update statistics
             if self._config and all_cards:
                 elapsed_time = time.time() - self._start_time
@@ -1574,7 +1806,43 @@ class BatchGenerateWorker(QThread):
         if "timeout" in message or "timed out" in message:
             self._timeout_events += 1
 
+    def _open_llm_scheduler(self) -> LLMRequestScheduler | None:
+        from ankismart.card_gen.llm_client import LLMClient
+        from ankismart.card_gen.llm_router import LLMRouter
+
+        max_in_flight = int(self.__dict__.get("_max_in_flight", 0) or 0)
+        if max_in_flight <= 0 or not isinstance(self._llm_client, LLMClient | LLMRouter):
+            return None
+
+        from ankismart.card_gen.llm_scheduler import LLMRequestScheduler
+
+        # The adaptive window starts from the configured concurrency and is bounded by
+        # ``llm_concurrency_max``; without it the scheduler runs at a fixed bound.
+        adaptive = bool(self.__dict__.get("_adaptive_enabled", False))
+        initial_in_flight = None
+        if adaptive:
+            max_in_flight = min(max_in_flight, max(1, int(self._concurrency_cap or 1)))
+            configured = getattr(self._config, "llm_concurrency", 0) if self._config else 0
+            try:
+                initial_in_flight = int(configured) if int(configured) > 0 else None
+            except (TypeError, ValueError):
+                initial_in_flight = None
+
+        cancel_event = self.__dict__.get("_cancel_event")
+        scheduler = LLMRequestScheduler(
+            self._llm_client.as_async(),
+            max_in_flight=max_in_flight,
+            cancel_token=CancellationToken(cancel_event) if cancel_event is not None else None,
+            adaptive=adaptive,
+            initial_in_flight=initial_in_flight,
+        )
+        self._llm_scheduler = scheduler
+        return scheduler
+
     def _close_llm_client(self) -> None:
+        scheduler = self.__dict__.get("_llm_scheduler")
+        self.__dict__["_llm_scheduler"] = None
+        _close_client_safely(scheduler, context="batch generation scheduler cleanup")
         client = self.__dict__.get("_llm_client")
         self.__dict__["_llm_client"] = None
         _close_client_safely(client, context="batch generation cleanup")
@@ -1663,7 +1931,12 @@ class BatchGenerateWorker(QThread):
             return
 
         next_value = current
-        if self._throttle_events > 0 or self._timeout_events > 0:
+        scheduler = self.__dict__.get("_llm_scheduler")
+        if scheduler is not None:
+            # The scheduler adapted per request during the run; start the next run from
+            # the window it settled on.
+            next_value = max(1, min(max(1, self._concurrency_cap), scheduler.concurrency_limit))
+        elif self._throttle_events > 0 or self._timeout_events > 0:
             next_value = max(1, current - 1)
         elif not had_error:
             next_value = min(max(1, self._concurrency_cap), current + 1)
@@ -1764,6 +2037,411 @@ class BatchGenerateWorker(QThread):
 
         return counts
 
+    def _generate_combined(
+        self,
+        generator: CardGenerator,
+        document: ConvertedDocument,
+        allocation: dict[str, int],
+        *,
+        auto_target_count: bool,
+        use_response_cache: bool = True,
+    ) -> dict[str, list[CardDraft]]:
+        """Request every strategy of ``allocation`` at once; ``{}`` means fall back."""
+        strategies = {
+            strategy: count
+            for strategy, count in allocation.items()
+            if count > 0 or auto_target_count
+        }
+        enabled = bool(self.__dict__.get("_combined_generation", False))
+        if not enabled or len(strategies) < 2 or self._is_cancelled():
+            return {}
+
+        request = GenerateRequest(
+            markdown=document.result.content,
+            strategy=next(iter(strategies)),
+            deck_name=self._deck_name,
+            tags=self._tags,
+            trace_id=document.result.trace_id,
+            source_path=document.result.source_path,
+            target_count=sum(strategies.values()),
+            auto_target_count=auto_target_count,
+            enable_auto_split=self._enable_auto_split,
+            split_threshold=self._split_threshold,
+            use_response_cache=use_response_cache,
+        )
+        self.progress.emit(f"正在从 {document.file_name} 一次生成 {len(strategies)} 类卡片")
+        try:
+            results = generator.generate_multi(request, strategies)
+        except OperationCancelledError:
+            return {}
+        except Exception as exc:
+            metrics.increment("batch_generate_combined_fallback_total")
+            logger.warning(
+                "combined strategy generation failed, falling back to per-strategy requests",
+                extra={
+                    "event": "worker.batch_generate.combined_failed",
+                    "file_name": document.file_name,
+                    "strategies": list(strategies),
+                    "error_detail": str(exc),
+                },
+            )
+            return {}
+        return {strategy: list(results.get(strategy, [])) for strategy in strategies}
+
+    def _config_number(self, name: str, default: float = 0.0) -> float:
+        try:
+            return float(getattr(self._config, name, default) or default)
+        except (TypeError, ValueError):
+            return default
+
+    def _estimate_batch_usage(
+        self,
+        documents: list[ConvertedDocument],
+        allocations: list[dict[str, int]],
+        *,
+        auto_target_count: bool,
+    ) -> UsageEstimate | None:
+        """Plan every document's requests the way ``run`` dispatches them and total them.
+
+        Combined generation is one request per chunk; otherwise each strategy is a request
+        per chunk. Quality top-up rounds are not planned, the calibration learned from
+        earlier batches covers them. Returns None when the plan cannot be built.
+        """
+        from ankismart.card_gen.usage_estimate import (
+            TokenPricing,
+            calibration_factors,
+            summarize_usage,
+        )
+
+        try:
+            generator = CardGenerator(self._llm_client)
+            combined = bool(self.__dict__.get("_combined_generation", False))
+            planned = []
+            for document, allocation in zip(documents, allocations, strict=True):
+                strategies = {
+                    strategy: count
+                    for strategy, count in allocation.items()
+                    if count > 0 or auto_target_count
+                }
+                if not strategies:
+                    continue
+                request = GenerateRequest(
+                    markdown=document.result.content,
+                    strategy=next(iter(strategies)),
+                    deck_name=self._deck_name,
+                    tags=self._tags,
+                    trace_id=document.result.trace_id,
+                    source_path=document.result.source_path,
+                    target_count=sum(strategies.values()),
+                    auto_target_count=auto_target_count,
+                    enable_auto_split=self._enable_auto_split,
+                    split_threshold=self._split_threshold,
+                )
+                if combined and len(strategies) > 1:
+                    planned.extend(
+                        generator.estimate_usage(request, strategies, document=document.file_name)
+                    )
+                    continue
+                for strategy, count in strategies.items():
+                    planned.extend(
+                        generator.estimate_usage(
+                            request.model_copy(
+                                update={"strategy": strategy, "target_count": count}
+                            ),
+                            document=document.file_name,
+                        )
+                    )
+            samples = getattr(self._config, "llm_usage_calibration", None) or []
+            estimate = summarize_usage(
+                planned,
+                pricing=TokenPricing(
+                    prompt_per_1k=self._config_number("llm_cost_per_1k_prompt_tokens"),
+                    completion_per_1k=self._config_number("llm_cost_per_1k_completion_tokens"),
+                ),
+                calibration=calibration_factors(samples if isinstance(samples, list) else []),
+            )
+        except Exception as exc:
+            logger.warning(
+                "batch usage estimation failed",
+                extra={"event": "worker.batch_generate.estimate_failed", "error_detail": str(exc)},
+            )
+            return None
+
+        metrics.set_gauge("batch_generate_estimated_prompt_tokens", estimate.prompt_tokens)
+        metrics.set_gauge("batch_generate_estimated_completion_tokens", estimate.completion_tokens)
+        logger.info(
+            "batch usage estimated",
+            extra={
+                "event": "worker.batch_generate.usage_estimated",
+                "requests": len(estimate.requests),
+                "prompt_tokens": estimate.prompt_tokens,
+                "completion_tokens": estimate.completion_tokens,
+                "estimated_cost": round(estimate.cost, 6),
+            },
+        )
+        return estimate
+
+    def _budget_overrun_message(self, estimate: UsageEstimate) -> str:
+        """UI message when ``estimate`` exceeds a configured batch budget, else ``""``."""
+        from ankismart.card_gen.usage_estimate import budget_overrun
+
+        token_budget = int(self._config_number("llm_batch_token_budget"))
+        cost_budget = self._config_number("llm_batch_cost_budget")
+        exceeded = budget_overrun(estimate, token_budget=token_budget, cost_budget=cost_budget)
+        if not exceeded:
+            return ""
+
+        metrics.increment("batch_generate_budget_blocked_total")
+        logger.warning(
+            "batch generation blocked by budget",
+            extra={
+                "event": "worker.batch_generate.budget_exceeded",
+                "budget": exceeded,
+                "estimated_tokens": estimate.total_tokens,
+                "token_budget": token_budget,
+                "estimated_cost": round(estimate.cost, 6),
+                "cost_budget": cost_budget,
+            },
+        )
+        is_zh = str(getattr(self._config, "language", "zh")).strip().lower().startswith("zh")
+        if exceeded == "tokens":
+            return (
+                f"预计消耗 {estimate.total_tokens} tokens，"
+                f"超过单批预算 {token_budget}，已停止生成。"
+                if is_zh
+                else (
+                    f"Projected usage of {estimate.total_tokens} tokens exceeds the batch "
+                    f"budget of {token_budget} tokens; generation was not started."
+                )
+            )
+        return (
+            f"预计费用 {estimate.cost:.4f}，超过单批预算 {cost_budget:.4f}，已停止生成。"
+            if is_zh
+            else (
+                f"Projected cost of {estimate.cost:.4f} exceeds the batch budget of "
+                f"{cost_budget:.4f}; generation was not started."
+            )
+        )
+
+    @staticmethod
+    def _trace_usage_snapshot(documents: list[ConvertedDocument]) -> dict[str, tuple[int, int]]:
+        from ankismart.card_gen.llm_client import trace_usage
+
+        return {
+            document.result.trace_id: trace_usage(document.result.trace_id)
+            for document in documents
+            if document.result.trace_id
+        }
+
+    def _record_usage_actuals(
+        self,
+        documents: list[ConvertedDocument],
+        estimate: UsageEstimate,
+        usage_before: dict[str, tuple[int, int]],
+    ) -> None:
+        """Compare each document's billed tokens with its estimate and keep the samples.
+
+        Documents are matched to their usage by trace id; documents that share a trace id
+        are recorded together. Fully cached documents bill nothing and are skipped, so
+        cache hits do not drag the calibration down.
+        """
+        from ankismart.card_gen.llm_client import trace_usage
+        from ankismart.card_gen.usage_estimate import append_calibration_sample
+
+        estimated_by_document = estimate.by_document()
+        groups: dict[str, list[str]] = {}
+        for document in documents:
+            if document.result.trace_id and document.file_name in estimated_by_document:
+                groups.setdefault(document.result.trace_id, []).append(document.file_name)
+
+        samples = getattr(self._config, "llm_usage_calibration", None)
+        samples = list(samples) if isinstance(samples, list) else []
+        recorded = 0
+        for trace_id, names in groups.items():
+            before_prompt, before_completion = usage_before.get(trace_id, (0, 0))
+            after_prompt, after_completion = trace_usage(trace_id)
+            actual = (after_prompt - before_prompt, after_completion - before_completion)
+            if actual[0] <= 0:
+                continue
+            estimated = (
+                sum(estimated_by_document[name][0] for name in names),
+                sum(estimated_by_document[name][1] for name in names),
+            )
+            logger.info(
+                "document usage recorded",
+                extra={
+                    "event": "worker.batch_generate.usage_actual",
+                    "trace_id": trace_id,
+                    "file_name": ", ".join(names),
+                    "estimated_prompt_tokens": estimated[0],
+                    "estimated_completion_tokens": estimated[1],
+                    "actual_prompt_tokens": actual[0],
+                    "actual_completion_tokens": actual[1],
+                },
+            )
+            samples = append_calibration_sample(
+                samples, document=", ".join(names), estimated=estimated, actual=actual
+            )
+            recorded += 1
+
+        if recorded and self._config is not None:
+            # Persisted with the run statistics by ``_persist_generation_metrics``.
+            self._config.llm_usage_calibration = samples
+
+    def _load_existing_notes_index(self) -> Any:
+        """Index the target deck's existing notes, or None when unavailable or disabled."""
+        if not self._deck_aware_generation or self._config is None:
+            return None
+        from ankismart.card_gen.existing_notes import (
+            deck_search_query,
+            shared_existing_notes_index,
+        )
+
+        anki_url = str(getattr(self._config, "anki_connect_url", "") or "")
+        if not anki_url:
+            return None
+        query = deck_search_query(
+            self._deck_name, str(getattr(self._config, "duplicate_scope", "deck") or "deck")
+        )
+        index = shared_existing_notes_index(
+            anki_url=anki_url, query=query, threshold=self._semantic_duplicate_threshold
+        )
+        try:
+            client_class, _, _ = _load_anki_gateway_types()
+            client = client_class(
+                url=anki_url,
+                key=str(getattr(self._config, "anki_connect_key", "") or ""),
+                proxy_url=str(getattr(self._config, "proxy_url", "") or ""),
+            )
+            index.refresh(client)
+        except (AnkiSmartError, OSError) as exc:
+            # Anki may be closed (e.g. when exporting .apkg); generation goes on unfiltered.
+            logger.warning(
+                "existing notes unavailable, skipping deck-aware filtering",
+                extra={"event": "worker.batch_generate.existing_notes_unavailable"},
+            )
+            logger.debug(f"existing notes refresh failed: {exc}")
+            return None
+        return index
+
+    def _plan_generation_documents(
+        self,
+    ) -> tuple[list[ConvertedDocument], list[tuple[str, ...]]]:
+        """Return generation units and the documents each unit's cards belong to."""
+        from ankismart.card_gen.section_dedup import plan_cross_document_dedup
+
+        documents = list(self._documents)
+        sources = [(document.file_name,) for document in documents]
+        enabled = bool(getattr(self._config, "cross_document_dedup", True))
+        if not enabled or len(documents) < 2:
+            return documents, sources
+
+        plan = plan_cross_document_dedup(
+            [(document.file_name, document.result.content) for document in documents]
+        )
+        if not plan.shared_sections:
+            return documents, sources
+
+        work_documents: list[ConvertedDocument] = []
+        work_sources: list[tuple[str, ...]] = []
+        for item in plan.items:
+            owner = documents[item.document_index]
+            work_documents.append(
+                ConvertedDocument(
+                    result=owner.result.model_copy(update={"content": item.markdown}),
+                    file_name=owner.file_name,
+                )
+            )
+            work_sources.append(item.source_documents)
+
+        metrics.increment("batch_generate_dedup_sections_total", value=plan.shared_sections)
+        metrics.increment(
+            "batch_generate_dedup_tokens_saved_total", value=plan.duplicate_tokens_skipped
+        )
+        logger.info(
+            "cross-document duplicate sections merged",
+            extra={
+                "event": "worker.batch_generate.dedup",
+                "documents_count": len(documents),
+                "work_items": len(work_documents),
+                "shared_sections": plan.shared_sections,
+                "chars_skipped": plan.duplicate_chars_skipped,
+                "tokens_skipped": plan.duplicate_tokens_skipped,
+            },
+        )
+        self.progress.emit(
+            f"检测到 {plan.shared_sections} 个跨文档重复章节，仅生成一次"
+            f"（节省约 {plan.duplicate_tokens_skipped} tokens）"
+        )
+        return work_documents, work_sources
+
+    def _allocate_work_items(
+        self,
+        work_documents: list[ConvertedDocument],
+        work_sources: list[tuple[str, ...]],
+        strategy_counts: dict[str, int],
+        *,
+        auto_target_count: bool,
+    ) -> list[dict[str, int]]:
+        """Strategy counts per generation unit.
+
+        Without shared units, fixed targets are spread evenly across documents and auto
+        mode leaves every count at zero so the generator decides from content density.
+        Once shared sections are split out, each document's allocation is divided between
+        its own remainder and the shared units it contains in proportion to their tokens.
+        A shared unit sums the shares of its documents in fixed mode, keeping the batch
+        total; in auto mode the allocation is a density hint and the shared unit takes the
+        largest share, since content generated once yields its cards once.
+        """
+        if not any(len(sources) > 1 for sources in work_sources):
+            if auto_target_count:
+                return [dict(strategy_counts) for _ in work_documents]
+            return self._distribute_counts_per_document(len(work_documents), strategy_counts)
+
+        from ankismart.card_gen.generator import (
+            expected_auto_card_count,
+            largest_remainder_split,
+        )
+        from ankismart.card_gen.tokens import estimate_tokens
+
+        documents = list(self._documents)
+        if auto_target_count:
+            document_allocations = [
+                {
+                    strategy: expected_auto_card_count(len(document.result.content))
+                    for strategy in strategy_counts
+                }
+                for document in documents
+            ]
+        else:
+            document_allocations = self._distribute_counts_per_document(
+                len(documents), strategy_counts
+            )
+
+        weights = [max(1, estimate_tokens(unit.result.content)) for unit in work_documents]
+        allocations: list[dict[str, int]] = [{} for _ in work_documents]
+        for document, document_allocation in zip(documents, document_allocations, strict=True):
+            units = [
+                index for index, sources in enumerate(work_sources) if document.file_name in sources
+            ]
+            if not units:
+                continue
+            for strategy, count in document_allocation.items():
+                shares = largest_remainder_split(count, [weights[index] for index in units])
+                for index, share in zip(units, shares, strict=True):
+                    current = allocations[index].get(strategy, 0)
+                    combined = max(current, share) if auto_target_count else current + share
+                    if combined > 0:
+                        allocations[index][strategy] = combined
+
+        if auto_target_count:
+            # Every unit still runs every enabled strategy; zero falls back to density.
+            return [
+                {strategy: allocation.get(strategy, 0) for strategy in strategy_counts}
+                for allocation in allocations
+            ]
+        return allocations
+
     @staticmethod
     def _distribute_counts_per_document(
         total_docs: int,
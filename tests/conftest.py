@@ -25,6 +25,13 @@ def _teardown_test_window(window: QWidget, app: QApplication) -> None:
     app.processEvents()
 
 
+@pytest.fixture(autouse=True)
+def _isolated_llm_response_cache(tmp_path_factory, monkeypatch) -> None:
+    """Keep LLM response caches out of the working tree and apart between tests."""
+    cache_dir = tmp_path_factory.mktemp("llm_cache")
+    monkeypatch.setenv("ANKISMART_LLM_CACHE_DB_PATH", str(cache_dir / "llm_responses.sqlite3"))
+
+
 @pytest.fixture(scope="session")
 def qapp() -> QApplication:
     app = QApplication.instance()
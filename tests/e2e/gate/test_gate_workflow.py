@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import time
 from pathlib import Path
 
@@ -28,15 +29,42 @@ def _wait_until(predicate, timeout: float = 20.0) -> None:
     raise AssertionError("timeout waiting for condition")
 
 
-@pytest.fixture
-def patch_gate_dependencies(monkeypatch):
-    records = {"notes_added": []}
+def _patch_llm_response(monkeypatch, response: str) -> None:
+    """Answer every chat request, whether sent directly or through the batch scheduler."""
+
+    def _reply(response_format) -> str:
+        # JSON schema requests expect the cards wrapped in an object.
+        if response_format is None:
+            return response
+        return json.dumps({"cards": json.loads(response)})
+
+    async def _async_chat(self, system_prompt, user_prompt, timeout=None, *, response_format=None):
+        return _reply(response_format)
+
+    async def _async_chat_stream(
+        self, system_prompt, user_prompt, timeout=None, *, on_text=None, response_format=None
+    ):
+        reply = _reply(response_format)
+        if on_text is not None:
+            on_text(reply)
+        return reply
 
     monkeypatch.setattr(
         "ankismart.card_gen.llm_client.LLMClient.chat",
-        lambda self, system_prompt, user_prompt: '[{"Front":"Gate Q","Back":"Gate A"}]',
+        lambda self, system_prompt, user_prompt: response,
+    )
+    monkeypatch.setattr("ankismart.card_gen.async_llm_client.AsyncLLMClient.chat", _async_chat)
+    monkeypatch.setattr(
+        "ankismart.card_gen.async_llm_client.AsyncLLMClient.chat_stream", _async_chat_stream
     )
 
+
+@pytest.fixture
+def patch_gate_dependencies(monkeypatch):
+    records = {"notes_added": []}
+
+    _patch_llm_response(monkeypatch, '[{"Front":"Gate Q","Back":"Gate A"}]')
+
     monkeypatch.setattr(
         "ankismart.anki_gateway.client.AnkiConnectClient.get_deck_names",
         lambda self: ["Default", "E2EDeck"],
@@ -95,10 +123,7 @@ def test_gate_real_main_workflow_success(window, e2e_files, patch_gate_dependenc
 @pytest.mark.gate
 @pytest.mark.gate_real
 def test_gate_real_push_failure_then_export_apkg(window, e2e_files, tmp_path: Path, monkeypatch):
-    monkeypatch.setattr(
-        "ankismart.card_gen.llm_client.LLMClient.chat",
-        lambda self, system_prompt, user_prompt: '[{"Front":"Fallback Q","Back":"Fallback A"}]',
-    )
+    _patch_llm_response(monkeypatch, '[{"Front":"Fallback Q","Back":"Fallback A"}]')
     monkeypatch.setattr(
         "ankismart.anki_gateway.client.AnkiConnectClient.get_deck_names",
         lambda self: ["Default"],
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import time
 from pathlib import Path
 from types import SimpleNamespace
@@ -124,8 +125,36 @@ def test_e2e_error_net_006_timeout_and_429_retry_then_recover(
         def close(self):
             return None
 
+    async def _fake_async_completion_create(**kwargs):
+        response = _fake_completion_create(**kwargs)
+        content = response.choices[0].message.content
+        if "response_format" in kwargs:
+            content = json.dumps({"cards": json.loads(content)})
+        if not kwargs.get("stream"):
+            response.choices[0].message.content = content
+            return response
+
+        async def _chunks():
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=None
+            )
+
+        return _chunks()
+
+    class _FakeAsyncOpenAI:
+        def __init__(self, **kwargs):
+            self.chat = SimpleNamespace(
+                completions=SimpleNamespace(create=_fake_async_completion_create)
+            )
+
+        async def close(self):
+            return None
+
+    # Batch generation sends requests through the async scheduler; both clients share
+    # the retry policy, so a zero base delay skips the backoff sleeps in either.
     monkeypatch.setattr("ankismart.card_gen.llm_client.OpenAI", _FakeOpenAI)
-    monkeypatch.setattr("ankismart.card_gen.llm_client.time.sleep", lambda _seconds: None)
+    monkeypatch.setattr("ankismart.card_gen.async_llm_client.AsyncOpenAI", _FakeAsyncOpenAI)
+    monkeypatch.setattr("ankismart.card_gen.llm_client._BASE_DELAY", 0.0)
 
     import_page = ImportPageObject(window)
     preview_page = PreviewPageObject(window)
@@ -229,3 +229,15 @@ class TestConvenienceMethods:
         mock_post.return_value = _mock_response({"error": None, "result": [1, None, 3]})
         result = AnkiConnectClient().add_notes([{}, {}, {}])
         assert result == [1, None, 3]
+
+    @patch("ankismart.anki_gateway.client.httpx.post")
+    def test_notes_info_and_mod_time(self, mock_post: MagicMock) -> None:
+        mock_post.return_value = _mock_response({"error": None, "result": [{"noteId": 1}]})
+        client = AnkiConnectClient()
+
+        assert client.notes_info([1]) == [{"noteId": 1}]
+        assert mock_post.call_args[1]["json"]["action"] == "notesInfo"
+        client.notes_mod_time([1])
+        body = mock_post.call_args[1]["json"]
+        assert body["action"] == "notesModTime"
+        assert body["params"] == {"notes": [1]}
@@ -0,0 +1,158 @@
+"""Tests for ankismart.card_gen.async_llm_client module."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from openai import APITimeoutError
+
+from ankismart.card_gen.async_llm_client import AsyncLLMClient
+from ankismart.card_gen.llm_client import _BASE_DELAY, _MAX_RETRIES, LLMClient
+from ankismart.card_gen.response_cache import LLMResponseCache
+from ankismart.core.errors import CardGenError, ErrorCode
+from ankismart.core.tracing import metrics
+
+
+def _make_response(content: str | None):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def _mock_async_openai(mock_cls, side_effect) -> MagicMock:
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(side_effect=side_effect)
+    mock_client.close = AsyncMock()
+    mock_cls.return_value = mock_client
+    return mock_client
+
+
+@patch("ankismart.card_gen.async_llm_client.AsyncOpenAI")
+def test_chat_returns_content_and_passes_settings(mock_openai_cls) -> None:
+    mock_client = _mock_async_openai(mock_openai_cls, [_make_response("hello")])
+
+    client = AsyncLLMClient(api_key="sk-test", model="m", temperature=0.1, max_tokens=50)
+    result = asyncio.run(client.chat("sys", "usr", timeout=30))
+
+    assert result == "hello"
+    kwargs = mock_client.chat.completions.create.await_args.kwargs
+    assert kwargs["model"] == "m"
+    assert kwargs["temperature"] == 0.1
+    assert kwargs["max_tokens"] == 50
+    assert kwargs["timeout"] == 30
+
+
+@patch("ankismart.card_gen.async_llm_client.asyncio.sleep", new_callable=AsyncMock)
+@patch("ankismart.card_gen.async_llm_client.AsyncOpenAI")
+def test_retry_sleeps_without_blocking_and_then_fails(mock_openai_cls, mock_sleep) -> None:
+    _mock_async_openai(mock_openai_cls, APITimeoutError(request=MagicMock()))
+
+    client = AsyncLLMClient(api_key="sk-test")
+    with pytest.raises(CardGenError) as exc_info:
+        asyncio.run(client.chat("sys", "usr"))
+
+    assert f"{_MAX_RETRIES} attempts" in exc_info.value.message
+    assert [call.args[0] for call in mock_sleep.await_args_list] == [
+        _BASE_DELAY * (2**i) for i in range(_MAX_RETRIES - 1)
+    ]
+
+
+@patch("ankismart.card_gen.async_llm_client.AsyncOpenAI")
+def test_empty_response_raises_llm_error(mock_openai_cls) -> None:
+    _mock_async_openai(mock_openai_cls, [_make_response(None)])
+
+    client = AsyncLLMClient(api_key="sk-test")
+    with pytest.raises(CardGenError) as exc_info:
+        asyncio.run(client.chat("sys", "usr"))
+
+    assert exc_info.value.code == ErrorCode.E_LLM_ERROR
+
+
+@patch("ankismart.card_gen.async_llm_client.AsyncOpenAI")
+@patch("ankismart.card_gen.llm_client.OpenAI")
+def test_sync_client_builds_async_twin_with_same_settings(_mock_openai, mock_async_cls) -> None:
+    sync_client = LLMClient(
+        api_key="sk-test", model="m", base_url="https://example.test/v1", temperature=0.2
+    )
+
+    async_client = sync_client.as_async()
+
+    assert isinstance(async_client, AsyncLLMClient)
+    assert async_client.model == "m"
+    assert mock_async_cls.call_args.kwargs == {
+        "api_key": "sk-test",
+        "base_url": "https://example.test/v1",
+    }
+
+
+@patch("ankismart.card_gen.async_llm_client.AsyncOpenAI")
+def test_identical_concurrent_requests_share_one_call_and_cache(mock_openai_cls, tmp_path) -> None:
+    async def slow_response(**_kwargs):
+        await asyncio.sleep(0.05)
+        return _make_response("shared")
+
+    mock_client = _mock_async_openai(mock_openai_cls, slow_response)
+    client = AsyncLLMClient(
+        api_key="sk-test", response_cache=LLMResponseCache(tmp_path / "llm.sqlite3")
+    )
+
+    async def run() -> list[str]:
+        results = await asyncio.gather(*(client.chat("sys", "usr") for _ in range(3)))
+        results.append(await client.chat("sys", "usr"))
+        return results
+
+    assert asyncio.run(run()) == ["shared"] * 4
+    assert mock_client.chat.completions.create.await_count == 1
+
+
+@patch("ankismart.card_gen.async_llm_client.AsyncOpenAI")
+def test_stream_requests_and_records_usage(mock_openai_cls) -> None:
+    usage = SimpleNamespace(prompt_tokens=30, completion_tokens=12, total_tokens=42)
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="[]"))], usage=None),
+        SimpleNamespace(choices=[], usage=usage),
+    ]
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def create(**_kwargs):
+        return stream()
+
+    metrics.reset()
+    mock_client = _mock_async_openai(mock_openai_cls, create)
+    client = AsyncLLMClient(api_key="sk-test", base_url="https://usage-async.example.com/v1")
+
+    assert asyncio.run(client.chat_stream("sys", "usr")) == "[]"
+    kwargs = mock_client.chat.completions.create.await_args.kwargs
+    assert kwargs["stream"] is True
+    assert kwargs["stream_options"] == {"include_usage": True}
+    assert metrics.get_counter("llm_total_tokens_total") == 42
+
+
+@patch("ankismart.card_gen.async_llm_client.AsyncOpenAI")
+def test_cancelled_leader_leaves_coalesced_follower_running(mock_openai_cls, tmp_path) -> None:
+    async def slow_response(**_kwargs):
+        await asyncio.sleep(0.05)
+        return _make_response("survivor")
+
+    mock_client = _mock_async_openai(mock_openai_cls, slow_response)
+    client = AsyncLLMClient(
+        api_key="sk-test", response_cache=LLMResponseCache(tmp_path / "llm.sqlite3")
+    )
+
+    async def run() -> str:
+        leader = asyncio.create_task(client.chat("sys", "cancel-me"))
+        await asyncio.sleep(0.02)
+        follower = asyncio.create_task(client.chat("sys", "cancel-me"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "survivor"
+    assert mock_client.chat.completions.create.await_count == 2
@@ -0,0 +1,86 @@
+"""Tests for ankismart.card_gen.boilerplate."""
+
+from __future__ import annotations
+
+from ankismart.card_gen.boilerplate import strip_repeated_boilerplate
+
+
+def _pages(bodies: list[str], *, header: str = "", footer: str = "") -> str:
+    sections = []
+    for index, body in enumerate(bodies, 1):
+        parts = [f"## Page {index}", ""]
+        if header:
+            parts.append(header.format(n=index))
+        parts.append(body)
+        if footer:
+            parts.append(footer.format(n=index))
+        sections.append("\n".join(parts))
+    return "\n\n---\n\n".join(sections)
+
+
+def test_strips_running_header_and_numbered_footer() -> None:
+    bodies = ["光合作用需要光。", "细胞呼吸释放能量。", "DNA 携带遗传信息。", "酶降低活化能。"]
+    markdown = _pages(bodies, header="生物学讲义 第三章", footer="Biology Notes - {n} of 4")
+
+    cleaned, report = strip_repeated_boilerplate(markdown)
+
+    assert "生物学讲义" not in cleaned
+    assert "Biology Notes" not in cleaned
+    for body in bodies:
+        assert body in cleaned
+    assert "## Page 3" in cleaned
+    assert report.removed_lines == 8
+    assert report.chars_saved == len(markdown) - len(cleaned)
+    assert report.tokens_saved > 0
+
+
+def test_copyright_line_removed_even_mid_page() -> None:
+    bodies = [f"first {i}\nsecond {i}\n© 2024 ACME Corp.\nthird {i}\nfourth {i}" for i in range(4)]
+
+    cleaned, report = strip_repeated_boilerplate(_pages(bodies))
+
+    assert "ACME" not in cleaned
+    assert "second 2" in cleaned
+    assert report.patterns == ("© # acme corp.",)
+
+
+def test_keeps_short_documents_and_unique_lines_untouched() -> None:
+    two_pages = _pages(["a", "b"], header="Header")
+    assert strip_repeated_boilerplate(two_pages) == (two_pages, strip_repeated_boilerplate("")[1])
+
+    varied = _pages(["alpha", "beta", "gamma", "delta"])
+    cleaned, report = strip_repeated_boilerplate(varied)
+    assert cleaned == varied
+    assert report.removed_lines == 0
+
+
+def test_repeated_lines_inside_code_blocks_are_kept() -> None:
+    bodies = [f"text {i}\n```\nimport os\n```" for i in range(4)]
+    markdown = _pages(bodies)
+
+    cleaned, _report = strip_repeated_boilerplate(markdown)
+
+    assert cleaned.count("import os") == 4
+
+
+def test_repeated_headings_are_kept() -> None:
+    slides = [f"### Example\n\nSlide {i} explains topic {i}." for i in range(5)]
+    markdown = "\n\n---\n\n".join(slides)
+
+    cleaned, report = strip_repeated_boilerplate(markdown)
+
+    assert cleaned == markdown
+    assert report.removed_lines == 0
+
+
+def test_blank_lines_inside_code_blocks_survive_removal() -> None:
+    code = "```python\ndef f():\n\n\n    return 1\n```"
+    bodies = [f"Lesson {i} body.\n\n{code}" for i in range(4)]
+    markdown = _pages(bodies, footer="\nCourse handout - page {n}")
+
+    cleaned, report = strip_repeated_boilerplate(markdown)
+
+    assert "Course handout" not in cleaned
+    assert report.removed_lines == 4
+    assert cleaned.count(code) == 4
+    assert "\n\n\n---" not in cleaned
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+from ankismart.card_gen import card_pipeline
 from ankismart.card_gen.card_normalizer import normalize_fields
-from ankismart.card_gen.card_pipeline import normalize_card_draft
+from ankismart.card_gen.card_pipeline import (
+    is_normalized,
+    normalize_card_draft,
+    normalize_raw_card,
+    validate_card_for_output,
+)
 from ankismart.core.models import CardDraft, CardMetadata
 
 
@@ -58,3 +64,64 @@ def test_normalize_card_draft_recomputes_quality_flags_instead_of_merging_stale_
     normalized = normalize_card_draft(draft)
 
     assert normalized.metadata.quality_flags == []
+
+
+def test_normalized_draft_is_not_normalized_or_copied_again(monkeypatch) -> None:
+    draft = CardDraft(
+        note_type="Basic",
+        fields={"Question": "什么是事务原子性？", "Answer": "操作要么全成要么全败。"},
+        metadata=CardMetadata(strategy_id="basic"),
+    )
+    normalized = normalize_card_draft(draft)
+
+    def fail(**kwargs):
+        raise AssertionError("normalized again")
+
+    monkeypatch.setattr(card_pipeline, "normalize_fields", fail)
+
+    assert is_normalized(normalized)
+    assert not is_normalized(draft)
+    assert normalize_card_draft(normalized) is normalized
+    assert validate_card_for_output(normalized).status != "blocking"
+
+
+def test_edited_draft_is_normalized_again() -> None:
+    normalized = normalize_card_draft(
+        CardDraft(
+            note_type="Basic",
+            fields={"Front": "什么是事务原子性？", "Back": "答案: 原子性\n解析:\n要么全成要么全败"},
+            metadata=CardMetadata(strategy_id="basic"),
+        )
+    )
+
+    normalized.fields["Back"] = "原子性"
+    renormalized = normalize_card_draft(normalized)
+
+    assert not is_normalized(normalized)
+    assert renormalized is not normalized
+    assert renormalized.fields["Back"].startswith("答案:")
+    assert "missing_explanation" in renormalized.metadata.quality_flags
+
+    renormalized.metadata.quality_flags.clear()
+    assert normalize_card_draft(renormalized).metadata.quality_flags == ["missing_explanation"]
+
+
+def test_equal_content_reuses_cached_normalization_without_sharing_results(monkeypatch) -> None:
+    calls: list[dict] = []
+    original = card_pipeline.normalize_fields
+
+    def counting(**kwargs):
+        calls.append(kwargs)
+        return original(**kwargs)
+
+    monkeypatch.setattr(card_pipeline, "normalize_fields", counting)
+    fields = {"Front": "Memoized normalization front?", "Back": "Memoized answer"}
+
+    first = normalize_raw_card(note_type="Basic", strategy_id="basic", fields=fields)
+    first.fields["Front"] = "mutated"
+    second = normalize_raw_card(note_type="Basic", strategy_id="basic", fields=dict(fields))
+    other = normalize_raw_card(note_type="Basic", strategy_id="basic", fields=fields, tags=["x"])
+
+    assert len(calls) == 2
+    assert second.fields["Front"] == "Memoized normalization front?"
+    assert other.fields == second.fields
@@ -0,0 +1,129 @@
+"""Tests for ankismart.card_gen.existing_notes module."""
+
+from __future__ import annotations
+
+import pytest
+
+from ankismart.card_gen import existing_notes
+from ankismart.card_gen.existing_notes import (
+    ExistingNotesIndex,
+    deck_search_query,
+    note_question_text,
+    shared_existing_notes_index,
+)
+from ankismart.core.errors import AnkiGatewayError, ErrorCode
+
+
+def _note(note_id: int, front: str, mod: int = 1) -> dict:
+    return {
+        "noteId": note_id,
+        "modelName": "Basic",
+        "mod": mod,
+        "fields": {
+            "Front": {"value": front, "order": 0},
+            "Back": {"value": "answer", "order": 1},
+        },
+    }
+
+
+class _FakeAnki:
+    def __init__(self, notes: list[dict], *, mod_time_supported: bool = True) -> None:
+        self.notes = {note["noteId"]: note for note in notes}
+        self.mod_time_supported = mod_time_supported
+        self.queries: list[str] = []
+        self.info_requests: list[list[int]] = []
+
+    def find_notes(self, query: str) -> list[int]:
+        self.queries.append(query)
+        return list(self.notes)
+
+    def notes_mod_time(self, note_ids: list[int]) -> list[dict]:
+        if not self.mod_time_supported:
+            raise AnkiGatewayError(
+                "AnkiConnect error: unsupported action", code=ErrorCode.E_ANKICONNECT_ERROR
+            )
+        return [{"noteId": i, "mod": self.notes[i]["mod"]} for i in note_ids]
+
+    def notes_info(self, note_ids: list[int]) -> list[dict]:
+        self.info_requests.append(list(note_ids))
+        return [self.notes[i] for i in note_ids]
+
+
+class TestNoteQuestionText:
+    def test_strips_markup_entities_and_cloze(self):
+        note = {
+            "fields": {
+                "Text": {"value": "The {{c1::mitochondria::organelle}} make&nbsp;<b>ATP</b>"}
+            }
+        }
+
+        assert note_question_text(note) == "The mitochondria make ATP"
+
+    def test_falls_back_to_first_field_by_order(self):
+        note = {"fields": {"Extra": {"value": "b", "order": 1}, "Term": {"value": "a", "order": 0}}}
+
+        assert note_question_text(note) == "a"
+
+    def test_deck_search_query(self):
+        assert deck_search_query('Bio "1"') == '"deck:Bio \\"1\\""'
+        assert deck_search_query("Bio", scope="collection") == "deck:*"
+
+
+class TestExistingNotesIndex:
+    def test_matches_existing_questions(self):
+        anki = _FakeAnki([_note(1, "What is the role of <i>ATP synthase</i>?")])
+        index = ExistingNotesIndex('"deck:Bio"')
+
+        assert index.refresh(anki) == 1
+        assert index.contains_similar("What is the role of ATP synthase?")
+        assert not index.contains_similar("Define osmotic pressure.")
+        assert anki.queries == ['"deck:Bio"']
+
+    def test_refresh_downloads_only_new_and_modified_notes(self):
+        anki = _FakeAnki([_note(1, "What is osmosis?"), _note(2, "What is diffusion?")])
+        index = ExistingNotesIndex("deck:*")
+        index.refresh(anki)
+
+        anki.notes[2] = _note(2, "Define active transport.", mod=2)
+        anki.notes[3] = _note(3, "What is endocytosis?")
+        del anki.notes[1]
+
+        assert index.refresh(anki) == 2
+        assert anki.info_requests[-1] == [2, 3]
+        assert len(index) == 2
+        assert not index.contains_similar("What is osmosis?")
+        assert index.contains_similar("Define active transport.")
+        assert index.refresh(anki) == 0
+
+    def test_falls_back_to_notes_info_without_mod_time_support(self):
+        anki = _FakeAnki([_note(1, "What is osmosis?")], mod_time_supported=False)
+        index = ExistingNotesIndex("deck:*")
+
+        assert index.refresh(anki) == 1
+        assert index.refresh(anki) == 0
+        assert len(anki.info_requests) == 2
+
+    def test_notes_info_is_batched(self, monkeypatch):
+        monkeypatch.setattr(existing_notes, "_NOTES_INFO_BATCH", 2)
+        anki = _FakeAnki([_note(i, f"Question number {i}") for i in range(5)])
+
+        ExistingNotesIndex("deck:*").refresh(anki)
+
+        assert [len(batch) for batch in anki.info_requests] == [2, 2, 1]
+
+    def test_connection_errors_propagate(self):
+        class _Offline:
+            def find_notes(self, query):
+                raise AnkiGatewayError("offline", code=ErrorCode.E_ANKICONNECT_ERROR)
+
+        with pytest.raises(AnkiGatewayError):
+            ExistingNotesIndex("deck:*").refresh(_Offline())
+
+    def test_shared_index_is_reused_per_endpoint_query_and_threshold(self):
+        first = shared_existing_notes_index(anki_url="http://a:8765/", query="deck:*")
+
+        assert shared_existing_notes_index(anki_url="http://a:8765", query="deck:*") is first
+        assert (
+            shared_existing_notes_index(anki_url="http://a:8765", query="deck:*", threshold=0.8)
+            is not first
+        )
@@ -3,19 +3,26 @@
 from __future__ import annotations
 
 import json
+import threading
+import time
 from unittest.mock import MagicMock
 
+import pytest
+
 from ankismart.card_gen.generator import _STRATEGY_MAP, CardGenerator
 from ankismart.card_gen.postprocess import build_card_drafts
 from ankismart.card_gen.prompts import (
     BASIC_SYSTEM_PROMPT,
     CLOZE_SYSTEM_PROMPT,
+    GENERATION_SYSTEM_PROMPT,
     IMAGE_QA_SYSTEM_PROMPT,
     MULTIPLE_CHOICE_SYSTEM_PROMPT,
     OCR_CORRECTION_PROMPT,
     SINGLE_CHOICE_SYSTEM_PROMPT,
 )
 from ankismart.card_gen.strategy_recommender import StrategyRecommender
+from ankismart.card_gen.tokens import ContextLimits, estimate_tokens
+from ankismart.core.errors import CardGenError
 from ankismart.core.models import GenerateRequest
 
 # ---------------------------------------------------------------------------
@@ -36,6 +43,11 @@ def _fake_llm_cloze(system_prompt: str, user_prompt: str) -> str:
     )
 
 
+def _document(user_prompt: str) -> str:
+    """Return the source document embedded in a generation user prompt."""
+    return user_prompt.split("<document>\n", 1)[1].split("\n</document>", 1)[0]
+
+
 def _make_generator(chat_side_effect=None, chat_return_value=None) -> CardGenerator:
     mock_llm = MagicMock()
     if chat_side_effect is not None:
@@ -96,10 +108,11 @@ class TestCardGeneratorGenerate:
         # Should fall back to basic
         assert len(drafts) == 2
         assert drafts[0].note_type == "Basic"
-        # Verify the LLM was called with BASIC_SYSTEM_PROMPT
+        # Verify the LLM was asked for basic cards
         gen._llm.chat.assert_called_once()
         call_args = gen._llm.chat.call_args
-        assert call_args[0][0] == BASIC_SYSTEM_PROMPT
+        assert call_args[0][0] == GENERATION_SYSTEM_PROMPT
+        assert "question-answer flashcard pairs" in call_args[0][1]
 
     def test_default_tags_when_none_provided(self):
         gen = _make_generator(chat_side_effect=_fake_llm_basic)
@@ -197,7 +210,7 @@ class TestCardGeneratorGenerate:
         prompts: list[str] = []
 
         def _fake_llm(system_prompt: str, user_prompt: str, timeout: float | None = None) -> str:
-            prompts.append(system_prompt)
+            prompts.append(user_prompt)
             return json.dumps(
                 [
                     {"Front": "Q1", "Back": "A1"},
@@ -228,7 +241,7 @@ class TestCardGeneratorGenerate:
         prompts: list[str] = []
 
         def _fake_llm(system_prompt: str, user_prompt: str, timeout: float | None = None) -> str:
-            prompts.append(system_prompt)
+            prompts.append(user_prompt)
             return json.dumps(
                 [
                     {"Front": "Q1", "Back": "A1"},
@@ -365,7 +378,7 @@ class TestCardGeneratorGenerate:
 
         gen._llm.chat.assert_called_once()
         call_args = gen._llm.chat.call_args[0]
-        assert call_args[1] == "My special content"
+        assert _document(call_args[1]) == "My special content"
 
 
 # ---------------------------------------------------------------------------
@@ -373,6 +386,29 @@ class TestCardGeneratorGenerate:
 # ---------------------------------------------------------------------------
 
 
+class TestBoilerplateStripping:
+    def _markdown(self) -> str:
+        pages = [
+            f"## Page {i}\n\nCourse Handbook 2024\nTopic {i} explained.\nPage {i} of 4"
+            for i in range(1, 5)
+        ]
+        return "\n\n---\n\n".join(pages)
+
+    def test_generate_sends_markdown_without_running_headers(self):
+        gen = _make_generator(chat_side_effect=_fake_llm_basic)
+        gen.generate(GenerateRequest(markdown=self._markdown()))
+
+        user_prompt = gen._llm.chat.call_args.args[1]
+        assert "Course Handbook" not in user_prompt
+        assert "Topic 3 explained." in user_prompt
+
+    def test_generate_can_opt_out_of_stripping(self):
+        gen = _make_generator(chat_side_effect=_fake_llm_basic)
+        gen.generate(GenerateRequest(markdown=self._markdown(), strip_boilerplate=False))
+
+        assert "Course Handbook" in gen._llm.chat.call_args.args[1]
+
+
 class TestCorrectOcrText:
     """Tests for CardGenerator.correct_ocr_text."""
 
@@ -388,6 +424,15 @@ class TestCorrectOcrText:
         result = gen.correct_ocr_text("messy input")
         assert result == "clean output"
 
+    def test_line_scores_limit_correction_to_low_confidence_lines(self):
+        gen = _make_generator(chat_return_value='{"2": "fixed line"}')
+        result = gen.correct_ocr_text("clean line\nf1xed line", line_scores=[0.99, 0.4])
+
+        assert result == "clean line\nfixed line"
+        gen._llm.chat.assert_called_once()
+        assert "clean line" in gen._llm.chat.call_args.args[1]
+        assert ">> 2: f1xed line" in gen._llm.chat.call_args.args[1]
+
 
 class TestSplitMarkdown:
     def test_generate_request_enables_auto_split_by_default(self):
@@ -521,6 +566,567 @@ class TestSplitMarkdown:
         assert all(draft.media.picture for draft in drafts)
 
 
+class TestTokenBudgetSplit:
+    def _generator(self, *, context_window: int, max_output_tokens: int) -> CardGenerator:
+        gen = _make_generator(chat_side_effect=_fake_llm_basic)
+        gen._llm.context_limits = ContextLimits(context_window, max_output_tokens)
+        return gen
+
+    def test_sections_split_at_headings_outside_code_blocks(self):
+        content = "# A\nintro\n```\n# not a heading\n```\n## B\nbody"
+
+        sections = CardGenerator._split_markdown_sections(content)
+
+        assert sections == ["# A\nintro\n```\n# not a heading\n```", "## B\nbody"]
+
+    def test_chunks_pack_sections_within_token_budget(self):
+        gen = _make_generator()
+        content = "\n\n".join(f"## Section {i}\n" + ("word " * 200) for i in range(10))
+
+        chunks = gen._split_markdown_by_tokens(content, token_budget=600)
+
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 600 for chunk in chunks)
+        assert all(chunk.startswith("## Section") for chunk in chunks)
+
+    def test_oversized_section_is_split_by_its_own_token_density(self):
+        gen = _make_generator()
+        content = "# 标题\n\n" + "\n\n".join("知识点" * 100 for _ in range(10))
+
+        chunks = gen._split_markdown_by_tokens(content, token_budget=1000)
+
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 1000 for chunk in chunks)
+
+    def test_cjk_document_splits_where_same_length_english_does_not(self):
+        gen = self._generator(context_window=16_384, max_output_tokens=4_096)
+        request = GenerateRequest(markdown="", strategy="basic", split_threshold=70000)
+        english = "\n\n".join("word " * 200 for _ in range(30))
+        cjk = "\n\n".join("知" * 1000 for _ in range(30))
+
+        assert len(english) == len(cjk)
+        assert gen._chunk_markdown(english, request) == [english]
+        assert len(gen._chunk_markdown(cjk, request)) > 1
+
+    def test_split_threshold_caps_chunks_within_token_budget(self):
+        gen = self._generator(context_window=128_000, max_output_tokens=16_384)
+        content = "\n\n".join(f"## Section {i}\n" + ("word " * 200) for i in range(10))
+
+        uncapped = GenerateRequest(markdown="", strategy="basic", split_threshold=70000)
+        capped = GenerateRequest(markdown="", strategy="basic", split_threshold=2500)
+
+        assert gen._chunk_markdown(content, uncapped) == [content]
+        chunks = gen._chunk_markdown(content, capped)
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 2500 for chunk in chunks)
+        assert all(chunk.startswith("## Section") for chunk in chunks)
+
+    def test_timeout_scales_with_expected_output_tokens(self):
+        gen = _make_generator()
+
+        small = gen._estimate_request_timeout("text", target_count=10)
+        large = gen._estimate_request_timeout("text", target_count=40)
+
+        assert large > small
+        assert 120.0 <= small <= large <= 600.0
+
+    def test_timeout_expected_output_is_capped_by_model_limit(self):
+        capped = self._generator(context_window=128_000, max_output_tokens=2_000)
+        uncapped = self._generator(context_window=128_000, max_output_tokens=16_384)
+
+        assert capped._estimate_request_timeout("text", target_count=40) < (
+            uncapped._estimate_request_timeout("text", target_count=40)
+        )
+
+
+class TestPromptCacheLayout:
+    def test_strategies_share_system_prompt_and_document_prefix(self):
+        gen = _make_generator(chat_side_effect=_fake_llm_basic)
+        for strategy in ("basic", "cloze", "single_choice"):
+            gen.generate(GenerateRequest(markdown="Shared chunk", strategy=strategy))
+
+        calls = [call.args for call in gen._llm.chat.call_args_list]
+        assert {system for system, _user in calls} == {GENERATION_SYSTEM_PROMPT}
+        prefix = "<document>\nShared chunk\n</document>\n\nTask:\n"
+        assert all(user.startswith(prefix) for _system, user in calls)
+        assert len({user for _system, user in calls}) == 3
+
+    def test_target_instruction_follows_the_document(self):
+        gen = _make_generator(chat_side_effect=_fake_llm_basic)
+        gen.generate(GenerateRequest(markdown="Some content", target_count=2))
+
+        user_prompt = gen._llm.chat.call_args.args[1]
+        assert user_prompt.index("Some content") < user_prompt.index("Generate exactly 2 cards")
+
+    def test_common_format_rules_are_sent_once(self):
+        gen = _make_generator(chat_side_effect=_fake_llm_basic)
+        gen.generate(GenerateRequest(markdown="Some content"))
+
+        system_prompt, user_prompt = gen._llm.chat.call_args.args
+        assert "MathJax" in system_prompt
+        assert "MathJax" not in user_prompt
+
+
+class _SchemaLLM:
+    """Client taking JSON schema ``response_format`` until the provider rejects one."""
+
+    def __init__(self, reply, *, reject: bool = False) -> None:
+        self.reply = reply
+        self.reject = reject
+        self.supports_structured_output = True
+        self.calls: list[tuple[str, dict | None]] = []
+
+    def chat(self, system_prompt, user_prompt, timeout=None, *, response_format=None):
+        self.calls.append((user_prompt, response_format))
+        if response_format is not None and self.reject:
+            self.supports_structured_output = False
+            raise CardGenError("response_format is not supported")
+        return self.reply(response_format)
+
+
+class TestStructuredOutput:
+    def test_schema_request_uses_compact_prompt_and_cards_key(self):
+        llm = _SchemaLLM(lambda _fmt: json.dumps({"cards": [{"Front": "Q1", "Back": "A1"}]}))
+        gen = CardGenerator(llm)
+
+        drafts = gen.generate(GenerateRequest(markdown="Some content", target_count=1))
+
+        assert [draft.fields["Front"] for draft in drafts] == ["Q1"]
+        user_prompt, response_format = llm.calls[0]
+        schema = response_format["json_schema"]["schema"]
+        assert schema["required"] == ["cards"]
+        assert schema["properties"]["cards"]["items"]["required"] == ["Front", "Back"]
+        assert "Example output" not in user_prompt
+        assert "JSON array" not in user_prompt
+        assert "Generate exactly 1 cards" in user_prompt
+        plain = _make_generator(chat_side_effect=_fake_llm_basic)
+        plain.generate(GenerateRequest(markdown="Some content", target_count=1))
+        assert len(user_prompt) < len(plain._llm.chat.call_args.args[1])
+
+    def test_rejected_schema_falls_back_to_the_full_prompt(self):
+        llm = _SchemaLLM(lambda _fmt: json.dumps([{"Front": "Q1", "Back": "A1"}]), reject=True)
+        gen = CardGenerator(llm)
+
+        drafts = gen.generate(GenerateRequest(markdown="Some content"))
+
+        assert [draft.fields["Front"] for draft in drafts] == ["Q1"]
+        assert [response_format is None for _prompt, response_format in llm.calls] == [
+            False,
+            True,
+        ]
+        assert "Output ONLY a JSON array" in llm.calls[1][0]
+
+    def test_multi_strategy_schema_has_one_array_per_type(self):
+        def reply(_fmt):
+            return json.dumps(
+                {
+                    "basic": [{"Front": "Q", "Back": "A"}],
+                    "cloze": [{"Text": "The {{c1::sun}} is a star.", "Extra": ""}],
+                }
+            )
+
+        llm = _SchemaLLM(reply)
+        results = CardGenerator(llm).generate_multi(
+            GenerateRequest(markdown="Some content"), {"basic": 1, "cloze": 1}
+        )
+
+        schema = llm.calls[0][1]["json_schema"]["schema"]
+        assert schema["required"] == ["basic", "cloze"]
+        assert schema["properties"]["cloze"]["items"]["required"] == ["Text", "Extra"]
+        assert len(results["basic"]) == 1
+        assert len(results["cloze"]) == 1
+
+    def test_mock_clients_stay_on_prompt_described_output(self):
+        gen = _make_generator(chat_side_effect=_fake_llm_basic)
+
+        gen.generate(GenerateRequest(markdown="Some content"))
+
+        assert "response_format" not in gen._llm.chat.call_args.kwargs
+
+
+class _StreamingLLM:
+    def __init__(self, parts: list[str], *, fail_after: bool = False) -> None:
+        self.parts = parts
+        self.fail_after = fail_after
+
+    def chat(self, system_prompt, user_prompt, timeout=None):
+        raise AssertionError("streaming generator should not use chat()")
+
+    def chat_stream(self, system_prompt, user_prompt, timeout=None, *, on_text=None):
+        for part in self.parts:
+            on_text(part)
+        if self.fail_after:
+            raise CardGenError("connection dropped")
+        return "".join(self.parts)
+
+
+class TestStreamingGeneration:
+    def test_cards_reach_callback_before_response_completes(self):
+        received: list[list[str]] = []
+        llm = _StreamingLLM(
+            ['[{"Front": "Q1", "Back": "A1"}', ', {"Front": "Q2", "Back": "A2"}', "]"]
+        )
+        gen = CardGenerator(
+            llm,
+            stream=True,
+            on_cards=lambda drafts: received.append([d.fields["Front"] for d in drafts]),
+        )
+
+        drafts = gen.generate(GenerateRequest(markdown="content", deck_name="D"))
+
+        assert received == [["Q1"], ["Q2"]]
+        assert [draft.fields["Front"] for draft in drafts] == ["Q1", "Q2"]
+
+    def test_interrupted_stream_keeps_completed_cards(self):
+        llm = _StreamingLLM(['[{"Front": "Q1", "Back": "A1"}, {"Front": "Q'], fail_after=True)
+        gen = CardGenerator(llm, stream=True)
+
+        drafts = gen.generate(GenerateRequest(markdown="content"))
+
+        assert [draft.fields["Front"] for draft in drafts] == ["Q1"]
+
+    def test_interrupted_stream_without_cards_raises(self):
+        gen = CardGenerator(_StreamingLLM(["[{"], fail_after=True), stream=True)
+
+        with pytest.raises(CardGenError):
+            gen.generate(GenerateRequest(markdown="content"))
+
+    def test_multi_strategy_stream_routes_cards_by_type(self):
+        received: list[str] = []
+        raw = json.dumps(
+            {"basic": [{"Front": "Q", "Back": "A"}], "cloze": [{"Text": "{{c1::sun}} shines"}]}
+        )
+        gen = CardGenerator(
+            _StreamingLLM([raw[:30], raw[30:]]),
+            stream=True,
+            on_cards=lambda drafts: received.extend(d.note_type for d in drafts),
+        )
+
+        results = gen.generate_multi(GenerateRequest(markdown="c"), {"basic": 1, "cloze": 1})
+
+        assert received == ["Basic", "Cloze"]
+        assert len(results["basic"]) == 1
+        assert len(results["cloze"]) == 1
+
+
+class TestParallelChunkGeneration:
+    def test_chunks_are_requested_concurrently_and_merged_in_order(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def chat(_system_prompt, user_prompt, timeout=None):
+            barrier.wait()
+            document = _document(user_prompt)
+            if "one" in document:
+                time.sleep(0.05)
+            return json.dumps([{"Front": f"Q {document}", "Back": "A"}])
+
+        gen = _make_generator(chat_side_effect=chat)
+        drafts = gen.generate(
+            GenerateRequest(
+                markdown="Paragraph one.\n\nParagraph two.\n\nParagraph six.",
+                strategy="basic",
+                enable_auto_split=True,
+                split_threshold=15,
+            )
+        )
+
+        assert [draft.fields["Front"] for draft in drafts] == [
+            "Q Paragraph one.",
+            "Q Paragraph two.",
+            "Q Paragraph six.",
+        ]
+
+    def test_target_is_preallocated_by_chunk_length(self):
+        targets = CardGenerator._allocate_chunk_targets(
+            ["a" * 300, "b" * 100, "c" * 100], 10, auto_target_count=False
+        )
+
+        assert targets == [6, 2, 2]
+        assert CardGenerator._allocate_chunk_targets(["a", "b"], 0, auto_target_count=False) == [
+            0,
+            0,
+        ]
+        assert CardGenerator._allocate_chunk_targets(
+            ["a" * 100, "b"], 1, auto_target_count=True
+        ) == [1, 1]
+
+    def test_each_chunk_is_asked_for_its_share(self):
+        seen: list[str] = []
+        lock = threading.Lock()
+
+        def chat(system_prompt, user_prompt, timeout=None):
+            with lock:
+                seen.append(user_prompt)
+            return json.dumps([{"Front": f"Q{i} {user_prompt}", "Back": "A"} for i in range(5)])
+
+        gen = _make_generator(chat_side_effect=chat)
+        drafts = gen.generate(
+            GenerateRequest(
+                markdown="Paragraph one.\n\nParagraph two.",
+                strategy="basic",
+                enable_auto_split=True,
+                split_threshold=15,
+                target_count=4,
+            )
+        )
+
+        assert len(drafts) == 4
+        assert all("Generate exactly 2 cards" in prompt for prompt in seen)
+
+    def test_chunk_failure_propagates(self):
+        def chat(_system_prompt, user_prompt, timeout=None):
+            if "two" in _document(user_prompt):
+                raise CardGenError("boom")
+            return json.dumps([{"Front": "Q", "Back": "A"}])
+
+        gen = _make_generator(chat_side_effect=chat)
+
+        with pytest.raises(CardGenError):
+            gen.generate(
+                GenerateRequest(
+                    markdown="Paragraph one.\n\nParagraph two.",
+                    strategy="basic",
+                    enable_auto_split=True,
+                    split_threshold=15,
+                )
+            )
+
+
+class TestDeltaRetryRounds:
+    def test_retry_shortfall_goes_to_chunks_below_their_share(self):
+        targets = CardGenerator._allocate_retry_targets(
+            ["a" * 100, "b" * 100, "c" * 100], 3, covered=[3, 0, 0]
+        )
+
+        assert targets == [0, 2, 1]
+        assert CardGenerator._allocate_retry_targets(["a", "b"], 0, covered=[1, 1]) == [0, 0]
+
+    def test_retry_skips_covered_chunks_and_lists_their_questions(self):
+        seen: list[str] = []
+        lock = threading.Lock()
+
+        def chat(system_prompt, user_prompt, timeout=None):
+            with lock:
+                seen.append(user_prompt)
+            return json.dumps([{"Front": "New question", "Back": "A"}])
+
+        gen = _make_generator(chat_side_effect=chat)
+        drafts = gen.generate(
+            GenerateRequest(
+                markdown="Paragraph one.\n\nParagraph two.",
+                strategy="basic",
+                enable_auto_split=True,
+                split_threshold=15,
+                target_count=1,
+                accepted_questions={"chunk-1": ["What is one?"], "": ["What is any?"]},
+            )
+        )
+
+        assert len(drafts) == 1
+        assert len(seen) == 1
+        assert "Paragraph two." in _document(seen[0])
+        assert "What is any?" in seen[0]
+        assert "What is one?" not in seen[0]
+
+    def test_avoid_list_follows_the_document_and_is_compact(self):
+        gen = _make_generator(chat_side_effect=_fake_llm_basic)
+        gen.generate(
+            GenerateRequest(
+                markdown="Some content",
+                target_count=1,
+                accepted_questions={"chunk-1": ["Q " + "x" * 300, "Q " + "x" * 300, "Other"]},
+            )
+        )
+
+        user_prompt = gen._llm.chat.call_args.args[1]
+        assert user_prompt.startswith("<document>\nSome content\n</document>")
+        assert "do not repeat them" in user_prompt
+        assert user_prompt.count("  - Q ") == 1
+        assert "x" * 200 not in user_prompt
+        assert "  - Other" in user_prompt
+
+
+class TestDamagedOutputRecovery:
+    def test_truncated_response_requests_only_the_missing_cards(self):
+        prompts: list[str] = []
+
+        def chat(system_prompt, user_prompt, timeout=None):
+            prompts.append(user_prompt)
+            if len(prompts) == 1:
+                cards = [{"Front": f"Salvaged {i}", "Back": "A"} for i in range(3)]
+                return json.dumps([*cards, {"Front": "Cut"}])[:-10]
+            return json.dumps([{"Front": "Follow-up", "Back": "A"}, {"Front": "More", "Back": "B"}])
+
+        gen = _make_generator(chat_side_effect=chat)
+        drafts = gen.generate(GenerateRequest(markdown="Some content", target_count=5))
+
+        assert [draft.fields["Front"] for draft in drafts] == [
+            "Salvaged 0",
+            "Salvaged 1",
+            "Salvaged 2",
+            "Follow-up",
+            "More",
+        ]
+        assert len(prompts) == 2
+        assert "Generate exactly 2 cards" in prompts[1]
+        assert "  - Salvaged 2" in prompts[1]
+        assert _document(prompts[1]) == _document(prompts[0])
+
+    def test_unusable_follow_up_keeps_salvaged_cards(self):
+        replies = iter(['[{"Front": "Q1", "Back": "A1"}, {"Front": "Q2"', "still not json"])
+        gen = _make_generator(chat_side_effect=lambda *_args, **_kwargs: next(replies))
+
+        drafts = gen.generate(GenerateRequest(markdown="Some content", target_count=3))
+
+        assert [draft.fields["Front"] for draft in drafts] == ["Q1"]
+        assert gen._llm.chat.call_count == 2
+
+    def test_multi_strategy_follow_up_asks_per_type_remainder(self):
+        prompts: list[str] = []
+
+        def chat(system_prompt, user_prompt, timeout=None):
+            prompts.append(user_prompt)
+            if len(prompts) == 1:
+                raw = json.dumps(
+                    {"basic": [{"Front": "Q1", "Back": "A1"}], "cloze": [{"Text": "{{c1::x}}"}]}
+                )
+                return raw[:-25]
+            return json.dumps({"cloze": [{"Text": "The {{c1::sun}} is a star.", "Extra": ""}]})
+
+        gen = _make_generator(chat_side_effect=chat)
+        results = gen.generate_multi(
+            GenerateRequest(markdown="Some content", strategy="basic"), {"basic": 1, "cloze": 1}
+        )
+
+        assert len(prompts) == 2
+        assert 'Card type "cloze"' in prompts[1]
+        assert 'Card type "basic"' not in prompts[1]
+        assert "  - Q1" in prompts[1]
+        assert len(results["basic"]) == 1
+        assert len(results["cloze"]) == 1
+
+
+class TestMultiStrategyGeneration:
+    def test_one_request_routes_cards_to_each_note_type(self):
+        def chat(system_prompt, user_prompt, timeout=None):
+            assert 'Card type "basic"' in user_prompt
+            assert 'Card type "cloze"' in user_prompt
+            assert "Generate exactly 1 cards" in user_prompt
+            assert "Generate exactly 2 cards" in user_prompt
+            return json.dumps(
+                {
+                    "basic": [{"Front": "Q1", "Back": "A1"}, {"Front": "Q2", "Back": "A2"}],
+                    "cloze": [
+                        {"Text": "The {{c1::sun}} is a star.", "Extra": ""},
+                        {"Text": "{{c1::Water}} is H2O.", "Extra": ""},
+                    ],
+                }
+            )
+
+        gen = _make_generator(chat_side_effect=chat)
+        results = gen.generate_multi(
+            GenerateRequest(markdown="Some content", strategy="basic", deck_name="D"),
+            {"basic": 1, "cloze": 2},
+        )
+
+        assert gen._llm.chat.call_count == 1
+        assert [draft.note_type for draft in results["basic"]] == ["Basic"]
+        assert [draft.note_type for draft in results["cloze"]] == ["Cloze", "Cloze"]
+        assert results["cloze"][0].metadata.strategy_id == "cloze"
+
+    def test_missing_type_comes_back_empty(self):
+        gen = _make_generator(
+            chat_return_value=json.dumps({"basic": [{"Front": "Q", "Back": "A"}]})
+        )
+
+        results = gen.generate_multi(
+            GenerateRequest(markdown="Some content", strategy="basic"),
+            {"basic": 1, "single_choice": 1},
+        )
+
+        assert len(results["basic"]) == 1
+        assert results["single_choice"] == []
+
+    def test_split_documents_send_one_combined_request_per_chunk(self):
+        gen = _make_generator(
+            chat_return_value=json.dumps(
+                {"basic": [{"Front": "Q", "Back": "A"}], "concept": [{"Front": "C", "Back": "D"}]}
+            )
+        )
+
+        results = gen.generate_multi(
+            GenerateRequest(
+                markdown="Paragraph one.\n\nParagraph two.",
+                strategy="basic",
+                enable_auto_split=True,
+                split_threshold=15,
+            ),
+            {"basic": 2, "concept": 2},
+        )
+
+        assert gen._llm.chat.call_count == 2
+        assert len(results["basic"]) == 2
+        assert len(results["concept"]) == 2
+        assert [draft.metadata.source_chunk_id for draft in results["basic"]] == [
+            "chunk-1",
+            "chunk-2",
+        ]
+
+
+class TestChunkProvenance:
+    def test_unsplit_document_spans_whole_source(self):
+        gen = _make_generator(chat_side_effect=_fake_llm_basic)
+        markdown = "Paragraph one.\n\nParagraph two."
+
+        drafts = gen.generate(GenerateRequest(markdown=markdown, strategy="basic"))
+
+        assert {draft.metadata.source_chunk_id for draft in drafts} == {"chunk-1"}
+        assert {(d.metadata.source_start, d.metadata.source_end) for d in drafts} == {
+            (0, len(markdown))
+        }
+
+    def test_split_chunks_record_their_spans_in_the_source(self):
+        seen: dict[str, str] = {}
+
+        def chat(system_prompt: str, user_prompt: str) -> str:
+            document = _document(user_prompt)
+            return json.dumps([{"Front": document, "Back": "A"}])
+
+        gen = _make_generator(chat_side_effect=chat)
+        markdown = "# One\nfirst body\n\n# Two\nsecond body\n\n# Three\nthird body"
+
+        drafts = gen.generate(
+            GenerateRequest(
+                markdown=markdown,
+                strategy="basic",
+                enable_auto_split=True,
+                split_threshold=25,
+            )
+        )
+
+        assert len(drafts) == 3
+        for draft in drafts:
+            metadata = draft.metadata
+            seen[metadata.source_chunk_id] = markdown[metadata.source_start : metadata.source_end]
+            assert seen[metadata.source_chunk_id] == draft.fields["Front"]
+        assert list(seen) == ["chunk-1", "chunk-2", "chunk-3"]
+
+    def test_spans_skip_stripped_lines_and_synthetic_fences(self):
+        document = "header\nalpha\n```py\nx = 1\ny = 2\n```\nomega"
+        chunks = ["alpha\n```py\nx = 1\n```", "```py\ny = 2\n```\nomega"]
+
+        spans = CardGenerator._locate_chunk_spans(document, chunks)
+
+        assert [document[start:end] for start, end in spans] == [
+            "alpha\n```py\nx = 1",
+            "y = 2\n```\nomega",
+        ]
+        assert CardGenerator._locate_chunk_spans(document, ["missing", "text"]) == [
+            (-1, -1),
+            (-1, -1),
+        ]
+
+
 class TestStrategyRecommender:
     def test_detect_document_type_and_rule_recommend(self):
         recommender = StrategyRecommender()
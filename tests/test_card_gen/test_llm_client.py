@@ -10,7 +10,14 @@ from unittest.mock import MagicMock, patch
 import httpx
 import pytest
 
-from ankismart.card_gen.llm_client import _BASE_DELAY, _MAX_RETRIES, LLMClient, _RpmThrottle
+from ankismart.card_gen.llm_client import (
+    _BASE_DELAY,
+    _MAX_RETRIES,
+    LLMClient,
+    cached_prompt_tokens,
+)
+from ankismart.card_gen.response_cache import LLMResponseCache
+from ankismart.card_gen.tokens import ContextLimits
 from ankismart.core.errors import CardGenError, ErrorCode
 from ankismart.core.tracing import metrics
 
@@ -315,6 +322,15 @@ class TestLLMClientGenerationParams:
         assert client._temperature == 0.3
         assert client._max_tokens == 0
 
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_context_limits_combine_model_overrides_and_max_tokens(self, mock_openai_cls):
+        assert LLMClient(api_key="k", model="gpt-4o").context_limits == ContextLimits(
+            128_000, 16_384
+        )
+        client = LLMClient(api_key="k", model="gpt-4o", max_tokens=2_048, context_window=32_000)
+        assert client.context_limits == ContextLimits(32_000, 2_048)
+        assert client.as_async().context_limits == ContextLimits(32_000, 2_048)
+
 
 class TestLLMClientValidateConnection:
     @patch("ankismart.card_gen.llm_client.OpenAI")
@@ -431,49 +447,115 @@ class TestLLMClientLifecycle:
         mock_openai.close.assert_called_once()
 
 
-class TestRpmThrottle:
+class TestThrottleUsageInChat:
     @patch("ankismart.card_gen.llm_client.time.sleep")
-    @patch("ankismart.card_gen.llm_client.time.monotonic")
-    def test_sliding_window_blocks_when_window_full(self, mock_monotonic, mock_sleep):
-        clock = {"t": 0.0}
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_chat_calls_throttle_for_every_retry_attempt(self, mock_openai_cls, mock_sleep):
+        from openai import APITimeoutError
+
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = APITimeoutError(
+            request=MagicMock(),
+        )
 
-        def _mono():
-            return clock["t"]
+        client = LLMClient(api_key="sk-test")
+        client._throttle = MagicMock()
 
-        def _sleep(seconds: float):
-            clock["t"] += seconds
+        with pytest.raises(CardGenError):
+            client.chat("sys", "usr")
 
-        mock_monotonic.side_effect = _mono
-        mock_sleep.side_effect = _sleep
+        assert client._throttle.wait.call_count == _MAX_RETRIES
 
-        throttle = _RpmThrottle(2)
-        throttle.wait()  # t=0
-        throttle.wait()  # t=0
-        throttle.wait()  # must wait ~60s before third request
+    @patch("ankismart.card_gen.llm_client.time.sleep")
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_rate_limit_follows_server_retry_after(self, mock_openai_cls, mock_sleep):
+        from openai import RateLimitError
 
-        assert mock_sleep.call_count == 1
-        assert pytest.approx(mock_sleep.call_args[0][0], rel=1e-6) == 60.0
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        response_mock = MagicMock()
+        response_mock.status_code = 429
+        response_mock.headers = {"retry-after": "7"}
+        mock_client.chat.completions.create.side_effect = [
+            RateLimitError(message="rate limited", response=response_mock, body=None),
+            _make_response("ok"),
+        ]
+        client = LLMClient(api_key="sk-test")
+        client._throttle = MagicMock()
+        client._throttle.wait.return_value = 0.0
 
+        assert client.chat("sys", "usr") == "ok"
+
+        client._throttle.defer.assert_called_once_with(7.0)
+        mock_sleep.assert_not_called()
+        reserved = client._throttle.wait.call_args_list[0].args[0]
+        assert client._throttle.reconcile.call_args_list[0].args == (reserved, 0)
+        assert client._throttle.reconcile.call_args_list[1].args == (reserved, 30)
 
-class TestThrottleUsageInChat:
     @patch("ankismart.card_gen.llm_client.time.sleep")
     @patch("ankismart.card_gen.llm_client.OpenAI")
-    def test_chat_calls_throttle_for_every_retry_attempt(self, mock_openai_cls, mock_sleep):
+    def test_timed_out_attempts_return_their_reservation(self, mock_openai_cls, mock_sleep):
         from openai import APITimeoutError
 
         mock_client = MagicMock()
         mock_openai_cls.return_value = mock_client
-        mock_client.chat.completions.create.side_effect = APITimeoutError(
-            request=MagicMock(),
-        )
+        mock_client.chat.completions.create.side_effect = [
+            APITimeoutError(request=MagicMock()),
+            _make_response("ok"),
+        ]
+        client = LLMClient(api_key="sk-test")
+        client._throttle = MagicMock()
+        client._throttle.wait.return_value = 0.0
+
+        assert client.chat("sys", "usr") == "ok"
+
+        reserved = client._throttle.wait.call_args_list[0].args[0]
+        assert [call.args for call in client._throttle.reconcile.call_args_list] == [
+            (reserved, 0),
+            (reserved, 30),
+        ]
 
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_failed_request_returns_its_reservation(self, mock_openai_cls):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = RuntimeError("boom")
         client = LLMClient(api_key="sk-test")
         client._throttle = MagicMock()
+        client._throttle.wait.return_value = 0.0
 
         with pytest.raises(CardGenError):
             client.chat("sys", "usr")
 
-        assert client._throttle.wait.call_count == _MAX_RETRIES
+        reserved = client._throttle.wait.call_args.args[0]
+        client._throttle.reconcile.assert_called_once_with(reserved, 0)
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_response_without_usage_settles_on_an_estimate(self, mock_openai_cls):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.return_value = _make_response_no_usage("ok")
+        client = LLMClient(api_key="sk-test", max_tokens=500)
+        client._throttle = MagicMock()
+        client._throttle.wait.return_value = 0.0
+
+        client.chat("sys", "usr")
+
+        reserved = client._throttle.wait.call_args.args[0]
+        (settled_reserved, used), _ = client._throttle.reconcile.call_args
+        assert settled_reserved == reserved
+        assert 0 < used < reserved - 400
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_clients_of_one_provider_share_a_limiter(self, mock_openai_cls):
+        first = LLMClient(api_key="sk-shared", model="m", base_url="https://x/v1", tpm_limit=100)
+        second = LLMClient(api_key="sk-shared", model="m", base_url="https://x/v1/", tpm_limit=100)
+        other = LLMClient(api_key="sk-other", model="m", base_url="https://x/v1", tpm_limit=100)
+
+        assert first._throttle is second._throttle
+        assert first._throttle is first.as_async()._throttle
+        assert other._throttle is not first._throttle
 
 
 class TestLLMClientMetrics:
@@ -519,3 +601,279 @@ class TestLLMClientMetrics:
             )
             == 1.0
         )
+
+
+class TestPromptCacheMetrics:
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_cached_tokens_and_hit_ratio_are_recorded(self, mock_openai_cls):
+        metrics.reset()
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        cached = _make_response("ok", prompt_tokens=100, completion_tokens=5)
+        cached.usage.prompt_tokens_details = SimpleNamespace(cached_tokens=80)
+        mock_client.chat.completions.create.side_effect = [
+            _make_response("ok", prompt_tokens=100, completion_tokens=5),
+            cached,
+        ]
+
+        client = LLMClient(api_key="sk-test")
+        client.chat("sys", "usr")
+        client.chat("sys", "usr2")
+
+        assert metrics.get_counter("llm_cached_prompt_tokens_total") == 80.0
+        assert metrics.get_gauge("llm_prompt_cache_hit_ratio") == pytest.approx(0.4)
+        assert metrics.get_gauge("llm_prompt_cache_last_hit_ratio") == pytest.approx(0.8)
+
+    def test_deepseek_cache_hit_field_is_understood(self):
+        usage = SimpleNamespace(prompt_tokens=50, prompt_cache_hit_tokens=32)
+
+        assert cached_prompt_tokens(usage) == 32
+        assert cached_prompt_tokens(SimpleNamespace(prompt_tokens=50)) == 0
+
+
+class TestLLMClientResponseCache:
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_repeated_request_is_served_from_cache(self, mock_openai_cls, tmp_path):
+        metrics.reset()
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.return_value = _make_response("cached")
+        cache = LLMResponseCache(tmp_path / "llm.sqlite3")
+
+        first = LLMClient(api_key="sk-test", response_cache=cache)
+        second = LLMClient(api_key="sk-test", response_cache=cache)
+
+        assert first.chat("sys", "usr") == "cached"
+        assert second.chat("sys", "usr") == "cached"
+        assert mock_client.chat.completions.create.call_count == 1
+        assert metrics.get_counter("llm_cache_hits_total") == 1.0
+
+        assert first.chat("sys", "other") == "cached"
+        assert mock_client.chat.completions.create.call_count == 2
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_sampled_requests_bypass_cache_when_opted_out(self, mock_openai_cls, tmp_path):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.return_value = _make_response("fresh")
+        cache = LLMResponseCache(tmp_path / "llm.sqlite3", cache_sampled=False)
+
+        client = LLMClient(api_key="sk-test", temperature=0.7, response_cache=cache)
+        client.chat("sys", "usr")
+        client.chat("sys", "usr")
+
+        assert mock_client.chat.completions.create.call_count == 2
+        assert cache.count() == 0
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_failed_requests_are_not_cached(self, mock_openai_cls, tmp_path):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = [
+            _make_response_empty(),
+            _make_response("ok"),
+        ]
+        client = LLMClient(api_key="sk-test", response_cache=LLMResponseCache(tmp_path / "c"))
+
+        with pytest.raises(CardGenError):
+            client.chat("sys", "usr")
+
+        assert client.chat("sys", "usr") == "ok"
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_use_cache_false_asks_again_and_refreshes_entry(self, mock_openai_cls, tmp_path):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = [
+            _make_response("rejected"),
+            _make_response("regenerated"),
+        ]
+        client = LLMClient(api_key="sk-test", response_cache=LLMResponseCache(tmp_path / "c"))
+
+        assert client.chat("sys", "usr") == "rejected"
+        assert client.chat("sys", "usr", use_cache=False) == "regenerated"
+        assert client.chat("sys", "usr") == "regenerated"
+        assert mock_client.chat.completions.create.call_count == 2
+
+
+def _stream_chunks(*parts: str):
+    return [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))], usage=None)
+        for part in parts
+    ]
+
+
+class TestLLMClientStreaming:
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_chat_stream_forwards_deltas_and_returns_full_text(self, mock_openai_cls):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.return_value = iter(_stream_chunks("[{", "}", "]"))
+        deltas: list[str] = []
+
+        client = LLMClient(api_key="sk-test")
+        result = client.chat_stream("sys", "usr", on_text=deltas.append)
+
+        assert result == "[{}]"
+        assert deltas == ["[{", "}", "]"]
+        assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+
+    @patch("ankismart.card_gen.llm_client.time.sleep")
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_stream_dropped_after_content_is_not_retried(self, mock_openai_cls, _mock_sleep):
+        from openai import APITimeoutError
+
+        def broken_stream():
+            yield from _stream_chunks("[{")
+            raise APITimeoutError(request=MagicMock())
+
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.return_value = broken_stream()
+        deltas: list[str] = []
+
+        client = LLMClient(api_key="sk-test")
+        with pytest.raises(CardGenError):
+            client.chat_stream("sys", "usr", on_text=deltas.append)
+
+        assert deltas == ["[{"]
+        assert mock_client.chat.completions.create.call_count == 1
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_stream_requests_and_records_usage(self, mock_openai_cls):
+        metrics.reset()
+        usage = SimpleNamespace(prompt_tokens=30, completion_tokens=12, total_tokens=42)
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.return_value = iter(
+            [*_stream_chunks("[]"), SimpleNamespace(choices=[], usage=usage)]
+        )
+
+        client = LLMClient(api_key="sk-test", base_url="https://usage.example.com/v1")
+        assert client.chat_stream("sys", "usr") == "[]"
+
+        kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert kwargs["stream_options"] == {"include_usage": True}
+        assert metrics.get_counter("llm_total_tokens_total") == 42
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_rejected_stream_options_fall_back_once(self, mock_openai_cls):
+        from openai import BadRequestError
+
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        base_url = "https://no-usage.example.com/v1"
+        response = httpx.Response(400, request=httpx.Request("POST", base_url))
+        mock_client.chat.completions.create.side_effect = [
+            BadRequestError(message="unknown field: stream_options", response=response, body=None),
+            iter(_stream_chunks("[]")),
+            iter(_stream_chunks("[]")),
+        ]
+        client = LLMClient(api_key="sk-test", base_url=base_url)
+
+        assert client.chat_stream("sys", "usr") == "[]"
+        assert client.chat_stream("sys", "usr") == "[]"
+
+        calls = mock_client.chat.completions.create.call_args_list
+        assert len(calls) == 3
+        assert "stream_options" in calls[0].kwargs
+        assert "stream_options" not in calls[1].kwargs
+        assert "stream_options" not in calls[2].kwargs
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_cache_hit_is_delivered_as_one_delta(self, mock_openai_cls, tmp_path):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.return_value = _make_response("[]")
+        client = LLMClient(api_key="sk-test", response_cache=LLMResponseCache(tmp_path / "c"))
+        client.chat("sys", "usr")
+        deltas: list[str] = []
+
+        assert client.chat_stream("sys", "usr", on_text=deltas.append) == "[]"
+        assert deltas == ["[]"]
+        assert mock_client.chat.completions.create.call_count == 1
+
+
+class TestLLMClientStructuredOutput:
+    _FORMAT = {"type": "json_schema", "json_schema": {"name": "flashcards", "schema": {}}}
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_response_format_is_sent_when_enabled(self, mock_openai_cls):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.return_value = _make_response('{"cards": []}')
+
+        client = LLMClient(
+            api_key="sk-test", base_url="https://schema-ok.example.com/v1", structured_output=True
+        )
+
+        assert client.supports_structured_output
+        client.chat("sys", "usr", response_format=self._FORMAT)
+        assert mock_client.chat.completions.create.call_args.kwargs["response_format"] == (
+            self._FORMAT
+        )
+        client.chat("sys", "usr")
+        assert "response_format" not in mock_client.chat.completions.create.call_args.kwargs
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_rejected_schema_disables_structured_output_for_the_endpoint(self, mock_openai_cls):
+        from openai import BadRequestError
+
+        metrics.reset()
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        base_url = "https://no-schema.example.com/v1"
+        response = httpx.Response(400, request=httpx.Request("POST", base_url))
+        mock_client.chat.completions.create.side_effect = BadRequestError(
+            message="response_format type json_schema is unavailable",
+            response=response,
+            body=None,
+        )
+        client = LLMClient(api_key="sk-test", base_url=base_url, structured_output=True)
+
+        with pytest.raises(CardGenError):
+            client.chat("sys", "usr", response_format=self._FORMAT)
+
+        assert not client.supports_structured_output
+        assert not LLMClient(
+            api_key="sk-other", base_url=base_url, structured_output=True
+        ).supports_structured_output
+        assert metrics.get_counter("llm_structured_output_rejected_total") == 1.0
+        with pytest.raises(CardGenError):
+            client.chat("sys", "usr", response_format=self._FORMAT)
+        assert mock_client.chat.completions.create.call_count == 1
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_unrelated_bad_request_keeps_structured_output(self, mock_openai_cls):
+        from openai import BadRequestError
+
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        base_url = "https://too-long.example.com/v1"
+        response = httpx.Response(400, request=httpx.Request("POST", base_url))
+        mock_client.chat.completions.create.side_effect = BadRequestError(
+            message="maximum context length exceeded", response=response, body=None
+        )
+        client = LLMClient(api_key="sk-test", base_url=base_url, structured_output=True)
+
+        with pytest.raises(CardGenError):
+            client.chat("sys", "usr", response_format=self._FORMAT)
+
+        assert client.supports_structured_output
+
+    @patch("ankismart.card_gen.llm_client.OpenAI")
+    def test_schema_is_part_of_the_cache_key(self, mock_openai_cls, tmp_path):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_client.chat.completions.create.return_value = _make_response("[]")
+        client = LLMClient(
+            api_key="sk-test",
+            base_url="https://schema-cache.example.com/v1",
+            structured_output=True,
+            response_cache=LLMResponseCache(tmp_path / "c"),
+        )
+
+        client.chat("sys", "usr")
+        client.chat("sys", "usr", response_format=self._FORMAT)
+
+        assert mock_client.chat.completions.create.call_count == 2
@@ -0,0 +1,313 @@
+"""Tests for ankismart.card_gen.llm_router module."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from ankismart.card_gen.llm_client import LLMClient
+from ankismart.card_gen.llm_router import (
+    AsyncLLMRouter,
+    LLMRouter,
+    ProviderHealth,
+    build_llm_client,
+)
+from ankismart.card_gen.tokens import ContextLimits
+from ankismart.core.errors import CardGenError, ErrorCode
+from ankismart.core.tracing import metrics
+
+
+class _FakeClient:
+    def __init__(self, name: str, *, fail: bool = False, limits=(128_000, 16_384)) -> None:
+        self.model = name
+        self.fail = fail
+        self.calls = 0
+        self.closed = False
+        self.context_limits = ContextLimits(*limits)
+
+    def chat(self, system_prompt, user_prompt, timeout=None):
+        self.calls += 1
+        if self.fail:
+            raise CardGenError("provider down", code=ErrorCode.E_LLM_ERROR)
+        return f"{self.model}:{user_prompt}"
+
+    def chat_stream(self, system_prompt, user_prompt, timeout=None, *, on_text=None):
+        self.calls += 1
+        on_text("partial")
+        if self.fail:
+            raise CardGenError("stream dropped", code=ErrorCode.E_LLM_ERROR)
+        return "partial"
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeAsyncClient:
+    def __init__(self, name: str, *, delay: float = 0.0, fail: bool = False) -> None:
+        self.model = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+        self.context_limits = ContextLimits(128_000, 16_384)
+
+    async def chat(self, system_prompt, user_prompt, timeout=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise CardGenError("provider down", code=ErrorCode.E_LLM_ERROR)
+        return self.model
+
+    async def chat_stream(self, system_prompt, user_prompt, timeout=None, *, on_text=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        on_text(self.model)
+        await asyncio.sleep(0)
+        return self.model
+
+    async def aclose(self):
+        return None
+
+
+def _warm(health: ProviderHealth, index: int, latency: float, count: int = 10) -> None:
+    for _ in range(count):
+        health.record_success(index, latency)
+
+
+class TestProviderHealth:
+    def test_failed_provider_is_tried_last_until_cooldown_ends(self):
+        health = ProviderHealth(["a", "b"], weights=[100, 1])
+
+        health.record_failure(0)
+
+        assert health.order() == [1, 0]
+        health.record_success(0, 0.1)
+        assert health.order()[0] in {0, 1}
+
+    def test_weights_bias_first_choice(self):
+        health = ProviderHealth(["a", "b"], weights=[9, 1])
+        health._random.seed(0)
+
+        firsts = [health.order()[0] for _ in range(200)]
+
+        assert firsts.count(0) > firsts.count(1) * 3
+
+    def test_hedge_delay_is_p95_after_warmup(self):
+        health = ProviderHealth(["a"])
+        _warm(health, 0, 1.0, count=9)
+        assert health.hedge_delay(0) is None
+
+        health.record_success(0, 9.0)
+
+        assert health.hedge_delay(0) == 9.0
+        _warm(health, 0, 1.0, count=20)
+        assert health.hedge_delay(0) == 1.0
+
+    def test_cancelled_requests_count_from_the_tail_only(self):
+        health = ProviderHealth(["a"])
+        _warm(health, 0, 1.0)
+
+        health.record_censored(0, 0.2)
+        assert health.hedge_delay(0) == 1.0
+
+        health.record_censored(0, 4.0)
+        assert health.hedge_delay(0) == 4.0
+
+
+class TestLLMRouter:
+    def test_fails_over_to_next_provider(self):
+        metrics.reset()
+        down, up = _FakeClient("down", fail=True), _FakeClient("up")
+        router = LLMRouter([down, up], weights=[100, 1])
+        router.health._random.seed(1)
+
+        assert router.chat("s", "u") == "up:u"
+        assert down.calls == 1
+        assert router.chat("s", "u") == "up:u"
+        assert down.calls == 1
+        assert metrics.get_counter("llm_provider_failovers_total") == 1.0
+
+    def test_raises_when_every_provider_fails(self):
+        router = LLMRouter([_FakeClient("a", fail=True), _FakeClient("b", fail=True)])
+
+        with pytest.raises(CardGenError, match="provider down"):
+            router.chat("s", "u")
+
+    def test_non_provider_errors_do_not_fail_over(self):
+        class _ParseFailing(_FakeClient):
+            def chat(self, system_prompt, user_prompt, timeout=None):
+                raise CardGenError("bad json", code=ErrorCode.E_LLM_PARSE_ERROR)
+
+        other = _FakeClient("other")
+        router = LLMRouter([_ParseFailing("a"), other], weights=[100, 1])
+        router.health.record_failure(1)
+
+        with pytest.raises(CardGenError, match="bad json"):
+            router.chat("s", "u")
+        assert other.calls == 0
+
+    def test_stream_does_not_fail_over_after_text_was_delivered(self):
+        down, up = _FakeClient("down", fail=True), _FakeClient("up")
+        router = LLMRouter([down, up])
+        router.health.record_failure(1)
+        deltas: list[str] = []
+
+        with pytest.raises(CardGenError):
+            router.chat_stream("s", "u", on_text=deltas.append)
+
+        assert deltas == ["partial"]
+        assert up.calls == 0
+
+    def test_context_limits_are_the_tightest_in_the_pool(self):
+        router = LLMRouter(
+            [_FakeClient("a", limits=(128_000, 4_096)), _FakeClient("b", limits=(64_000, 8_192))]
+        )
+
+        assert router.context_limits == ContextLimits(64_000, 4_096)
+
+    def test_structured_output_needs_every_provider(self):
+        clients = [_FakeClient("a"), _FakeClient("b")]
+        clients[0].supports_structured_output = True
+
+        assert not LLMRouter(clients).supports_structured_output
+        clients[1].supports_structured_output = True
+        assert LLMRouter(clients).supports_structured_output
+
+    def test_close_closes_every_client(self):
+        clients = [_FakeClient("a"), _FakeClient("b")]
+
+        LLMRouter(clients).close()
+
+        assert all(client.closed for client in clients)
+
+
+class TestAsyncLLMRouter:
+    def test_slow_request_is_hedged_to_second_provider(self):
+        metrics.reset()
+        slow, fast = _FakeAsyncClient("slow", delay=1.0), _FakeAsyncClient("fast", delay=0.01)
+        health = ProviderHealth(["slow", "fast"], weights=[1_000, 1])
+        _warm(health, 0, 0.05)
+        health._random.seed(0)
+        router = AsyncLLMRouter([slow, fast], health=health, hedge=True)
+
+        result = asyncio.run(router.chat("s", "u"))
+
+        assert result == "fast"
+        assert slow.cancelled == 1
+        assert metrics.get_counter("llm_hedged_requests_total") == 1.0
+        assert metrics.get_counter("llm_hedged_wins_total") == 1.0
+        # The cancelled primary still reports that it ran past its p95.
+        assert health.hedge_delay(0) > 0.05
+
+    def test_without_hedging_waits_for_primary(self):
+        slow, fast = _FakeAsyncClient("slow", delay=0.1), _FakeAsyncClient("fast")
+        health = ProviderHealth(["slow", "fast"], weights=[1_000, 1])
+        _warm(health, 0, 0.01)
+        health._random.seed(0)
+        router = AsyncLLMRouter([slow, fast], health=health, hedge=False)
+
+        assert asyncio.run(router.chat("s", "u")) == "slow"
+        assert fast.calls == 0
+
+    def test_hedged_stream_delivers_only_the_winner(self):
+        slow, fast = _FakeAsyncClient("slow", delay=1.0), _FakeAsyncClient("fast", delay=0.01)
+        health = ProviderHealth(["slow", "fast"], weights=[1_000, 1])
+        _warm(health, 0, 0.05)
+        health._random.seed(0)
+        router = AsyncLLMRouter([slow, fast], health=health, hedge=True)
+        deltas: list[str] = []
+
+        assert asyncio.run(router.chat_stream("s", "u", on_text=deltas.append)) == "fast"
+        assert deltas == ["fast"]
+
+    def test_async_failover(self):
+        down, up = _FakeAsyncClient("down", fail=True), _FakeAsyncClient("up")
+        health = ProviderHealth(["down", "up"], weights=[1_000, 1])
+        health._random.seed(0)
+        router = AsyncLLMRouter([down, up], health=health)
+
+        assert asyncio.run(router.chat("s", "u")) == "up"
+
+    def test_congestion_listener_reaches_every_client(self):
+        clients = [_FakeAsyncClient("a"), _FakeAsyncClient("b")]
+        for client in clients:
+            client.congestion_listener = None
+        router = AsyncLLMRouter(clients)
+
+        router.congestion_listener = print
+
+        assert all(client.congestion_listener is print for client in clients)
+
+
+class TestBuildLLMClient:
+    @staticmethod
+    def _provider(provider_id: str, **overrides):
+        values = {
+            "id": provider_id,
+            "name": provider_id.upper(),
+            "api_key": f"sk-{provider_id}",
+            "base_url": f"https://{provider_id}.example.com/v1",
+            "model": f"model-{provider_id}",
+            "rpm_limit": 0,
+            "routing_weight": 1,
+        }
+        values.update(overrides)
+        return SimpleNamespace(**values)
+
+    def test_single_provider_without_routing(self, monkeypatch):
+        monkeypatch.setattr("ankismart.card_gen.llm_client.OpenAI", lambda **_kwargs: object())
+        primary = self._provider("a")
+        config = SimpleNamespace(
+            llm_multi_provider=False, llm_providers=[primary, self._provider("b")], proxy_url=""
+        )
+
+        client = build_llm_client(config, primary)
+
+        assert isinstance(client, LLMClient)
+        assert client.model == "model-a"
+
+    def test_router_over_enabled_providers(self, monkeypatch):
+        monkeypatch.setattr("ankismart.card_gen.llm_client.OpenAI", lambda **_kwargs: object())
+        primary = self._provider("a", routing_weight=3)
+        config = SimpleNamespace(
+            llm_multi_provider=True,
+            llm_hedged_requests=True,
+            llm_providers=[
+                primary,
+                self._provider("b"),
+                self._provider("off", routing_weight=0),
+                self._provider("nokey", api_key="", base_url=""),
+            ],
+            proxy_url="",
+        )
+
+        router = build_llm_client(config, primary)
+
+        assert isinstance(router, LLMRouter)
+        assert [client.model for client in router.clients] == ["model-a", "model-b"]
+        assert router.health.names == ["A", "B"]
+        assert isinstance(router.as_async(), AsyncLLMRouter)
+        router.close()
+
+    def test_clients_use_the_configured_sampling_settings(self, monkeypatch):
+        monkeypatch.setattr("ankismart.card_gen.llm_client.OpenAI", lambda **_kwargs: object())
+        primary = self._provider("a")
+        config = SimpleNamespace(
+            llm_multi_provider=True,
+            llm_providers=[primary, self._provider("b")],
+            llm_temperature=0.0,
+            llm_max_tokens=2048,
+            proxy_url="",
+        )
+
+        router = build_llm_client(config, primary)
+
+        assert [client._temperature for client in router.clients] == [0.0, 0.0]
+        assert [client._max_tokens for client in router.clients] == [2048, 2048]
+        router.close()
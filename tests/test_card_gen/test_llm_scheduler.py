@@ -0,0 +1,240 @@
+"""Tests for ankismart.card_gen.llm_scheduler module."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from ankismart.card_gen.async_llm_client import AsyncLLMClient
+from ankismart.card_gen.llm_scheduler import AIMDConcurrencyLimit, LLMRequestScheduler
+from ankismart.card_gen.response_cache import LLMResponseCache
+from ankismart.core.cancellation import CancellationToken
+from ankismart.core.errors import CardGenError, OperationCancelledError
+from ankismart.core.tracing import metrics, trace_context
+
+
+class _FakeAsyncClient:
+    model = "fake-model"
+
+    def __init__(self, *, delay: float = 0.05, fail_on: str = "") -> None:
+        self.delay = delay
+        self.fail_on = fail_on
+        self.active = 0
+        self.peak = 0
+        self.closed = False
+        self.threads: set[str] = set()
+
+    async def chat(self, system_prompt: str, user_prompt: str, timeout=None) -> str:
+        self.threads.add(threading.current_thread().name)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if user_prompt == self.fail_on:
+                raise CardGenError("boom")
+            return f"{system_prompt}:{user_prompt}"
+        finally:
+            self.active -= 1
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+def test_chat_each_runs_requests_concurrently_within_bound() -> None:
+    client = _FakeAsyncClient()
+
+    with LLMRequestScheduler(client, max_in_flight=4) as scheduler:
+        results = scheduler.chat_each([("s", str(i)) for i in range(12)])
+
+    assert results == [f"s:{i}" for i in range(12)]
+    assert client.peak == 4
+    assert client.threads == {"llm-request-scheduler"}
+    assert client.closed
+
+
+def test_sync_facade_is_safe_from_many_threads() -> None:
+    client = _FakeAsyncClient(delay=0.02)
+    results: list[str] = []
+    lock = threading.Lock()
+
+    with LLMRequestScheduler(client, max_in_flight=8) as scheduler:
+        assert scheduler.model == "fake-model"
+
+        def call(index: int) -> None:
+            value = scheduler.chat("sys", str(index))
+            with lock:
+                results.append(value)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert sorted(results) == sorted(f"sys:{i}" for i in range(10))
+
+
+def test_errors_propagate_to_caller() -> None:
+    client = _FakeAsyncClient(fail_on="bad")
+
+    with LLMRequestScheduler(client) as scheduler:
+        with pytest.raises(CardGenError):
+            scheduler.chat("sys", "bad")
+
+
+def test_chat_each_keeps_other_results_when_one_request_fails() -> None:
+    client = _FakeAsyncClient(fail_on="bad")
+
+    with LLMRequestScheduler(client, max_in_flight=2) as scheduler:
+        results = scheduler.chat_each([("s", "a"), ("s", "bad"), ("s", "c")])
+
+    assert results[0] == "s:a"
+    assert isinstance(results[1], CardGenError)
+    assert results[2] == "s:c"
+
+
+def test_chat_each_stops_on_the_callers_cancel_token() -> None:
+    token = CancellationToken()
+    client = _FakeAsyncClient(delay=5.0)
+
+    with LLMRequestScheduler(client, max_in_flight=1) as scheduler:
+        threading.Timer(0.1, token.cancel).start()
+        with pytest.raises(OperationCancelledError):
+            scheduler.chat_each([("s", "a"), ("s", "b")], cancel_token=token)
+
+
+def test_trace_id_follows_request_onto_loop() -> None:
+    seen: list[str | None] = []
+
+    class _TraceClient(_FakeAsyncClient):
+        async def chat(self, system_prompt, user_prompt, timeout=None):
+            from ankismart.core.tracing import peek_trace_id
+
+            seen.append(peek_trace_id())
+            return "ok"
+
+    with LLMRequestScheduler(_TraceClient()) as scheduler, trace_context("trace-xyz"):
+        scheduler.chat("sys", "usr")
+
+    assert seen == ["trace-xyz"]
+
+
+def test_cancel_token_aborts_waiting_and_queued_requests() -> None:
+    token = CancellationToken()
+    client = _FakeAsyncClient(delay=5.0)
+
+    with LLMRequestScheduler(client, max_in_flight=1, cancel_token=token) as scheduler:
+        threading.Timer(0.1, token.cancel).start()
+        with pytest.raises(OperationCancelledError):
+            scheduler.chat_each([("s", "a"), ("s", "b")])
+        with pytest.raises(OperationCancelledError):
+            scheduler.chat("s", "c")
+
+
+def test_chat_stream_passes_deltas_through_the_loop() -> None:
+    class _StreamingClient(_FakeAsyncClient):
+        async def chat_stream(self, system_prompt, user_prompt, timeout=None, *, on_text=None):
+            for part in ("a", "b"):
+                on_text(part)
+                await asyncio.sleep(0)
+            return "ab"
+
+    deltas: list[str] = []
+    with LLMRequestScheduler(_StreamingClient()) as scheduler:
+        assert scheduler.chat_stream("s", "u", on_text=deltas.append) == "ab"
+
+    assert deltas == ["a", "b"]
+
+
+class TestAIMDConcurrencyLimit:
+    def test_successes_grow_window_additively_up_to_maximum(self):
+        limit = AIMDConcurrencyLimit(initial=2, maximum=4)
+
+        for _ in range(3):
+            limit.on_success(1.0)
+        assert limit.limit == 3
+
+        for _ in range(20):
+            limit.on_success(1.0)
+        assert limit.limit == 4
+
+    def test_congestion_halves_window_once_per_round_trip(self):
+        metrics.reset()
+        limit = AIMDConcurrencyLimit(initial=8, maximum=8)
+        started = 0.0
+
+        limit.on_congestion("rate_limited", started=started)
+        limit.on_congestion("rate_limited", started=started)
+
+        assert limit.limit == 4
+        assert metrics.get_gauge("llm_concurrency_window") == 4
+
+        limit.on_congestion("timeout")
+        limit.on_congestion("timeout")
+        assert limit.limit == 1
+
+    def test_latency_spike_counts_as_congestion(self):
+        limit = AIMDConcurrencyLimit(initial=6, maximum=6, warmup_samples=3)
+        for _ in range(3):
+            limit.on_success(1.0)
+
+        limit.on_success(5.0)
+
+        assert limit.limit == 3
+
+
+def test_adaptive_scheduler_shrinks_in_flight_after_rate_limits() -> None:
+    class _ThrottledClient(_FakeAsyncClient):
+        congestion_listener = None
+
+        async def chat(self, system_prompt, user_prompt, timeout=None):
+            if user_prompt == "0":
+                self.congestion_listener("rate_limited")
+            return await super().chat(system_prompt, user_prompt, timeout=timeout)
+
+    client = _ThrottledClient(delay=0.05)
+
+    with LLMRequestScheduler(client, max_in_flight=4, adaptive=True) as scheduler:
+        assert scheduler.concurrency_limit == 4
+        scheduler.chat("s", "0")
+        assert scheduler.concurrency_limit == 2
+
+        client.peak = 0
+        scheduler.chat_each([("s", str(i)) for i in range(1, 5)])
+
+    assert client.peak == 2
+    assert scheduler.concurrency_limit == 3
+
+
+@patch("ankismart.card_gen.async_llm_client.AsyncOpenAI")
+def test_cache_hits_do_not_shrink_the_adaptive_window(mock_openai_cls, tmp_path) -> None:
+    async def provider(**_kwargs):
+        await asyncio.sleep(0.05)
+        message = SimpleNamespace(content="[]")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(side_effect=provider)
+    mock_client.close = AsyncMock()
+    mock_openai_cls.return_value = mock_client
+    client = AsyncLLMClient(
+        api_key="sk-test", response_cache=LLMResponseCache(tmp_path / "llm.sqlite3")
+    )
+    metrics.reset()
+
+    with LLMRequestScheduler(client, max_in_flight=4, adaptive=True) as scheduler:
+        for i in range(6):
+            scheduler.chat("s", f"fresh-{i}")
+        # Near-instant replays must not drag the latency baseline down...
+        for _ in range(20):
+            scheduler.chat("s", "fresh-0")
+        # ...or the next ordinary provider call would look like a latency spike.
+        scheduler.chat("s", "fresh-6")
+
+    assert mock_client.chat.completions.create.await_count == 7
+    assert scheduler.concurrency_limit == 4
+    assert metrics.get_counter("llm_concurrency_decreases_total", labels={"reason": "latency"}) == 0
@@ -0,0 +1,126 @@
+"""Tests for ankismart.card_gen.near_duplicates module."""
+
+from __future__ import annotations
+
+import random
+from difflib import SequenceMatcher
+
+from ankismart.card_gen.near_duplicates import (
+    NearDuplicateIndex,
+    find_near_duplicate_indices,
+    normalize_for_similarity,
+)
+
+_WORDS = (
+    "cell membrane protein enzyme reaction energy transport gradient signal receptor "
+    "molecule structure function pathway cycle acid base bond charge current voltage "
+    "resistance field force mass velocity momentum pressure volume heat entropy"
+).split()
+
+
+def _sentences(count: int, seed: int = 3) -> list[str]:
+    rng = random.Random(seed)
+    return ["What is the " + " ".join(rng.choice(_WORDS) for _ in range(12)) for _ in range(count)]
+
+
+def _brute_force(texts: list[str], threshold: float) -> set[int]:
+    normalized = [normalize_for_similarity(text) for text in texts]
+    found: set[int] = set()
+    for i, left in enumerate(normalized):
+        for j in range(i + 1, len(normalized)):
+            right = normalized[j]
+            if left and right and SequenceMatcher(None, left, right).ratio() >= threshold:
+                found.update((i, j))
+    return found
+
+
+class TestNearDuplicateIndex:
+    def test_query_finds_near_duplicate_but_not_unrelated_text(self):
+        index = NearDuplicateIndex(0.9)
+        index.add("a", "What is the role of ATP synthase in the mitochondria?")
+        index.add("b", "Define the term osmotic pressure.")
+
+        assert index.query("what is the role of ATP  synthase in mitochondria?") == ["a"]
+        assert index.query("Explain Newton's third law of motion.") == []
+        assert index.contains_similar("Define the term osmotic pressure")
+
+    def test_remove_and_replace(self):
+        index = NearDuplicateIndex(0.9)
+        index.add(1, "What is the role of ATP synthase in the mitochondria?")
+
+        index.add(1, "Define the term osmotic pressure.")
+
+        assert len(index) == 1
+        assert not index.contains_similar("What is the role of ATP synthase in the mitochondria?")
+        assert index.remove(1)
+        assert not index.remove(1)
+        assert 1 not in index
+        assert not index.contains_similar("Define the term osmotic pressure.")
+
+    def test_empty_text_is_not_indexed(self):
+        index = NearDuplicateIndex(0.9)
+        index.add_many([(0, ""), (1, "   "), (2, "")])
+
+        assert len(index) == 0
+        assert index.query("") == []
+        assert index.duplicate_keys() == set()
+
+    def test_similar_keys_excludes_self(self):
+        index = NearDuplicateIndex(0.9)
+        index.add_many(
+            [
+                (0, "What is the function of the sodium potassium pump?"),
+                (1, "What is the function of the sodium-potassium pump?"),
+                (2, "Explain Newton's third law of motion."),
+            ]
+        )
+
+        assert index.similar_keys(0) == [1]
+        assert index.similar_keys(2) == []
+        assert index.similar_keys("missing") == []
+
+    def test_pairs_are_compared_in_the_order_of_a_pairwise_scan(self):
+        # SequenceMatcher.ratio is 0.81 with the first text first and 0.79 the other way.
+        first = "what is the voltage enzyme structure"
+        second = "what is the enzyme voltage membrane structure"
+        index = NearDuplicateIndex(0.8)
+        index.add_many([(0, first), (1, second)])
+
+        assert index.duplicate_keys() == {0, 1}
+        assert index.similar_keys(0) == [1]
+        assert index.similar_keys(1) == [0]
+        # A query is compared first, like a new card checked against accepted ones.
+        index.remove(1)
+        assert index.query(second) == []
+
+    def test_small_sets_are_exact_below_the_lsh_jaccard_floor(self):
+        # Reordered words: ratio 0.61 but a trigram Jaccard the LSH is not tuned for.
+        texts = [
+            "third function why of enzyme osmotic of law function energy how process",
+            "atp why function osmotic cell function define prodess role third",
+        ]
+
+        assert find_near_duplicate_indices(texts, 0.6) == _brute_force(texts, 0.6) == {0, 1}
+
+
+class TestFindNearDuplicateIndices:
+    def test_matches_pairwise_sequence_matcher(self):
+        texts = _sentences(200)
+        rng = random.Random(5)
+        for i in range(0, 200, 10):
+            words = texts[i].split()
+            words[rng.randrange(3, len(words))] = rng.choice(_WORDS)
+            texts[i + 1] = " ".join(words)
+        texts[7] = ""
+
+        for threshold in (0.9, 0.8):
+            assert find_near_duplicate_indices(texts, threshold) == _brute_force(texts, threshold)
+
+    def test_large_input_is_checked_without_a_comparison_budget(self):
+        texts = _sentences(3_000, seed=11)
+        texts.append(texts[0] + "?")
+        texts.append(texts[2_500].upper())
+
+        found = find_near_duplicate_indices(texts, 0.9)
+
+        assert {0, 2_500, 3_000, 3_001} <= found
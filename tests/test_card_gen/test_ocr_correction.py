@@ -0,0 +1,223 @@
+"""Tests for ankismart.card_gen.ocr_correction."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from ankismart.card_gen.llm_scheduler import LLMRequestScheduler
+from ankismart.card_gen.ocr_correction import (
+    LineBatch,
+    correct_low_confidence_lines,
+    correct_ocr_chunks,
+    find_low_confidence_lines,
+    parse_line_fixes,
+    plan_line_batches,
+    render_line_batch,
+    split_ocr_chunks,
+)
+from ankismart.card_gen.prompts import OCR_CORRECTION_PROMPT, OCR_LINE_CORRECTION_PROMPT
+from ankismart.core.cancellation import CancellationToken
+from ankismart.core.errors import OperationCancelledError
+
+
+class _ChatClient:
+    """Blocking client whose responses come from ``reply(system_prompt, user_prompt)``."""
+
+    def __init__(self, reply) -> None:
+        self._reply = reply
+
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        return self._reply(system_prompt, user_prompt)
+
+
+class _AsyncChatClient:
+    model = "fake-model"
+
+    def __init__(self, reply) -> None:
+        self._reply = reply
+        self.active = 0
+        self.peak = 0
+
+    async def chat(self, system_prompt: str, user_prompt: str, timeout=None) -> str:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.02)
+            return self._reply(system_prompt, user_prompt)
+        finally:
+            self.active -= 1
+
+    async def aclose(self) -> None:
+        pass
+
+
+def test_find_low_confidence_lines_skips_structural_and_blank_lines() -> None:
+    lines = ["## Page 1", "", "good", "bad", "   "]
+    scores = [None, None, 0.99, 0.42, 0.1]
+
+    assert find_low_confidence_lines(lines, scores, threshold=0.85) == [3]
+
+
+def test_plan_line_batches_merges_overlapping_context_and_respects_limits() -> None:
+    lines = [f"line {i}" for i in range(10)]
+
+    batches = plan_line_batches(lines, [2, 3, 8], context_lines=1, max_targets=2)
+
+    assert batches == [
+        LineBatch(targets=(2, 3), window=(1, 2, 3, 4)),
+        LineBatch(targets=(8,), window=(7, 8, 9)),
+    ]
+
+
+def test_render_line_batch_marks_targets_with_one_based_numbers() -> None:
+    lines = ["a", "b", "c", "d", "e"]
+
+    rendered = render_line_batch(lines, LineBatch(targets=(1,), window=(0, 1, 4)))
+
+    assert rendered.splitlines() == ["   1: a", ">> 2: b", "...", "   5: e"]
+
+
+def test_parse_line_fixes_ignores_context_lines_and_runaway_rewrites() -> None:
+    lines = ["ctx", "teh cat", "ok"]
+    batch = LineBatch(targets=(1,), window=(0, 1, 2))
+    response = "Sure:\n" + json.dumps({"1": "changed ctx", "2": "the cat", "3": "x" * 200})
+
+    assert parse_line_fixes(response, batch, lines) == {1: "the cat"}
+    assert parse_line_fixes("not json", batch, lines) == {}
+
+
+def test_correct_low_confidence_lines_only_sends_suspicious_lines() -> None:
+    prompts: list[str] = []
+
+    def chat(system_prompt: str, user_prompt: str) -> str:
+        assert system_prompt == OCR_LINE_CORRECTION_PROMPT
+        prompts.append(user_prompt)
+        return json.dumps({"4": "recognized text"})
+
+    text = "## Page 1\n\nclean line\nrec0gnized text\nanother clean line"
+    scores = [None, None, 0.99, 0.51, 0.97]
+
+    result = correct_low_confidence_lines(text, scores, _ChatClient(chat))
+
+    assert result == "## Page 1\n\nclean line\nrecognized text\nanother clean line"
+    assert len(prompts) == 1
+    assert ">> 4: rec0gnized text" in prompts[0]
+    assert "## Page 1" not in prompts[0]
+
+
+def test_correct_low_confidence_lines_skips_llm_when_everything_is_confident() -> None:
+    def chat(_system_prompt: str, _user_prompt: str) -> str:
+        raise AssertionError("LLM should not be called")
+
+    text = "alpha\nbeta"
+
+    assert correct_low_confidence_lines(text, [0.99, 0.98], _ChatClient(chat)) == text
+
+
+def test_failed_batch_keeps_raw_lines_while_other_batches_apply() -> None:
+    def chat(_system_prompt: str, user_prompt: str) -> str:
+        if ">> 1:" in user_prompt:
+            raise RuntimeError("provider down")
+        return json.dumps({"5": "fixed five"})
+
+    lines = ["bad one", "ok", "ok", "ok", "bad five"]
+    scores = [0.2, 0.99, 0.99, 0.99, 0.2]
+
+    with LLMRequestScheduler(_AsyncChatClient(chat), max_in_flight=2) as scheduler:
+        result = correct_low_confidence_lines(
+            "\n".join(lines), scores, scheduler, max_lines_per_batch=1
+        )
+
+    assert result.split("\n") == ["bad one", "ok", "ok", "ok", "fixed five"]
+
+
+def test_cancelled_token_stops_before_any_request() -> None:
+    token = CancellationToken()
+    token.cancel()
+
+    def chat(_system_prompt: str, _user_prompt: str) -> str:
+        raise AssertionError("LLM should not be called")
+
+    with pytest.raises(OperationCancelledError):
+        correct_low_confidence_lines("bad", [0.1], _ChatClient(chat), cancel_token=token)
+
+
+def test_line_batches_are_numbered_per_page_so_pages_cache_independently() -> None:
+    prompts: list[str] = []
+
+    def chat(_system_prompt: str, user_prompt: str) -> str:
+        prompts.append(user_prompt)
+        return json.dumps({"3": "fixed"})
+
+    page_two = ["## Page 2", "", "bad two"]
+    scores = [None, None, 0.2]
+    first = correct_low_confidence_lines(
+        "\n".join(["## Page 1", "", "bad one", "", "---", "", *page_two]),
+        [None, None, 0.2, None, None, None, *scores],
+        _ChatClient(chat),
+    )
+    second = correct_low_confidence_lines("\n".join(page_two), scores, _ChatClient(chat))
+
+    assert first.split("\n")[2] == "fixed"
+    assert first.split("\n")[-1] == "fixed"
+    assert second.split("\n")[-1] == "fixed"
+    # Page two is sent as the same prompt on its own, so the response cache can reuse it.
+    assert sorted(prompt.split("\n")[-1] for prompt in prompts) == [
+        ">> 3: bad one",
+        ">> 3: bad two",
+        ">> 3: bad two",
+    ]
+
+
+def test_split_ocr_chunks_joins_back_and_bounds_large_pages() -> None:
+    long_page = "## Page 2\n\n" + "\n\n".join(f"paragraph {i} " * 8 for i in range(6))
+    text = f"## Page 1\n\nshort page\n\n---\n\n{long_page}"
+
+    pieces = split_ocr_chunks(text, max_chars=150)
+
+    assert "".join(piece for piece, _ in pieces) == text
+    assert pieces[0] == ("## Page 1\n\nshort page", True)
+    assert pieces[1] == ("\n\n---\n\n", False)
+    assert all(len(piece) <= 150 for piece, _ in pieces)
+    assert len(pieces) > 3
+
+
+def test_correct_ocr_chunks_sends_each_page_once() -> None:
+    prompts: list[str] = []
+
+    def chat(system_prompt: str, user_prompt: str) -> str:
+        assert system_prompt == OCR_CORRECTION_PROMPT
+        prompts.append(user_prompt)
+        return user_prompt.replace("0", "o")
+
+    text = "## Page 1\n\nf0o\n\n---\n\n## Page 2\n\nb0ar"
+
+    result = correct_ocr_chunks(text, _ChatClient(chat))
+
+    assert result == "## Page 1\n\nfoo\n\n---\n\n## Page 2\n\nboar"
+    assert prompts == ["## Page 1\n\nf0o", "## Page 2\n\nb0ar"]
+
+
+def test_correct_ocr_chunks_sends_pages_concurrently_through_a_scheduler() -> None:
+    client = _AsyncChatClient(lambda _system, user: user.replace("0", "o"))
+    text = "\n\n---\n\n".join(f"## Page {index}\n\nb0ar" for index in range(6))
+
+    with LLMRequestScheduler(client, max_in_flight=3) as scheduler:
+        result = correct_ocr_chunks(text, scheduler)
+
+    assert result == text.replace("0", "o")
+    assert client.peak == 3
+
+
+def test_failed_chunk_keeps_its_raw_text() -> None:
+    def chat(_system_prompt: str, user_prompt: str) -> str:
+        if "Page 1" in user_prompt:
+            raise RuntimeError("context length exceeded")
+        return user_prompt.upper()
+
+    result = correct_ocr_chunks("## Page 1\n\nraw\n\n---\n\n## Page 2\n\nraw", _ChatClient(chat))
+
+    assert result == "## Page 1\n\nraw\n\n---\n\n## PAGE 2\n\nRAW"
@@ -0,0 +1,26 @@
+"""Tests for ankismart.card_gen.output_schema module."""
+
+from __future__ import annotations
+
+from ankismart.card_gen.output_schema import card_schema, cards_response_format
+
+
+class TestCardsResponseFormat:
+    def test_strict_schema_with_one_array_per_key(self):
+        response_format = cards_response_format({"basic": "Basic", "cloze": "Cloze"})
+
+        assert response_format["type"] == "json_schema"
+        assert response_format["json_schema"]["strict"] is True
+        schema = response_format["json_schema"]["schema"]
+        assert schema["required"] == ["basic", "cloze"]
+        assert schema["additionalProperties"] is False
+        assert schema["properties"]["cloze"]["items"] == card_schema("Cloze")
+
+    def test_card_schema_requires_every_note_field(self):
+        assert card_schema("Basic") == {
+            "type": "object",
+            "properties": {"Front": {"type": "string"}, "Back": {"type": "string"}},
+            "required": ["Front", "Back"],
+            "additionalProperties": False,
+        }
+        assert card_schema("Unknown") == card_schema("Basic")
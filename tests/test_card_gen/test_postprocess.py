@@ -8,8 +8,12 @@ import pytest
 
 from ankismart.card_gen.card_pipeline import normalize_card_draft
 from ankismart.card_gen.postprocess import (
+    IncrementalCardParser,
     build_card_drafts,
     parse_llm_output,
+    parse_typed_llm_output,
+    recover_llm_output,
+    recover_typed_llm_output,
     validate_cloze,
 )
 from ankismart.core.errors import CardGenError, ErrorCode
@@ -91,6 +95,145 @@ class TestParseLlmOutput:
 # ---------------------------------------------------------------------------
 
 
+class TestParseTypedLlmOutput:
+    """Tests for parse_typed_llm_output."""
+
+    def test_object_keyed_by_type_in_code_fence(self):
+        raw = (
+            "```json\n"
+            + json.dumps({"Basic": [{"Front": "Q", "Back": "A"}], "other": [{"x": 1}]})
+            + "\n```"
+        )
+
+        result = parse_typed_llm_output(raw, ["basic", "cloze"])
+
+        assert result == {"basic": [{"Front": "Q", "Back": "A"}], "cloze": []}
+
+    def test_flat_array_routed_by_type_field(self):
+        raw = json.dumps(
+            [
+                {"type": "cloze", "Text": "{{c1::x}}"},
+                {"type": "basic", "Front": "Q", "Back": "A"},
+                {"type": "unknown", "Front": "?"},
+            ]
+        )
+
+        result = parse_typed_llm_output(raw, ["basic", "cloze"])
+
+        assert result == {
+            "basic": [{"Front": "Q", "Back": "A"}],
+            "cloze": [{"Text": "{{c1::x}}"}],
+        }
+
+    def test_invalid_json_raises_parse_error(self):
+        with pytest.raises(CardGenError) as exc_info:
+            parse_typed_llm_output("{not json", ["basic"])
+        assert exc_info.value.code == ErrorCode.E_LLM_PARSE_ERROR
+
+    def test_structured_output_is_parsed_without_fence_stripping(self):
+        raw = json.dumps({"cards": [{"Front": "Q", "Back": "```py\nx = 1\n```"}]})
+
+        result = parse_typed_llm_output(raw, ["cards"], structured=True)
+
+        assert result == {"cards": [{"Front": "Q", "Back": "```py\nx = 1\n```"}]}
+        with pytest.raises(CardGenError):
+            parse_typed_llm_output("```json\n" + raw + "\n```", ["cards"], structured=True)
+
+
+class TestIncrementalCardParser:
+    """Tests for IncrementalCardParser."""
+
+    @staticmethod
+    def _feed_in_pieces(raw: str, size: int = 3) -> list[list[tuple[str, dict]]]:
+        parser = IncrementalCardParser()
+        return [parser.feed(raw[i : i + size]) for i in range(0, len(raw), size)]
+
+    def test_cards_are_emitted_as_soon_as_each_object_closes(self):
+        first = '{"Front": "Q1", "Back": "A1"}'
+        second = '{"Front": "Q2", "Back": "A2"}'
+        parser = IncrementalCardParser()
+
+        assert parser.feed("```json\n[" + first[:-1]) == []
+        assert parser.feed("}, " + second[:10]) == [("", {"Front": "Q1", "Back": "A1"})]
+        assert parser.feed(second[10:] + "]\n```") == [("", {"Front": "Q2", "Back": "A2"})]
+        assert len(parser.cards) == 2
+
+    def test_braces_and_quotes_inside_strings_are_ignored(self):
+        card = {"Front": 'Set {a, b} and "[x]" \\ done', "Back": "{{c1::x}}"}
+        raw = json.dumps([card, {"Front": "Q", "Back": {"nested": [1, 2]}}, 3])
+
+        emitted = [item for batch in self._feed_in_pieces(raw) for item in batch]
+
+        assert emitted == [("", card), ("", {"Front": "Q", "Back": {"nested": [1, 2]}})]
+
+    def test_multi_strategy_object_reports_card_type_key(self):
+        raw = json.dumps({"basic": [{"Front": "Q", "Back": "A"}], "cloze": [{"Text": "{{c1::x}}"}]})
+
+        emitted = [item for batch in self._feed_in_pieces(raw, size=5) for item in batch]
+
+        assert emitted == [
+            ("basic", {"Front": "Q", "Back": "A"}),
+            ("cloze", {"Text": "{{c1::x}}"}),
+        ]
+
+    def test_truncated_stream_keeps_completed_cards_only(self):
+        parser = IncrementalCardParser()
+        parser.feed('[{"Front": "Q1", "Back": "A1"}, {"Front": "Q2", "Ba')
+
+        assert parser.cards == [("", {"Front": "Q1", "Back": "A1"})]
+        assert not parser.closed
+
+    def test_malformed_object_is_counted_and_skipped(self):
+        parser = IncrementalCardParser()
+        parser.feed('[{"Front": "Q1", "Back": A1}, {"Front": "Q2", "Back": "A2",}]')
+
+        assert parser.cards == [("", {"Front": "Q2", "Back": "A2"})]
+        assert parser.dropped == 1
+        assert parser.closed
+
+
+class TestRecoverLlmOutput:
+    """Tests for recover_llm_output and recover_typed_llm_output."""
+
+    def test_valid_output_is_not_damaged(self):
+        recovered = recover_llm_output(json.dumps([{"Front": "Q", "Back": "A"}]))
+
+        assert recovered.cards == [{"Front": "Q", "Back": "A"}]
+        assert not recovered.damaged
+
+    def test_truncated_array_keeps_complete_cards(self):
+        raw = json.dumps([{"Front": f"Q{i}", "Back": f"A{i}"} for i in range(5)])[:-20]
+
+        recovered = recover_llm_output(raw)
+
+        assert [card["Front"] for card in recovered.cards] == ["Q0", "Q1", "Q2", "Q3"]
+        assert recovered.truncated
+        assert recovered.dropped == 0
+
+    def test_malformed_object_is_reported_as_dropped(self):
+        raw = '[{"Front": "Q1", "Back": "A1"}, {"Front": "Q2" "Back": "A2"}]'
+
+        recovered = recover_llm_output(raw)
+
+        assert recovered.cards == [{"Front": "Q1", "Back": "A1"}]
+        assert recovered.dropped == 1
+        assert not recovered.truncated
+
+    def test_output_without_any_card_still_raises(self):
+        with pytest.raises(CardGenError) as exc_info:
+            recover_llm_output("not json at all")
+        assert exc_info.value.code == ErrorCode.E_LLM_PARSE_ERROR
+
+    def test_typed_output_is_salvaged_per_type(self):
+        cards = {"basic": [{"Front": "Q", "Back": "A"}], "cloze": [{"Text": "{{c1::x}}"}]}
+        raw = json.dumps({**cards, "cloze": [*cards["cloze"], {"Text": "y"}]})[:-15]
+
+        typed, recovered = recover_typed_llm_output(raw, ["basic", "cloze"])
+
+        assert typed == cards
+        assert recovered.truncated
+
+
 class TestValidateCloze:
     """Tests for validate_cloze."""
 
@@ -0,0 +1,125 @@
+"""Tests for ankismart.card_gen.rate_limiter module."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from ankismart.card_gen import rate_limiter as rate_limiter_module
+from ankismart.card_gen.rate_limiter import (
+    ProviderRateLimiter,
+    retry_delay_from_headers,
+    shared_rate_limiter,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    state = {"t": 1_000.0, "slept": []}
+
+    def sleep(seconds: float) -> None:
+        state["slept"].append(seconds)
+        state["t"] += seconds
+
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", lambda: state["t"])
+    monkeypatch.setattr(rate_limiter_module.time, "sleep", sleep)
+    return state
+
+
+class TestProviderRateLimiter:
+    def test_unlimited_limiter_never_waits(self, clock):
+        limiter = ProviderRateLimiter()
+
+        assert [limiter.wait(10_000) for _ in range(5)] == [0.0] * 5
+        assert clock["slept"] == []
+
+    def test_request_bucket_refills_at_rpm_rate(self, clock):
+        limiter = ProviderRateLimiter(rpm=2)
+        limiter.wait()
+        limiter.wait()
+
+        waited = limiter.wait()
+
+        assert waited == pytest.approx(30.0)
+
+    def test_token_bucket_waits_for_reserved_tokens(self, clock):
+        limiter = ProviderRateLimiter(tpm=6_000)
+        limiter.wait(6_000)
+
+        assert limiter.try_acquire(3_000) == pytest.approx(30.0)
+        assert limiter.wait(3_000) == pytest.approx(30.0)
+
+    def test_reconcile_returns_unused_reservation(self, clock):
+        limiter = ProviderRateLimiter(tpm=6_000)
+        limiter.wait(6_000)
+
+        limiter.reconcile(6_000, 1_000)
+
+        assert limiter.try_acquire(5_000) == 0.0
+
+    def test_request_larger_than_tpm_waits_for_a_full_bucket(self, clock):
+        limiter = ProviderRateLimiter(tpm=1_000)
+
+        assert limiter.try_acquire(50_000) == 0.0
+        assert limiter.try_acquire(50_000) == pytest.approx(60.0)
+
+    def test_defer_holds_all_callers_until_reset(self, clock):
+        limiter = ProviderRateLimiter()
+        limiter.defer(12.5)
+
+        assert limiter.wait() == pytest.approx(12.5)
+        assert limiter.try_acquire() == 0.0
+
+    def test_async_wait_suspends_instead_of_sleeping(self, clock, monkeypatch):
+        awaited: list[float] = []
+
+        async def fake_sleep(seconds: float) -> None:
+            awaited.append(seconds)
+            clock["t"] += seconds
+
+        monkeypatch.setattr(rate_limiter_module.asyncio, "sleep", fake_sleep)
+        limiter = ProviderRateLimiter(rpm=1)
+        limiter.wait()
+
+        assert asyncio.run(limiter.wait_async()) == pytest.approx(60.0)
+        assert awaited == [pytest.approx(60.0)]
+        assert clock["slept"] == []
+
+
+def test_shared_limiter_applies_latest_limits():
+    first = shared_rate_limiter(base_url="https://a", api_key="k-latest", model="m", rpm=10)
+    second = shared_rate_limiter(
+        base_url="https://a", api_key="k-latest", model="m", rpm=20, tpm=1_000
+    )
+
+    assert first is second
+    assert (second.rpm, second.tpm) == (20, 1_000)
+
+
+class TestRetryDelayFromHeaders:
+    @pytest.mark.parametrize(
+        ("headers", "expected"),
+        [
+            ({"Retry-After": "3"}, 3.0),
+            ({"retry-after-ms": "250", "retry-after": "9"}, 0.25),
+            ({"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "6m0s"}, 120.0),
+            ({"x-ratelimit-reset-tokens": "20ms"}, 0.02),
+            ({"x-ratelimit-reset-requests": "1m30s"}, 90.0),
+        ],
+    )
+    def test_parses_server_hints(self, headers, expected):
+        assert retry_delay_from_headers(headers) == pytest.approx(expected)
+
+    def test_parses_http_date(self):
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+        delay = retry_delay_from_headers({"retry-after": format_datetime(when, usegmt=True)})
+
+        assert 25.0 <= delay <= 30.0
+
+    @pytest.mark.parametrize("headers", [None, {}, {"retry-after": "soon"}, {"x-other": "1"}])
+    def test_missing_or_unusable_hints(self, headers):
+        assert retry_delay_from_headers(headers) is None
@@ -0,0 +1,207 @@
+"""Tests for ankismart.card_gen.response_cache module."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ankismart.card_gen import response_cache as response_cache_module
+from ankismart.card_gen.response_cache import (
+    LLMResponseCache,
+    SingleFlight,
+    build_cache_key,
+    build_response_cache,
+    resolve_llm_cache_db_path,
+)
+from ankismart.core.tracing import metrics
+
+
+def _key(**overrides) -> str:
+    params = {
+        "model": "m",
+        "base_url": "https://api.example.com/v1",
+        "system_prompt": "sys",
+        "user_prompt": "usr",
+        "temperature": 0.3,
+        "max_tokens": 0,
+    }
+    params.update(overrides)
+    return build_cache_key(**params)
+
+
+class TestBuildCacheKey:
+    def test_same_inputs_produce_same_key(self):
+        assert _key() == _key()
+
+    @pytest.mark.parametrize(
+        "override",
+        [
+            {"model": "other"},
+            {"base_url": "https://other.example.com"},
+            {"system_prompt": "sys2"},
+            {"user_prompt": "usr2"},
+            {"temperature": 0.0},
+            {"max_tokens": 100},
+        ],
+    )
+    def test_every_request_input_changes_key(self, override):
+        assert _key(**override) != _key()
+
+    def test_trailing_slash_in_base_url_is_ignored(self):
+        assert _key(base_url="https://api.example.com/v1/") == _key()
+
+
+class TestLLMResponseCache:
+    def test_put_then_get_round_trips(self, tmp_path):
+        cache = LLMResponseCache(tmp_path / "llm.sqlite3")
+        assert cache.get("k") is None
+
+        cache.put("k", "response", model="m")
+
+        assert cache.get("k") == "response"
+        assert cache.count() == 1
+
+    def test_expired_entries_are_misses(self, tmp_path, monkeypatch):
+        cache = LLMResponseCache(tmp_path / "llm.sqlite3", ttl_seconds=60)
+        now = time.time()
+        monkeypatch.setattr(response_cache_module.time, "time", lambda: now)
+        cache.put("k", "response")
+
+        monkeypatch.setattr(response_cache_module.time, "time", lambda: now + 61)
+
+        assert cache.get("k") is None
+        assert cache.count() == 0
+
+    def test_least_recently_read_entries_are_evicted(self, tmp_path, monkeypatch):
+        cache = LLMResponseCache(tmp_path / "llm.sqlite3", max_entries=2)
+        clock = iter(range(1_000, 2_000))
+        monkeypatch.setattr(response_cache_module.time, "time", lambda: float(next(clock)))
+        cache.put("a", "A")
+        cache.put("b", "B")
+        assert cache.get("a") == "A"
+
+        cache.put("c", "C")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+
+    def test_sampled_requests_can_opt_out(self, tmp_path):
+        cache = LLMResponseCache(tmp_path / "llm.sqlite3", cache_sampled=False)
+
+        assert cache.accepts(0.0) is True
+        assert cache.accepts(0.7) is False
+        assert LLMResponseCache(tmp_path / "llm.sqlite3").accepts(0.7) is True
+
+    def test_storage_errors_degrade_to_misses(self, tmp_path):
+        blocker = tmp_path / "not-a-dir"
+        blocker.write_text("x", encoding="utf-8")
+        cache = LLMResponseCache(blocker / "llm.sqlite3")
+
+        cache.put("k", "response")
+
+        assert cache.get("k") is None
+        assert cache.get_or_fetch("k", lambda: "fresh") == "fresh"
+
+    def test_get_or_fetch_coalesces_concurrent_identical_requests(self, tmp_path):
+        metrics.reset()
+        cache = LLMResponseCache(tmp_path / "llm.sqlite3")
+        release = threading.Event()
+        calls: list[int] = []
+
+        def fetch() -> str:
+            calls.append(1)
+            release.wait(timeout=5)
+            return "shared"
+
+        results: list[str] = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", fetch)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        assert results == ["shared"] * 4
+        assert len(calls) == 1
+        assert cache.get_or_fetch("k", fetch) == "shared"
+        assert len(calls) == 1
+        assert metrics.get_counter("llm_cache_misses_total") == 1.0
+
+
+class TestSingleFlight:
+    def test_failure_is_shared_and_not_remembered(self):
+        flights = SingleFlight()
+
+        def boom() -> str:
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            flights.do("k", boom)
+
+        assert flights.do("k", lambda: "ok") == ("ok", False)
+
+    def test_async_caller_joins_a_sync_flight(self):
+        flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls: list[int] = []
+
+        def fetch() -> str:
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5)
+            return "shared"
+
+        sync_results: list[tuple[str, bool]] = []
+        leader = threading.Thread(target=lambda: sync_results.append(flights.do("k", fetch)))
+        leader.start()
+        started.wait(timeout=5)
+
+        async def follow() -> tuple[str, bool]:
+            async def never() -> str:
+                raise AssertionError("follower must not run its own call")
+
+            task = asyncio.create_task(flights.do_async("k", never))
+            await asyncio.sleep(0.05)
+            release.set()
+            return await task
+
+        assert asyncio.run(follow()) == ("shared", True)
+        leader.join(timeout=5)
+        assert sync_results == [("shared", False)]
+        assert len(calls) == 1
+
+
+def test_resolve_path_honours_env(monkeypatch, tmp_path):
+    target = tmp_path / "custom.sqlite3"
+    monkeypatch.setenv("ANKISMART_LLM_CACHE_DB_PATH", str(target))
+
+    assert resolve_llm_cache_db_path() == target.resolve()
+
+
+def test_build_response_cache_from_config(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANKISMART_LLM_CACHE_DB_PATH", str(tmp_path / "llm.sqlite3"))
+
+    assert build_response_cache(SimpleNamespace(llm_response_cache=False)) is None
+    cache = build_response_cache(
+        SimpleNamespace(
+            llm_response_cache=True,
+            llm_response_cache_ttl_hours=2,
+            llm_response_cache_max_entries=10,
+            llm_cache_sampled_responses=False,
+        )
+    )
+
+    assert cache is not None
+    assert cache.ttl_seconds == 7200
+    assert cache.max_entries == 10
+    assert cache.cache_sampled is False
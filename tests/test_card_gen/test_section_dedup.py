@@ -0,0 +1,80 @@
+"""Tests for ankismart.card_gen.section_dedup."""
+
+from __future__ import annotations
+
+from ankismart.card_gen.section_dedup import (
+    plan_cross_document_dedup,
+    split_content_defined_chunks,
+)
+
+
+def _section(title: str, sentence: str, repeat: int = 12) -> str:
+    return f"## {title}\n\n" + (sentence + " ") * repeat
+
+
+SHARED = "\n\n".join(
+    _section(f"Shared {i}", f"Shared lecture material number {i} on enzymes.") for i in range(3)
+)
+
+
+def test_chunk_boundaries_do_not_depend_on_preceding_content() -> None:
+    first = split_content_defined_chunks(_section("Intro", "Alpha text.") + "\n\n" + SHARED)
+    second = split_content_defined_chunks(
+        _section("Other intro", "Completely different opening.", repeat=40) + "\n\n" + SHARED
+    )
+
+    assert first[-3:] == second[-3:]
+
+
+def test_chunker_keeps_fenced_code_together() -> None:
+    markdown = "## Code\n\n```python\nx = 1\n\ny = 2\n```"
+
+    assert split_content_defined_chunks(markdown) == [markdown]
+
+
+def test_plan_moves_shared_sections_into_one_attributed_item() -> None:
+    docs = [
+        ("a.pdf", _section("A only", "Notes unique to A.") + "\n\n" + SHARED),
+        ("b.pdf", _section("B only", "Notes unique to B.") + "\n\n" + SHARED),
+    ]
+
+    plan = plan_cross_document_dedup(docs)
+
+    assert plan.shared_sections == 3
+    assert plan.duplicate_chars_skipped > 0
+    assert plan.duplicate_tokens_skipped > 0
+    assert [item.source_documents for item in plan.items] == [
+        ("a.pdf",),
+        ("a.pdf", "b.pdf"),
+        ("b.pdf",),
+    ]
+    shared_item = plan.items[1]
+    assert shared_item.shared
+    assert shared_item.markdown.count("## Shared") == 3
+    assert "Shared" not in plan.items[0].markdown
+    assert "Shared" not in plan.items[2].markdown
+
+
+def test_plan_ignores_page_numbering_when_matching_sections() -> None:
+    body = "Identical slide text about mitochondria and ATP synthesis. " * 10
+    docs = [
+        ("slides.pdf", f"## Page 3\n\n{body}"),
+        ("handout.pdf", f"## Page 7\n\n{body}"),
+    ]
+
+    plan = plan_cross_document_dedup(docs)
+
+    assert plan.shared_sections == 1
+    assert [item.source_documents for item in plan.items] == [("slides.pdf", "handout.pdf")]
+
+
+def test_plan_leaves_short_repeats_and_unrelated_documents_alone() -> None:
+    docs = [
+        ("a.md", "# Title\n\nShort line.\n\n" + "Only in A. " * 30),
+        ("b.md", "# Title\n\nShort line.\n\n" + "Only in B. " * 30),
+    ]
+
+    plan = plan_cross_document_dedup(docs)
+
+    assert plan.shared_sections == 0
+    assert [item.markdown for item in plan.items] == [docs[0][1], docs[1][1]]
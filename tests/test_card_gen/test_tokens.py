@@ -0,0 +1,30 @@
+"""Tests for ankismart.card_gen.tokens module."""
+
+from __future__ import annotations
+
+from ankismart.card_gen.tokens import ContextLimits, estimate_tokens, resolve_context_limits
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("知识点") == 3
+    assert estimate_tokens("abcdefgh") == 2
+
+
+class TestResolveContextLimits:
+    def test_known_model_uses_longest_matching_prefix(self):
+        assert resolve_context_limits("moonshot-v1-128k") == ContextLimits(131_072, 8_192)
+        assert resolve_context_limits("gpt-4o-mini") == ContextLimits(128_000, 16_384)
+        assert resolve_context_limits("gpt-4") == ContextLimits(8_192, 4_096)
+
+    def test_provider_prefix_and_case_are_ignored(self):
+        assert resolve_context_limits("deepseek-ai/DeepSeek-Chat") == ContextLimits(64_000, 8_192)
+
+    def test_unknown_model_falls_back_to_conservative_limits(self):
+        assert resolve_context_limits("my-local-model") == ContextLimits(32_768, 4_096)
+
+    def test_positive_overrides_take_precedence(self):
+        limits = resolve_context_limits("gpt-4o", context_window=8_000, max_output_tokens=0)
+
+        assert limits == ContextLimits(8_000, 8_000)
+        assert resolve_context_limits("x", max_output_tokens=1_024).max_output_tokens == 1_024
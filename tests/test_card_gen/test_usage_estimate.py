@@ -0,0 +1,124 @@
+"""Tests for ankismart.card_gen.usage_estimate and CardGenerator.estimate_usage."""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+from ankismart.card_gen.generator import CardGenerator
+from ankismart.card_gen.tokens import estimate_tokens
+from ankismart.card_gen.usage_estimate import (
+    RequestEstimate,
+    TokenPricing,
+    append_calibration_sample,
+    budget_overrun,
+    calibration_factors,
+    summarize_usage,
+)
+from ankismart.core.models import GenerateRequest
+
+_SECTIONS = "\n\n".join(f"# Section {i}\n\n" + ("Plant cells make ATP. " * 30) for i in range(4))
+
+
+def _request(**overrides) -> GenerateRequest:
+    values = {
+        "markdown": _SECTIONS,
+        "strategy": "basic",
+        "target_count": 4,
+        "enable_auto_split": True,
+        "split_threshold": 1500,
+        "source_path": "bio.md",
+    }
+    values.update(overrides)
+    return GenerateRequest(**values)
+
+
+class TestEstimateUsage:
+    def test_follows_split_plan_without_calling_llm(self):
+        llm = MagicMock()
+        generator = CardGenerator(llm)
+        chunks = generator._chunk_markdown(_SECTIONS, _request())
+
+        estimates = generator.estimate_usage(_request(), document="bio.md")
+
+        assert len(chunks) > 1
+        assert [estimate.chunk_index for estimate in estimates] == list(range(1, len(chunks) + 1))
+        assert sum(estimate.completion_tokens for estimate in estimates) == 4 * 200
+        for estimate, chunk in zip(estimates, chunks, strict=True):
+            assert estimate.document == "bio.md"
+            assert estimate.strategies == ("basic",)
+            assert estimate.prompt_tokens > estimate_tokens(chunk)
+        llm.chat.assert_not_called()
+
+    def test_combined_plan_is_one_request_per_chunk(self):
+        generator = CardGenerator(MagicMock())
+        request = _request(enable_auto_split=False)
+
+        estimates = generator.estimate_usage(request, {"basic": 2, "cloze": 3})
+
+        assert len(estimates) == 1
+        assert estimates[0].strategies == ("basic", "cloze")
+        assert estimates[0].completion_tokens == 5 * 200
+        assert estimates[0].document == "bio.md"
+
+    def test_auto_mode_expects_cards_from_content_length(self):
+        generator = CardGenerator(MagicMock())
+        request = _request(enable_auto_split=False, target_count=0, auto_target_count=True)
+
+        [estimate] = generator.estimate_usage(request)
+
+        assert estimate.completion_tokens == (len(_SECTIONS) // 450) * 200
+
+
+class TestUsageSummary:
+    def test_calibration_scales_totals_and_cost(self):
+        samples = [
+            {
+                "estimated_prompt_tokens": 1000,
+                "estimated_completion_tokens": 400,
+                "actual_prompt_tokens": 2000,
+                "actual_completion_tokens": 200,
+            }
+        ]
+        requests = [
+            RequestEstimate("a.md", 1, ("basic",), 300, 100),
+            RequestEstimate("a.md", 2, ("basic",), 200, 100),
+            RequestEstimate("b.md", 1, ("basic",), 500, 200),
+        ]
+
+        estimate = summarize_usage(
+            requests,
+            pricing=TokenPricing(prompt_per_1k=1.0, completion_per_1k=2.0),
+            calibration=calibration_factors(samples),
+        )
+
+        assert (estimate.prompt_tokens, estimate.completion_tokens) == (2000, 200)
+        assert estimate.cost == 2.4
+        assert estimate.by_document() == {"a.md": (500, 200), "b.md": (500, 200)}
+
+    def test_calibration_ignores_empty_samples_and_clamps(self):
+        assert calibration_factors([]) == (1.0, 1.0)
+        outlier = {"estimated_prompt_tokens": 10, "actual_prompt_tokens": 1000}
+
+        assert calibration_factors([outlier, "bad"]) == (4.0, 1.0)
+
+    def test_budget_overrun(self):
+        estimate = summarize_usage(
+            [RequestEstimate("a.md", 1, ("basic",), 900, 200)],
+            pricing=TokenPricing(prompt_per_1k=1.0),
+        )
+
+        assert budget_overrun(estimate, token_budget=0, cost_budget=0) == ""
+        assert budget_overrun(estimate, token_budget=1000, cost_budget=0) == "tokens"
+        assert budget_overrun(estimate, token_budget=2000, cost_budget=0.5) == "cost"
+        assert budget_overrun(estimate, token_budget=2000, cost_budget=1.0) == ""
+
+    def test_calibration_samples_keep_the_newest(self):
+        samples: list[dict[str, object]] = []
+        for index in range(60):
+            samples = append_calibration_sample(
+                samples, document=f"{index}.md", estimated=(10, 5), actual=(12, 4)
+            )
+
+        assert len(samples) == 50
+        assert samples[-1]["document"] == "59.md"
+        assert samples[0]["document"] == "10.md"
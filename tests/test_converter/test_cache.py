@@ -11,14 +11,17 @@ import ankismart.converter.cache as cache_module
 from ankismart.converter.cache import (
     build_conversion_cache_key,
     clear_cache,
+    discard_ocr_page_cache,
     get_cache_count,
     get_cache_size,
     get_cache_stats,
     get_cached,
     get_cached_by_hash,
     get_file_hash,
+    prune_ocr_page_cache,
     save_cache,
     save_cache_by_hash,
+    save_cached_ocr_page,
 )
 from ankismart.core.models import MarkdownResult
 
@@ -334,6 +337,31 @@ class TestCacheStatsAndClear:
         assert rglob_calls == ["*"]
 
 
+class TestOcrPageCache:
+    def test_prune_drops_stale_and_surplus_documents(self, tmp_path: Path) -> None:
+        cache_dir = tmp_path / "cache"
+        with patch("ankismart.converter.cache.CACHE_DIR", cache_dir):
+            for index, key in enumerate(("old", "a", "b", "c", "current")):
+                save_cached_ocr_page(key, 1, f"page of {key}")
+                mtime = 1_000 if key == "old" else 2_000_000_000 + index
+                os.utime(cache_dir / "ocr_pages" / key, (mtime, mtime))
+
+            removed = prune_ocr_page_cache(keep="current", max_documents=3)
+            remaining = sorted(entry.name for entry in (cache_dir / "ocr_pages").iterdir())
+
+        assert removed == 2
+        assert remaining == ["b", "c", "current"]
+
+    def test_discard_removes_one_document(self, tmp_path: Path) -> None:
+        cache_dir = tmp_path / "cache"
+        with patch("ankismart.converter.cache.CACHE_DIR", cache_dir):
+            save_cached_ocr_page("done", 1, "text")
+            save_cached_ocr_page("pending", 1, "text")
+            discard_ocr_page_cache("done")
+
+        assert [entry.name for entry in (cache_dir / "ocr_pages").iterdir()] == ["pending"]
+
+
 class TestResolveAppDir:
     def test_env_app_dir_has_highest_priority(self, monkeypatch, tmp_path: Path) -> None:
         override = tmp_path / "custom-cache-root"
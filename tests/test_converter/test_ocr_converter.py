@@ -26,7 +26,8 @@ from ankismart.converter.ocr_converter import (
     resolve_ocr_model_pair,
     resolve_ocr_model_source,
 )
-from ankismart.core.errors import ConvertError, ErrorCode
+from ankismart.core.cancellation import CancellationToken
+from ankismart.core.errors import ConvertError, ErrorCode, OperationCancelledError
 from ankismart.core.models import MarkdownResult
 
 # ---------------------------------------------------------------------------
@@ -572,6 +573,19 @@ class TestOcrImage:
         assert "Hello" in result
         assert "World" in result
 
+    def test_keeps_rec_scores_per_line(self) -> None:
+        ocr = MagicMock()
+        ocr.predict.return_value = [
+            {"rec_texts": ["Hello", "", "W0rld"], "rec_scores": [0.99, 0.5, 0.61]}
+        ]
+        image = MagicMock()
+
+        with patch("ankismart.converter.ocr_converter.np.array", return_value="fake_array"):
+            result = _ocr_image(ocr, image)
+
+        assert result == "Hello\nW0rld"
+        assert result.line_scores == (0.99, 0.61)
+
     def test_empty_result(self) -> None:
         ocr = MagicMock()
         ocr.predict.return_value = None
@@ -832,6 +846,123 @@ class TestConvert:
 
         assert result.trace_id != ""
 
+    def test_cancel_stops_between_pages_and_cached_pages_resume(self, tmp_path: Path) -> None:
+        f = tmp_path / "cancel.pdf"
+        f.write_bytes(b"fake")
+        token = CancellationToken()
+        calls: list[int] = []
+
+        def _ocr_then_cancel(_ocr, _image) -> str:
+            calls.append(len(calls) + 1)
+            if len(calls) == 2:
+                token.cancel()
+            return f"text {len(calls)}"
+
+        images = [MagicMock(), MagicMock(), MagicMock()]
+        with patch("ankismart.converter.cache.CACHE_DIR", tmp_path / "cache"):
+            with patch("ankismart.converter.ocr_converter._get_ocr", return_value=MagicMock()):
+                with patch("ankismart.converter.ocr_converter._pdf_to_images", return_value=images):
+                    with patch(
+                        "ankismart.converter.ocr_converter._pdf.count_pdf_pages", return_value=3
+                    ):
+                        with patch(
+                            "ankismart.converter.ocr_converter._ocr_image",
+                            side_effect=_ocr_then_cancel,
+                        ):
+                            with pytest.raises(OperationCancelledError) as exc_info:
+                                convert(
+                                    f,
+                                    trace_id="ocr-cancel",
+                                    cancel_token=token,
+                                    use_page_cache=True,
+                                )
+
+                        assert exc_info.value.completed == 2
+                        assert exc_info.value.skipped == 1
+                        assert exc_info.value.code == ErrorCode.E_CANCELLED
+
+                        with patch(
+                            "ankismart.converter.ocr_converter._ocr_image",
+                            return_value="text 3",
+                        ) as ocr_fn:
+                            result = convert(f, trace_id="ocr-resume", use_page_cache=True)
+
+        assert ocr_fn.call_count == 1
+        # Pages are only kept until the conversion finishes.
+        assert not any((tmp_path / "cache" / "ocr_pages").iterdir())
+        assert "text 1" in result.content
+        assert "text 2" in result.content
+        assert "text 3" in result.content
+
+    def test_correction_receives_line_scores_aligned_with_content(self, tmp_path: Path) -> None:
+        from ankismart.converter.ocr_converter import OcrPageText
+
+        f = tmp_path / "scored.pdf"
+        f.write_bytes(b"fake")
+        pages = iter(
+            [
+                OcrPageText([("alpha", 0.99), ("b3ta", 0.4)]),
+                OcrPageText([("gamma", 0.98)]),
+            ]
+        )
+        received: dict[str, object] = {}
+
+        def correction_fn(text: str, *, cancel_token=None, line_scores=None) -> str:
+            received["text"] = text
+            received["scores"] = line_scores
+            return text
+
+        with patch("ankismart.converter.ocr_converter._get_ocr", return_value=MagicMock()):
+            with patch(
+                "ankismart.converter.ocr_converter._pdf_to_images",
+                return_value=[MagicMock(), MagicMock()],
+            ):
+                with patch(
+                    "ankismart.converter.ocr_converter._ocr_image",
+                    side_effect=lambda _ocr, _image: next(pages),
+                ):
+                    convert(f, trace_id="ocr-scores", ocr_correction_fn=correction_fn)
+
+        lines = str(received["text"]).split("\n")
+        scores = received["scores"]
+        assert len(lines) == len(scores)
+        assert dict(zip(lines, scores)) == {
+            "## Page 1": None,
+            "": None,
+            "alpha": 0.99,
+            "b3ta": 0.4,
+            "---": None,
+            "## Page 2": None,
+            "gamma": 0.98,
+        }
+
+    def test_cancel_skips_ocr_correction(self, tmp_path: Path) -> None:
+        f = tmp_path / "cancel-correction.pdf"
+        f.write_bytes(b"fake")
+        token = CancellationToken()
+        correction_fn = MagicMock(side_effect=lambda text, **_kwargs: token.cancel() or text)
+
+        def _ocr_then_cancel(_ocr, _image) -> str:
+            token.cancel()
+            return "page text"
+
+        with patch("ankismart.converter.ocr_converter._get_ocr", return_value=MagicMock()):
+            with patch(
+                "ankismart.converter.ocr_converter._pdf_to_images", return_value=[MagicMock()]
+            ):
+                with patch(
+                    "ankismart.converter.ocr_converter._ocr_image", side_effect=_ocr_then_cancel
+                ):
+                    with pytest.raises(OperationCancelledError):
+                        convert(
+                            f,
+                            trace_id="ocr-cancel-fix",
+                            ocr_correction_fn=correction_fn,
+                            cancel_token=token,
+                        )
+
+        correction_fn.assert_not_called()
+
 
 # ---------------------------------------------------------------------------
 # convert_image
@@ -995,6 +1126,57 @@ class TestCloudMode:
         paths = [call.kwargs["path"] for call in request_fn.call_args_list]
         assert paths == ["file-urls/batch", "extract-results/batch/batch-001"]
 
+    def test_cloud_poll_wakes_up_on_cancel(self, tmp_path: Path) -> None:
+        import ankismart.converter.ocr_converter as mod
+
+        f = tmp_path / "cloud-cancel.pdf"
+        f.write_bytes(b"fake")
+        token = CancellationToken()
+        transport = MagicMock()
+        transport.__enter__.return_value = MagicMock()
+        transport.__exit__.return_value = None
+
+        def _fake_request(*_args, **kwargs):
+            if kwargs["path"] == "file-urls/batch":
+                return (
+                    {
+                        "code": 0,
+                        "data": {
+                            "file_urls": [{"url": "https://upload.example.com/file"}],
+                            "batch_id": "batch-002",
+                        },
+                    },
+                    "https://mineru.net/api/v4/file-urls/batch",
+                )
+            token.cancel()
+            return (
+                {"code": 0, "data": {"extract_result": [{"state": "running"}]}},
+                "https://mineru.net/api/v4/extract-results/batch/batch-002",
+            )
+
+        with patch("ankismart.converter.ocr_converter.httpx.Client", return_value=transport):
+            with patch("ankismart.converter.ocr_converter._upload_cloud_file"):
+                with patch(
+                    "ankismart.converter.ocr_converter._pdf.count_pdf_pages", return_value=1
+                ):
+                    with patch(
+                        "ankismart.converter.ocr_converter._request_cloud_json",
+                        side_effect=_fake_request,
+                    ):
+                        with patch("ankismart.converter.ocr_converter.time.sleep") as sleep_fn:
+                            with pytest.raises(OperationCancelledError):
+                                mod._convert_via_cloud(
+                                    file_path=f,
+                                    source_format="pdf",
+                                    trace_id="trace-cloud-cancel",
+                                    cloud_provider="mineru",
+                                    cloud_endpoint="https://mineru.net",
+                                    cloud_api_key="token",
+                                    cancel_token=token,
+                                )
+
+        sleep_fn.assert_not_called()
+
     def test_request_cloud_json_retries_ssl_eof_then_succeeds(self) -> None:
         import ssl
 
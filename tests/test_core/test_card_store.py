@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from ankismart.core.card_store import CardStore
+from ankismart.core.models import CardDraft, CardMetadata, MediaAttachments, MediaItem
+
+
+def _card(index: int, **overrides) -> CardDraft:
+    values = {
+        "trace_id": "trace-1",
+        "deck_name": "Biology::Cells",
+        "note_type": "Basic",
+        "fields": {"Front": f"Question {index}", "Back": f"Answer {index}"},
+        "tags": ["ankismart", "biology"],
+        "metadata": CardMetadata(
+            strategy_id="basic",
+            source_document="lesson.md",
+            source_documents=["lesson.md", "notes.md"],
+            source_start=index,
+            source_end=index + 10,
+        ),
+    }
+    values.update(overrides)
+    return CardDraft(**values)
+
+
+def test_cards_round_trip_and_materialize_once() -> None:
+    media = MediaAttachments(picture=[MediaItem(filename="cell.png", path="/tmp/cell.png")])
+    cards = [_card(0), _card(1, media=media, metadata=CardMetadata(quality_flags=["x"]))]
+    store = CardStore(cards)
+
+    assert len(store) == 2
+    assert store.materialized_count() == 0
+    assert list(store) == cards
+    assert store[0] is store[0]
+    assert store.materialized_count() == 2
+
+
+def test_rows_and_filters_do_not_materialize_cards() -> None:
+    store = CardStore(_card(index) for index in range(10))
+
+    view = store.filter(lambda row: row.fields["Front"].endswith(("3", "7")))
+
+    assert [view.store_index(i) for i in range(len(view))] == [3, 7]
+    assert store.materialized_count() == 0
+    assert view[1].fields["Front"] == "Question 7"
+    assert store.materialized_count() == 1
+    assert [row.fields["Front"] for row in store.view().page(1, 4).rows()] == [
+        "Question 4",
+        "Question 5",
+        "Question 6",
+        "Question 7",
+    ]
+    assert len(store.view().page(2, 4)) == 2
+
+
+def test_row_of_finds_handed_out_drafts_by_identity() -> None:
+    store = CardStore([_card(0), _card(1)])
+    draft = store[1]
+
+    assert store.row_of(draft).key == store.row(1).key
+    assert store.row(0).key != store.row(1).key
+    assert store.row_of(_card(1)) is None
+    assert store.materialized_count() == 1
+
+
+def test_edits_to_materialized_cards_are_seen_by_rows() -> None:
+    store = CardStore([_card(0), _card(1)])
+
+    store[1].fields["Front"] = "Edited question"
+    replacement = _card(5, deck_name="Chemistry")
+    store[0] = replacement
+
+    assert store[0] is replacement
+    assert [row.deck_name for row in store.rows()] == ["Chemistry", "Biology::Cells"]
+    assert len(store.filter(lambda row: row.fields["Front"] == "Edited question")) == 1
+
+    store.release_drafts()
+
+    assert store.materialized_count() == 0
+    assert store[1].fields["Front"] == "Edited question"
+
+
+def test_from_records_accepts_dumped_cards_in_either_key_style() -> None:
+    cards = [_card(0), _card(1, tags=[])]
+    records = [cards[0].model_dump(), cards[1].model_dump(by_alias=True)]
+
+    store = CardStore.from_records(records)
+
+    assert store.materialized_count() == 0
+    assert store.row(0).source_document == "lesson.md"
+    assert list(store.transient_drafts()) == cards
+    assert store.materialized_count() == 0
+
+
+def test_interned_strings_are_shared_between_cards() -> None:
+    store = CardStore.from_records(_card(index).model_dump() for index in range(3))
+
+    first, second = store.row(0), store.row(2)
+
+    assert first.deck_name is second.deck_name
+    assert first.tags[1] is second.tags[1]
+
+
+def test_merging_by_position_keeps_rows_findable() -> None:
+    store = CardStore(_card(index) for index in range(4))
+    kept = store[3]
+    replacement = _card(9)
+
+    store[1] = replacement
+    del store[2]
+    store.insert(1, _card(8))
+
+    assert store.row_of(replacement).key == store.row(2).key
+    assert store.row_of(kept).key == store.row(3).key
+    assert [row.fields["Front"] for row in store.rows()] == [
+        "Question 0",
+        "Question 8",
+        "Question 9",
+        "Question 3",
+    ]
+    assert store == [_card(0), _card(8), _card(9), _card(3)]
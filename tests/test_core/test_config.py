@@ -40,6 +40,7 @@ class TestAppConfig:
         assert cfg.default_tags == ["ankismart"]
         assert cfg.doc_convert_backend == "native"
         assert cfg.enable_auto_split is True
+        assert cfg.deck_aware_generation is False
         assert cfg.log_level == "INFO"
 
     def test_active_provider_returns_matching(self):
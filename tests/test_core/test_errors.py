@@ -11,6 +11,7 @@ from ankismart.core.errors import (
     ConfigError,
     ConvertError,
     ErrorCode,
+    OperationCancelledError,
 )
 from ankismart.core.interfaces import IAnkiGateway, IApkgExporter, ICardGenerator, IConverter
 
@@ -120,3 +121,23 @@ class TestInterfaces:
         assert ICardGenerator is not None
         assert IAnkiGateway is not None
         assert IApkgExporter is not None
+
+
+class TestOperationCancelledError:
+    def test_reports_completed_and_skipped_units(self):
+        err = OperationCancelledError(stage="OCR", completed=3, total=10, trace_id="t-1")
+        assert err.code == ErrorCode.E_CANCELLED
+        assert err.stage == "OCR"
+        assert err.completed == 3
+        assert err.skipped == 7
+        assert err.trace_id == "t-1"
+
+    def test_token_raises_only_after_cancel(self):
+        from ankismart.core.cancellation import CancellationToken
+
+        token = CancellationToken()
+        token.raise_if_cancelled(stage="OCR", completed=1, total=2)
+        token.cancel()
+        assert token.wait(5) is True
+        with pytest.raises(OperationCancelledError, match=r"\(1/2 completed\)"):
+            token.raise_if_cancelled(stage="OCR", completed=1, total=2)
@@ -192,3 +192,24 @@ def test_history_store_prunes_oldest_batches_by_size(tmp_path: Path) -> None:
     assert stats_before["batch_count"] == 2
     assert pruned.deleted_batch_ids == ["old", "new"]
     assert store.get_cache_stats()["batch_count"] == 0
+
+
+def test_history_store_loads_batches_into_card_store(tmp_path: Path) -> None:
+    store = SQLiteHistoryStore(tmp_path / "history.sqlite3")
+    store.save_generation_batch([_card(1), _card(2)], batch_id="batch-1")
+    store.save_generation_batch([_card(3)], batch_id="batch-2")
+
+    cards = store.load_generation_store(["batch-2", "batch-1", "missing"])
+
+    assert [row.fields["Front"] for row in cards.rows()] == [
+        "Question 3",
+        "Question 1",
+        "Question 2",
+    ]
+    assert cards[0] == _card(3)
+
+    summary = store.save_generation_batch(cards, batch_id="batch-3")
+
+    assert summary.metadata["source_documents"] == ["lesson.md"]
+    assert store.load_generation_cards("batch-3") == [_card(3), _card(1), _card(2)]
+    assert cards.materialized_count() == 1
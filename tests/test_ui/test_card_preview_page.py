@@ -4,12 +4,16 @@ import sys
 from types import SimpleNamespace
 from unittest.mock import MagicMock
 
+import pytest
 from PyQt6.QtWidgets import QApplication
 from qfluentwidgets import PushButton
 
+from ankismart.card_gen.card_pipeline import normalize_card_draft
 from ankismart.card_gen.postprocess import build_card_drafts
+from ankismart.core.card_store import CardStore, CardView
 from ankismart.core.models import CardDraft, CardMetadata
 from ankismart.ui.card_preview_page import CardPreviewPage, CardRenderer
+from ankismart.ui.result_page import ResultPage
 
 _APP = QApplication.instance() or QApplication(sys.argv)
 
@@ -144,6 +148,34 @@ def test_regenerate_current_card_reuses_source_document(monkeypatch) -> None:
 
     assert captured["request"].scope == "current_card"
     assert captured["request"].source_documents == ["sample.md"]
+    assert captured["request"].sections == []
+
+
+def test_regenerate_current_card_sends_only_its_source_section(monkeypatch) -> None:
+    page = CardPreviewPage(_make_main_window())
+    cards = [
+        _make_card(front=f"Question {index}", back="Answer", source_document="sample.md")
+        for index in range(3)
+    ]
+    cards[2].metadata.source_start = 120
+    cards[2].metadata.source_end = 480
+    page.load_cards(cards)
+    page._search_input.setText("Question 2")
+    captured: dict[str, object] = {}
+    monkeypatch.setattr(
+        page,
+        "_dispatch_regenerate_request",
+        lambda request: captured.setdefault("request", request),
+    )
+    page._card_list.setCurrentRow(0)
+
+    page._regenerate_current_card()
+
+    request = captured["request"]
+    assert request.card_indices == [2]
+    assert [(s.source_document, s.start, s.end) for s in request.sections] == [
+        ("sample.md", 120, 480)
+    ]
 
 
 def test_large_card_load_defers_duplicate_scan_and_renders_once(monkeypatch) -> None:
@@ -187,6 +219,104 @@ def test_duplicate_filter_computes_deferred_duplicate_scan_once(monkeypatch) ->
     assert page._card_list.count() == 2
 
 
+def test_reloading_regenerated_cards_updates_duplicate_risk_incrementally(monkeypatch) -> None:
+    page = CardPreviewPage(_make_main_window())
+    first = _make_card(front="What is the role of ATP synthase?", back="A")
+    copy = _make_card(front="What is the role of ATP synthase ?", back="B")
+    other = _make_card(front="Define osmotic pressure.", back="C")
+    fillers = [
+        _make_card(front=front, back="E")
+        for front in ("What causes tides?", "Name the noble gases.", "Who wrote Hamlet?")
+    ]
+    page.load_cards([first, copy, other, *fillers])
+    assert page._duplicate_risk_card_ids == {id(first), id(copy)}
+    page._build_card_list_item_text(other)
+    full_scans = {"count": 0}
+    original = page._collect_duplicate_risk_indices
+
+    def _collect_duplicate_risk_indices(cards_arg, threshold):
+        full_scans["count"] += 1
+        return original(cards_arg, threshold)
+
+    monkeypatch.setattr(page, "_collect_duplicate_risk_indices", _collect_duplicate_risk_indices)
+    replacement = _make_card(front="Explain Newton's third law.", back="D")
+
+    page.load_cards([first, replacement, other, *fillers])
+
+    assert full_scans["count"] == 0
+    assert page._duplicate_risk_card_ids == set()
+    assert id(other) in page._card_list_text_cache
+    assert id(copy) not in page._card_list_text_cache
+
+
+def test_update_cards_rechecks_only_the_edited_card_neighbours() -> None:
+    page = CardPreviewPage(_make_main_window())
+    cards = [
+        _make_card(front="What is the role of ATP synthase?", back="A"),
+        _make_card(front="Define osmotic pressure.", back="B"),
+        _make_card(front="Explain Newton's third law.", back="C"),
+    ]
+    page.load_cards(cards)
+    assert page._duplicate_risk_card_ids == set()
+
+    cards[1].fields["Front"] = "What is the role of ATP synthase ?"
+    page.update_cards([cards[1]])
+
+    assert page._duplicate_risk_card_ids == {id(cards[0]), id(cards[1])}
+    assert "[近重复]" in page._build_card_list_item_text(cards[0])
+    page._on_toggle_duplicate_risk_filter(True)
+    assert page._card_list.count() == 2
+
+
+def test_editing_a_pushed_card_rechecks_only_its_neighbours(monkeypatch) -> None:
+    main = _make_main_window()
+    page = CardPreviewPage(main)
+    main.card_preview_page = page
+    cards = [
+        _make_card(front="What is the role of ATP synthase?", back="A"),
+        _make_card(front="Define osmotic pressure.", back="B"),
+        _make_card(front="Explain Newton's third law.", back="C"),
+        _make_card(front="Explain Newton's third law ?", back="D"),
+    ]
+    page.load_cards(cards)
+    result_page = ResultPage(main)
+    result_page._cards = cards
+    monkeypatch.setattr(result_page, "_show_info_bar", lambda *args, **kwargs: None)
+
+    class _EditDialog:
+        def __init__(self, card, _lang, _parent) -> None:
+            self._card = card
+
+        def exec(self) -> bool:
+            return True
+
+        def get_edited_card(self) -> CardDraft:
+            self._card.fields["Front"] = "What is the role of ATP synthase ?"
+            return normalize_card_draft(self._card)
+
+    monkeypatch.setattr("ankismart.ui.result_page.CardEditDialog", _EditDialog)
+    monkeypatch.setattr(
+        page,
+        "_collect_duplicate_risk_indices",
+        lambda *_args: pytest.fail("editing one card must not rescan the deck"),
+    )
+    index = page._duplicate_index
+    checked: set[int] = set()
+    original_similar_keys = index.similar_keys
+
+    def _similar_keys(key):
+        checked.add(key)
+        return original_similar_keys(key)
+
+    monkeypatch.setattr(index, "similar_keys", _similar_keys)
+
+    result_page._edit_card(1)
+
+    assert checked == {id(cards[0]), id(cards[1])}
+    assert page._duplicate_risk_card_ids == {id(card) for card in cards}
+    assert "[近重复]" in page._build_card_list_item_text(cards[1])
+
+
 def test_preview_detects_choice_kind_from_strategy_id_not_only_tags() -> None:
     card = CardDraft(
         note_type="Basic",
@@ -249,3 +379,58 @@ def test_generated_choice_card_keeps_preview_layout_after_shared_normalization()
     assert draft.fields["Back"].startswith("答案: A, B, D")
     assert html.count('class="flat-option-line"') == 4
     assert html.count('class="flat-answer-item"') == 3
+
+
+def test_card_preview_filters_card_store_into_a_view() -> None:
+    page = CardPreviewPage(_make_main_window())
+    store = CardStore(
+        _make_card(front=f"Question number {index}", back="A long enough answer")
+        for index in range(30)
+    )
+    page.load_cards(store)
+
+    page._search_input.setText("number 2")
+    page._apply_filters()
+
+    assert isinstance(page._filtered_cards, CardView)
+    assert page._card_list.count() == 11
+    assert page._filtered_cards.store_index(1) == 20
+    assert page._filtered_cards[1] is store[20]
+
+
+def test_card_store_quality_and_duplicate_scans_use_rows() -> None:
+    page = CardPreviewPage(_make_main_window())
+    store = CardStore(
+        [
+            _make_card(front="What is the role of ATP synthase?", back="A long answer"),
+            _make_card(front="What is the role of ATP synthase ?", back="Another answer"),
+            _make_card(front="Q", back="A", quality_flags=["too_short"]),
+            *(
+                _make_card(front=f"Question number {index}", back="A long enough answer")
+                for index in range(20)
+            ),
+        ]
+    )
+
+    # Only the displayed card needs a draft; keep display out of the way of the scans.
+    page._show_card = lambda index: None
+    page.load_cards(store)
+    page._on_toggle_low_quality_filter(True)
+
+    assert isinstance(page._filtered_cards, CardView)
+    assert page._card_list.count() == 1
+    assert store.materialized_count() == 0
+
+    page._on_toggle_low_quality_filter(False)
+    page._on_toggle_duplicate_risk_filter(True)
+
+    assert [page._filtered_cards.store_index(i) for i in range(2)] == [0, 1]
+    assert "[近重复]" in page._card_list.item(0).text()
+    assert store.materialized_count() == 0
+
+    page._on_toggle_duplicate_risk_filter(False)
+    store[5].fields["Front"] = "What is the role of ATP synthase"
+    page.update_cards([store[5]])
+
+    assert store.materialized_count() == 1
+    assert page._is_duplicate_risk_card(store.row(5))
@@ -8,6 +8,7 @@ from PyQt6.QtGui import QCloseEvent
 from PyQt6.QtWidgets import QApplication, QWidget
 from pytest import mark
 
+from ankismart.core.card_store import CardStore
 from ankismart.core.models import (
     BatchConvertResult,
     CardDraft,
@@ -15,6 +16,7 @@ from ankismart.core.models import (
     ConvertedDocument,
     MarkdownResult,
     RegenerateRequest,
+    SourceSection,
 )
 from ankismart.ui.preview_page import MarkdownHighlighter, PreviewPage
 
@@ -799,6 +801,88 @@ def test_build_documents_filters_pending_regenerate_source_documents():
     assert [doc.file_name for doc in docs] == ["b.md"]
 
 
+def test_build_documents_scopes_regeneration_to_source_sections():
+    main = _make_main_window()
+    page = PreviewPage(main)
+    page._documents = [_make_doc("a.md", "# Intro\nalpha\n\n# Middle\nbeta\n\n# End\ngamma")]
+    page._pending_regenerate_request = RegenerateRequest(
+        scope="current_card",
+        source_documents=["a.md"],
+        sections=[
+            SourceSection(source_document="a.md", start=30, end=41),
+            SourceSection(source_document="a.md", start=0, end=13),
+        ],
+    )
+
+    docs = page._build_documents()
+
+    assert docs[0].result.content == "# Intro\nalpha\n\n# End\ngamma"
+
+
+def test_build_documents_keeps_whole_document_when_section_is_stale():
+    main = _make_main_window()
+    page = PreviewPage(main)
+    page._documents = [_make_doc("a.md", "# A\nshort")]
+    page._pending_regenerate_request = RegenerateRequest(
+        scope="current_card",
+        sections=[SourceSection(source_document="a.md", start=0, end=500)],
+    )
+
+    docs = page._build_documents()
+
+    assert docs[0].result.content == "# A\nshort"
+    assert page._regenerate_section_maps == {}
+
+
+def test_section_regeneration_replaces_only_requested_cards():
+    main = _make_main_window()
+    page = PreviewPage(main)
+    page._documents = [_make_doc("a.md", "# Intro\nalpha\n\n# Middle\nbeta\n\n# End\ngamma")]
+    page._pending_regenerate_request = RegenerateRequest(
+        scope="current_card",
+        sections=[SourceSection(source_document="a.md", start=30, end=41)],
+    )
+    page._build_documents()
+    regenerated = CardDraft(
+        fields={"Front": "new", "Back": "card"},
+        metadata=CardMetadata(source_document="a.md", source_start=0, source_end=11),
+    )
+
+    page._rebase_regenerated_spans([regenerated])
+    merged = page._merge_regenerated_cards(["c0", "c1", "c2"], [1], [regenerated])
+
+    assert (regenerated.metadata.source_start, regenerated.metadata.source_end) == (30, 41)
+    assert merged == ["c0", regenerated, "c2"]
+    assert page._section_generation_config(
+        {"target_total": 20, "auto_target_count": True, "strategy_mix": []},
+        RegenerateRequest(scope="current_card", card_indices=[1], strategy_ids=["cloze"]),
+    ) == {
+        "target_total": 1,
+        "auto_target_count": False,
+        "strategy_mix": [{"strategy": "cloze", "ratio": 1}],
+    }
+
+
+def test_regenerated_cards_are_merged_into_the_loaded_store_in_place():
+    existing = CardStore(CardDraft(fields={"Front": f"q{i}", "Back": "a"}) for i in range(5))
+    untouched = existing[4]
+    regenerated = CardStore(CardDraft(fields={"Front": f"new{i}", "Back": "a"}) for i in range(3))
+
+    merged = PreviewPage._merge_regenerated_cards(existing, [1, 3], regenerated)
+
+    assert merged is existing
+    assert [row.fields["Front"] for row in merged.rows()] == [
+        "q0",
+        "new0",
+        "new1",
+        "new2",
+        "q2",
+        "q4",
+    ]
+    assert merged.row_of(untouched) is not None
+    assert existing.materialized_count() == 2
+
+
 def test_sample_error_clears_progress_infobar(monkeypatch):
     main = _make_main_window()
     main.config.language = "zh"
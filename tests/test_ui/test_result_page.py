@@ -6,6 +6,7 @@ from PyQt6.QtWidgets import QApplication
 from qfluentwidgets import TitleLabel
 
 import ankismart.ui.result_page as result_page_module
+from ankismart.core.card_store import CardStore
 from ankismart.core.models import CardDraft, CardPushStatus, PushResult
 from ankismart.ui.card_edit_widget import CardEditWidget
 from ankismart.ui.result_page import ResultPage
@@ -614,6 +615,23 @@ def test_result_page_renders_push_results_in_pages_of_50(_qapp) -> None:
     assert page._btn_next_page.isEnabled() is False
 
 
+def test_result_page_renders_card_store_rows_without_building_drafts(_qapp) -> None:
+    page = ResultPage(_FakeMainWindow())
+    cards = CardStore(_make_card(f"问题 {index}", f"答案 {index}") for index in range(60))
+    result = PushResult(
+        total=60,
+        succeeded=60,
+        failed=0,
+        results=[CardPushStatus(index=index, success=True, error="") for index in range(60)],
+    )
+
+    page.load_result(result, cards)
+
+    assert page._table.rowCount() == 50
+    assert page._table.item(1, 1).text() == "问题 1"
+    assert cards.materialized_count() == 0
+
+
 def test_result_page_total_stat_card_uses_theme_accent(_qapp, monkeypatch) -> None:
     monkeypatch.setattr("ankismart.ui.result_page.get_theme_accent_text_hex", lambda **_: "#123456")
     page = ResultPage(_FakeMainWindow())
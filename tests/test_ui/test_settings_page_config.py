@@ -495,6 +495,37 @@ def test_save_config_persists_adaptive_concurrency_and_update_flags(_qapp, monke
     assert captured["cfg"].auto_check_updates is False
 
 
+def test_usage_pricing_and_batch_budgets_load_and_save(_qapp, monkeypatch) -> None:
+    cfg = AppConfig(llm_cost_per_1k_prompt_tokens=0.0025, llm_batch_token_budget=500_000)
+    main, _ = make_main(cfg)
+    page = SettingsPage(main)
+
+    assert page._prompt_price_spin.value() == pytest.approx(0.0025)
+    assert page._token_budget_spin.value() == 500_000
+
+    captured: dict[str, AppConfig] = {}
+    monkeypatch.setattr(
+        "ankismart.ui.settings_page.save_config", lambda c: captured.setdefault("cfg", c)
+    )
+    monkeypatch.setattr("ankismart.ui.settings_page.configure_ocr_runtime", lambda **kwargs: None)
+    monkeypatch.setattr(
+        QMessageBox, "information", lambda *args, **kwargs: QMessageBox.StandardButton.Ok
+    )
+    monkeypatch.setattr(
+        QMessageBox, "critical", lambda *args, **kwargs: QMessageBox.StandardButton.Ok
+    )
+
+    page._completion_price_spin.setValue(0.01)
+    page._cost_budget_spin.setValue(5.0)
+    page._save_config()
+
+    assert "cfg" in captured
+    assert captured["cfg"].llm_cost_per_1k_prompt_tokens == pytest.approx(0.0025)
+    assert captured["cfg"].llm_cost_per_1k_completion_tokens == pytest.approx(0.01)
+    assert captured["cfg"].llm_batch_token_budget == 500_000
+    assert captured["cfg"].llm_batch_cost_budget == pytest.approx(5.0)
+
+
 def test_save_config_preserves_generation_preset_from_import_page(_qapp, monkeypatch) -> None:
     cfg = AppConfig(generation_preset="language_vocab")
     main, _ = make_main(cfg)
@@ -5,6 +5,7 @@ import types
 from pathlib import Path
 from types import SimpleNamespace
 
+from ankismart.core.card_store import CardStore
 from ankismart.core.config import LLMProviderConfig
 from ankismart.core.errors import CardGenError, ErrorCode
 from ankismart.core.models import (
@@ -24,6 +25,7 @@ from ankismart.ui.workers import (
     ProviderConnectionWorker,
     PushWorker,
     _format_error_for_ui,
+    _rebase_source_spans,
 )
 
 
@@ -32,12 +34,24 @@ def test_format_error_for_ui_preserves_error_code() -> None:
     assert _format_error_for_ui(error) == "[E_LLM_AUTH_ERROR] invalid token"
 
 
+def test_rebase_source_spans_maps_deduplicated_units_onto_stored_document() -> None:
+    found = CardDraft(fields={"Front": "Q", "Back": "A"})
+    found.metadata.source_start, found.metadata.source_end = 0, 5
+    missing = CardDraft(fields={"Front": "Q", "Back": "A"})
+    missing.metadata.source_start, missing.metadata.source_end = 7, 12
+
+    _rebase_source_spans([found, missing], "gamma\n\nshared", "alpha\n\ngamma\n\ndelta")
+
+    assert (found.metadata.source_start, found.metadata.source_end) == (7, 12)
+    assert (missing.metadata.source_start, missing.metadata.source_end) == (-1, -1)
+
+
 def test_convert_worker_success_emits_progress_and_finished() -> None:
     messages: list[str] = []
     results: list[MarkdownResult] = []
 
     class _FakeConverter:
-        def convert(self, path, *, progress_callback=None):
+        def convert(self, path, *, progress_callback=None, cancel_token=None):
             if progress_callback:
                 progress_callback("正在处理内容")
             return MarkdownResult(
@@ -100,7 +114,7 @@ def test_convert_worker_cancelled_during_progress_does_not_emit_finished() -> No
     cancelled: list[bool] = []
 
     class _FakeConverter:
-        def convert(self, path, *, progress_callback=None):
+        def convert(self, path, *, progress_callback=None, cancel_token=None):
             if progress_callback:
                 progress_callback("step-1")
             return MarkdownResult(
@@ -677,7 +691,7 @@ def test_batch_convert_worker_emits_ocr_progress(monkeypatch) -> None:
         def __init__(self, *args, **kwargs):
             pass
 
-        def convert(self, path, *, progress_callback=None):
+        def convert(self, path, *, progress_callback=None, cancel_token=None):
             if progress_callback is not None:
                 progress_callback("OCR 正在识别第 1 页...")
             return MarkdownResult(
@@ -730,7 +744,7 @@ def test_batch_convert_worker_cancel_stops_processing(monkeypatch) -> None:
         def __init__(self, *a, **_kw):
             pass
 
-        def convert(self, path, *, progress_callback=None):
+        def convert(self, path, *, progress_callback=None, cancel_token=None):
             convert_count["n"] += 1
             return MarkdownResult(
                 content="ok",
@@ -757,7 +771,7 @@ def test_batch_convert_worker_retry_on_failure(monkeypatch) -> None:
         def __init__(self, *a, **_kw):
             pass
 
-        def convert(self, path, *, progress_callback=None):
+        def convert(self, path, *, progress_callback=None, cancel_token=None):
             call_count["n"] += 1
             if call_count["n"] == 1:
                 raise RuntimeError("transient error")
@@ -781,12 +795,41 @@ def test_batch_convert_worker_retry_on_failure(monkeypatch) -> None:
     assert call_count["n"] == 2
 
 
+def test_batch_convert_worker_does_not_retry_cancelled_conversion(monkeypatch) -> None:
+    call_count = {"n": 0}
+
+    class _CancellingConverter:
+        def __init__(self, *a, **_kw):
+            pass
+
+        def convert(self, path, *, progress_callback=None, cancel_token=None):
+            call_count["n"] += 1
+            cancel_token.cancel()
+            cancel_token.raise_if_cancelled(stage="OCR", completed=2, total=5)
+
+    monkeypatch.setattr("ankismart.ui.workers.DocumentConverter", _CancellingConverter)
+
+    worker = BatchConvertWorker([Path("demo.pdf")])
+    messages: list[str] = []
+    cancelled: list[bool] = []
+    file_errors: list[str] = []
+    worker.ocr_progress.connect(messages.append)
+    worker.cancelled.connect(lambda: cancelled.append(True))
+    worker.file_error.connect(file_errors.append)
+    worker.run()
+
+    assert call_count["n"] == 1
+    assert cancelled == [True]
+    assert file_errors == []
+    assert any("2/5" in message and "跳过 3 页" in message for message in messages)
+
+
 def test_batch_convert_worker_file_error_emitted_on_final_failure(monkeypatch) -> None:
     class _AlwaysFailConverter:
         def __init__(self, *a, **_kw):
             pass
 
-        def convert(self, path, *, progress_callback=None):
+        def convert(self, path, *, progress_callback=None, cancel_token=None):
             raise RuntimeError("permanent error")
 
     monkeypatch.setattr("ankismart.ui.workers.DocumentConverter", _AlwaysFailConverter)
@@ -800,9 +843,12 @@ def test_batch_convert_worker_file_error_emitted_on_final_failure(monkeypatch) -
     assert "permanent error" in file_errors[0]
 
 
-def test_batch_generate_worker_malformed_large_llm_output_emits_error(monkeypatch) -> None:
+def test_batch_generate_worker_truncated_large_llm_output_is_recovered(monkeypatch) -> None:
     class _MalformedLLMClient:
+        calls = 0
+
         def chat(self, *_args, **_kwargs):
+            self.calls += 1
             cards = [
                 {
                     "Front": f"Question {index}",
@@ -815,6 +861,7 @@ def test_batch_generate_worker_malformed_large_llm_output_emits_error(monkeypatc
         def close(self):
             pass
 
+    llm_client = _MalformedLLMClient()
     document = ConvertedDocument(
         result=MarkdownResult(
             content="source content",
@@ -830,7 +877,7 @@ def test_batch_generate_worker_malformed_large_llm_output_emits_error(monkeypatc
             "target_total": 120,
             "strategy_mix": [{"strategy": "basic", "ratio": 100}],
         },
-        llm_client=_MalformedLLMClient(),
+        llm_client=llm_client,
         deck_name="Default",
         tags=["ankismart"],
         config=SimpleNamespace(
@@ -850,9 +897,11 @@ def test_batch_generate_worker_malformed_large_llm_output_emits_error(monkeypatc
 
     worker.run()
 
-    assert finished == []
-    assert len(errors) == 1
-    assert "[E_LLM_PARSE_ERROR]" in errors[0]
+    # Complete objects are kept and one follow-up asks for the missing remainder.
+    assert errors == []
+    assert len(finished) == 1
+    assert finished[0]
+    assert llm_client.calls == 2
 
 
 def test_batch_generate_worker_retries_failed_strategy_before_success(monkeypatch) -> None:
@@ -923,13 +972,75 @@ def test_batch_generate_worker_retries_failed_strategy_before_success(monkeypatc
     assert any("第 3/3 次尝试" in message for message in progress)
 
 
+def test_batch_generate_worker_retry_round_sends_shortfall_and_accepted_questions(
+    monkeypatch,
+) -> None:
+    requests = []
+
+    class _FakeGenerator:
+        def __init__(self, _llm_client):
+            pass
+
+        def generate(self, request):
+            requests.append(request)
+            front = ("What is osmosis?", "Define diffusion.")[len(requests) - 1]
+            card = CardDraft(note_type="Basic", fields={"Front": front, "Back": "Answer"})
+            card.metadata.source_chunk_id = "chunk-1"
+            duplicate = card.model_copy(deep=True)
+            return [card, duplicate]
+
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator", _FakeGenerator)
+    document = ConvertedDocument(
+        result=MarkdownResult(
+            content="source content",
+            source_path="delta.md",
+            source_format="markdown",
+            trace_id="trace-delta",
+        ),
+        file_name="delta.md",
+    )
+    worker = BatchGenerateWorker(
+        documents=[document],
+        generation_config={
+            "target_total": 2,
+            "strategy_mix": [{"strategy": "basic", "ratio": 100}],
+        },
+        llm_client=SimpleNamespace(close=lambda: None),
+        deck_name="Default",
+        tags=[],
+        config=SimpleNamespace(card_quality_retry_rounds=1, llm_concurrency=1),
+    )
+    finished: list[list[CardDraft]] = []
+    worker.finished.connect(finished.append)
+
+    worker.run()
+
+    assert [request.target_count for request in requests] == [2, 1]
+    assert requests[0].accepted_questions == {}
+    assert requests[1].accepted_questions == {"chunk-1": ["What is osmosis?"]}
+    assert isinstance(finished[0], CardStore)
+    assert [card.fields["Front"] for card in finished[0]] == [
+        "What is osmosis?",
+        "Define diffusion.",
+    ]
+
+
 def test_batch_convert_worker_closes_ocr_correction_client(monkeypatch) -> None:
-    closed = {"value": False}
+    closed = {"value": False, "async": False}
+
+    class _FakeAsyncClient:
+        model = "gpt-4o-mini"
+
+        async def aclose(self):
+            closed["async"] = True
 
     class _FakeLLMClient:
         def __init__(self, **kwargs):
             pass
 
+        def as_async(self):
+            return _FakeAsyncClient()
+
         def close(self):
             closed["value"] = True
 
@@ -944,7 +1055,7 @@ def test_batch_convert_worker_closes_ocr_correction_client(monkeypatch) -> None:
         def __init__(self, **kwargs):
             self._ocr_correction_fn = kwargs["ocr_correction_fn"]
 
-        def convert(self, path, *, progress_callback=None):
+        def convert(self, path, *, progress_callback=None, cancel_token=None):
             return MarkdownResult(
                 content="ok",
                 source_path=str(path),
@@ -995,7 +1106,7 @@ def test_batch_convert_worker_closes_ocr_correction_client(monkeypatch) -> None:
 
     worker.run()
 
-    assert closed["value"] is True
+    assert closed == {"value": True, "async": True}
 
 
 def test_batch_generate_worker_has_cancel() -> None:
@@ -1093,6 +1204,57 @@ def test_batch_generate_worker_closes_llm_client_after_run(monkeypatch) -> None:
     assert closed["value"] is True
 
 
+def test_batch_generate_worker_routes_llm_calls_through_shared_scheduler(monkeypatch) -> None:
+    from ankismart.card_gen.llm_client import LLMClient
+    from ankismart.card_gen.llm_scheduler import LLMRequestScheduler
+
+    monkeypatch.setattr("ankismart.card_gen.llm_client.OpenAI", lambda **_kwargs: object())
+    monkeypatch.setattr(
+        "ankismart.card_gen.async_llm_client.AsyncOpenAI", lambda **_kwargs: object()
+    )
+    docs = [
+        ConvertedDocument(
+            result=MarkdownResult(
+                content=f"content {name}",
+                source_path=f"{name}.md",
+                source_format="markdown",
+                trace_id=f"trace-{name}",
+            ),
+            file_name=f"{name}.md",
+        )
+        for name in ("a", "b")
+    ]
+    seen_clients: list[object] = []
+
+    def _generate(self, _request):
+        seen_clients.append(self._impl._llm)
+        return []
+
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate", _generate)
+    worker = BatchGenerateWorker(
+        documents=docs,
+        generation_config={"target_total": 2, "strategy_mix": [{"strategy": "basic", "ratio": 1}]},
+        llm_client=LLMClient(api_key="sk-test"),
+        deck_name="Default",
+        tags=[],
+        config=SimpleNamespace(
+            llm_concurrency=2,
+            llm_concurrency_max=8,
+            llm_max_in_flight=16,
+            card_quality_retry_rounds=0,
+        ),
+    )
+
+    worker.run()
+
+    assert len(seen_clients) == 2
+    assert all(isinstance(client, LLMRequestScheduler) for client in seen_clients)
+    assert seen_clients[0] is seen_clients[1]
+    assert seen_clients[0].max_in_flight == 8
+    assert seen_clients[0].concurrency_limit == 2
+    assert worker._llm_scheduler is None
+
+
 def test_allocate_auto_strategy_counts_uses_enabled_strategies_without_fixed_counts() -> None:
     counts = BatchGenerateWorker._allocate_auto_strategy_counts(
         [
@@ -1208,6 +1370,399 @@ def test_batch_generate_worker_enables_auto_split_by_default(monkeypatch) -> Non
     assert all(item == (True, 70000) for item in captured)
 
 
+def test_batch_generate_worker_generates_shared_sections_once(monkeypatch) -> None:
+    shared = "\n\n".join(
+        f"## Shared topic {i}\n\n" + f"Shared paragraph {i} about cell biology. " * 15
+        for i in range(3)
+    )
+    docs = [
+        ConvertedDocument(
+            result=MarkdownResult(
+                content=f"## Intro {name}\n\n"
+                + f"Unique notes for {name}. " * 20
+                + "\n\n"
+                + shared,
+                source_path=f"{name}.md",
+                source_format="markdown",
+                trace_id=f"trace-{name}",
+            ),
+            file_name=f"{name}.md",
+        )
+        for name in ("a", "b")
+    ]
+    markdowns: list[str] = []
+    finished: list[list[CardDraft]] = []
+
+    def _generate(_self, request):
+        markdowns.append(request.markdown)
+        return [
+            CardDraft(
+                fields={"Front": f"Question about {request.markdown[:40]}?", "Back": "Answer"},
+                note_type="Basic",
+            )
+        ]
+
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate", _generate)
+    worker = BatchGenerateWorker(
+        documents=docs,
+        generation_config={
+            "target_total": 3,
+            "strategy_mix": [{"strategy": "basic", "ratio": 1}],
+        },
+        llm_client=object(),
+        deck_name="Default",
+        tags=[],
+        config=SimpleNamespace(llm_concurrency=1, card_quality_retry_rounds=0),
+    )
+    worker.finished.connect(finished.append)
+
+    worker.run()
+
+    assert sum(markdown.count("Shared paragraph 0") > 0 for markdown in markdowns) == 1
+    shared_cards = [card for card in finished[0] if card.metadata.source_documents]
+    assert len(shared_cards) == 1
+    assert shared_cards[0].metadata.source_documents == ["a.md", "b.md"]
+
+
+def _shared_section_documents() -> list[ConvertedDocument]:
+    shared = "\n\n".join(
+        f"## Shared topic {i}\n\n" + f"Shared paragraph {i} about cell biology. " * 15
+        for i in range(3)
+    )
+    return [
+        ConvertedDocument(
+            result=MarkdownResult(
+                content=f"## Intro {name}\n\n"
+                + f"Unique notes for {name}. " * 20
+                + "\n\n"
+                + shared,
+                source_path=f"{name}.md",
+                source_format="markdown",
+                trace_id=f"trace-{name}",
+            ),
+            file_name=f"{name}.md",
+        )
+        for name in ("a", "b")
+    ]
+
+
+def test_batch_generate_worker_auto_mode_splits_hints_across_shared_units(monkeypatch) -> None:
+    docs = _shared_section_documents()
+    requests: list[tuple[str, int, bool]] = []
+    completed: list[tuple[str, int]] = []
+    progress: list[str] = []
+
+    def _generate(_self, request):
+        requests.append((request.markdown, request.target_count, request.auto_target_count))
+        return [
+            CardDraft(
+                fields={"Front": f"Question about {request.markdown[:40]}?", "Back": "Answer"},
+                note_type="Basic",
+            )
+        ]
+
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate", _generate)
+    worker = BatchGenerateWorker(
+        documents=docs,
+        generation_config={
+            "auto_target_count": True,
+            "strategy_mix": [{"strategy": "basic", "ratio": 1}],
+        },
+        llm_client=object(),
+        deck_name="Default",
+        tags=[],
+        config=SimpleNamespace(llm_concurrency=1),
+    )
+    worker.document_completed.connect(lambda name, count: completed.append((name, count)))
+    worker.progress.connect(progress.append)
+
+    worker.run()
+
+    assert len(requests) == 3
+    assert all(auto for _markdown, _hint, auto in requests)
+    per_document_hint = len(docs[0].result.content) // 450
+    hints = [hint for _markdown, hint, _auto in requests]
+    # The shared unit counts once; the batch asks for fewer cards than two full documents.
+    assert all(hint > 0 for hint in hints)
+    assert sum(hints) < 2 * per_document_hint
+    shared_hint = next(hint for markdown, hint, _ in requests if "Shared paragraph" in markdown)
+    unique_hints = [hint for markdown, hint, _ in requests if "Shared paragraph" not in markdown]
+    assert all(shared_hint > hint for hint in unique_hints)
+    assert sorted(completed) == [("a.md", 2), ("b.md", 2)]
+    assert not any(" + " in message for message in progress)
+
+
+def test_batch_generate_worker_fixed_mode_splits_counts_by_unit_size() -> None:
+    docs = _shared_section_documents()
+    worker = BatchGenerateWorker(
+        documents=docs,
+        generation_config={},
+        llm_client=object(),
+        deck_name="Default",
+        tags=[],
+        config=SimpleNamespace(),
+    )
+    work_documents, work_sources = worker._plan_generation_documents()
+
+    allocations = worker._allocate_work_items(
+        work_documents, work_sources, {"basic": 10}, auto_target_count=False
+    )
+
+    assert [document.file_name for document in work_documents] == ["a.md", "a.md", "b.md"]
+    assert work_sources == [("a.md",), ("a.md", "b.md"), ("b.md",)]
+    assert sum(allocation.get("basic", 0) for allocation in allocations) == 10
+    assert allocations[1]["basic"] > allocations[0]["basic"] + allocations[2]["basic"]
+
+
+def test_batch_generate_worker_cross_document_dedup_can_be_disabled(monkeypatch) -> None:
+    content = "\n\n".join(f"Shared paragraph {i}. " * 30 for i in range(3))
+    docs = [
+        ConvertedDocument(
+            result=MarkdownResult(
+                content=content,
+                source_path=f"{name}.md",
+                source_format="markdown",
+                trace_id=f"trace-{name}",
+            ),
+            file_name=f"{name}.md",
+        )
+        for name in ("a", "b")
+    ]
+    markdowns: list[str] = []
+
+    def _generate(_self, request):
+        markdowns.append(request.markdown)
+        return []
+
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate", _generate)
+    worker = BatchGenerateWorker(
+        documents=docs,
+        generation_config={
+            "target_total": 2,
+            "strategy_mix": [{"strategy": "basic", "ratio": 1}],
+        },
+        llm_client=object(),
+        deck_name="Default",
+        tags=[],
+        config=SimpleNamespace(
+            llm_concurrency=1, card_quality_retry_rounds=0, cross_document_dedup=False
+        ),
+    )
+
+    worker.run()
+
+    assert markdowns == [content, content]
+
+
+def test_batch_generate_worker_retries_and_regeneration_skip_response_cache(monkeypatch) -> None:
+    doc = ConvertedDocument(
+        result=MarkdownResult(
+            content="Cell biology notes. " * 20,
+            source_path="a.md",
+            source_format="markdown",
+            trace_id="trace-a",
+        ),
+        file_name="a.md",
+    )
+    cache_flags: list[bool] = []
+
+    def _generate(_self, request):
+        cache_flags.append(request.use_response_cache)
+        if len(cache_flags) == 1:
+            return []
+        return [
+            CardDraft(
+                fields={"Front": "What do mitochondria make?", "Back": "ATP"},
+                note_type="Basic",
+            )
+        ]
+
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate", _generate)
+
+    def _run(generation_config: dict) -> None:
+        BatchGenerateWorker(
+            documents=[doc],
+            generation_config={
+                "target_total": 1,
+                "strategy_mix": [{"strategy": "basic", "ratio": 1}],
+                **generation_config,
+            },
+            llm_client=object(),
+            deck_name="Default",
+            tags=[],
+            config=SimpleNamespace(llm_concurrency=1, card_quality_retry_rounds=1),
+        ).run()
+
+    _run({})
+    # The empty first answer is retried with a fresh request, not replayed from cache.
+    assert cache_flags == [True, False]
+
+    cache_flags.clear()
+    _run({"fresh_responses": True})
+    assert cache_flags == [False, False]
+
+
+def test_batch_generate_worker_drops_cards_already_in_target_deck(monkeypatch) -> None:
+    doc = ConvertedDocument(
+        result=MarkdownResult(
+            content="Cell biology notes. " * 20,
+            source_path="a.md",
+            source_format="markdown",
+            trace_id="trace-a",
+        ),
+        file_name="a.md",
+    )
+    finished: list[list[CardDraft]] = []
+    queries: list[str] = []
+
+    class _Client:
+        def __init__(self, url, key, proxy_url):
+            pass
+
+        def find_notes(self, query):
+            queries.append(query)
+            return [7]
+
+        def notes_mod_time(self, note_ids):
+            return [{"noteId": 7, "mod": 1}]
+
+        def notes_info(self, note_ids):
+            return [{"noteId": 7, "mod": 1, "fields": {"Front": {"value": "What is osmosis?"}}}]
+
+    def _generate(_self, request):
+        return [
+            CardDraft(fields={"Front": "What is osmosis?", "Back": "Water"}, note_type="Basic"),
+            CardDraft(fields={"Front": "What is diffusion?", "Back": "Spread"}, note_type="Basic"),
+        ]
+
+    monkeypatch.setattr(
+        "ankismart.ui.workers._load_anki_gateway_types",
+        lambda: (_Client, object, types.SimpleNamespace),
+    )
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate", _generate)
+    worker = BatchGenerateWorker(
+        documents=[doc],
+        generation_config={
+            "target_total": 2,
+            "strategy_mix": [{"strategy": "basic", "ratio": 1}],
+        },
+        llm_client=object(),
+        deck_name="Biology",
+        tags=[],
+        config=SimpleNamespace(
+            llm_concurrency=1,
+            card_quality_retry_rounds=0,
+            deck_aware_generation=True,
+            allow_duplicate=False,
+            duplicate_scope="deck",
+            anki_connect_url="http://deck-aware-test:8765",
+        ),
+    )
+    worker.finished.connect(finished.append)
+
+    worker.run()
+
+    assert queries == ['"deck:Biology"']
+    assert [card.fields["Front"] for card in finished[0]] == ["What is diffusion?"]
+
+
+def test_batch_generate_worker_combines_strategies_and_tops_up_short_ones(monkeypatch) -> None:
+    doc = ConvertedDocument(
+        result=MarkdownResult(
+            content="demo",
+            source_path="a.md",
+            source_format="markdown",
+            trace_id="trace-combined",
+        ),
+        file_name="a.md",
+    )
+    combined_calls: list[dict[str, int]] = []
+    single_calls: list[tuple[str, int]] = []
+    finished: list[list[CardDraft]] = []
+
+    def _generate_multi(_self, _request, strategy_counts):
+        combined_calls.append(dict(strategy_counts))
+        return {
+            "basic": [
+                CardDraft(
+                    fields={"Front": "What is osmosis?", "Back": "Water diffusion."},
+                    note_type="Basic",
+                ),
+                CardDraft(
+                    fields={"Front": "Why do cells need ATP?", "Back": "Energy."},
+                    note_type="Basic",
+                ),
+            ],
+            "cloze": [],
+        }
+
+    def _generate(_self, request):
+        single_calls.append((request.strategy, request.target_count))
+        return [
+            CardDraft(fields={"Text": "{{c1::Mitochondria}} make ATP."}, note_type="Cloze"),
+            CardDraft(fields={"Text": "{{c1::Ribosomes}} build proteins."}, note_type="Cloze"),
+        ]
+
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate_multi", _generate_multi)
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate", _generate)
+    worker = BatchGenerateWorker(
+        documents=[doc],
+        generation_config={
+            "target_total": 4,
+            "strategy_mix": [{"strategy": "basic", "ratio": 1}, {"strategy": "cloze", "ratio": 1}],
+        },
+        llm_client=object(),
+        deck_name="Default",
+        tags=[],
+        config=SimpleNamespace(llm_concurrency=1),
+    )
+    worker.finished.connect(finished.append)
+
+    worker.run()
+
+    assert combined_calls == [{"basic": 2, "cloze": 2}]
+    assert single_calls == [("cloze", 2)]
+    assert len(finished[0]) == 4
+
+
+def test_batch_generate_worker_falls_back_when_combined_request_fails(monkeypatch) -> None:
+    doc = ConvertedDocument(
+        result=MarkdownResult(
+            content="demo",
+            source_path="a.md",
+            source_format="markdown",
+            trace_id="trace-combined-fallback",
+        ),
+        file_name="a.md",
+    )
+    single_calls: list[str] = []
+
+    def _generate_multi(_self, _request, _strategy_counts):
+        raise CardGenError("bad json", code=ErrorCode.E_LLM_PARSE_ERROR)
+
+    def _generate(_self, request):
+        single_calls.append(request.strategy)
+        return []
+
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate_multi", _generate_multi)
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate", _generate)
+    worker = BatchGenerateWorker(
+        documents=[doc],
+        generation_config={
+            "target_total": 2,
+            "strategy_mix": [{"strategy": "basic", "ratio": 1}, {"strategy": "cloze", "ratio": 1}],
+        },
+        llm_client=object(),
+        deck_name="Default",
+        tags=[],
+        config=SimpleNamespace(llm_concurrency=1, card_quality_retry_rounds=0),
+    )
+
+    worker.run()
+
+    assert single_calls == ["basic", "cloze"]
+
+
 def test_batch_generate_worker_emits_warning_when_partial_timeout_has_cards(monkeypatch) -> None:
     doc = ConvertedDocument(
         result=MarkdownResult(
@@ -1378,3 +1933,155 @@ def test_batch_generate_worker_adaptive_concurrency_increases_when_stable() -> N
 
     assert config.llm_concurrency == 3
     assert any("自动将并发从 2 调整为 3" in message for message in messages)
+
+
+def test_batch_generate_worker_persists_scheduler_concurrency_window() -> None:
+    config = SimpleNamespace(
+        llm_concurrency=2,
+        llm_adaptive_concurrency=True,
+        llm_concurrency_max=6,
+    )
+    worker = BatchGenerateWorker(
+        documents=[],
+        generation_config={"target_total": 1, "strategy_mix": [{"strategy": "basic", "ratio": 1}]},
+        llm_client=object(),
+        deck_name="Default",
+        tags=[],
+        config=config,
+    )
+    messages: list[str] = []
+    worker.progress.connect(messages.append)
+
+    worker._throttle_events = 0
+    worker._llm_scheduler = SimpleNamespace(concurrency_limit=5)
+    worker._apply_adaptive_concurrency(configured_workers=2, had_error=False)
+
+    assert config.llm_concurrency == 5
+    assert any("自动将并发从 2 调整为 5" in message for message in messages)
+
+
+def test_batch_generate_worker_reports_streamed_cards_before_response_completes() -> None:
+    progress_events: list[tuple[int, int]] = []
+    seen_mid_stream: list[list[tuple[int, int]]] = []
+
+    class _StreamingClient:
+        def chat(self, _system_prompt, _user_prompt, timeout=None):
+            raise AssertionError("expected a streaming request")
+
+        def chat_stream(self, _system_prompt, _user_prompt, timeout=None, *, on_text=None):
+            on_text('[{"Front": "What is alpha decay?", "Back": "Answer: emission"}')
+            seen_mid_stream.append(list(progress_events))
+            on_text(', {"Front": "Which law governs gases?", "Back": "Answer: ideal gas law"}]')
+            return (
+                '[{"Front": "What is alpha decay?", "Back": "Answer: emission"}, '
+                '{"Front": "Which law governs gases?", "Back": "Answer: ideal gas law"}]'
+            )
+
+        def close(self):
+            pass
+
+    doc = ConvertedDocument(
+        result=MarkdownResult(
+            content="physics notes",
+            source_path="physics.md",
+            source_format="markdown",
+            trace_id="trace-stream",
+        ),
+        file_name="physics.md",
+    )
+    worker = BatchGenerateWorker(
+        documents=[doc],
+        generation_config={"target_total": 2, "strategy_mix": [{"strategy": "basic", "ratio": 1}]},
+        llm_client=_StreamingClient(),
+        deck_name="Default",
+        tags=[],
+        config=SimpleNamespace(language="zh", llm_concurrency=1, card_quality_retry_rounds=0),
+    )
+    finished: list[list[CardDraft]] = []
+    worker.card_progress.connect(lambda current, total: progress_events.append((current, total)))
+    worker.finished.connect(finished.append)
+
+    worker.run()
+
+    assert seen_mid_stream == [[(1, 2)]]
+    assert progress_events[-1] == (2, 2)
+    assert len(finished[0]) == 2
+
+
+def _usage_document(name: str) -> ConvertedDocument:
+    return ConvertedDocument(
+        result=MarkdownResult(
+            content=f"# {name}\n\n" + "Mitochondria produce ATP through respiration. " * 20,
+            source_path=f"{name}.md",
+            source_format="markdown",
+            trace_id=f"trace-usage-{name}",
+        ),
+        file_name=f"{name}.md",
+    )
+
+
+def test_batch_generate_worker_stops_before_dispatch_when_estimate_exceeds_budget(
+    monkeypatch,
+) -> None:
+    def _unexpected(_self, _request):
+        raise AssertionError("no request may be sent over budget")
+
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate", _unexpected)
+    worker = BatchGenerateWorker(
+        documents=[_usage_document("a"), _usage_document("b")],
+        generation_config={"target_total": 4, "strategy_mix": [{"strategy": "basic", "ratio": 1}]},
+        llm_client=object(),
+        deck_name="Default",
+        tags=[],
+        config=SimpleNamespace(language="en", llm_concurrency=1, llm_batch_token_budget=500),
+    )
+    estimates: list[object] = []
+    errors: list[str] = []
+    worker.usage_estimated.connect(estimates.append)
+    worker.error.connect(errors.append)
+
+    worker.run()
+
+    [estimate] = estimates
+    assert [request.document for request in estimate.requests] == ["a.md", "b.md"]
+    assert estimate.completion_tokens == 4 * 200
+    assert estimate.total_tokens > 500
+    assert errors and "budget of 500 tokens" in errors[0]
+
+
+def test_batch_generate_worker_records_actual_usage_for_calibration(monkeypatch) -> None:
+    from ankismart.card_gen.llm_client import record_usage
+
+    def _billed_generate(_self, request):
+        usage = SimpleNamespace(prompt_tokens=900, completion_tokens=150, total_tokens=1050)
+        record_usage(SimpleNamespace(usage=usage), trace_id=request.trace_id, model="m")
+        return [CardDraft(fields={"Front": "What makes ATP?", "Back": "Mitochondria"})]
+
+    monkeypatch.setattr("ankismart.ui.workers.CardGenerator.generate", _billed_generate)
+    monkeypatch.setattr("ankismart.core.config.save_config", lambda _config: None)
+    config = SimpleNamespace(
+        language="en",
+        llm_concurrency=1,
+        llm_batch_token_budget=0,
+        llm_usage_calibration=[],
+        card_quality_retry_rounds=0,
+    )
+    worker = BatchGenerateWorker(
+        documents=[_usage_document("c")],
+        generation_config={"target_total": 1, "strategy_mix": [{"strategy": "basic", "ratio": 1}]},
+        llm_client=object(),
+        deck_name="Default",
+        tags=[],
+        config=config,
+    )
+    estimates: list[object] = []
+    worker.usage_estimated.connect(estimates.append)
+
+    worker.run()
+
+    [sample] = config.llm_usage_calibration
+    assert sample["document"] == "c.md"
+    assert sample["actual_prompt_tokens"] == 900
+    assert sample["actual_completion_tokens"] == 150
+    assert sample["estimated_completion_tokens"] == 200
+    assert sample["estimated_prompt_tokens"] == estimates[0].prompt_tokens